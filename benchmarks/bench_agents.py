@@ -0,0 +1,530 @@
+"""
+智能体端到端基准测试
+
+使用确定性的脚本化聊天模型（按轮次回放预设的工具调用）与内置 MCP 服务器
+(src/mcp_servers/*)，无需网络和 API Key，测量：
+
+- 冷启动：新进程中导入、初始化与首次运行的耗时
+- 各场景单次运行的延迟分位数
+- N 个并发运行下的吞吐量与延迟
+- 每次运行的内存峰值（tracemalloc）
+
+结果（含 git 提交与环境信息）以 JSON 输出，可用 --compare 与之前的结果对比。
+
+用法:
+    python benchmarks/bench_agents.py
+    python benchmarks/bench_agents.py --scenarios react_travel react_data --runs 50 --concurrency 1 8 32
+    python benchmarks/bench_agents.py --llm-latency-ms 300 --json results/agents.json
+    TOOL_EARLY_DISPATCH=false python benchmarks/bench_agents.py --scenarios react_travel --llm-latency-ms 300
+    PLAN_CACHE=false python benchmarks/bench_agents.py --scenarios react_travel react_data  # 每次都走 LLM
+    python benchmarks/bench_agents.py --compare results/agents.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+
+from langchain_core.language_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage  # noqa: E402
+from langchain_core.messages.tool import tool_call_chunk  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    确定性的脚本化聊天模型
+
+    script 的每一项对应一轮回复：工具调用列表 [(工具名, 参数), ...] 或最终回复文本。
+    轮次由输入中已有的 AIMessage 数量决定，因此无内部状态，可被并发运行共享。
+    """
+
+    script: List[Any]
+    latency_ms: float = 0.0
+    model_name: str = "scripted"
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"model_name": self.model_name}
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        turn = sum(isinstance(m, AIMessage) for m in messages)
+        step = self.script[min(turn, len(self.script) - 1)]
+        if isinstance(step, str):
+            message = AIMessage(content=step)
+            output = step
+        else:
+            tool_calls = [
+                {"name": name, "args": args, "id": f"call_{turn}_{i}", "type": "tool_call"}
+                for i, (name, args) in enumerate(step)
+            ]
+            message = AIMessage(content="", tool_calls=tool_calls)
+            output = json.dumps(tool_calls, ensure_ascii=False)
+        # 按约 4 字符 / token 估算，供遥测中的 token 统计使用
+        prompt_tokens = sum(len(str(m.content)) for m in messages) // 4 + 1
+        completion_tokens = len(output) // 4 + 1
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return message
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        """
+        流式回放：延迟均分为首 token 等待与每个工具调用（或文本）的生成时间，
+        第 i 个工具调用的参数在 (i + 2) / (n + 1) * latency 时输出完整，总耗时与非流式相同
+        """
+        message = self._reply(messages)
+        calls = message.tool_calls
+        delay = self.latency_ms / 1000 / (max(len(calls), 1) + 1)
+        await asyncio.sleep(delay)
+        if not calls:
+            await asyncio.sleep(delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=message.content))
+        for i, call in enumerate(calls):
+            head = tool_call_chunk(name=call["name"], args="", id=call["id"], index=i)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[head]))
+            await asyncio.sleep(delay)
+            args = json.dumps(call["args"], ensure_ascii=False)
+            tail = tool_call_chunk(name=None, args=args, id=None, index=i)
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[tail]))
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=message.usage_metadata))
+
+
+# agent: react = browser_agent.graph 中的 ReAct 循环（LLM + 工具执行；默认流式调用并提前执行工具，
+#        TOOL_EARLY_DISPATCH=false 时为 ainvoke + ToolNode；同一请求重复运行时，
+#        轨迹确认后直接回放，PLAN_CACHE=false 时每次都调用 LLM），
+#        travel / data = 编排器中的同名智能体（不调用 LLM）
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "react_travel": {
+        "agent": "react",
+        "servers": ["12306", "amap"],
+        "prompt": "帮我查 2026-02-05 北京到上海的火车票、上海的天气和自驾路线",
+        "script": [
+            [
+                ("query_train_tickets", {"origin": "北京", "destination": "上海", "date": "2026-02-05"}),
+                ("get_weather", {"city": "上海"}),
+            ],
+            [("plan_route", {"origin": "北京", "destination": "上海", "mode": "driving"})],
+            "已为你整理好车次、天气和自驾路线。",
+        ],
+    },
+    "react_data": {
+        "agent": "react",
+        "servers": ["nl2sql"],
+        "prompt": "统计每个城市的用户数量",
+        "script": [
+            [("get_schema", {})],
+            [("execute_sql", {"sql": "SELECT city, COUNT(*) AS n FROM users GROUP BY city"})],
+            "各城市用户数量已统计完成。",
+        ],
+    },
+    "travel": {
+        "agent": "travel",
+        "servers": ["12306", "amap"],
+        "prompt": "从北京到上海 2026-02-05 的火车票",
+    },
+    "data": {
+        "agent": "data",
+        "servers": ["nl2sql"],
+        "prompt": "查询所有用户数据",
+    },
+}
+
+
+def write_config(servers: List[str], path: str) -> None:
+    """从 config/mcp_config.json 中只保留场景用到的服务器"""
+    with open(os.path.join(ROOT, "config", "mcp_config.json"), encoding="utf-8") as f:
+        config = json.load(f)
+    entries = [entry for entry in config["mcp_servers"] if entry["name"] in servers]
+    missing = set(servers) - {entry["name"] for entry in entries}
+    if missing:
+        raise ValueError(f"mcp_config.json 中没有服务器: {', '.join(sorted(missing))}")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"mcp_servers": entries}, f, ensure_ascii=False)
+
+
+class Harness:
+    """为一个场景准备 MCP 管理器、脚本化 LLM 与智能体实例"""
+
+    def __init__(self, name: str, llm_latency_ms: float, workdir: str):
+        self.name = name
+        self.scenario = SCENARIOS[name]
+        self.llm_latency_ms = llm_latency_ms
+        self.config_path = os.path.join(workdir, f"mcp_{name}.json")
+        self.manager = None
+        self.agent = None
+
+    async def setup(self) -> None:
+        from core.mcp_client_manager import MCPClientManager
+        from core.settings import Settings
+
+        write_config(self.scenario["servers"], self.config_path)
+        self.manager = MCPClientManager()
+        self.manager.load_config(self.config_path)
+
+        kind = self.scenario["agent"]
+        if kind == "react":
+            from agents.browser_agent.graph import BrowserAgent
+
+            # 智能体在首次运行时通过 Settings.get_llm() 绑定工具
+            Settings._llm_instance = ScriptedChatModel(
+                script=self.scenario["script"], latency_ms=self.llm_latency_ms
+            )
+            self.agent = BrowserAgent(mcp_manager=self.manager)
+            await self.agent._initialize()
+        elif kind == "travel":
+            from agents.travel_agent import TravelAgent
+
+            self.agent = TravelAgent(mcp_manager=self.manager)
+        elif kind == "data":
+            from agents.data_agent import DataAgent
+
+            self.agent = DataAgent(mcp_manager=self.manager)
+        else:
+            raise ValueError(f"未知的智能体类型: {kind}")
+
+    async def run_once(self) -> float:
+        start = time.perf_counter()
+        await self.agent.run(self.scenario["prompt"])
+        return time.perf_counter() - start
+
+    async def close(self) -> None:
+        from core.settings import Settings
+
+        Settings.reset_llm()
+        if self.manager is not None:
+            await self.manager.close()
+
+
+async def measure_latency(harness: Harness, runs: int, warmup: int) -> Dict[str, Any]:
+    """顺序运行：第一次运行的耗时（含连接 MCP 服务器）单独记录，预热后统计分位数"""
+    from core import telemetry
+
+    result: Dict[str, Any] = {"runs": runs}
+    errors: List[str] = []
+    samples: List[float] = []
+    last_trace = None
+    for i in range(warmup + runs):
+        try:
+            with telemetry.trace_run(harness.name) as trace:
+                elapsed = await harness.run_once()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+            continue
+        if i == 0:
+            result["first_run_ms"] = round(elapsed * 1000, 3)
+        if i >= warmup:
+            samples.append(elapsed)
+            last_trace = trace
+
+    result["errors"] = len(errors)
+    if errors:
+        result["first_error"] = errors[0][:300]
+    if samples:
+        result.update(percentiles(samples))
+    if last_trace is not None:
+        # 最后一次运行的耗时构成（按 span 聚合）
+        result["breakdown"] = {
+            name: group["total_ms"] for name, group in last_trace.summary()["spans"].items()
+        }
+    return result
+
+
+async def measure_throughput(harness: Harness, concurrency: int, runs: int) -> Dict[str, Any]:
+    """以固定并发数完成 runs 次运行"""
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: List[float] = []
+    errors = 0
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            try:
+                samples.append(await harness.run_once())
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(runs)))
+    wall = time.perf_counter() - start
+
+    result: Dict[str, Any] = {
+        "concurrency": concurrency,
+        "runs": runs,
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "runs_per_s": round(len(samples) / wall, 2) if wall > 0 else None,
+    }
+    if samples:
+        result.update(percentiles(samples))
+    return result
+
+
+async def measure_memory(harness: Harness, runs: int) -> Dict[str, Any]:
+    """每次运行的 Python 堆内存峰值增量，以及多次运行后的残留增长（泄漏指标）"""
+    peaks: List[int] = []
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(runs):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            try:
+                await harness.run_once()
+            except Exception:
+                continue
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        retained = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+
+    if not peaks:
+        return {"runs": runs, "errors": runs}
+    return {
+        "runs": runs,
+        "errors": runs - len(peaks),
+        "peak_kib_mean": round(sum(peaks) / len(peaks) / 1024, 1),
+        "peak_kib_max": round(max(peaks) / 1024, 1),
+        "retained_kib_per_run": round(retained / runs / 1024, 1),
+    }
+
+
+def measure_cold_start(name: str, llm_latency_ms: float) -> Dict[str, Any]:
+    """在新进程中测量导入、初始化与首次运行（含拉起 MCP 服务器）的耗时"""
+    cmd = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--cold-start-child",
+        name,
+        "--llm-latency-ms",
+        str(llm_latency_ms),
+    ]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_wall_ms"] = round(wall * 1000, 3)
+    return result
+
+
+async def cold_start_child(name: str, llm_latency_ms: float) -> Dict[str, Any]:
+    start = time.perf_counter()
+    import core.mcp_client_manager  # noqa: F401
+    from core.logger import setup_logger
+
+    kind = SCENARIOS[name]["agent"]
+    if kind == "react":
+        import agents.browser_agent.graph  # noqa: F401
+    elif kind == "travel":
+        import agents.travel_agent  # noqa: F401
+    else:
+        import agents.data_agent  # noqa: F401
+    imported = time.perf_counter()
+
+    setup_logger(log_dir=tempfile.gettempdir(), log_level="ERROR")
+    with tempfile.TemporaryDirectory() as workdir:
+        harness = Harness(name, llm_latency_ms, workdir)
+        await harness.setup()
+        ready = time.perf_counter()
+        try:
+            await harness.run_once()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        done = time.perf_counter()
+        await harness.close()
+
+    result = {
+        "import_ms": round((imported - start) * 1000, 3),
+        "setup_ms": round((ready - imported) * 1000, 3),
+        "first_run_ms": round((done - ready) * 1000, 3),
+        "total_ms": round((done - start) * 1000, 3),
+    }
+    if error:
+        result["error"] = error[:300]
+    return result
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from core.logger import setup_logger
+
+    report: dict = {"environment": environment(), "params": vars(args).copy(), "scenarios": {}}
+    report["params"].pop("compare", None)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_logger(log_dir=workdir, log_level="ERROR")
+        for name in args.scenarios:
+            entry: Dict[str, Any] = {}
+            if not args.skip_cold_start:
+                entry["cold_start"] = measure_cold_start(name, args.llm_latency_ms)
+
+            harness = Harness(name, args.llm_latency_ms, workdir)
+            try:
+                await harness.setup()
+                entry["latency"] = await measure_latency(harness, args.runs, args.warmup)
+                entry["throughput"] = [
+                    await measure_throughput(harness, n, max(args.runs, n * 4))
+                    for n in args.concurrency
+                ]
+                entry["memory"] = await measure_memory(harness, args.memory_runs)
+            finally:
+                await harness.close()
+            report["scenarios"][name] = entry
+            print(f"[bench] {name} 完成", file=sys.stderr)
+
+    return report
+
+
+# 对比时关注的指标: (路径, 越大越好)
+COMPARE_METRICS = [
+    (("cold_start", "total_ms"), False),
+    (("latency", "p50_ms"), False),
+    (("latency", "p95_ms"), False),
+    (("memory", "peak_kib_mean"), False),
+]
+
+
+def _lookup(entry: dict, path: tuple) -> Optional[float]:
+    for key in path:
+        if not isinstance(entry, dict) or key not in entry:
+            return None
+        entry = entry[key]
+    return entry if isinstance(entry, (int, float)) else None
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> List[str]:
+    """与基线结果对比，返回变化说明；变差超过 threshold（比例）的标记为 REGRESSION"""
+    lines = [
+        f"对比基线 {baseline.get('environment', {}).get('commit')} -> "
+        f"{report['environment'].get('commit')}"
+    ]
+    for name, entry in report["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        metrics = list(COMPARE_METRICS)
+        base_tp = {t["concurrency"]: t for t in base.get("throughput", [])}
+        for tp in entry.get("throughput", []):
+            if tp["concurrency"] in base_tp:
+                metrics.append(((f"throughput@{tp['concurrency']}",), True))
+        for path, higher_is_better in metrics:
+            if path[0].startswith("throughput@"):
+                concurrency = int(path[0].split("@")[1])
+                new = next(t for t in entry["throughput"] if t["concurrency"] == concurrency)["runs_per_s"]
+                old = base_tp[concurrency]["runs_per_s"]
+            else:
+                new, old = _lookup(entry, path), _lookup(base, path)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if worse > threshold else ""
+            lines.append(f"  {name} {'.'.join(path)}: {old} -> {new} ({change:+.1%}){flag}")
+    return lines
+
+
+def quiet(coro):
+    """运行 coro；智能体会打印每轮回复，测量期间丢弃标准输出（并发运行共用一次重定向）"""
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return asyncio.run(coro)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=30, help="每个场景的顺序运行次数")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--memory-runs", type=int, default=10)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="脚本化模型每轮的模拟延迟")
+    parser.add_argument("--skip-cold-start", action="store_true")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    parser.add_argument("--compare", help="与之前的 JSON 结果对比")
+    parser.add_argument("--threshold", type=float, default=0.10, help="对比时判定为回退的变差比例")
+    parser.add_argument("--cold-start-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知的场景: {', '.join(unknown)}（可选: {', '.join(SCENARIOS)}）")
+
+    os.chdir(ROOT)
+    if args.cold_start_child:
+        print(json.dumps(quiet(cold_start_child(args.cold_start_child, args.llm_latency_ms))))
+        return
+
+    report = quiet(run(args))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline, args.threshold)))
+
+
+if __name__ == "__main__":
+    main()
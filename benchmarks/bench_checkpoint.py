@@ -0,0 +1,222 @@
+"""
+检查点写入量与恢复耗时
+
+用一个模拟多轮对话的图（每轮追加用户/助手消息，并改写 context 与 data 字段）
+在同一线程上连续运行，比较各 checkpointer：
+
+- 每轮写入字节数：前几轮与最后几轮对比，观察是否随历史长度增长
+- 每轮 put 耗时分位数
+- 恢复耗时：同一实例（warm）与新建实例（cold，无进程内缓存）读取最新检查点
+- 跨线程去重：多个线程共享相同的系统提示与工具结果时的总写入量
+
+对比对象：InMemorySaver、SqliteSaver（安装了 langgraph-checkpoint-sqlite 时）、DeltaCheckpointSaver。
+
+用法:
+    python benchmarks/bench_checkpoint.py
+    python benchmarks/bench_checkpoint.py --turns 200 --message-bytes 2000 --threads 8
+    python benchmarks/bench_checkpoint.py --snapshot-interval 32 --json results/checkpoint.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage  # noqa: E402
+from langgraph.checkpoint.memory import InMemorySaver  # noqa: E402
+from langgraph.graph import END  # noqa: E402
+
+from core.checkpoint import DeltaCheckpointSaver, run_config  # noqa: E402
+from core.graph_builder import BaseGraphBuilder  # noqa: E402
+from core.state import DataAgentState  # noqa: E402
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:
+    SqliteSaver = None
+
+SYSTEM_PROMPT = "你是数据分析助手，根据用户问题生成 SQL 并解释结果。" * 20
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50_ms": round(pick(0.50), 3), "p90_ms": round(pick(0.90), 3), "p99_ms": round(pick(0.99), 3)}
+
+
+class CountingSerializer:
+    """包装 saver 的序列化器，累计编码后的字节数（作为写入量）"""
+
+    def __init__(self, serde):
+        self.serde = serde
+        self.bytes = 0
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        self.bytes += len(data)
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self.serde.loads_typed(data)
+
+
+class Timed:
+    """记录 put 耗时的代理"""
+
+    def __init__(self, saver):
+        self.saver = saver
+        self.put_times: List[float] = []
+        original = saver.put
+
+        def put(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.put_times.append(time.perf_counter() - start)
+
+        saver.put = put
+
+
+def build_graph(saver, message_bytes: int, rows: int):
+    def analyze(state: DataAgentState) -> Dict[str, Any]:
+        turn = len(state["messages"])
+        return {
+            "messages": [AIMessage(content=f"第 {turn} 轮分析：" + "结果" * (message_bytes // 6))],
+            "context": {"turn": turn, "intent": "select"},
+            # 每轮重新查询，行内容大部分不变
+            "data": [{"id": i, "name": f"用户{i}", "score": i % 7} for i in range(rows)],
+        }
+
+    builder = BaseGraphBuilder(DataAgentState, checkpointer=saver)
+    builder.add_node("analyze", analyze)
+    builder.set_entry_point("analyze")
+    builder.add_edge("analyze", END)
+    return builder.compile()
+
+
+def make_savers(snapshot_interval: int, workdir: str) -> Dict[str, Callable[[], Tuple[Any, Callable[[], int], Callable[[], Any]]]]:
+    """名称 -> 工厂；工厂返回 (saver, 已写入字节数, 重新打开同一存储的函数)"""
+
+    def memory():
+        serde = CountingSerializer(InMemorySaver().serde)
+        saver = InMemorySaver(serde=serde)
+        # 内存存储无法"冷启动"，恢复测量的是反序列化
+        return saver, lambda: serde.bytes, lambda: saver
+
+    def sqlite():
+        path = os.path.join(workdir, f"sqlite-{time.monotonic_ns()}.db")
+        serde = CountingSerializer(InMemorySaver().serde)
+        saver = SqliteSaver(sqlite3.connect(path, check_same_thread=False), serde=serde)
+        return saver, lambda: serde.bytes, lambda: SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+    def delta():
+        path = os.path.join(workdir, f"delta-{time.monotonic_ns()}.db")
+        saver = DeltaCheckpointSaver(path, snapshot_interval=snapshot_interval)
+        return (
+            saver,
+            lambda: saver.stats["bytes_written"],
+            lambda: DeltaCheckpointSaver(path, snapshot_interval=snapshot_interval),
+        )
+
+    factories = {"memory": memory, "delta": delta}
+    if SqliteSaver is not None:
+        factories["sqlite"] = sqlite
+    return factories
+
+
+def run_saver(name: str, factory, args) -> Dict[str, Any]:
+    saver, written, reopen = factory()
+    timed = Timed(saver)
+    graph = build_graph(saver, args.message_bytes, args.rows)
+    config = run_config("bench")
+
+    per_turn: List[int] = []
+    start = time.perf_counter()
+    for turn in range(args.turns):
+        before = written()
+        state = {"messages": [HumanMessage(content=f"问题 {turn}")]}
+        if turn == 0:
+            state["messages"].insert(0, SystemMessage(content=SYSTEM_PROMPT))
+        graph.invoke(state, config)
+        per_turn.append(written() - before)
+    elapsed = time.perf_counter() - start
+
+    warm, cold = [], []
+    for _ in range(args.resume_runs):
+        t = time.perf_counter()
+        saver.get_tuple(config)
+        warm.append(time.perf_counter() - t)
+        fresh = reopen()
+        t = time.perf_counter()
+        tup = fresh.get_tuple(config)
+        cold.append(time.perf_counter() - t)
+    messages = len(tup.checkpoint["channel_values"]["messages"])
+
+    # 跨线程：相同系统提示与查询结果
+    before = written()
+    for i in range(args.threads):
+        state = {"messages": [SystemMessage(content=SYSTEM_PROMPT), HumanMessage(content="查询所有用户数据")]}
+        graph.invoke(state, run_config(f"thread-{i}"))
+    cross_thread = written() - before
+
+    head = per_turn[: args.window]
+    tail = per_turn[-args.window:]
+    return {
+        "saver": name,
+        "turns": args.turns,
+        "messages_restored": messages,
+        "total_bytes": sum(per_turn),
+        "bytes_per_turn_first": round(sum(head) / len(head)),
+        "bytes_per_turn_last": round(sum(tail) / len(tail)),
+        "put": percentiles(timed.put_times),
+        "turns_per_s": round(args.turns / elapsed, 1),
+        "resume_warm": percentiles(warm),
+        "resume_cold": percentiles(cold),
+        "cross_thread_bytes": cross_thread,
+        **({"stats": dict(saver.stats)} if isinstance(saver, DeltaCheckpointSaver) else {}),
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    # SqliteSaver 只支持同步接口，图统一用 invoke 驱动
+    with tempfile.TemporaryDirectory() as workdir:
+        factories = make_savers(args.snapshot_interval, workdir)
+        names = [n for n in args.savers if n in factories]
+        results = [run_saver(name, factories[name], args) for name in names]
+    return {"params": vars(args).copy(), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--savers", nargs="+", default=["memory", "sqlite", "delta"])
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--message-bytes", type=int, default=1000, help="每条助手消息的大致字节数")
+    parser.add_argument("--rows", type=int, default=50, help="data 字段的行数")
+    parser.add_argument("--threads", type=int, default=10, help="跨线程去重测试的线程数")
+    parser.add_argument("--snapshot-interval", type=int, default=16)
+    parser.add_argument("--window", type=int, default=10, help="统计首尾各多少轮的平均写入量")
+    parser.add_argument("--resume-runs", type=int, default=5)
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
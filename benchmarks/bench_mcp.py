@@ -0,0 +1,560 @@
+"""
+MCP 传输层微基准与负载生成器
+
+直接用 MCP 客户端会话（不经过 LangChain 与智能体）驱动 config/mcp_config.json 中的
+任意服务器（stdio 或 streamable-http），测量：
+
+- 闭环：固定并发数下的吞吐量与延迟分位数
+- 开环：按固定到达率（泊松到达）发起请求；延迟从计划发出时刻算起，
+  服务器跟不上时排队时间会体现在延迟中（避免协调遗漏）
+- 耗时拆分：服务端处理耗时（结果 _meta.server_time_ms）与传输/JSON-RPC 框架开销
+- 序列化：单次调用的请求编码、响应编码与解码耗时及报文大小
+- 服务器进程 RSS（空闲与负载期间的峰值）
+
+内置服务器各带一组基线调用（轮流发出）；--transport http 时由本脚本以
+streamable-http 方式拉起内置服务器（可多 worker）。
+
+用法:
+    python benchmarks/bench_mcp.py
+    python benchmarks/bench_mcp.py --servers amap nl2sql --concurrency 1 8 32 --rates 100 500
+    python benchmarks/bench_mcp.py --transport http --workers 2 --json results/mcp_http.json
+    python benchmarks/bench_mcp.py --servers amap --tool get_weather --args '{"city": "上海"}'
+    python benchmarks/bench_mcp.py --config my_mcp.json --servers remote --tool search --args '{"q": "mcp"}'
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(ROOT, "src"))
+
+from langchain_mcp_adapters.sessions import create_session  # noqa: E402
+from mcp import types  # noqa: E402
+
+from core.mcp_client_manager import MCPClientManager  # noqa: E402
+from core.telemetry import SERVER_TIME_META  # noqa: E402
+from mcp_servers.launcher import BUNDLED_SERVERS  # noqa: E402
+
+try:
+    import psutil
+except ImportError:  # 非 Linux 且未安装 psutil 时不报告 RSS
+    psutil = None
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+# 内置服务器的基线调用: server -> [(工具名, 参数), ...]
+BASELINES: Dict[str, List[Tuple[str, dict]]] = {
+    "12306": [
+        ("query_train_tickets", {"origin": "北京", "destination": "上海", "date": "2026-02-05"}),
+        ("get_train_detail", {"train_no": "G1"}),
+    ],
+    "amap": [
+        ("get_weather", {"city": "上海"}),
+        ("search_poi", {"keywords": "咖啡", "city": "上海", "top_k": 10}),
+        ("plan_route", {"origin": "北京", "destination": "上海", "mode": "driving"}),
+    ],
+    "nl2sql": [
+        ("get_schema", {}),
+        ("execute_sql", {"sql": "SELECT city, COUNT(*) AS n FROM users GROUP BY city"}),
+    ],
+    "python": [
+        ("execute_python", {"code": "print(sum(range(1000)))"}),
+    ],
+    "archive": [
+        ("search_archive", {"query": "MCP 协议", "top_k": 5}),
+    ],
+}
+
+
+# ---------------------------------------------------------------------------
+# 服务器进程与 RSS
+# ---------------------------------------------------------------------------
+
+
+def _process_tree(pid: int) -> List[int]:
+    """pid 及其全部子孙进程（uvicorn 多 worker 时 worker 是子进程）"""
+    if psutil is not None:
+        try:
+            root = psutil.Process(pid)
+            return [pid] + [p.pid for p in root.children(recursive=True)]
+        except psutil.Error:
+            return []
+    if not os.path.isdir("/proc"):
+        return []
+    parents: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rb") as f:
+                # comm 字段可能含空格，从最后一个 ')' 之后解析
+                fields = f.read().rsplit(b")", 1)[1].split()
+        except OSError:
+            continue
+        parents.setdefault(int(fields[1]), []).append(int(entry))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(parents.get(current, []))
+    return tree
+
+
+def _rss_bytes(pid: int) -> int:
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def tree_rss_kib(pids: List[int]) -> Optional[float]:
+    """服务器进程树的 RSS 总和；无法获取时返回 None"""
+    if not pids:
+        return None
+    total = sum(_rss_bytes(p) for root in pids for p in _process_tree(root))
+    return round(total / 1024, 1) if total else None
+
+
+class RSSSampler:
+    """负载期间在后台定期采样服务器 RSS，记录峰值"""
+
+    def __init__(self, pids: List[int], interval: float = 0.1):
+        self.pids = pids
+        self.interval = interval
+        self.peak: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            rss = await asyncio.to_thread(tree_rss_kib, self.pids)
+            if rss is not None:
+                self.peak = max(self.peak or 0.0, rss)
+            await asyncio.sleep(self.interval)
+
+    def __enter__(self) -> "RSSSampler":
+        if self.pids:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+def _children() -> set:
+    return set(_process_tree(os.getpid())) - {os.getpid()}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def launch_http(name: str, workers: int, timeout: float = 30.0) -> Tuple[subprocess.Popen, str]:
+    """以 streamable-http 方式拉起内置服务器，等待 /healthz 就绪"""
+    port = _free_port()
+    script = os.path.join(ROOT, "src", "mcp_servers", f"{BUNDLED_SERVERS[name]}.py")
+    cmd = [
+        sys.executable, script,
+        "--transport", "streamable-http",
+        "--port", str(port),
+        "--workers", str(workers),
+    ]  # fmt: skip
+    proc = subprocess.Popen(cmd, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{name} HTTP 服务器启动失败 (exit {proc.returncode})")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/healthz", timeout=1):
+                return proc, f"http://127.0.0.1:{port}/mcp"
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise TimeoutError(f"{name} HTTP 服务器 {timeout}s 内未就绪")
+
+
+def stop_http(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# ---------------------------------------------------------------------------
+# 负载
+# ---------------------------------------------------------------------------
+
+
+class Sample:
+    __slots__ = ("latency", "rtt", "server", "error")
+
+    def __init__(self, latency: float, rtt: float, server: Optional[float], error: Optional[str]):
+        self.latency = latency
+        self.rtt = rtt
+        self.server = server
+        self.error = error
+
+
+class Target:
+    """一个服务器的若干个 MCP 会话；调用按轮询分配到会话，参数按轮询取自 calls"""
+
+    def __init__(self, sessions: List[Any], calls: List[Tuple[str, dict]]):
+        self.sessions = sessions
+        self.calls = calls
+        self._next = 0
+
+    async def call(self, scheduled: Optional[float] = None) -> Sample:
+        index = self._next
+        self._next += 1
+        session = self.sessions[index % len(self.sessions)]
+        tool, arguments = self.calls[index % len(self.calls)]
+        start = time.perf_counter()
+        try:
+            result = await session.call_tool(tool, arguments)
+        except Exception as e:
+            end = time.perf_counter()
+            return Sample(end - (scheduled or start), end - start, None, f"{type(e).__name__}: {e}")
+        end = time.perf_counter()
+        server_ms = (result.meta or {}).get(SERVER_TIME_META)
+        error = None
+        if result.isError:
+            error = "isError: " + " ".join(getattr(c, "text", "") for c in result.content)[:200]
+        return Sample(
+            end - (scheduled or start),
+            end - start,
+            server_ms / 1000 if server_ms is not None else None,
+            error,
+        )
+
+
+def summarize(samples: List[Sample], wall: float) -> Dict[str, Any]:
+    ok = [s for s in samples if s.error is None]
+    result: Dict[str, Any] = {
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 1) if wall > 0 else None,
+    }
+    errors = [s.error for s in samples if s.error is not None]
+    if errors:
+        result["first_error"] = errors[0][:300]
+    if not ok:
+        return result
+    result.update(percentiles([s.latency for s in ok]))
+    timed = [s for s in ok if s.server is not None]
+    if timed:
+        # 客户端往返耗时 = 服务端处理 + 传输/框架/排队开销
+        result["server"] = percentiles([s.server for s in timed])
+        result["overhead"] = percentiles([max(0.0, s.rtt - s.server) for s in timed])
+    return result
+
+
+async def closed_loop(target: Target, concurrency: int, requests: int) -> Dict[str, Any]:
+    """concurrency 个客户端各自循环发起请求，共完成 requests 次"""
+    samples: List[Sample] = []
+    remaining = requests
+
+    async def client() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            samples.append(await target.call())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return {"concurrency": concurrency, **summarize(samples, wall)}
+
+
+async def open_loop(
+    target: Target, rate: float, duration: float, max_inflight: int, seed: int
+) -> Dict[str, Any]:
+    """
+    按泊松过程以 rate 次/秒发起请求，持续 duration 秒
+
+    请求不等待前一个完成；延迟从计划发出时刻算起。
+    在途请求超过 max_inflight 时丢弃新到达的请求（计入 dropped）。
+    """
+    rng = random.Random(seed)
+    tasks: List[asyncio.Task] = []
+    inflight = peak_inflight = dropped = 0
+    lag: List[float] = []
+
+    async def one(scheduled: float) -> Sample:
+        nonlocal inflight
+        try:
+            return await target.call(scheduled)
+        finally:
+            inflight -= 1
+
+    start = time.perf_counter()
+    scheduled = start
+    while True:
+        scheduled += rng.expovariate(rate)
+        if scheduled - start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        lag.append(max(0.0, time.perf_counter() - scheduled))
+        if inflight >= max_inflight:
+            dropped += 1
+            continue
+        inflight += 1
+        peak_inflight = max(peak_inflight, inflight)
+        tasks.append(asyncio.create_task(one(scheduled)))
+
+    samples = list(await asyncio.gather(*tasks))
+    wall = time.perf_counter() - start
+    result = {"target_rps": rate, "duration_s": duration, **summarize(samples, wall)}
+    result["dropped"] = dropped
+    result["peak_inflight"] = peak_inflight
+    if lag:
+        # 发送端自身的调度滞后；过大说明负载生成器本身成了瓶颈
+        result["scheduler_lag_p99_ms"] = percentiles(lag)["p99_ms"]
+    return result
+
+
+def measure_serialization(tool: str, arguments: dict, result: types.CallToolResult, iterations: int) -> Dict[str, Any]:
+    """
+    单次调用的 JSON-RPC 序列化开销（与 mcp SDK 的 stdio/HTTP 传输相同的编解码路径）
+
+    request_encode: 客户端编码 tools/call 请求
+    response_encode: 服务端编码 CallToolResult 响应
+    response_decode: 客户端解析响应报文并校验为 CallToolResult
+    """
+    request = types.JSONRPCMessage(
+        types.JSONRPCRequest(
+            jsonrpc="2.0",
+            id=1,
+            method="tools/call",
+            params={"name": tool, "arguments": arguments},
+        )
+    )
+    response = types.JSONRPCMessage(
+        types.JSONRPCResponse(
+            jsonrpc="2.0",
+            id=1,
+            result=result.model_dump(by_alias=True, mode="json", exclude_none=True),
+        )
+    )
+    request_line = request.model_dump_json(by_alias=True, exclude_none=True)
+    response_line = response.model_dump_json(by_alias=True, exclude_none=True)
+
+    def timed(fn) -> float:
+        fn()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        return (time.perf_counter() - start) / iterations * 1e6
+
+    def decode() -> None:
+        message = types.JSONRPCMessage.model_validate_json(response_line)
+        types.CallToolResult.model_validate(message.root.result)
+
+    return {
+        "request_bytes": len(request_line.encode()),
+        "response_bytes": len(response_line.encode()),
+        "request_encode_us": round(
+            timed(lambda: request.model_dump_json(by_alias=True, exclude_none=True)), 2
+        ),
+        "response_encode_us": round(
+            timed(lambda: response.model_dump_json(by_alias=True, exclude_none=True)), 2
+        ),
+        "response_decode_us": round(timed(decode), 2),
+    }
+
+
+# ---------------------------------------------------------------------------
+# 场景
+# ---------------------------------------------------------------------------
+
+
+def resolve_connection(
+    name: str, transport: str, config_servers: Dict[str, dict]
+) -> Dict[str, Any]:
+    """
+    确定服务器的连接方式
+
+    transport=config: 使用配置文件中的连接（内置服务器不在配置中时以 stdio 拉起）
+    transport=stdio/http: 内置服务器按指定方式拉起
+    """
+    if transport == "config" and name in config_servers:
+        return dict(config_servers[name])
+    if name not in BUNDLED_SERVERS:
+        raise ValueError(f"配置中没有服务器 '{name}'，且不是内置服务器")
+    if transport == "http":
+        return {"transport": "launch_http"}
+    script = os.path.join("src", "mcp_servers", f"{BUNDLED_SERVERS[name]}.py")
+    return {"transport": "stdio", "command": sys.executable, "args": [script]}
+
+
+async def run_server(
+    name: str, connection: dict, calls: List[Tuple[str, dict]], args: argparse.Namespace
+) -> Dict[str, Any]:
+    entry: Dict[str, Any] = {"calls": [tool for tool, _ in calls]}
+    proc = None
+    server_pids: List[int] = list(args.server_pid or [])
+
+    async with contextlib.AsyncExitStack() as stack:
+        start = time.perf_counter()
+        if connection["transport"] == "launch_http":
+            proc, url = await asyncio.to_thread(launch_http, name, args.workers)
+            stack.callback(stop_http, proc)
+            server_pids.append(proc.pid)
+            connection = {"transport": "streamable_http", "url": url}
+        entry["transport"] = connection["transport"]
+
+        before = _children()
+        sessions = []
+        for _ in range(args.sessions):
+            session = await stack.enter_async_context(create_session(connection))
+            await session.initialize()
+            sessions.append(session)
+        if connection["transport"] == "stdio":
+            server_pids.extend(sorted(_children() - before))
+        entry["startup_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        entry["sessions"] = args.sessions
+
+        # 预热（首次调用触发服务器侧的懒加载），同时取得每个工具的样例响应
+        target = Target(sessions, calls)
+        responses: Dict[str, Tuple[dict, types.CallToolResult]] = {}
+        for tool, arguments in calls:
+            result = await sessions[0].call_tool(tool, arguments)
+            if result.isError:
+                text = " ".join(getattr(c, "text", "") for c in result.content)
+                raise RuntimeError(f"{name}.{tool} 返回错误: {text[:300]}")
+            responses[tool] = (arguments, result)
+        for _ in range(args.warmup):
+            await target.call()
+
+        entry["serialization"] = {
+            tool: measure_serialization(tool, arguments, result, args.serialization_iterations)
+            for tool, (arguments, result) in responses.items()
+        }
+        entry["rss_idle_kib"] = tree_rss_kib(server_pids)
+
+        with RSSSampler(server_pids) as sampler:
+            entry["closed_loop"] = [
+                await closed_loop(target, n, max(args.requests, n * 10)) for n in args.concurrency
+            ]
+            entry["open_loop"] = [
+                await open_loop(target, rate, args.duration, args.max_inflight, args.seed)
+                for rate in args.rates
+            ]
+        entry["rss_peak_kib"] = sampler.peak
+
+    # 序列化占单次往返的比例（以并发 1 的平均往返为基准）
+    single = next((r for r in entry["closed_loop"] if r["concurrency"] == 1), None)
+    if single and "mean_ms" in single:
+        per_call = [
+            (s["request_encode_us"] + s["response_encode_us"] + s["response_decode_us"]) / 1000
+            for s in entry["serialization"].values()
+        ]
+        entry["serialization_share"] = round(sum(per_call) / len(per_call) / single["mean_ms"], 4)
+    return entry
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from core.logger import setup_logger
+
+    report: dict = {"params": vars(args).copy(), "servers": {}}
+    config_servers: Dict[str, dict] = {}
+    if os.path.exists(args.config):
+        config_servers, _, _ = MCPClientManager()._read_config(args.config)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        setup_logger(log_dir=workdir, log_level="ERROR")
+        for name in args.servers:
+            if args.tool:
+                calls = [(args.tool, json.loads(args.args))]
+            elif name in BASELINES:
+                calls = BASELINES[name]
+            else:
+                raise ValueError(f"服务器 '{name}' 没有基线调用，请用 --tool/--args 指定")
+            label = f"{name}@{args.transport}" if args.transport != "config" else name
+            try:
+                connection = resolve_connection(name, args.transport, config_servers)
+                report["servers"][label] = await run_server(name, connection, calls, args)
+            except Exception as e:
+                report["servers"][label] = {"error": f"{type(e).__name__}: {e}"[:300]}
+            print(f"[bench] {label} 完成", file=sys.stderr)
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=os.path.join(ROOT, "config", "mcp_config.json"))
+    parser.add_argument("--servers", nargs="+", default=list(BASELINES))
+    parser.add_argument(
+        "--transport",
+        choices=["config", "stdio", "http"],
+        default="config",
+        help="config: 按配置文件连接；stdio/http: 由本脚本拉起内置服务器",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="--transport http 时的 worker 数")
+    parser.add_argument("--sessions", type=int, default=1, help="每个服务器打开的会话数（stdio 即进程数）")
+    parser.add_argument("--tool", help="只调用该工具（替代基线调用）")
+    parser.add_argument("--args", default="{}", help="--tool 的 JSON 参数")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=500, help="每个并发档位的最少请求数")
+    parser.add_argument("--rates", type=float, nargs="*", default=[50.0, 200.0], help="开环到达率（次/秒）")
+    parser.add_argument("--duration", type=float, default=5.0, help="每个开环档位的持续秒数")
+    parser.add_argument("--max-inflight", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--serialization-iterations", type=int, default=2000)
+    parser.add_argument("--server-pid", type=int, nargs="*", help="外部 HTTP 服务器的进程号（用于 RSS）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    report = asyncio.run(run(args))
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+路径规划引擎基准测试
+
+在生成的省级路网上比较 A*(ALT) 与双向 Dijkstra 在各出行方式下的查询耗时。
+
+用法:
+    python benchmarks/bench_routing.py
+    python benchmarks/bench_routing.py --rows 400 --cols 400 --queries 200 --json out.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from mcp_servers.routing import RoadNetwork, generate_network  # noqa: E402
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    report: dict = {"params": vars(args).copy()}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "road_network.bin")
+        start = time.perf_counter()
+        generate_network(args.rows, args.cols, seed=args.seed).save(path)
+        report["generate_s"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        network = RoadNetwork.load(path)
+        report["load_s"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        network.prepare_landmarks(args.landmarks)
+        report["landmarks_s"] = round(time.perf_counter() - start, 3)
+
+    report["nodes"] = len(network.lat)
+    report["edges"] = len(network.edges)
+
+    n = len(network.lat)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for _ in range(args.queries)]
+    for mode in ("driving", "walking", "transit"):
+        network.graph(mode)  # 预构建 CSR，不计入查询耗时
+        for name, search in (("astar", network.astar), ("bidijkstra", network.bidirectional_dijkstra)):
+            queries = pairs if mode == "driving" else pairs[: max(1, len(pairs) // 5)]
+            samples, expanded = [], 0
+            for s, t in queries:
+                s = network.nearest_node(network.lat[s], network.lon[s], mode)
+                t = network.nearest_node(network.lat[t], network.lon[t], mode)
+                begin = time.perf_counter()
+                _, _, visited = search(mode, s, t)
+                samples.append(time.perf_counter() - begin)
+                expanded += visited
+            report[f"{mode}_{name}"] = {
+                "queries": len(queries),
+                "avg_expanded": round(expanded / len(queries)),
+                **percentiles(samples),
+            }
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--cols", type=int, default=300)
+    parser.add_argument("--landmarks", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+启动耗时与导入耗时分析
+
+- 各模块在新进程中的导入耗时（多次取中位数）
+- `python -X importtime` 报告：按自身耗时排序的最慢模块，以及按顶层包汇总的耗时
+- `python main.py "<query>"` 的首次输出时间（读到第一行输出即结束进程）
+
+用法:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --profile main --top 30
+    python benchmarks/bench_startup.py --modules core.settings agents.travel_agent --runs 10 --json out.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# 在子进程中执行：与 main.py 相同的 sys.path 设置
+_PRELUDE = f"import sys; sys.path.insert(0, {os.path.join(ROOT, 'src')!r}); sys.path.insert(0, {ROOT!r}); "
+
+DEFAULT_MODULES = [
+    "core",
+    "core.settings",
+    "core.logger",
+    "core.mcp_client_manager",
+    "core.graph_builder",
+    "agents.travel_agent",
+    "agents.data_agent",
+    "agents.supervisor",
+    "agents.browser_agent.graph",
+    "main",
+]
+
+
+def median(samples: List[float]) -> float:
+    ordered = sorted(samples)
+    return ordered[len(ordered) // 2]
+
+
+def import_time(module: str, runs: int) -> Dict[str, Any]:
+    """新进程中导入 module 的耗时（不含解释器启动）"""
+    code = (
+        _PRELUDE
+        + "import time; t = time.perf_counter(); "
+        + f"import {module}; "
+        + "print(time.perf_counter() - t)"
+    )
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+        samples.append(float(proc.stdout.strip().splitlines()[-1]))
+    return {"median_ms": round(median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1)}
+
+
+def import_profile(module: str, top: int) -> Dict[str, Any]:
+    """解析 -X importtime 输出（单位微秒）：最慢的模块与按顶层包的汇总"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PRELUDE + f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    if not entries:
+        return {"error": proc.stderr.strip()[-300:] or "no importtime output"}
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in entries:
+        packages[name.split(".")[0]] += self_us
+    total_us = sum(self_us for _, self_us, _ in entries)
+    by_self = sorted(entries, key=lambda e: e[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "modules_imported": len(entries),
+        "total_ms": round(total_us / 1000, 1),
+        "top_modules": [
+            {"module": name, "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)}
+            for name, s, c in by_self
+        ],
+        "top_packages": [
+            {"package": name, "self_ms": round(us / 1000, 1), "share": round(us / total_us, 3)}
+            for name, us in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:top]
+        ],
+    }
+
+
+def time_to_first_output(query: str, runs: int) -> Dict[str, Any]:
+    """从启动 `python main.py <query>` 到读到第一行标准输出的耗时"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "main.py", query],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env={**os.environ, "PYTHONUNBUFFERED": "1"},
+        )
+        line = proc.stdout.readline()
+        elapsed = time.perf_counter() - start
+        proc.kill()
+        proc.wait()
+        if not line:
+            return {"error": "main.py 没有输出"}
+        samples.append(elapsed)
+    return {"median_ms": round(median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=DEFAULT_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", default="main", help="生成 importtime 报告的模块")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--query", default="查询所有用户数据", help="测量首次输出时间所用的查询")
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    report = {
+        "params": vars(args).copy(),
+        "import_time": {module: import_time(module, args.runs) for module in args.modules},
+        "profile": import_profile(args.profile, args.top),
+        "time_to_first_output": time_to_first_output(args.query, args.runs),
+    }
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
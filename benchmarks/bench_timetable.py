@@ -0,0 +1,103 @@
+"""
+时刻表引擎基准测试
+
+在生成的全国规模时刻表上测量索引构建、直达查询与一次换乘查询的耗时。
+
+用法:
+    python benchmarks/bench_timetable.py
+    python benchmarks/bench_timetable.py --trains 30000 --queries 2000 --json out.json
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from mcp_servers.timetable import (  # noqa: E402
+    MAJOR_CITIES,
+    TimetableEngine,
+    generate_timetable,
+    save_timetable,
+)
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "p50_ms": round(pick(0.50), 3),
+        "p95_ms": round(pick(0.95), 3),
+        "p99_ms": round(pick(0.99), 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    report: dict = {"params": vars(args).copy()}
+
+    start = time.perf_counter()
+    data = generate_timetable(args.lines, args.stations_per_line, args.trains, args.seed)
+    report["generate_s"] = round(time.perf_counter() - start, 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "timetable.json")
+        save_timetable(data, path)
+        report["dataset_mb"] = round(os.path.getsize(path) / 1e6, 2)
+
+        start = time.perf_counter()
+        engine = TimetableEngine.load(path)
+        report["load_s"] = round(time.perf_counter() - start, 3)
+    report["stats"] = engine.stats()
+
+    cities = list(MAJOR_CITIES)
+    dates = [f"2026-03-{d:02d}" for d in range(1, 8)]
+
+    def random_query() -> tuple:
+        origin, destination = rng.sample(cities, 2)
+        hour = rng.randrange(0, 20)
+        return origin, destination, rng.choice(dates), f"{hour:02d}:00", f"{hour + 4:02d}:00"
+
+    for kind, count, func in (
+        ("direct", args.queries, engine.query_direct),
+        ("transfer", max(1, args.queries // 5), engine.query_transfer),
+    ):
+        samples, hits = [], 0
+        for _ in range(count):
+            origin, destination, date, after, before = random_query()
+            start = time.perf_counter()
+            results = func(origin, destination, date, depart_after=after, depart_before=before)
+            samples.append(time.perf_counter() - start)
+            hits += bool(results)
+        report[kind] = {"queries": count, "hit_rate": round(hits / count, 3), **percentiles(samples)}
+
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=150)
+    parser.add_argument("--stations-per-line", type=int, default=20)
+    parser.add_argument("--trains", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=12306)
+    parser.add_argument("--json", help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,39 +2,65 @@
 LangGraph MCP Bootcamp - 统一入口
 """
 import asyncio
+import os
 import sys
-# from pathlib import Path
+from pathlib import Path
 from typing import Optional
 
-# 添加 src 到 Python 路径
-# sys.path.insert(0, str(Path(__file__).parent / "src"))
+ROOT = Path(__file__).resolve().parent
 
-from src.core.mcp_adapters import MCPAdapterManager
-from src.agents.browser_agent import BrowserAgent
-from src.agents.travel_agent import TravelAgent
-from src.agents.data_agent import DataAgent
+# 添加 src 到 Python 路径（智能体与 core 模块内部使用 `from core import ...`）
+sys.path.insert(0, str(ROOT / "src"))
+
+# 入口只导入轻量模块；langgraph、mcp 与各智能体在 AgentOrchestrator.initialize()
+# 中导入，启动信息先输出，导入耗时不推迟首次输出。
+# 转发给后台进程的 CLI 调用只用到标准库（见 client_mode）
+from core.settings import Settings
 
 
 class AgentOrchestrator:
     """智能体编排器"""
 
     def __init__(self):
-        self.mcp_manager = MCPAdapterManager()
+        self.mcp_manager = None
+        self.router = None
+        self.agents = {}
+        self.supervisor = None
+        self.metrics_server = None
+
+    def _create_components(self):
+        """导入并创建 MCP 管理器、路由器与各智能体"""
+        from core.mcp_client_manager import MCPClientManager
+        from core.router import IntentRouter
+        from agents.browser_agent import BrowserAgent
+        from agents.travel_agent import TravelAgent
+        from agents.data_agent import DataAgent
+        from agents.supervisor import SupervisorAgent
+
+        # 所有智能体共享同一个 MCP 管理器（常驻会话 + 工具结果缓存）
+        self.mcp_manager = MCPClientManager()
+        self.router = IntentRouter.from_config("config/agents_config.yaml")
         self.agents = {
-            "browser": BrowserAgent(),
-            "travel": TravelAgent(),
-            "data": DataAgent()
+            "browser": BrowserAgent(mcp_manager=self.mcp_manager),
+            "travel": TravelAgent(mcp_manager=self.mcp_manager),
+            "data": DataAgent(mcp_manager=self.mcp_manager)
         }
+        self.supervisor = SupervisorAgent(self.agents, self.router)
+        self.mcp_manager.add_reload_listener(self._on_mcp_reload)
 
     async def initialize(self):
         """初始化系统"""
-        print("=" * 50)
-        print("LangGraph MCP Bootcamp 启动中...")
-        print("=" * 50)
+        print("=" * 50, flush=True)
+        print("LangGraph MCP Bootcamp 启动中...", flush=True)
+        print("=" * 50, flush=True)
+
+        self._create_components()
 
         try:
-            await self.mcp_manager.load_servers()
-            print("[System] MCP 服务器连接成功")
+            servers = self.mcp_manager.load_config("config/mcp_config.json")
+            print(f"[System] 已注册 MCP 服务器: {', '.join(servers)}（首次使用时连接）")
+            # 修改 mcp_config.json 后自动增量生效，无需重启
+            self.mcp_manager.watch_config()
         except Exception as e:
             print(f"[System] MCP 服务器连接失败: {e}")
             print("[System] 将使用模拟模式运行")
@@ -42,34 +68,60 @@ class AgentOrchestrator:
         for name, agent in self.agents.items():
             agent.build_graph()
             print(f"[System] {name.upper()} 智能体已初始化")
+        self.supervisor.build_graph()
+
+        if Settings.METRICS_PORT:
+            from core import telemetry
+
+            self.metrics_server = telemetry.start_metrics_server(Settings.METRICS_PORT)
+            print(f"[System] 指标端点: http://127.0.0.1:{Settings.METRICS_PORT}/metrics")
 
         print("=" * 50)
         print("系统初始化完成！")
         print("=" * 50)
 
+    def _on_mcp_reload(self, affected: set) -> None:
+        """MCP 配置热更新：只让依赖受影响服务器的智能体在下次运行时重建图"""
+        for name, agent in self.agents.items():
+            if affected & set(getattr(agent, "mcp_servers", ())):
+                agent.graph = None
+                print(f"[System] MCP 服务器变更 ({', '.join(sorted(affected))})，"
+                      f"{name.upper()} 智能体将重新构建")
+
     async def route_request(self, user_input: str) -> str:
         """路由请求到合适的智能体"""
-        user_input_lower = user_input.lower()
-
-        # 简单的路由逻辑
-        if any(kw in user_input_lower for kw in ["浏览器", "爬取", "访问", "browser", "crawl", "visit"]):
-            return "browser"
-        elif any(kw in user_input_lower for kw in ["出行", "火车", "机票", "路线", "travel", "train", "flight"]):
-            return "travel"
-        elif any(kw in user_input_lower for kw in ["查询", "数据", "分析", "sql", "query", "data", "analyze"]):
-            return "data"
-        else:
-            return "data"  # 默认
+        decision = await self.router.route(user_input)
+        return decision.agent
 
     async def run(self, user_input: str) -> dict:
-        """运行智能体"""
-        agent_type = await self.route_request(user_input)
-        agent = self.agents[agent_type]
-
-        print(f"\n[Router] 路由到 {agent_type.upper()} 智能体")
-        print("-" * 40)
-
-        result = await agent.run(user_input)
+        """运行智能体，返回结果与本次运行的耗时汇总"""
+        from core import telemetry
+        from core.logger import correlation_scope
+
+        with telemetry.trace_run("orchestrator.run") as trace, correlation_scope(trace.trace_id):
+            # 运行期间固定使用的 MCP 会话，热更新不会中断进行中的运行
+            async with self.mcp_manager.run_scope():
+                response = await self._run(user_input)
+        response["trace"] = trace.summary()
+        if Settings.TRACE_EXPORT_DIR:
+            trace.export(Settings.TRACE_EXPORT_DIR)
+        print(trace.format_summary())
+        return response
+
+    async def _run(self, user_input: str) -> dict:
+        subtasks = await self.supervisor.split_request(user_input)
+        if len(subtasks) > 1:
+            # 复合请求：并发运行多个智能体并合并结果
+            agent_type = "supervisor"
+            print(f"\n[Router] 拆分为 {len(subtasks)} 个子任务: "
+                  f"{', '.join(t['agent'].upper() for t in subtasks)}")
+            print("-" * 40)
+            result = await self.supervisor.run(user_input, subtasks)
+        else:
+            agent_type = subtasks[0]["agent"]
+            print(f"\n[Router] 路由到 {agent_type.upper()} 智能体")
+            print("-" * 40)
+            result = await self.agents[agent_type].run(user_input)
 
         return {
             "agent_type": agent_type,
@@ -78,7 +130,10 @@ class AgentOrchestrator:
 
     async def close(self):
         """关闭系统"""
-        await self.mcp_manager.close_all()
+        if self.mcp_manager is not None:
+            await self.mcp_manager.close()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
 
 
 async def interactive_mode():
@@ -103,12 +158,7 @@ async def interactive_mode():
                 break
 
             response = await orchestrator.run(user_input)
-
-            print("\n[响应]")
-            if response["result"].get("messages"):
-                for msg in response["result"]["messages"]:
-                    if msg["role"] == "assistant":
-                        print(f"  {msg['content']}")
+            print_response(response)
 
         except KeyboardInterrupt:
             print("\n\n收到中断信号，正在退出...")
@@ -125,22 +175,191 @@ async def single_mode(query: str):
     await orchestrator.initialize()
 
     response = await orchestrator.run(query)
+    print_response(response)
+
+    await orchestrator.close()
+
 
+def print_response(response: dict) -> None:
     print("\n[响应]")
     if response["result"].get("messages"):
         for msg in response["result"]["messages"]:
-            if msg["role"] == "assistant":
-                print(f"  {msg['content']}")
+            if msg.type == "ai":
+                print(f"  {msg.content}")
 
-    await orchestrator.close()
+
+def _socket_path() -> str:
+    from core import daemon
+
+    return Settings.DAEMON_SOCKET or daemon.default_socket_path(os.getcwd())
+
+
+# 除 Settings 配置项外，影响后台进程（及其常驻 MCP 服务器子进程）行为的环境变量
+_DAEMON_ENV = (
+    "TIMETABLE_PATH",
+    "ROAD_NETWORK_PATH",
+    "POI_STORE_PATH",
+    "ARCHIVE_DIR",
+    "ARCHIVE_INDEX_PATH",
+    "ARCHIVE_EMBED_MODEL",
+)
+
+
+def _fingerprint() -> str:
+    """
+    源码与配置指纹：后台进程启动后代码、配置文件或环境变量有改动时，客户端据此让它重启
+
+    覆盖源码、agents_config.yaml、mcp_config.json 与 .env 的修改时间，以及 Settings 配置项
+    和 _DAEMON_ENV 的当前值（先合并 .env，与后台进程启动时看到的环境一致）。
+    """
+    from core import daemon
+
+    Settings.load()
+    sources = daemon.source_fingerprint(
+        [
+            str(ROOT / "main.py"),
+            str(ROOT / "src"),
+            str(ROOT / "config" / "agents_config.yaml"),
+            os.path.join("config", "mcp_config.json"),
+            str(ROOT / ".env"),
+        ]
+    )
+    env = daemon.env_fingerprint([*Settings.env_names(), *_DAEMON_ENV])
+    return f"{sources}:{env}"
+
+
+async def daemon_mode():
+    """
+    后台进程模式：保持编排器、MCP 常驻会话与各级缓存，在 Unix socket 上处理查询
+
+    通常由 client_mode 自动拉起；空闲 DAEMON_IDLE_TIMEOUT 秒后退出。
+    """
+    from core import daemon
+
+    orchestrator = AgentOrchestrator()
+
+    async def handle(request: dict) -> int:
+        try:
+            response = await orchestrator.run(request["query"])
+        except Exception as e:
+            print(f"\n[错误] {e}")
+            return 1
+        print_response(response)
+        return 0
+
+    server = daemon.DaemonServer(
+        handle, _socket_path(), idle_timeout=Settings.DAEMON_IDLE_TIMEOUT, fingerprint=_fingerprint()
+    )
+    if not server.acquire_lock():
+        print(f"[daemon] 已有后台进程在 {server.socket_path} 上运行")
+        return
+
+    # 请求执行期间的 print 流式转发给对应的客户端
+    sys.stdout = daemon.OutputRouter(sys.stdout)
+    try:
+        await orchestrator.initialize()
+        print(f"[daemon] 监听 {server.socket_path} (pid={os.getpid()})")
+        await server.serve()
+    finally:
+        await orchestrator.close()
+        server.release()
+
+
+def client_mode(query: str) -> Optional[int]:
+    """
+    把查询转发给后台进程并流式输出结果（后台进程不存在时自动拉起）
+
+    Returns:
+        退出码；后台进程无法启动时返回 None，由调用方回退为进程内执行
+    """
+    from core import daemon
+
+    socket_path = _socket_path()
+    payload = {"query": query, "fingerprint": _fingerprint()}
+    for _ in range(2):
+        sock = daemon.connect(socket_path)
+        if sock is None:
+            proc = daemon.spawn(
+                [sys.executable, str(ROOT / "main.py"), "--daemon"],
+                cwd=os.getcwd(),
+                log_path=os.path.join("logs", "daemon.log"),
+            )
+            sock = daemon.wait_for(socket_path, proc, timeout=60)
+            if sock is None:
+                print("[System] 后台进程启动失败（见 logs/daemon.log），改为直接运行", file=sys.stderr)
+                return None
+        try:
+            status = daemon.request(sock, payload)
+        except KeyboardInterrupt:
+            return 130
+        except (ConnectionError, OSError) as e:
+            print(f"\n[错误] 后台进程连接中断: {e}", file=sys.stderr)
+            return 1
+        if status != daemon.RESTART:
+            return status
+    return None
+
+
+def stop_daemon() -> int:
+    from core import daemon
+
+    sock = daemon.connect(_socket_path())
+    if sock is None:
+        print("后台进程未运行")
+        return 0
+    daemon.request(sock, {"command": "stop"})
+    print("后台进程已停止")
+    return 0
+
+
+def _setup_logger() -> None:
+    from core.logger import setup_logger
+
+    # 日志写入移到后台线程，不占用事件循环
+    setup_logger(
+        log_dir=Settings.LOG_DIR,
+        log_level=Settings.LOG_LEVEL,
+        enqueue=Settings.LOG_ASYNC,
+        overflow=Settings.LOG_OVERFLOW,
+        json_sink=Settings.LOG_JSON,
+    )
 
 
 def main():
-    """主函数"""
-    if len(sys.argv) > 1:
-        query = " ".join(sys.argv[1:])
+    """
+    主函数
+
+    python main.py "<query>"              单次查询（默认经由后台进程，见 client_mode）
+    python main.py --no-daemon "<query>"  在当前进程中执行单次查询
+    python main.py                        交互模式
+    python main.py --daemon               前台运行后台进程
+    python main.py --stop-daemon          停止后台进程
+    """
+    from core import daemon
+
+    args = sys.argv[1:]
+    if args == ["--stop-daemon"]:
+        sys.exit(stop_daemon())
+    if args == ["--daemon"]:
+        _setup_logger()
+        asyncio.run(daemon_mode())
+        return
+
+    use_daemon = Settings.DAEMON and daemon.available()
+    if args and args[0] == "--no-daemon":
+        use_daemon = False
+        args = args[1:]
+
+    if args:
+        query = " ".join(args)
+        if use_daemon:
+            status = client_mode(query)
+            if status is not None:
+                sys.exit(status)
+        _setup_logger()
         asyncio.run(single_mode(query))
     else:
+        _setup_logger()
         asyncio.run(interactive_mode())
 
 
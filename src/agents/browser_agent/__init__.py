@@ -1,19 +1,35 @@
 """
 Browser Agent - 浏览器自动化智能体
+
+配置了 firecrawl 服务器时通过共享的 MCP 管理器抓取页面，否则返回模拟内容。
+需要 LLM 的 ReAct 归档流程见 browser_agent.graph。
 """
 
-from typing import Any, Dict
+import json
+from typing import Any, Dict, Optional
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.graph import END
+from langgraph.types import Overwrite
 from core.state import BrowserAgentState
+from core.checkpoint import run_config
 from core.graph_builder import BaseGraphBuilder
+from core.mcp_client_manager import MCPClientManager
 
 
 class BrowserAgent:
     """浏览器自动化智能体"""
 
-    def __init__(self):
+    # mcp_config.json 中的服务器名称
+    SCRAPE_SERVER = "firecrawl"
+    # 依赖的 MCP 服务器，配置热更新时据此判断是否需要重建图
+    mcp_servers = (SCRAPE_SERVER,)
+    # 页面内容缓存秒数
+    SCRAPE_TTL = 300
+
+    def __init__(self, mcp_manager: Optional[MCPClientManager] = None):
         self.name = "browser_agent"
         self.graph = None
+        self.mcp_manager = mcp_manager
 
     def build_graph(self) -> Any:
         """构建智能体图"""
@@ -30,36 +46,60 @@ class BrowserAgent:
         builder.add_edge("extract_data", "format_result")
         builder.add_edge("format_result", END)
 
-        self.graph = builder.compile()
+        self.graph = builder.compile(name=self.name)
         return self.graph
 
-    async def parse_request(self, state: BrowserAgentState) -> BrowserAgentState:
+    async def parse_request(self, state: BrowserAgentState) -> Dict[str, Any]:
         """解析用户请求"""
-        user_message = state["messages"][-1]["content"]
-        state["context"]["parsed_url"] = self._extract_url(user_message)
-        state["context"]["task"] = user_message
-        return state
+        user_message = state["messages"][-1].content
+        return {"context": {"parsed_url": self._extract_url(user_message), "task": user_message}}
 
-    async def navigate(self, state: BrowserAgentState) -> BrowserAgentState:
+    async def navigate(self, state: BrowserAgentState) -> Dict[str, Any]:
         """导航到目标页面"""
         url = state["context"].get("parsed_url", "")
-        state["url"] = url
-        state["messages"].append({"role": "assistant", "content": f"正在访问: {url}"})
-        return state
+        return {
+            "url": url,
+            "messages": [AIMessage(content=f"正在访问: {url}")],
+        }
 
-    async def extract_data(self, state: BrowserAgentState) -> BrowserAgentState:
-        """提取页面数据"""
-        state["page_content"] = "模拟的页面内容"
-        state["messages"].append({"role": "assistant", "content": "已提取页面内容"})
-        return state
+    async def extract_data(self, state: BrowserAgentState) -> Dict[str, Any]:
+        """提取页面数据（抓取失败时记录错误，不中断图）"""
+        if not self.mcp_manager or self.SCRAPE_SERVER not in self.mcp_manager.server_names:
+            return {
+                "page_content": "模拟的页面内容",
+                "messages": [AIMessage(content="已提取页面内容")],
+            }
+
+        try:
+            payload = await self.mcp_manager.call_tool(
+                self.SCRAPE_SERVER,
+                "firecrawl_scrape",
+                {"url": state["url"], "formats": ["markdown"]},
+                cache_ttl=self.SCRAPE_TTL,
+            )
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            return {
+                "page_content": None,
+                "error": error,
+                "messages": [AIMessage(content=f"页面抓取失败: {error}")],
+            }
+
+        if isinstance(payload, dict):
+            content = payload.get("markdown") or json.dumps(payload, ensure_ascii=False)
+        else:
+            content = str(payload)
+        return {
+            "page_content": content,
+            "messages": [AIMessage(content=f"已提取页面内容（{len(content)} 字符）")],
+        }
 
-    async def format_result(self, state: BrowserAgentState) -> BrowserAgentState:
+    async def format_result(self, state: BrowserAgentState) -> Dict[str, Any]:
         """格式化结果"""
-        state["result"] = {"url": state["url"], "content": state["page_content"]}
-        state["messages"].append(
-            {"role": "assistant", "content": f"任务完成: {state['context']['task']}"}
-        )
-        return state
+        return {
+            "result": {"url": state["url"], "content": state["page_content"], "error": state.get("error")},
+            "messages": [AIMessage(content=f"任务完成: {state['context']['task']}")],
+        }
 
     def _extract_url(self, text: str) -> str:
         """从文本中提取URL"""
@@ -69,22 +109,22 @@ class BrowserAgent:
         match = re.search(url_pattern, text)
         return match.group(0) if match else "https://example.com"
 
-    async def run(self, user_input: str) -> Dict[str, Any]:
+    async def run(self, user_input: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
         """运行智能体"""
         if self.graph is None:
             self.build_graph()
 
         initial_state: BrowserAgentState = {
-            "messages": [{"role": "user", "content": user_input}],
+            "messages": [HumanMessage(content=user_input)],
             "next": None,
             "result": None,
             "error": None,
-            "context": {},
+            "context": Overwrite({}),
             "url": None,
             "page_content": None,
-            "screenshots": [],
-            "actions": [],
+            "screenshots": Overwrite([]),
+            "actions": Overwrite([]),
         }
 
-        result = await self.graph.ainvoke(initial_state)
+        result = await self.graph.ainvoke(initial_state, run_config(thread_id))
         return result
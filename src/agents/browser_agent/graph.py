@@ -1,35 +1,95 @@
 import sys
 import os
+import re
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from typing import Literal
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from typing import Any, Literal, Optional, Tuple
+from langchain_core.messages import HumanMessage, AIMessage
 from langgraph.graph import StateGraph, END, START
 from langgraph.prebuilt import ToolNode
 
 from core import AgentState, MCPClientManager, Settings, get_logger
+from core.plan_cache import PlanCache
+from core.prefetch import PrefetchRule, Prefetcher
+from core.prompt import PromptAssembler, TokenCounter, load_encoder
+from core.tool_dispatch import EarlyToolDispatcher
+from core.tool_retriever import ToolRetriever
 
 LOG = get_logger(__name__)
 
+ARCHIVER_PROMPT = """
+你是一个网页数据归档专家。工作流：抓取网页 -> 保存到本地。
+
+步骤：
+1. 使用 firecrawl_scrape 工具获取网页 Markdown 内容（formats 设为 ["markdown"]）
+2. 调用 write_file 使用 Markdown 格式将内容保存到 data/crawled/ 目录
+
+文件命名规则：去掉 http://，将 / 替换为 _
+例如：https://example.com/news -> data/crawled/example_com_news.md
+"""
+
+# 归档工作流必需的工具，每轮都绑定
+PINNED_TOOLS = ("firecrawl_scrape", "write_file")
+# 工具描述多为英文，补充中文关键词便于按请求检索
+TOOL_HINTS = {
+    "firecrawl_scrape": "抓取 爬取 网页 网站 访问 链接 内容",
+    "write_file": "保存 写入 归档 文件 本地",
+    "read_file": "读取 查看 文件 内容",
+    "list_directory": "列出 目录 文件夹",
+    "create_directory": "创建 目录 文件夹",
+}
+
+_URL = re.compile(r"https?://[^\s，。、；！？）)\]\"'<>]+")
+
+
+def _scrape_args(text: str) -> Optional[dict]:
+    """请求中第一个 URL 的抓取参数（与提示词要求模型使用的参数一致）"""
+    match = _URL.search(text)
+    return {"url": match.group(0), "formats": ["markdown"]} if match else None
+
+
+# 归档请求的第一步总是抓取请求中的 URL，与第一轮 LLM 调用同时预取
+PREFETCH_RULES = (PrefetchRule("scrape", "firecrawl_scrape", _scrape_args),)
+
 
 class BrowserAgent:
 
-    def __init__(self):
-        
+    def __init__(
+        self,
+        mcp_manager: Optional[MCPClientManager] = None,
+        config_path: str = "config/mcp_config.json",
+    ):
+        # mcp_manager 已注册服务器时直接使用其工具，否则从 config_path 加载
+        self.mcp_manager = mcp_manager
+        self.config_path = config_path
         self.tools = []
+        self.retriever: Optional[ToolRetriever] = None
+        self.token_counter: Optional[TokenCounter] = None
+        self.dispatcher: Optional[EarlyToolDispatcher] = None
+        self.prefetcher = Prefetcher("browser_agent", PREFETCH_RULES)
+        # 成功运行的工具调用轨迹，同一请求模板再次出现时直接回放
+        self.plans = PlanCache(min_support=Settings.PLAN_CACHE_MIN_SUPPORT)
         self.graph = None        
 
     async def _initialize(self):
         if self.graph:
             return
         # 1. 加载工具
-        manager = MCPClientManager()
-        self.tools = await manager.load_tools_from_config("config/mcp_config.json")
+        if self.mcp_manager is None:
+            self.mcp_manager = MCPClientManager()
+        if self.mcp_manager.server_names:
+            self.tools = await self.mcp_manager.get_tools()
+        else:
+            self.tools = await self.mcp_manager.load_tools_from_config(self.config_path)
         tool_names = [t.name for t in self.tools]
         LOG.info(f"[OK] Found tools: {'.'.join(tool_names)}")
-        llm = Settings.get_llm()
-        self.llm = llm.bind_tools(self.tools)
+        # 只绑定与请求相关的工具子集（一次运行内不变）；各子集的提示词组装器与绑定后的 LLM 按子集缓存
+        self.retriever = ToolRetriever(
+            self.tools, top_k=Settings.TOOL_TOP_K, pinned=PINNED_TOOLS, hints=TOOL_HINTS
+        )
+        self.token_counter = TokenCounter(load_encoder(Settings.PROMPT_TOKENIZER))
+        self.dispatcher = EarlyToolDispatcher(self.tools)
         # 2. 初始化图
         self.graph = self._build_graph()
 
@@ -37,6 +97,7 @@ class BrowserAgent:
 
         # 3. 定义节点
         nodes = [
+            ("replay", self._replay),
             ("agent", self._archiver_agent),
             ("tools", ToolNode(self.tools)),
         ]        
@@ -45,35 +106,63 @@ class BrowserAgent:
         for node_name, node_func in nodes:
             workflow.add_node(node_name, node_func)
 
-        workflow.add_edge(START, "agent")
-        workflow.add_conditional_edges("agent", self._internal_router, {"tools": "tools", END: END})
+        workflow.add_edge(START, "replay")
+        workflow.add_conditional_edges("replay", self._replay_router, {"agent": "agent", END: END})
+        workflow.add_conditional_edges(
+            "agent", self._internal_router, {"agent": "agent", "tools": "tools", END: END}
+        )
         workflow.add_edge("tools", "agent")  
         LOG.info("[OK] BrowserAgent graph built successfully")
-        return workflow.compile()
+        return workflow.compile(name="browser_agent")
+
+    def _bind(self, tools) -> Tuple[PromptAssembler, Any]:
+        """工具子集 -> (提示词组装器, 绑定了这些工具的 LLM)"""
+        # 系统提示与排序后的工具 schema 构成该子集每轮相同的请求前缀
+        prompt = PromptAssembler(
+            ARCHIVER_PROMPT, tools, max_tokens=Settings.PROMPT_MAX_TOKENS, counter=self.token_counter
+        )
+        return prompt, Settings.get_llm().bind_tools(prompt.tool_schemas)
+
+    async def _replay(self, state: AgentState) -> AgentState:
+        """命中已确认的轨迹时直接执行其工具调用；未命中或校验失败时交给 agent 节点"""
+        if not Settings.PLAN_CACHE:
+            return {}
+        matched = self.plans.match(state["messages"][0].content, [t.name for t in self.tools])
+        if matched is None:
+            return {}
+        plan, slots = matched
+        messages, complete = await self.plans.replay(plan, slots, self.dispatcher.execute)
+        LOG.info(f"[PLAN] 回放轨迹: {plan.template}{'' if complete else '（由 LLM 继续）'}")
+        return {"messages": messages}
+
+    def _replay_router(self, state: AgentState) -> Literal["agent", END]:
+        last_message = state["messages"][-1]
+        # 回放到了最终回复
+        if last_message.type == "ai" and not last_message.tool_calls:
+            return END
+        return "agent"
 
     async def _archiver_agent(self, state: AgentState) -> AgentState:
-        messages = state["messages"]       
-        # 第一步：收到用户请求
-        system_instruction = SystemMessage(content="""
-        你是一个网页数据归档专家。工作流：抓取网页 -> 保存到本地。
-
-        步骤：
-        1. 使用 firecrawl_scrape 工具获取网页 Markdown 内容
-        2. 调用 write_file 使用 Markdown 格式将内容保存到 data/crawled/ 目录
-
-        文件命名规则：去掉 http://，将 / 替换为 _
-        例如：https://example.com/news -> data/crawled/example_com_news.md
-        """)
-        full_messages = [system_instruction] + messages
-
-        # 绑定工具并调用 LLM        
-        response:AIMessage = await self.llm.ainvoke(full_messages)
+        tools = self.retriever.select(state["messages"])
+        prompt, llm = self.retriever.bound(tools, self._bind)
+        full_messages = prompt.assemble(state["messages"])
+
+        if not Settings.TOOL_EARLY_DISPATCH:
+            # 调用绑定了本轮工具子集的 LLM，工具调用交给 tools 节点
+            response: AIMessage = await llm.ainvoke(full_messages)
+            response.pretty_print()
+            return {"messages": [response]}
+
+        # 流式调用：参数完整的工具调用在模型继续生成时就开始执行，结果随回复一起写入状态
+        response, results = await self.dispatcher.run(llm, full_messages)
         response.pretty_print()
+        return {"messages": [response, *results]}
 
-        return {"messages": [response]}
-
-    def _internal_router(self,state: AgentState) -> Literal["tools", END]:
+    def _internal_router(self, state: AgentState) -> Literal["agent", "tools", END]:
         last_message = state["messages"][-1]
+        # 工具已在 agent 节点中提前执行，直接把结果交回 LLM
+        if last_message.type == "tool":
+            return "agent"
         # 如果 LLM 想要调用工具，就去 tools 节点
         if last_message.tool_calls:
             return "tools"
@@ -87,39 +176,41 @@ class BrowserAgent:
         initial_state = {"messages": [HumanMessage(content=input)]}
         # 2. 执行图
         final_reply = ""
-        async for event in self.graph.astream(initial_state, {"recursion_limit": 20}):
-            for node, output in event.items():
-                # 打印当前节点，方便调试
-                # print(f"--> 进入节点: {node}")
-                if node == "agent":
-                    msg = output["messages"][-1]
-                    # 如果是纯文本（非工具调用），通常是最终回复
-                    if msg.tool_calls:
-                        tool = msg.tool_calls[0]
-                        LOG.info(
-                            f"[DECISION] Agent calling tool: [{tool.get('name', 'unknown')}]"
-                        )
-                    else:
-                        final_reply = msg.content
-                        LOG.info(f"[COMPLETE] Agent finished task")
-                elif (node == "tools") and ("messages" in output) and output["messages"]:
-                    tool_msg = output["messages"][-1]
-                    if tool_msg.content:
-                        # Extract text from content blocks
-                        content_preview = ""
-                        for block in tool_msg.content:
-                            if isinstance(block, dict):
-                                content_preview = block.get("text", str(block))
+        messages = list(initial_state["messages"])
+        async with self.prefetcher.session(self.mcp_manager, input):
+            async for event in self.graph.astream(initial_state, {"recursion_limit": 20}):
+                for node, output in event.items():
+                    # 打印当前节点，方便调试
+                    # print(f"--> 进入节点: {node}")
+                    for msg in (output or {}).get("messages", []):
+                        messages.append(msg)
+                        if msg.type == "ai":
+                            # 如果是纯文本（非工具调用），通常是最终回复
+                            if msg.tool_calls:
+                                tool = msg.tool_calls[0]
+                                LOG.info(
+                                    f"[DECISION] Agent calling tool: [{tool.get('name', 'unknown')}]"
+                                )
                             else:
-                                content_preview = str(block)
-                            break  # Use first content block
-                        # Truncate for display
-                        if len(content_preview) > 200:
-                            content_preview = content_preview[:200] + "..."
-                        LOG.info(f"[TOOL RESULT] {content_preview}")
-
+                                final_reply = msg.content
+                                LOG.info(f"[COMPLETE] Agent finished task")
+                        elif msg.type == "tool" and msg.content:
+                            content_preview = msg.content
+                            if isinstance(content_preview, list):
+                                # Extract text from the first content block
+                                block = content_preview[0]
+                                content_preview = block.get("text", str(block)) if isinstance(block, dict) else str(block)
+                            # Truncate for display
+                            if len(content_preview) > 200:
+                                content_preview = content_preview[:200] + "..."
+                            LOG.info(f"[TOOL RESULT] {content_preview}")
+
+        if Settings.PLAN_CACHE:
+            # 成功的轨迹（无工具错误、以文本回复结束）按请求模板记录；回放得到的运行由 record 跳过
+            self.plans.record(messages)
         LOG.info(f"\n[FINAL RESULT]:\n{final_reply}")
         LOG.info(f"{'='*50}\n")
+        return final_reply
 
 
 # 测试运行
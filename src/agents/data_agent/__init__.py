@@ -2,18 +2,37 @@
 Data Agent - 数据分析智能体
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.graph import END
+from langgraph.types import Overwrite
 from core.state import DataAgentState
+from core.checkpoint import run_config
 from core.graph_builder import BaseGraphBuilder
+from core.mcp_client_manager import MCPClientManager
+from core.prefetch import PrefetchRule, Prefetcher
+from core.tool_results import SqlRows, SqlSchema
 
 
 class DataAgent:
     """数据分析智能体"""
 
-    def __init__(self):
+    # NL2SQL MCP 服务器在 mcp_config.json 中的名称
+    SQL_SERVER = "nl2sql"
+    # 依赖的 MCP 服务器，配置热更新时据此判断是否需要重建图
+    mcp_servers = (SQL_SERVER,)
+    # 表结构缓存秒数
+    SCHEMA_TTL = 300
+
+    def __init__(self, mcp_manager: Optional[MCPClientManager] = None):
         self.name = "data_agent"
         self.graph = None
+        self.mcp_manager = mcp_manager
+        # 每次查询都要读取表结构，运行开始时即预取
+        self.prefetcher = Prefetcher(
+            self.name,
+            [PrefetchRule("schema", "get_schema", lambda text: {}, self.SQL_SERVER, self.SCHEMA_TTL)],
+        )
 
     def build_graph(self) -> Any:
         """构建智能体图"""
@@ -32,88 +51,101 @@ class DataAgent:
         builder.add_edge("analyze_result", "create_visualization")
         builder.add_edge("create_visualization", END)
 
-        self.graph = builder.compile()
+        self.graph = builder.compile(name=self.name)
         return self.graph
 
-    async def parse_query(self, state: DataAgentState) -> DataAgentState:
+    async def parse_query(self, state: DataAgentState) -> Dict[str, Any]:
         """解析用户查询"""
-        user_message = state["messages"][-1]["content"]
-        state["query"] = user_message
-        state["context"]["intent"] = self._classify_intent(user_message)
-
-        state["messages"].append(
-            {"role": "assistant", "content": f"已解析查询: {user_message}"}
-        )
-
-        return state
+        user_message = state["messages"][-1].content
+        return {
+            "query": user_message,
+            "context": {"intent": self._classify_intent(user_message)},
+            "messages": [AIMessage(content=f"已解析查询: {user_message}")],
+        }
 
-    async def generate_sql(self, state: DataAgentState) -> DataAgentState:
+    async def generate_sql(self, state: DataAgentState) -> Dict[str, Any]:
         """生成SQL"""
         query = state["query"]
 
         # 简化的SQL生成
         if "用户" in query or "user" in query.lower():
-            state["sql"] = "SELECT * FROM users LIMIT 10"
+            table = "users"
         elif "产品" in query or "product" in query.lower():
-            state["sql"] = "SELECT * FROM products LIMIT 10"
+            table = "products"
         elif "订单" in query or "order" in query.lower():
-            state["sql"] = "SELECT * FROM orders LIMIT 10"
+            table = "orders"
         else:
-            state["sql"] = "SELECT * FROM users LIMIT 10"
-
-        state["messages"].append(
-            {"role": "assistant", "content": f"生成SQL: {state['sql']}"}
-        )
-
-        return state
-
-    async def execute_query(self, state: DataAgentState) -> DataAgentState:
-        """执行查询"""
-        # 这里调用MCP Server
-        state["data"] = [{"id": 1, "name": "示例数据"}, {"id": 2, "name": "示例数据2"}]
+            table = "users"
+
+        # 数据库中没有该表时退回第一张表
+        tables = await self._table_names()
+        if tables and table not in tables:
+            table = tables[0]
+        sql = f"SELECT * FROM {table} LIMIT 10"
+
+        return {"sql": sql, "messages": [AIMessage(content=f"生成SQL: {sql}")]}
+
+    async def _table_names(self) -> List[str]:
+        """数据库中的表名（读取失败或未配置服务器时为空）"""
+        if not self.mcp_manager or self.SQL_SERVER not in self.mcp_manager.server_names:
+            return []
+        try:
+            schema: SqlSchema = await self.mcp_manager.call_tool(
+                self.SQL_SERVER, "get_schema", cache_ttl=self.SCHEMA_TTL
+            )
+        except Exception:
+            return []
+        return [table["name"] for table in schema.get("tables", [])]
+
+    async def execute_query(self, state: DataAgentState) -> Dict[str, Any]:
+        """执行查询（失败时记录 error 并返回空数据，不中断图）"""
+        if self.mcp_manager and self.SQL_SERVER in self.mcp_manager.server_names:
+            try:
+                result: SqlRows = await self.mcp_manager.call_tool(
+                    self.SQL_SERVER, "execute_sql", {"sql": state["sql"]}
+                )
+                data = result["rows"]
+            except Exception as e:
+                # SQL 执行错误由服务器以 isError 结果返回，call_tool 抛出 ToolError
+                return self._query_failed(f"{type(e).__name__}: {e}")
+        else:
+            data = [{"id": 1, "name": "示例数据"}, {"id": 2, "name": "示例数据2"}]
 
-        state["messages"].append(
-            {
-                "role": "assistant",
-                "content": f"查询完成，返回 {len(state['data'])} 条记录",
-            }
-        )
+        return {
+            "data": data,
+            "messages": [AIMessage(content=f"查询完成，返回 {len(data)} 条记录")],
+        }
 
-        return state
+    @staticmethod
+    def _query_failed(error: str) -> Dict[str, Any]:
+        return {"data": [], "error": error, "messages": [AIMessage(content=f"查询失败: {error}")]}
 
-    async def analyze_result(self, state: DataAgentState) -> DataAgentState:
+    async def analyze_result(self, state: DataAgentState) -> Dict[str, Any]:
         """分析结果"""
-        state["context"]["analysis"] = {
-            "row_count": len(state["data"]) if state["data"] else 0,
-            "columns": list(state["data"][0].keys()) if state["data"] else [],
+        data = state["data"]
+        analysis = {
+            "row_count": len(data) if data else 0,
+            "columns": list(data[0].keys()) if data else [],
+        }
+        return {
+            "context": {"analysis": analysis},
+            "messages": [AIMessage(content=f"数据分析: 共 {analysis['row_count']} 行")],
         }
 
-        state["messages"].append(
-            {
-                "role": "assistant",
-                "content": f"数据分析: 共 {state['context']['analysis']['row_count']} 行",
-            }
-        )
-
-        return state
-
-    async def create_visualization(self, state: DataAgentState) -> DataAgentState:
+    async def create_visualization(self, state: DataAgentState) -> Dict[str, Any]:
         """创建可视化"""
-        state["visualization"] = {"type": "table", "data": state["data"]}
-
-        state["result"] = {
-            "query": state["query"],
-            "sql": state["sql"],
-            "data": state["data"],
-            "analysis": state["context"]["analysis"],
+        return {
+            "visualization": {"type": "table", "data": state["data"]},
+            "result": {
+                "query": state["query"],
+                "sql": state["sql"],
+                "data": state["data"],
+                "analysis": state["context"]["analysis"],
+                "error": state.get("error"),
+            },
+            "messages": [AIMessage(content="分析完成，结果已生成")],
         }
 
-        state["messages"].append(
-            {"role": "assistant", "content": "分析完成，结果已生成"}
-        )
-
-        return state
-
     def _classify_intent(self, query: str) -> str:
         """分类查询意图"""
         query = query.lower()
@@ -125,22 +157,23 @@ class DataAgent:
         else:
             return "select"
 
-    async def run(self, user_input: str) -> Dict[str, Any]:
+    async def run(self, user_input: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
         """运行智能体"""
         if self.graph is None:
             self.build_graph()
 
         initial_state: DataAgentState = {
-            "messages": [{"role": "user", "content": user_input}],
+            "messages": [HumanMessage(content=user_input)],
             "next": None,
             "result": None,
             "error": None,
-            "context": {},
+            "context": Overwrite({}),
             "query": None,
             "sql": None,
             "data": None,
             "visualization": None,
         }
 
-        result = await self.graph.ainvoke(initial_state)
+        async with self.prefetcher.session(self.mcp_manager, user_input):
+            result = await self.graph.ainvoke(initial_state, run_config(thread_id))
         return result
@@ -0,0 +1,172 @@
+"""
+Supervisor Agent - 多智能体编排
+
+将复合请求拆分为子任务，并发运行对应的智能体并合并结果。
+"""
+
+import asyncio
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END
+from langgraph.types import Overwrite
+from core.state import SupervisorState
+from core.checkpoint import run_config
+from core.graph_builder import BaseGraphBuilder
+from core.router import IntentRouter
+
+# 复合请求中明确的连接词与分号（单字 "并"、句号会拆开 并行/合并/多句描述 等单一意图的请求）
+_SPLIT_PATTERN = re.compile(r"(?:并且|然后|同时|以及|另外|；|;|\band then\b)")
+
+
+class SupervisorAgent:
+    """多智能体编排智能体"""
+
+    def __init__(self, agents: Dict[str, Any], router: IntentRouter):
+        """
+        Args:
+            agents: 路由名 -> 智能体实例（与编排器共享同一批实例，
+                因此 MCP 会话与工具结果缓存在子智能体之间复用）
+            router: 用于给每个子任务分配智能体
+        """
+        self.name = "supervisor"
+        self.agents = agents
+        self.router = router
+        self.graph = None
+
+    def build_graph(self) -> Any:
+        """构建智能体图"""
+        builder = BaseGraphBuilder(SupervisorState)
+
+        builder.add_node("split_request", self.split_request_node)
+        builder.add_node("dispatch", self.dispatch)
+        builder.add_node("merge_results", self.merge_results)
+
+        builder.set_entry_point("split_request")
+        builder.add_edge("split_request", "dispatch")
+        builder.add_edge("dispatch", "merge_results")
+        builder.add_edge("merge_results", END)
+
+        self.graph = builder.compile(name=self.name)
+        return self.graph
+
+    async def split_request(self, text: str) -> List[Dict[str, str]]:
+        """
+        拆分复合请求
+
+        按连接词切分后逐段路由，相邻且路由到同一智能体的片段合并为一个子任务。
+        本地索引判断不出意图的片段（如 "然后告诉我"）丢弃；
+        可路由的片段不足两个时整句作为一个任务路由。
+        """
+        parts = [p.strip(" ，,、。") for p in _SPLIT_PATTERN.split(text)]
+        parts = [
+            p for p in parts
+            if len(p) >= 2 and self.router.classify(p).confidence >= self.router.min_score
+        ]
+        if len(parts) <= 1:
+            decision = await self.router.route(text)
+            return [{"agent": decision.agent, "task": text}]
+
+        # 各片段并发路由，LLM 兜底的耗时不随片段数累加
+        decisions = await asyncio.gather(*(self.router.route(part) for part in parts))
+        subtasks: List[Dict[str, str]] = []
+        for part, decision in zip(parts, decisions):
+            if subtasks and subtasks[-1]["agent"] == decision.agent:
+                subtasks[-1]["task"] += f"，{part}"
+            else:
+                subtasks.append({"agent": decision.agent, "task": part})
+        return subtasks
+
+    async def split_request_node(self, state: SupervisorState) -> Dict[str, Any]:
+        """拆分节点：已有子任务（由编排器预先拆分）时直接复用"""
+        if state["subtasks"]:
+            return {}
+        return {"subtasks": await self.split_request(state["context"]["task"])}
+
+    async def dispatch(self, state: SupervisorState) -> Dict[str, Any]:
+        """并发运行所有子任务，总耗时取决于最慢的子任务"""
+        sub_results = await asyncio.gather(
+            *(self._run_subtask(task) for task in state["subtasks"])
+        )
+        return {"sub_results": sub_results}
+
+    async def _run_subtask(self, subtask: Dict[str, str]) -> Dict[str, Any]:
+        agent = self.agents[subtask["agent"]]
+        start = time.perf_counter()
+        try:
+            output = await agent.run(subtask["task"])
+            error = None
+        except Exception as e:
+            output, error = {}, f"{type(e).__name__}: {e}"
+
+        return {
+            "agent": subtask["agent"],
+            "task": subtask["task"],
+            "output": output or {},
+            "error": error,
+            "elapsed": time.perf_counter() - start,
+        }
+
+    async def merge_results(self, state: SupervisorState) -> Dict[str, Any]:
+        """合并各子智能体的 result 与回复"""
+        merged: Dict[str, Any] = {}
+        lines = []
+        for sub in state["sub_results"]:
+            merged.setdefault(sub["agent"], []).append(sub["output"].get("result"))
+            if sub["error"]:
+                lines.append(f"[{sub['agent'].upper()}] 执行失败: {sub['error']}")
+                continue
+            replies = _assistant_texts(sub["output"].get("messages", []))
+            if replies:
+                lines.append(f"[{sub['agent'].upper()}] {replies[-1].strip()}")
+
+        return {
+            "result": {
+                "subtasks": [
+                    {k: sub[k] for k in ("agent", "task", "error", "elapsed")}
+                    for sub in state["sub_results"]
+                ],
+                "results": {
+                    agent: results[0] if len(results) == 1 else results
+                    for agent, results in merged.items()
+                },
+            },
+            "messages": [AIMessage(content="\n".join(lines))],
+        }
+
+    async def run(
+        self,
+        user_input: str,
+        subtasks: Optional[List[Dict[str, str]]] = None,
+        thread_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """运行智能体"""
+        if self.graph is None:
+            self.build_graph()
+
+        initial_state: SupervisorState = {
+            "messages": [HumanMessage(content=user_input)],
+            "next": None,
+            "result": None,
+            "error": None,
+            "context": Overwrite({"task": user_input}),
+            "subtasks": Overwrite(subtasks or []),
+            "sub_results": Overwrite([]),
+        }
+
+        result = await self.graph.ainvoke(initial_state, run_config(thread_id))
+        return result
+
+
+def _assistant_texts(messages: List[Any]) -> List[str]:
+    """提取助手消息文本，兼容 dict 与 BaseMessage"""
+    texts = []
+    for msg in messages:
+        if isinstance(msg, dict):
+            if msg.get("role") == "assistant":
+                texts.append(str(msg.get("content", "")))
+        elif getattr(msg, "type", None) == "ai":
+            texts.append(str(msg.content))
+    return texts
@@ -2,129 +2,268 @@
 Travel Agent - 出行规划智能体
 """
 
-from typing import Any, Dict
+import asyncio
+import re
+from typing import Any, Dict, Optional, Tuple
 
+from langchain_core.messages import AIMessage, HumanMessage
 from langgraph.graph import END
+from langgraph.types import Overwrite
 from core.state import TravelAgentState
+from core.checkpoint import run_config
 from core.graph_builder import BaseGraphBuilder
+from core.mcp_client_manager import MCPClientManager
+from core.prefetch import PrefetchRule, Prefetcher
+from core.tool_results import RoutePlan, TicketQueryResult, WeatherInfo
 
 
 class TravelAgent:
     """出行规划智能体"""
 
-    def __init__(self):
+    # mcp_config.json 中的服务器名称
+    TICKET_SERVER = "12306"
+    MAP_SERVER = "amap"
+    # 依赖的 MCP 服务器，配置热更新时据此判断是否需要重建图
+    mcp_servers = (TICKET_SERVER, MAP_SERVER)
+
+    # 各并行分支的超时（秒），超时的分支只记录错误，不阻塞推荐
+    BRANCH_TIMEOUTS = {"tickets": 8.0, "route": 5.0, "weather": 3.0}
+    # 各分支工具结果的缓存秒数
+    CACHE_TTLS = {"tickets": 60, "route": 300, "weather": 600}
+
+    def __init__(self, mcp_manager: Optional[MCPClientManager] = None):
         self.name = "travel_agent"
         self.graph = None
+        self.mcp_manager = mcp_manager
+        # 车票与天气只依赖解析出的出发地、目的地和日期，运行开始时即预取
+        self.prefetcher = Prefetcher(
+            self.name,
+            [
+                PrefetchRule(
+                    "tickets",
+                    "query_train_tickets",
+                    lambda text: self._ticket_args(self._extract_trip_info(text)),
+                    self.TICKET_SERVER,
+                    self.CACHE_TTLS["tickets"],
+                ),
+                PrefetchRule(
+                    "weather",
+                    "get_weather",
+                    lambda text: self._weather_args(self._extract_trip_info(text)),
+                    self.MAP_SERVER,
+                    self.CACHE_TTLS["weather"],
+                ),
+            ],
+        )
 
     def build_graph(self) -> Any:
-        """构建智能体图"""
+        """
+        构建智能体图
+
+        车票、路线、天气三个分支互不依赖，解析后并行执行，在 recommend 处汇合。
+        """
         builder = BaseGraphBuilder(TravelAgentState)
 
         builder.add_node("parse_trip_request", self.parse_trip_request)
         builder.add_node("query_tickets", self.query_tickets)
         builder.add_node("plan_route", self.plan_route)
+        builder.add_node("query_weather", self.query_weather)
         builder.add_node("recommend", self.recommend)
 
         builder.set_entry_point("parse_trip_request")
-        builder.add_edge("parse_trip_request", "query_tickets")
-        builder.add_edge("query_tickets", "plan_route")
-        builder.add_edge("plan_route", "recommend")
+        for branch in ("query_tickets", "plan_route", "query_weather"):
+            builder.add_edge("parse_trip_request", branch)
+        builder.add_edge(["query_tickets", "plan_route", "query_weather"], "recommend")
         builder.add_edge("recommend", END)
 
-        self.graph = builder.compile()
+        self.graph = builder.compile(name=self.name)
         return self.graph
 
-    async def parse_trip_request(self, state: TravelAgentState) -> TravelAgentState:
+    async def parse_trip_request(self, state: TravelAgentState) -> Dict[str, Any]:
         """解析出行请求"""
-        user_message = state["messages"][-1]["content"]
+        user_message = state["messages"][-1].content
 
         # 简单的NLP提取
-        state["context"]["trip_info"] = self._extract_trip_info(user_message)
-        state["origin"] = state["context"]["trip_info"].get("origin")
-        state["destination"] = state["context"]["trip_info"].get("destination")
-        state["date"] = state["context"]["trip_info"].get("date")
-
-        return state
-
-    async def query_tickets(self, state: TravelAgentState) -> TravelAgentState:
-        """查询火车票"""
-        state["messages"].append(
-            {
-                "role": "assistant",
-                "content": f"正在查询 {state['origin']} -> {state['destination']} 的火车票",
-            }
+        trip_info = self._extract_trip_info(user_message)
+        return {
+            "context": {"trip_info": trip_info},
+            "origin": trip_info.get("origin"),
+            "destination": trip_info.get("destination"),
+            "date": trip_info.get("date"),
+        }
+
+    async def _call_branch(
+        self,
+        branch: str,
+        server: str,
+        tool: str,
+        arguments: Dict[str, Any],
+        cache_ttl: float = 0,
+    ) -> Tuple[Any, Optional[str]]:
+        """
+        带超时执行单个分支的工具调用，返回 (结果, 错误信息)
+
+        分支超时只约束工具调用本身：服务器冷启动（受 connect_timeout 约束）在计时前完成，
+        否则首次运行时 stdio 子进程的启动耗时会让短超时的分支必然失败。
+        工具以 error 字段返回的失败（如未知地点、日期格式错误）同样作为分支错误。
+        """
+        if not self.mcp_manager or server not in self.mcp_manager.server_names:
+            return None, f"MCP server '{server}' 未配置"
+
+        try:
+            await self.mcp_manager.get_session(server)
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+
+        try:
+            result = await asyncio.wait_for(
+                self.mcp_manager.call_tool(server, tool, arguments, cache_ttl=cache_ttl),
+                timeout=self.BRANCH_TIMEOUTS[branch],
+            )
+        except asyncio.TimeoutError:
+            return None, f"超时 ({self.BRANCH_TIMEOUTS[branch]}s)"
+        except Exception as e:
+            return None, f"{type(e).__name__}: {e}"
+        if isinstance(result, dict) and result.get("error"):
+            return None, str(result["error"])
+        return result, None
+
+    async def query_tickets(self, state: TravelAgentState) -> Dict[str, Any]:
+        """查询火车票（并行分支，仅返回本分支写入的键）"""
+        result, error = await self._call_branch(
+            "tickets",
+            self.TICKET_SERVER,
+            "query_train_tickets",
+            self._ticket_args(state),
+            cache_ttl=self.CACHE_TTLS["tickets"],
         )
 
-        # 这里调用MCP Server
-        state["ticket_info"] = {
-            "origin": state["origin"],
-            "destination": state["destination"],
-            "date": state["date"],
-            "available": True,
+        update: Dict[str, Any] = {
+            "ticket_info": result,
+            "messages": [
+                AIMessage(content=f"正在查询 {state['origin']} -> {state['destination']} 的火车票")
+            ],
         }
+        if error:
+            update["branch_errors"] = {"tickets": error}
+        return update
 
-        return state
+    async def plan_route(self, state: TravelAgentState) -> Dict[str, Any]:
+        """规划路线（并行分支）"""
+        result, error = await self._call_branch(
+            "route",
+            self.MAP_SERVER,
+            "plan_route",
+            {"origin": state["origin"], "destination": state["destination"], "mode": "driving"},
+            cache_ttl=self.CACHE_TTLS["route"],
+        )
 
-    async def plan_route(self, state: TravelAgentState) -> TravelAgentState:
-        """规划路线"""
-        state["messages"].append({"role": "assistant", "content": "正在规划出行路线"})
+        update: Dict[str, Any] = {
+            "route_options": [result] if result else [],
+            "messages": [AIMessage(content="正在规划出行路线")],
+        }
+        if error:
+            update["branch_errors"] = {"route": error}
+        return update
 
-        state["route_options"] = [
-            {"type": "高铁", "duration": "5小时", "price": 500},
-            {"type": "飞机", "duration": "2小时", "price": 800},
-        ]
+    async def query_weather(self, state: TravelAgentState) -> Dict[str, Any]:
+        """查询目的地天气（并行分支）"""
+        result, error = await self._call_branch(
+            "weather",
+            self.MAP_SERVER,
+            "get_weather",
+            self._weather_args(state),
+            cache_ttl=self.CACHE_TTLS["weather"],
+        )
 
-        return state
+        update: Dict[str, Any] = {"weather": result}
+        if error:
+            update["branch_errors"] = {"weather": error}
+        return update
 
-    async def recommend(self, state: TravelAgentState) -> TravelAgentState:
-        """生成推荐"""
-        recommendation = f"""
-        出行推荐:
-        - 路线: {state['origin']} -> {state['destination']}
-        - 日期: {state['date']}
-        - 推荐: 高铁 (性价比高)
-        """
+    async def recommend(self, state: TravelAgentState) -> Dict[str, Any]:
+        """生成推荐（汇合点：允许部分分支缺失）"""
+        errors = state.get("branch_errors") or {}
+        lines = [
+            "出行推荐:",
+            f"- 路线: {state['origin']} -> {state['destination']}",
+            f"- 日期: {state['date']}",
+        ]
+
+        tickets: Optional[TicketQueryResult] = state["ticket_info"]
+        if tickets and tickets.get("tickets"):
+            cheapest = min(tickets["tickets"], key=lambda t: t.get("price", float("inf")))
+            lines.append(
+                f"- 车次: 共 {len(tickets['tickets'])} 趟，推荐 {cheapest.get('train_no')} "
+                f"({cheapest.get('departure')} - {cheapest.get('arrival')})"
+            )
+        if state["route_options"]:
+            route: RoutePlan = state["route_options"][0]
+            lines.append(f"- 自驾: {route.get('distance')}，约 {route.get('duration')}")
+        weather: Optional[WeatherInfo] = state["weather"]
+        if weather:
+            lines.append(f"- 目的地天气: {weather.get('weather')} {weather.get('temperature')}")
+        for branch, error in errors.items():
+            lines.append(f"- [{branch}] 暂无结果: {error}")
 
-        state["result"] = {
-            "trip": state["context"]["trip_info"],
-            "tickets": state["ticket_info"],
-            "routes": state["route_options"],
+        return {
+            "result": {
+                "trip": state["context"]["trip_info"],
+                "tickets": state["ticket_info"],
+                "routes": state["route_options"],
+                "weather": state["weather"],
+                "partial": bool(errors),
+                "errors": errors,
+            },
+            "messages": [AIMessage(content="\n".join(lines))],
         }
 
-        state["messages"].append({"role": "assistant", "content": recommendation})
+    @staticmethod
+    def _ticket_args(trip: Dict[str, Any]) -> Dict[str, Any]:
+        return {"origin": trip["origin"], "destination": trip["destination"], "date": trip["date"]}
 
-        return state
+    @staticmethod
+    def _weather_args(trip: Dict[str, Any]) -> Dict[str, Any]:
+        return {"city": trip["destination"]}
 
     def _extract_trip_info(self, text: str) -> Dict[str, str]:
         """提取出行信息"""
         # 简化的提取逻辑
         info = {"origin": "北京", "destination": "上海", "date": "2026-02-05"}
 
-        if "从" in text and "到" in text:
-            parts = text.split("从")[1].split("到")
-            if len(parts) == 2:
-                info["origin"] = parts[0].strip()
-                info["destination"] = parts[1].split("出发")[0].strip()
+        match = re.search(
+            r"从\s*([一-鿿A-Za-z]+?)\s*(?:到|去|至)\s*([一-鿿A-Za-z]+?)(?=的|出发|\s|\d|,|，|$)",
+            text,
+        )
+        if match:
+            info["origin"], info["destination"] = match.group(1), match.group(2)
+
+        date = re.search(r"\d{4}-\d{2}-\d{2}", text)
+        if date:
+            info["date"] = date.group(0)
 
         return info
 
-    async def run(self, user_input: str) -> Dict[str, Any]:
+    async def run(self, user_input: str, thread_id: Optional[str] = None) -> Dict[str, Any]:
         """运行智能体"""
         if self.graph is None:
             self.build_graph()
 
         initial_state: TravelAgentState = {
-            "messages": [{"role": "user", "content": user_input}],
+            "messages": [HumanMessage(content=user_input)],
             "next": None,
             "result": None,
             "error": None,
-            "context": {},
+            "context": Overwrite({}),
             "origin": None,
             "destination": None,
             "date": None,
             "ticket_info": None,
-            "route_options": [],
+            "route_options": Overwrite([]),
+            "weather": None,
+            "branch_errors": Overwrite({}),
         }
 
-        result = await self.graph.ainvoke(initial_state)
+        async with self.prefetcher.session(self.mcp_manager, user_input):
+            result = await self.graph.ainvoke(initial_state, run_config(thread_id))
         return result
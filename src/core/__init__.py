@@ -2,11 +2,43 @@
 核心模块
 
 包含日志管理、状态定义、图构建器等基础设施组件。
+
+导出项在首次访问时才导入对应子模块（PEP 562），
+`from core import get_logger` 不会连带导入 langgraph / mcp 等重量级依赖。
 """
 
-from .logger import Logger, get_logger
-from .settings import Settings
-from .state import AgentState
-from .mcp_client_manager import MCPClientManager
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .logger import Logger, get_logger
+    from .mcp_client_manager import MCPClientManager
+    from .router import IntentRouter
+    from .settings import Settings
+    from .state import AgentState
+
+# 导出名 -> 所在子模块
+_EXPORTS = {
+    "Logger": ".logger",
+    "get_logger": ".logger",
+    "Settings": ".settings",
+    "AgentState": ".state",
+    "MCPClientManager": ".mcp_client_manager",
+    "IntentRouter": ".router",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
-__all__ = ["Logger", "get_logger", "Settings", "AgentState", "MCPClientManager"]
+__all__ = ["Logger", "get_logger", "Settings", "AgentState", "MCPClientManager", "IntentRouter"]
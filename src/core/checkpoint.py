@@ -0,0 +1,725 @@
+"""
+增量压缩的检查点存储
+
+LangGraph 每个 super-step 都会把整个状态交给 checkpointer，默认实现每次都重新序列化
+完整的消息历史以及 data / page_content 等大字段。这里的 DeltaCheckpointSaver：
+
+- 只写每个通道相对上一个版本的增量：列表通道（messages、actions、subtasks 等）只记录
+  新追加元素的哈希，字典通道（context、branch_errors）只记录变化的键；
+  每 snapshot_interval 个增量写一次完整快照，恢复时最多回溯这么多条记录
+- 列表元素与较大的值按内容哈希存入 blobs 表，跨线程去重（相同的系统提示、工具结果只存一份）
+- 所有值用 msgpack 编码（JsonPlusSerializer），超过阈值的再做 zstd 压缩
+  （未安装 zstandard 时退化为标准库 zlib）
+
+增量按内容判断：每次写入都重新编码各元素（不压缩）并与上一版本的内容哈希比较，
+节点原地修改了已写入的对象时，变化的元素同样会被写入（前缀变化时写完整快照）。
+只有新增或变化的元素才会压缩并写库，写入量与本步的变化量成正比。
+已写入或读取的元素按哈希在进程内缓存未压缩的编码，恢复时不再查库和解压；
+每次读取都重新解码，不同线程（以及同一线程的不同检查点）不会共享同一个对象。
+
+用法:
+    saver = DeltaCheckpointSaver("data/checkpoints.db")
+    graph = BaseGraphBuilder(AgentState, checkpointer=saver)...compile()
+    await graph.ainvoke(state, run_config("thread-1"))
+
+设置 CHECKPOINT_DB 后各智能体的图默认使用 default_checkpointer()。
+"""
+
+import asyncio
+import hashlib
+import random
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        parent_checkpoint_id TEXT,
+        type TEXT,
+        checkpoint BLOB,
+        metadata_type TEXT,
+        metadata BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+    );
+
+    -- 每个通道版本一条记录：完整快照或相对 base_version 的增量
+    CREATE TABLE IF NOT EXISTS channels (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        channel TEXT NOT NULL,
+        version TEXT NOT NULL,
+        base_version TEXT,
+        depth INTEGER NOT NULL,
+        type TEXT,
+        record BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+    );
+
+    -- 按内容哈希存储的值，跨线程共享；blob_refs 记录引用它的线程，删除线程时回收
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash BLOB PRIMARY KEY,
+        type TEXT,
+        data BLOB
+    );
+    CREATE TABLE IF NOT EXISTS blob_refs (
+        hash BLOB NOT NULL,
+        thread_id TEXT NOT NULL,
+        PRIMARY KEY (hash, thread_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_blob_refs_thread ON blob_refs(thread_id);
+
+    CREATE TABLE IF NOT EXISTS writes (
+        thread_id TEXT NOT NULL,
+        checkpoint_ns TEXT NOT NULL DEFAULT '',
+        checkpoint_id TEXT NOT NULL,
+        task_id TEXT NOT NULL,
+        task_path TEXT NOT NULL DEFAULT '',
+        idx INTEGER NOT NULL,
+        channel TEXT NOT NULL,
+        type TEXT,
+        value BLOB,
+        PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+    );
+"""
+
+# SQLite 单条语句的参数上限较小，批量查询 blobs 时分段
+_IN_BATCH = 500
+
+
+class CompactSerializer(SerializerProtocol):
+    """
+    msgpack 编码 + 压缩
+
+    编码交给 JsonPlusSerializer（ormsgpack），长度不小于 min_size 的结果再压缩，
+    类型标记追加压缩算法（如 "msgpack+zstd"），解码时据此解压。短数据压缩收益为负，保持原样。
+    """
+
+    def __init__(
+        self,
+        serde: Optional[SerializerProtocol] = None,
+        level: int = 3,
+        min_size: int = 256,
+    ):
+        self.serde = serde or JsonPlusSerializer()
+        self.level = level
+        self.min_size = min_size
+        self.codec = "zstd" if zstandard is not None else "zlib"
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.pack(self.serde.dumps_typed(obj))
+
+    def pack(self, typed: Tuple[str, bytes]) -> Tuple[str, bytes]:
+        """压缩内层序列化器的编码结果"""
+        type_, data = typed
+        if len(data) < self.min_size:
+            return type_, data
+        if self.codec == "zstd":
+            packed = zstandard.compress(data, self.level)
+        else:
+            packed = zlib.compress(data, min(self.level * 2, 9))
+        if len(packed) >= len(data):
+            return type_, data
+        return f"{type_}+{self.codec}", packed
+
+    def unpack(self, data: Tuple[str, bytes]) -> Tuple[str, bytes]:
+        """解压为内层序列化器的编码结果"""
+        type_, payload = data
+        type_, _, codec = type_.partition("+")
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("检查点数据使用 zstd 压缩，需要安装 zstandard")
+            payload = zstandard.decompress(payload)
+        elif codec == "zlib":
+            payload = zlib.decompress(payload)
+        return type_, payload
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self.serde.loads_typed(self.unpack(data))
+
+
+@dataclass
+class _Head:
+    """某个通道最近一次写入/读取的版本（内容哈希），作为下一次增量的基准"""
+
+    version: str
+    depth: int
+    # 列表通道：各元素的内容哈希；字典通道：键 -> 值的内容哈希（另一项为 None）
+    hashes: Optional[List[bytes]] = None
+    digests: Optional[Dict[Any, bytes]] = None
+
+
+class DeltaCheckpointSaver(BaseCheckpointSaver[str]):
+    """
+    基于 SQLite 的增量检查点存储
+
+    Args:
+        path: 数据库路径，":memory:" 为内存数据库
+        serde: 序列化器，默认 CompactSerializer（msgpack + zstd）
+        snapshot_interval: 连续增量达到该数量后写一次完整快照
+        inline_limit: 非列表/字典的值编码后不超过该字节数时直接内联，否则按哈希存入 blobs
+        cache_size: 进程内缓存的元素编码数量
+        head_cache_size: 保留增量基准的通道数量（每个线程的每个通道一项）
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        *,
+        serde: Optional[SerializerProtocol] = None,
+        snapshot_interval: int = 16,
+        inline_limit: int = 256,
+        cache_size: int = 4096,
+        head_cache_size: int = 1024,
+    ):
+        super().__init__(serde=serde or CompactSerializer())
+        self.path = path
+        self.snapshot_interval = max(1, snapshot_interval)
+        self.inline_limit = inline_limit
+        self.cache_size = cache_size
+        self.head_cache_size = head_cache_size
+
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # 同步方法在事件循环线程调用，异步方法经 to_thread 在工作线程调用，由 _lock 串行化
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+        self._lock = threading.RLock()
+        self._heads: "OrderedDict[Tuple[str, str, str], _Head]" = OrderedDict()
+        # 内容哈希 -> 未压缩的编码
+        self._encoded: "OrderedDict[bytes, Tuple[str, bytes]]" = OrderedDict()
+        self.stats = {
+            "checkpoints": 0,
+            "snapshots": 0,
+            "deltas": 0,
+            "bytes_written": 0,
+            "blobs_written": 0,
+            "blobs_deduped": 0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    # ------------------------------------------------------------------
+    # 内容寻址的值
+    # ------------------------------------------------------------------
+
+    def _remember(self, digest: bytes, raw: Tuple[str, bytes]) -> None:
+        self._encoded[digest] = raw
+        self._encoded.move_to_end(digest)
+        while len(self._encoded) > self.cache_size:
+            self._encoded.popitem(last=False)
+
+    def _hash(self, type_: str, data: bytes) -> bytes:
+        return hashlib.blake2b(type_.encode() + b"\0" + data, digest_size=16).digest()
+
+    def _raw(self, value: Any) -> Tuple[str, bytes]:
+        """未压缩的编码，用于计算内容哈希"""
+        if isinstance(self.serde, CompactSerializer):
+            return self.serde.serde.dumps_typed(value)
+        return self.serde.dumps_typed(value)
+
+    def _pack(self, raw: Tuple[str, bytes]) -> Tuple[str, bytes]:
+        if isinstance(self.serde, CompactSerializer):
+            return self.serde.pack(raw)
+        return raw
+
+    def _unpack(self, typed: Tuple[str, bytes]) -> Tuple[str, bytes]:
+        if isinstance(self.serde, CompactSerializer):
+            return self.serde.unpack(typed)
+        return typed
+
+    def _loads_raw(self, raw: Tuple[str, bytes]) -> Any:
+        if isinstance(self.serde, CompactSerializer):
+            return self.serde.serde.loads_typed(raw)
+        return self.serde.loads_typed(raw)
+
+    def _store(self, cur: sqlite3.Cursor, thread_id: str, raw: Tuple[str, bytes]) -> bytes:
+        """按内容哈希存储编码后的值（已存在则只记录引用），返回哈希"""
+        digest = self._hash(*raw)
+        self._remember(digest, raw)
+        type_, data = self._pack(raw)
+        cur.execute(
+            "INSERT OR IGNORE INTO blobs(hash, type, data) VALUES (?, ?, ?)",
+            (digest, type_, data),
+        )
+        if cur.rowcount:
+            self.stats["blobs_written"] += 1
+            self.stats["bytes_written"] += len(data) + len(digest)
+        else:
+            self.stats["blobs_deduped"] += 1
+        cur.execute(
+            "INSERT OR IGNORE INTO blob_refs(hash, thread_id) VALUES (?, ?)", (digest, thread_id)
+        )
+        return digest
+
+    def _fetch(self, cur: sqlite3.Cursor, digests: Sequence[bytes]) -> List[Any]:
+        """
+        按哈希取值，缓存中没有的批量查询并解压
+
+        缓存的是编码而不是对象：每次返回新解码的值，调用方原地修改不会影响缓存或其他线程。
+        """
+        missing = list({d for d in digests if d not in self._encoded})
+        for start in range(0, len(missing), _IN_BATCH):
+            batch = missing[start:start + _IN_BATCH]
+            rows = cur.execute(
+                f"SELECT hash, type, data FROM blobs WHERE hash IN ({','.join('?' * len(batch))})",
+                batch,
+            ).fetchall()
+            for digest, type_, data in rows:
+                self._remember(digest, self._unpack((type_, data)))
+        values = []
+        for digest in digests:
+            if digest not in self._encoded:
+                raise KeyError(f"检查点引用的数据缺失: {digest.hex()}")
+            values.append(self._loads_raw(self._encoded[digest]))
+            self._encoded.move_to_end(digest)
+        return values
+
+    # ------------------------------------------------------------------
+    # 通道编码
+    # ------------------------------------------------------------------
+
+    def _set_head(self, key: Tuple[str, str, str], head: _Head) -> None:
+        self._heads[key] = head
+        self._heads.move_to_end(key)
+        while len(self._heads) > self.head_cache_size:
+            self._heads.popitem(last=False)
+
+    def _encode_list(
+        self, cur: sqlite3.Cursor, thread_id: str, value: List[Any], prev: Optional[_Head]
+    ) -> Tuple[Any, Optional[str], int, _Head]:
+        old = prev.hashes if prev is not None and prev.hashes is not None else None
+        # 上一版本已引用的内容无需再写；新增或被原地修改的元素按新内容存储
+        known = set(old or ())
+        hashes = []
+        for item in value:
+            raw = self._raw(item)
+            digest = self._hash(*raw)
+            if digest not in known:
+                self._store(cur, thread_id, raw)
+                known.add(digest)
+            hashes.append(digest)
+        if old is not None and hashes[: len(old)] == old and prev.depth + 1 < self.snapshot_interval:
+            # 前缀内容未变：只记录新追加的元素
+            return ["list+", hashes[len(old):]], prev.version, prev.depth + 1, _Head("", prev.depth + 1, hashes=hashes)
+        return ["list", hashes], None, 0, _Head("", 0, hashes=hashes)
+
+    def _encode_dict(
+        self, value: Dict[Any, Any], prev: Optional[_Head]
+    ) -> Tuple[Any, Optional[str], int, _Head]:
+        raws = {k: self._raw(v) for k, v in value.items()}
+        digests = {k: self._hash(*raw) for k, raw in raws.items()}
+        if (
+            prev is not None
+            and prev.digests is not None
+            and prev.depth + 1 < self.snapshot_interval
+        ):
+            old = prev.digests
+            changed = {k: self._pack(raw) for k, raw in raws.items() if old.get(k) != digests[k]}
+            removed = [k for k in old if k not in value]
+            return ["dict+", changed, removed], prev.version, prev.depth + 1, _Head("", prev.depth + 1, digests=digests)
+        items = {k: self._pack(raw) for k, raw in raws.items()}
+        return ["dict", items], None, 0, _Head("", 0, digests=digests)
+
+    def _encode_channel(
+        self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str, channel: str, version: str, values: Dict[str, Any]
+    ) -> None:
+        key = (thread_id, checkpoint_ns, channel)
+        prev = self._heads.get(key)
+        base, depth, head = None, 0, None
+        if channel not in values:
+            record = ["empty"]
+        else:
+            value = values[channel]
+            if isinstance(value, list):
+                record, base, depth, head = self._encode_list(cur, thread_id, value, prev)
+            elif isinstance(value, dict):
+                record, base, depth, head = self._encode_dict(value, prev)
+            else:
+                raw = self._raw(value)
+                typed = self._pack(raw)
+                if len(typed[1]) > self.inline_limit:
+                    record = ["ref", self._store(cur, thread_id, raw)]
+                else:
+                    record = ["value", list(typed)]
+        if head is not None:
+            head.version = version
+            self._set_head(key, head)
+            self.stats["deltas" if base is not None else "snapshots"] += 1
+        else:
+            self._heads.pop(key, None)
+
+        type_, data = self.serde.dumps_typed(record)
+        self.stats["bytes_written"] += len(data)
+        cur.execute(
+            "INSERT OR REPLACE INTO channels"
+            "(thread_id, checkpoint_ns, channel, version, base_version, depth, type, record)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (thread_id, checkpoint_ns, channel, version, base, depth, type_, data),
+        )
+
+    def _load_channel(
+        self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str, channel: str, version: str
+    ) -> Tuple[Any, Optional[_Head]]:
+        """沿增量链回溯到最近的完整快照并还原；通道为空时返回 (None, None)"""
+        chain = []
+        current: Optional[str] = version
+        while current is not None:
+            row = cur.execute(
+                "SELECT base_version, depth, type, record FROM channels"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, current),
+            ).fetchone()
+            if row is None:
+                return None, None
+            base, depth, type_, data = row
+            chain.append(self.serde.loads_typed((type_, data)))
+            current = base
+        chain.reverse()
+
+        kind = chain[0][0]
+        if kind == "empty":
+            return None, None
+        if kind == "value":
+            return self.serde.loads_typed(tuple(chain[0][1])), None
+        if kind == "ref":
+            return self._fetch(cur, [chain[0][1]])[0], None
+        if kind == "list":
+            hashes = list(chain[0][1])
+            for record in chain[1:]:
+                hashes.extend(record[1])
+            value = self._fetch(cur, hashes)
+            return value, _Head(version, len(chain) - 1, hashes=hashes)
+        value = {k: self.serde.loads_typed(tuple(v)) for k, v in chain[0][1].items()}
+        for _, changed, removed in chain[1:]:
+            for k in removed:
+                value.pop(k, None)
+            value.update({k: self.serde.loads_typed(tuple(v)) for k, v in changed.items()})
+        digests = {k: self._hash(*self._raw(v)) for k, v in value.items()}
+        return value, _Head(version, len(chain) - 1, digests=digests)
+
+    # ------------------------------------------------------------------
+    # BaseCheckpointSaver 接口
+    # ------------------------------------------------------------------
+
+    def _tuple(
+        self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str, row: Tuple, track: bool
+    ) -> CheckpointTuple:
+        checkpoint_id, parent_id, type_, data, metadata_type, metadata = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, data))
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            value, head = self._load_channel(cur, thread_id, checkpoint_ns, channel, version)
+            if value is None and head is None:
+                continue
+            channel_values[channel] = value
+            # 恢复执行时 LangGraph 在读出的值上继续追加，以它为基准可以继续写增量
+            if track and head is not None:
+                self._set_head((thread_id, checkpoint_ns, channel), head)
+        writes = cur.execute(
+            "SELECT task_id, channel, type, value FROM writes"
+            " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+            " ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((type_, value)))
+                for task_id, channel, type_, value in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        columns = "checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata"
+        with self._lock:
+            cur = self.conn.cursor()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = cur.execute(
+                    f"SELECT {columns} FROM checkpoints"
+                    " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = cur.execute(
+                    f"SELECT {columns} FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+                    " ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            if row is None:
+                return None
+            return self._tuple(cur, thread_id, checkpoint_ns, row, track=True)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        where, params = [], []
+        if config:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+            " type, checkpoint, metadata_type, metadata FROM checkpoints"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY checkpoint_id DESC"
+        )
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            if filter:
+                metadata = self.serde.loads_typed((row[4], row[5]))
+                if not all(metadata.get(k) == v for k, v in filter.items()):
+                    continue
+            with self._lock:
+                item = self._tuple(self.conn.cursor(), thread_id, checkpoint_ns, tuple(row), track=False)
+            if limit is not None:
+                limit -= 1
+            yield item
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        body = checkpoint.copy()
+        values: Dict[str, Any] = body.pop("channel_values")  # type: ignore[misc]
+        type_, data = self.serde.dumps_typed(body)
+        metadata_type, metadata_data = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        with self._lock, self.conn:
+            cur = self.conn.cursor()
+            # 只有 new_versions 中的通道在本步发生了变化
+            for channel, version in new_versions.items():
+                self._encode_channel(cur, thread_id, checkpoint_ns, channel, str(version), values)
+            cur.execute(
+                "INSERT OR REPLACE INTO checkpoints"
+                "(thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id,"
+                " type, checkpoint, metadata_type, metadata) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    data,
+                    metadata_type,
+                    metadata_data,
+                ),
+            )
+            self.stats["checkpoints"] += 1
+            self.stats["bytes_written"] += len(data) + len(metadata_data)
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        # 特殊写入（错误、中断等）覆盖旧值，普通写入重放时保持首次结果
+        verb = "INSERT OR REPLACE" if all(w[0] in WRITES_IDX_MAP for w in writes) else "INSERT OR IGNORE"
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            self.stats["bytes_written"] += len(data)
+            rows.append((
+                thread_id,
+                checkpoint_ns,
+                checkpoint_id,
+                task_id,
+                task_path,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                type_,
+                data,
+            ))
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"{verb} INTO writes(thread_id, checkpoint_ns, checkpoint_id, task_id, task_path,"
+                " idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """删除线程的全部检查点，并回收不再被任何线程引用的 blobs"""
+        with self._lock, self.conn:
+            for table in ("checkpoints", "channels", "writes"):
+                self.conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            orphans = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT r.hash FROM blob_refs r WHERE r.thread_id = ? AND NOT EXISTS"
+                    " (SELECT 1 FROM blob_refs o WHERE o.hash = r.hash AND o.thread_id != ?)",
+                    (thread_id, thread_id),
+                )
+            ]
+            self.conn.execute("DELETE FROM blob_refs WHERE thread_id = ?", (thread_id,))
+            self.conn.executemany("DELETE FROM blobs WHERE hash = ?", [(h,) for h in orphans])
+            for key in [k for k in self._heads if k[0] == thread_id]:
+                del self._heads[key]
+            for digest in orphans:
+                self._encoded.pop(digest, None)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None = None) -> str:
+        """单调递增的整数部分加随机后缀：从旧检查点分叉时新版本不会与已有版本冲突"""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+_default: Optional[DeltaCheckpointSaver] = None
+_default_lock = threading.Lock()
+
+
+def default_checkpointer() -> Optional[DeltaCheckpointSaver]:
+    """CHECKPOINT_DB 非空时返回进程内共享的 DeltaCheckpointSaver，否则返回 None"""
+    global _default
+    from .settings import Settings
+
+    if not Settings.CHECKPOINT_DB:
+        return None
+    with _default_lock:
+        if _default is None or _default.path != Settings.CHECKPOINT_DB:
+            _default = DeltaCheckpointSaver(
+                Settings.CHECKPOINT_DB,
+                snapshot_interval=Settings.CHECKPOINT_SNAPSHOT_INTERVAL,
+            )
+        return _default
+
+
+def run_config(thread_id: Optional[str] = None, **configurable: Any) -> RunnableConfig:
+    """图调用配置：带 thread_id 时延续该线程的状态，否则新建线程（未启用检查点时无影响）"""
+    return {"configurable": {"thread_id": thread_id or uuid4().hex, **configurable}}
+
+
+__all__ = [
+    "CompactSerializer",
+    "DeltaCheckpointSaver",
+    "default_checkpointer",
+    "run_config",
+]
@@ -0,0 +1,342 @@
+"""
+常驻后台进程（daemon）
+
+把已初始化的编排器（MCP 常驻会话、工具结果缓存、路由缓存、LLM 客户端）保留在一个
+后台进程中，CLI 通过本地 Unix socket 把查询转发给它并流式取回输出。
+
+- 首次使用时由客户端自动拉起，空闲超过 idle_timeout 秒后自行退出
+- 源码、配置文件或相关环境变量有改动时（指纹不一致）旧进程拒绝请求并退出，客户端重新拉起
+- 同一 socket 只允许一个后台进程（flock），并发拉起时后来者等待或退出
+
+协议为换行分隔的 JSON：
+    客户端 -> {"protocol": 1, "fingerprint": "...", ...请求字段}
+    服务端 -> {"type": "output", "text": "..."}   请求执行期间的标准输出
+              {"type": "done", "status": 0}       结束（status 为退出码）
+              {"type": "restart"}                 指纹不一致，后台进程即将退出
+
+本模块只依赖标准库，客户端路径不会导入任何重量级依赖。
+仅支持提供 AF_UNIX 的平台（Windows 上 available() 返回 False，调用方回退为进程内执行）。
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+PROTOCOL_VERSION = 1
+
+# 当前请求的输出回调；由 OutputRouter 按上下文把 print 转发给对应的客户端
+_output: ContextVar[Optional[Callable[[str], None]]] = ContextVar("daemon_output", default=None)
+
+
+def available() -> bool:
+    return hasattr(socket, "AF_UNIX") and sys.platform != "win32"
+
+
+def default_socket_path(workdir: str) -> str:
+    """按工作目录区分的 socket 路径（放在运行时目录，长度受 sun_path 限制）"""
+    key = hashlib.sha1(os.path.abspath(workdir).encode()).hexdigest()[:12]
+    base = os.getenv("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"langgraph-mcp-{os.getuid()}-{key}.sock")
+
+
+def source_fingerprint(paths: Iterable[str]) -> str:
+    """源码指纹：各路径（目录递归其中的 .py）的文件数与最大修改时间"""
+    count, latest = 0, 0.0
+    for path in paths:
+        root = Path(path)
+        files = root.rglob("*.py") if root.is_dir() else [root]
+        for file in files:
+            try:
+                latest = max(latest, file.stat().st_mtime)
+                count += 1
+            except OSError:
+                continue
+    return f"{count}:{latest:.6f}"
+
+
+def env_fingerprint(names: Iterable[str]) -> str:
+    """环境变量指纹：各变量当前值（未设置与空串区分）的摘要，不含明文"""
+    values = {name: os.environ.get(name) for name in sorted(set(names))}
+    return hashlib.sha256(json.dumps(values, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+class OutputRouter(io.TextIOBase):
+    """
+    替换 sys.stdout：处理请求的任务（及其创建的任务/线程）中的输出发给对应客户端，
+    其余输出写入原来的标准输出（后台进程的日志文件）
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+
+    def write(self, text: str) -> int:
+        sink = _output.get()
+        if sink is None:
+            return self.fallback.write(text)
+        sink(text)
+        return len(text)
+
+    def flush(self) -> None:
+        if _output.get() is None:
+            self.fallback.flush()
+
+    def isatty(self) -> bool:
+        return False
+
+    @property
+    def encoding(self) -> str:
+        return "utf-8"
+
+
+def _send(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    if not writer.is_closing():
+        writer.write(json.dumps(message, ensure_ascii=False).encode() + b"\n")
+
+
+class DaemonServer:
+    """
+    在 Unix socket 上接收请求并交给 handler 执行
+
+    Args:
+        handler: 请求处理协程，参数为请求字典，返回退出码；执行期间的 print 会流式发给客户端
+        socket_path: socket 路径
+        idle_timeout: 无请求进行中且空闲超过该秒数后退出（<= 0 表示不自动退出）
+        fingerprint: 启动时的源码指纹，与请求中的不一致时要求客户端重启后台进程
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Dict[str, Any]], Awaitable[int]],
+        socket_path: str,
+        idle_timeout: float = 600.0,
+        fingerprint: str = "",
+    ):
+        self.handler = handler
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.fingerprint = fingerprint
+        self.active = 0
+        self.last_activity = time.monotonic()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._stopping: Optional[asyncio.Event] = None
+        self._lock_file = None
+
+    def acquire_lock(self, timeout: float = 30.0) -> bool:
+        """获取该 socket 的独占锁；已有后台进程在运行（或正在退出）时最多等待 timeout 秒"""
+        import fcntl
+
+        self._lock_file = open(self.socket_path + ".lock", "w")
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return True
+            except BlockingIOError:
+                # 持锁进程仍在监听说明是并发拉起，直接让位；已停止监听则是正在退出，等待它释放
+                sock = connect(self.socket_path)
+                if sock is not None:
+                    sock.close()
+                if sock is not None or time.monotonic() >= deadline:
+                    self._lock_file.close()
+                    self._lock_file = None
+                    return False
+                time.sleep(0.1)
+
+    async def serve(self) -> None:
+        """监听直到空闲超时或 stop()；调用前须已 acquire_lock()"""
+        self._stopping = asyncio.Event()
+        # 持有锁说明之前的进程已退出，残留的 socket 文件可以删除
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+
+        watchdog = asyncio.create_task(self._watch_idle())
+        try:
+            await self._stopping.wait()
+        finally:
+            watchdog.cancel()
+            self._close_listener()
+            # 等进行中的请求完成
+            while self.active:
+                await asyncio.sleep(0.05)
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+    def _close_listener(self) -> None:
+        """停止接受新连接并删除 socket 文件，新的客户端会转而拉起新进程"""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+    async def _watch_idle(self) -> None:
+        if self.idle_timeout <= 0:
+            return
+        while True:
+            await asyncio.sleep(min(5.0, self.idle_timeout))
+            if not self.active and time.monotonic() - self.last_activity >= self.idle_timeout:
+                print(f"[daemon] 空闲 {self.idle_timeout:.0f}s，退出")
+                self.stop()
+                return
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.active += 1
+        try:
+            line = await reader.readline()
+            if not line:
+                return
+            request = json.loads(line)
+            if request.get("command") == "stop":
+                _send(writer, {"type": "done", "status": 0})
+                self.stop()
+                return
+            if (
+                request.get("protocol") != PROTOCOL_VERSION
+                or request.get("fingerprint", self.fingerprint) != self.fingerprint
+            ):
+                print("[daemon] 源码、配置或协议已变更，退出以便重新拉起")
+                _send(writer, {"type": "restart"})
+                self._close_listener()
+                self.stop()
+                return
+            status = await self._run(request, reader, writer)
+            _send(writer, {"type": "done", "status": status})
+        except Exception as e:
+            _send(writer, {"type": "output", "text": f"[daemon] 请求处理失败: {e}\n"})
+            _send(writer, {"type": "done", "status": 1})
+        finally:
+            with contextlib.suppress(Exception):
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            # 响应发送完后才计为结束，serve() 据此等待进行中的请求
+            self.active -= 1
+            self.last_activity = time.monotonic()
+
+    async def _run(
+        self, request: Dict[str, Any], reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> int:
+        """执行 handler；客户端断开（如 Ctrl+C）时取消该请求"""
+
+        def emit(text: str) -> None:
+            _send(writer, {"type": "output", "text": text})
+
+        token = _output.set(emit)
+        try:
+            task = asyncio.create_task(self.handler(request))
+        finally:
+            _output.reset(token)
+        disconnected = asyncio.create_task(reader.read())
+        done, _ = await asyncio.wait({task, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        if task not in done:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await task
+            return 130
+        disconnected.cancel()
+        return task.result()
+
+    def release(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+# ---------------------------------------------------------------------------
+# 客户端
+# ---------------------------------------------------------------------------
+
+# request() 的特殊返回值：后台进程要求重启
+RESTART = -1
+
+
+def connect(socket_path: str) -> Optional[socket.socket]:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    return sock
+
+
+def request(sock: socket.socket, payload: Dict[str, Any], out=None) -> int:
+    """
+    发送请求并把输出流式写到 out（默认 sys.stdout）
+
+    Returns:
+        退出码；后台进程要求重启时返回 RESTART
+    """
+    out = out or sys.stdout
+    with sock, sock.makefile("rwb") as stream:
+        stream.write(json.dumps({"protocol": PROTOCOL_VERSION, **payload}).encode() + b"\n")
+        stream.flush()
+        for line in stream:
+            message = json.loads(line)
+            kind = message.get("type")
+            if kind == "output":
+                out.write(message["text"])
+                out.flush()
+            elif kind == "done":
+                return int(message.get("status", 0))
+            elif kind == "restart":
+                return RESTART
+    raise ConnectionError("后台进程意外断开")
+
+
+def spawn(command: List[str], cwd: str, log_path: str) -> subprocess.Popen:
+    """以独立会话拉起后台进程（不随终端关闭），输出写入 log_path"""
+    os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+    with open(log_path, "ab") as log:
+        return subprocess.Popen(
+            command,
+            cwd=cwd,
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+
+def wait_for(socket_path: str, proc: subprocess.Popen, timeout: float) -> Optional[socket.socket]:
+    """等待后台进程开始监听；进程提前退出（如另一个进程持有锁后又退出）时返回 None"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        sock = connect(socket_path)
+        if sock is not None:
+            return sock
+        if proc.poll() is not None:
+            # 并发拉起时本进程拿不到锁而退出，另一个进程可能已经在监听
+            return connect(socket_path)
+        time.sleep(0.05)
+    return None
+
+
+__all__ = [
+    "DaemonServer",
+    "OutputRouter",
+    "RESTART",
+    "available",
+    "connect",
+    "default_socket_path",
+    "request",
+    "env_fingerprint",
+    "source_fingerprint",
+    "spawn",
+    "wait_for",
+]
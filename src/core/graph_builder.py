@@ -2,9 +2,62 @@
 LangGraph 构建基类
 """
 
+from typing import Any, Callable, Dict, Optional, Sequence, Union
+
 from langgraph.graph import StateGraph, START, END
-from langgraph.types import BaseCheckpointSaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from core import AgentState, Settings
+from core.checkpoint import default_checkpointer
+
+
+class BaseGraphBuilder:
+    """
+    StateGraph 的轻量封装
+
+    智能体通过 add_node / add_edge / set_entry_point 声明工作流，最后 compile。
+    节点只返回本步变化的键（如 {"sql": ..., "messages": [AIMessage(...)]}），
+    不要原地修改并返回整个 state：列表/字典字段由 state 中声明的 reducer 合并，
+    返回整个 state 会让每一步都重新合并全部消息并复制所有大字段。
+
+    未指定 checkpointer 时使用 default_checkpointer()（设置了 CHECKPOINT_DB 才启用），
+    启用后调用图需传入 run_config(thread_id)。
+    """
+
+    def __init__(
+        self,
+        state_schema: type = AgentState,
+        checkpointer: Optional[BaseCheckpointSaver] = None,
+    ):
+        self.workflow = StateGraph(state_schema)
+        self.checkpointer = checkpointer if checkpointer is not None else default_checkpointer()
+
+    def add_node(self, name: str, func: Callable) -> "BaseGraphBuilder":
+        self.workflow.add_node(name, func)
+        return self
+
+    def add_edge(
+        self, start: Union[str, Sequence[str]], end: str
+    ) -> "BaseGraphBuilder":
+        """添加边；start 为列表时表示等待所有上游节点完成后再进入 end（join）"""
+        self.workflow.add_edge(start if isinstance(start, str) else list(start), end)
+        return self
+
+    def add_conditional_edges(
+        self,
+        source: str,
+        path: Callable,
+        path_map: Optional[Dict[Any, str]] = None,
+    ) -> "BaseGraphBuilder":
+        self.workflow.add_conditional_edges(source, path, path_map)
+        return self
+
+    def set_entry_point(self, name: str) -> "BaseGraphBuilder":
+        self.workflow.add_edge(START, name)
+        return self
+
+    def compile(self, name: Optional[str] = None):
+        """编译图；name 用作图的 run 名称（追踪与指标中的 graph 标签）"""
+        return self.workflow.compile(checkpointer=self.checkpointer, name=name)
 
 
 class GraphBuilder:
@@ -16,7 +69,7 @@ class GraphBuilder:
     def chatModel(self):
         return Settings.get_llm()
 
-    def __agent_node(self, state: AgentState) -> AgentState:
+    def __agent_node(self, state: AgentState) -> Dict[str, Any]:
         """智能体节点"""
         messages = state["messages"]
         response = self.chatModel.invoke(messages)
@@ -2,12 +2,224 @@
 日志管理模块
 
 使用 loguru 提供统一的日志配置和管理。
+
+默认同步写入控制台和文件；enqueue=True 时改为异步批量写入：
+日志调用只把记录放入有界队列，由后台线程批量格式化并写入，
+文件 I/O 不再发生在事件循环线程上。
+
+log_dir 为空时不写文件（也不创建目录），只输出到控制台；未显式配置时按 LOG_DIR 初始化，
+测试与作为库导入时可设置 LOG_DIR= 避免在当前目录下生成 logs/。
 """
 
+import atexit
+import json
+import queue
 import sys
+import threading
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from loguru import logger
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TEXT_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+CONSOLE_FORMAT = "<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>"
+
+# 异步模式下由后台线程回放给文件 sink 的批次，extra 中带有该键
+_BATCH_KEY = "_log_batch"
+# 后台线程自身产生的日志（如丢弃告警），直接写出而不入队
+_WRITER_KEY = "_log_writer"
+
+# 当前运行的关联 ID，由 correlation_scope() 设置，自动写入每条日志的 extra["run_id"]
+_run_id: ContextVar[Optional[str]] = ContextVar("log_run_id", default=None)
+
+_LEVEL_COLORS = {
+    "TRACE": "\x1b[36m",
+    "DEBUG": "\x1b[34m",
+    "INFO": "\x1b[1m",
+    "SUCCESS": "\x1b[32m",
+    "WARNING": "\x1b[33m",
+    "ERROR": "\x1b[31m",
+    "CRITICAL": "\x1b[41m",
+}
+_GREEN, _CYAN, _RESET = "\x1b[32m", "\x1b[36m", "\x1b[0m"
+
+
+def _add_run_id(record: Dict[str, Any]) -> None:
+    run_id = _run_id.get()
+    if run_id is not None:
+        record["extra"].setdefault("run_id", run_id)
+
+
+@contextmanager
+def correlation_scope(run_id: str) -> Iterator[str]:
+    """
+    在作用域内（包括其中创建的异步任务）的所有日志带上 run_id
+
+    Args:
+        run_id: 关联 ID，例如一次智能体运行的 trace_id
+    """
+    token = _run_id.set(run_id)
+    try:
+        yield run_id
+    finally:
+        _run_id.reset(token)
+
+
+def _exception_text(record: Dict[str, Any]) -> str:
+    exception = record["exception"]
+    if exception is None:
+        return ""
+    return "".join(traceback.format_exception(exception.type, exception.value, exception.traceback))
+
+
+def _format_text(record: Dict[str, Any], colorize: bool = False) -> str:
+    """与 TEXT_FORMAT / CONSOLE_FORMAT 相同的格式；有关联 ID 时附在消息前"""
+    run_id = record["extra"].get("run_id")
+    message = f"[{run_id}] {record['message']}" if run_id else record["message"]
+    level = record["level"].name
+    time_text = record["time"].strftime("%Y-%m-%d %H:%M:%S")
+    where = f"{record['name']}:{record['function']}:{record['line']}"
+    if colorize:
+        color = _LEVEL_COLORS.get(level, "")
+        line = (
+            f"{_GREEN}{time_text}{_RESET} | {color}{level: <8}{_RESET} | "
+            f"{_CYAN}{where}{_RESET} - {color}{message}{_RESET}\n"
+        )
+    else:
+        line = f"{time_text} | {level: <8} | {where} - {message}\n"
+    return line + _exception_text(record)
+
+
+def _format_json(record: Dict[str, Any]) -> str:
+    """结构化 JSON 行"""
+    entry = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "name": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+    }
+    extra = {k: v for k, v in record["extra"].items() if not k.startswith("_")}
+    if extra:
+        entry.update(extra)
+    exception = _exception_text(record)
+    if exception:
+        entry["exception"] = exception
+    return json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+
+
+def _json_sink_format(record: Dict[str, Any]) -> str:
+    """同步模式 JSON sink 的 format 函数：预先序列化，模板只引用结果"""
+    record["extra"]["_json"] = _format_json(record)
+    return "{extra[_json]}"
+
+
+class AsyncLogWriter:
+    """
+    异步批量日志写入器
+
+    日志调用线程只把 loguru 记录放入有界队列；后台线程每次取出队列中已有的全部记录
+    （至多 batch_size 条），格式化后一次写入各目标。
+    队列满时按 overflow 策略处理：
+        drop   丢弃新记录并计数，之后写入一条告警（默认，保证请求路径不被阻塞）
+        block  阻塞调用方直到队列有空位（不丢日志，但会反压到请求路径）
+    """
+
+    def __init__(self, queue_size: int = 10000, overflow: str = "drop", batch_size: int = 512):
+        if overflow not in ("drop", "block"):
+            raise ValueError(f"overflow must be 'drop' or 'block', got {overflow!r}")
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._reported_dropped = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        # 目标: (最低级别, 批量写入函数)
+        self._targets: List[tuple] = []
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._closed = False
+
+    def add_target(self, level_no: int, write: Callable[[List[Dict[str, Any]]], None]) -> None:
+        self._targets.append((level_no, write))
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def sink(self, message) -> None:
+        """loguru sink：只入队，不做格式化和 I/O"""
+        record = message.record
+        if self.overflow == "block":
+            self._queue.put(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def direct_sink(self, message) -> None:
+        """后台线程自身日志的 sink：在后台线程内直接写出"""
+        self._write([message.record])
+
+    def flush(self, timeout: Optional[float] = 5.0) -> bool:
+        """等待此前入队的记录全部写出"""
+        if self._closed or not self._thread.is_alive():
+            return False
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        """写完剩余记录后停止后台线程"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records, events = [], []
+            for item in batch:
+                if item is None:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)
+                else:
+                    records.append(item)
+            if records:
+                self._write(records)
+            self._report_dropped()
+            for event in events:
+                event.set()
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        for level_no, write in self._targets:
+            selected = [r for r in records if r["level"].no >= level_no]
+            if not selected:
+                continue
+            try:
+                write(selected)
+            except Exception:
+                traceback.print_exc(file=sys.__stderr__)
+
+    def _report_dropped(self) -> None:
+        dropped = self.dropped
+        if dropped > self._reported_dropped:
+            count, self._reported_dropped = dropped - self._reported_dropped, dropped
+            logger.bind(**{_WRITER_KEY: True}).warning(
+                f"日志队列已满，丢弃了 {count} 条日志（累计 {dropped}）"
+            )
 
 
 class Logger:
@@ -19,73 +231,175 @@ class Logger:
 
     def __init__(
         self,
-        log_dir: str = "logs",
+        log_dir: Optional[str] = "logs",
         log_level: str = "INFO",
         rotation: str = "500 MB",
         retention: str = "7 days",
         compression: str = "zip",
         enable_console: bool = True,
+        enqueue: bool = False,
+        queue_size: int = 10000,
+        overflow: str = "drop",
+        json_sink: bool = False,
     ):
         """
         初始化 Logger 配置
 
         Args:
-            log_dir: 日志文件存储目录
+            log_dir: 日志文件存储目录，为空时不写文件
             log_level: 日志级别 (DEBUG, INFO, WARNING, ERROR, CRITICAL)
             rotation: 日志轮转大小
             retention: 日志保留时间
             compression: 压缩格式
             enable_console: 是否启用控制台输出
+            enqueue: 是否异步批量写入（后台线程）
+            queue_size: 异步模式的队列容量
+            overflow: 异步模式队列满时的策略 (drop / block)
+            json_sink: 是否额外写入结构化 JSON 行日志 (events_*.jsonl)
         """
-        self.log_dir = Path(log_dir)
+        self.log_dir = Path(log_dir) if log_dir else None
         self.log_level = log_level
         self.rotation = rotation
         self.retention = retention
         self.compression = compression
         self.enable_console = enable_console
+        self.enqueue = enqueue
+        self.queue_size = queue_size
+        self.overflow = overflow
+        self.json_sink = json_sink
+        self.writer: Optional[AsyncLogWriter] = None
 
         # 确保日志目录存在
-        self.log_dir.mkdir(parents=True, exist_ok=True)
+        if self.log_dir is not None:
+            self.log_dir.mkdir(parents=True, exist_ok=True)
+
+    def _file_options(self) -> Dict[str, Any]:
+        return dict(
+            rotation=self.rotation,
+            retention=self.retention,
+            compression=self.compression,
+            encoding="utf-8",
+        )
 
     def configure(self) -> None:
         """
         配置 loguru logger
 
-        移除默认处理器，添加自定义的控制台和文件处理器。
+        移除默认的处理器，添加自定义的控制台和文件处理器。
         """
+        global _active_writer
+
         # 移除默认的处理器
         logger.remove()
+        if _active_writer is not None:
+            _active_writer.stop()
+            _active_writer = None
+        logger.configure(patcher=_add_run_id)
+
+        if self.enqueue:
+            self._configure_async()
+            return
 
         # 控制台输出
         if self.enable_console:
             logger.add(
                 sys.stderr,
                 level=self.log_level,
-                format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
+                format=CONSOLE_FORMAT,
                 colorize=True,
             )
 
+        if self.log_dir is None:
+            return
+
         # 普通日志文件
         logger.add(
             self.log_dir / "app_{time:YYYY-MM-DD}.log",
             level=self.log_level,
-            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-            rotation=self.rotation,
-            retention=self.retention,
-            compression=self.compression,
-            encoding="utf-8",
+            format=TEXT_FORMAT,
+            **self._file_options(),
         )
 
         # 错误日志文件
         logger.add(
             self.log_dir / "error_{time:YYYY-MM-DD}.log",
             level="ERROR",
-            format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-            rotation=self.rotation,
-            retention=self.retention,
-            compression=self.compression,
-            encoding="utf-8",
+            format=TEXT_FORMAT,
+            **self._file_options(),
+        )
+
+        # 结构化日志
+        if self.json_sink:
+            logger.add(
+                self.log_dir / "events_{time:YYYY-MM-DD}.jsonl",
+                level=self.log_level,
+                format=_json_sink_format,
+                **self._file_options(),
+            )
+
+    def _configure_async(self) -> None:
+        """
+        异步模式
+
+        请求路径上只有一个入队 sink；后台线程把每批记录格式化为一段文本，
+        再以一次 raw 写入交给对应的文件 sink（保留 loguru 的轮转/保留/压缩）。
+        """
+        global _active_writer
+
+        writer = AsyncLogWriter(queue_size=self.queue_size, overflow=self.overflow)
+        level_no = logger.level(self.log_level).no
+        batch_logger = logger.opt(raw=True)
+
+        def replay_to(name: str, format_record: Callable[[Dict[str, Any]], str]):
+            def write(records: List[Dict[str, Any]]) -> None:
+                text = "".join(format_record(r) for r in records)
+                batch_logger.bind(**{_BATCH_KEY: name}).log(0, text)
+
+            return write
+
+        def only(name: str):
+            return lambda record: record["extra"].get(_BATCH_KEY) == name
+
+        if self.enable_console:
+
+            def write_console(records: List[Dict[str, Any]]) -> None:
+                sys.stderr.write("".join(_format_text(r, colorize=True) for r in records))
+                sys.stderr.flush()
+
+            writer.add_target(level_no, write_console)
+
+        sinks = []
+        if self.log_dir is not None:
+            sinks.append(("app", "app_{time:YYYY-MM-DD}.log", level_no, _format_text))
+            sinks.append(("error", "error_{time:YYYY-MM-DD}.log", logger.level("ERROR").no, _format_text))
+        if self.log_dir is not None and self.json_sink:
+            sinks.append(("events", "events_{time:YYYY-MM-DD}.jsonl", level_no, _format_json))
+        for name, filename, min_level, format_record in sinks:
+            logger.add(
+                self.log_dir / filename,
+                level=0,
+                format="{message}",
+                filter=only(name),
+                **self._file_options(),
+            )
+            writer.add_target(min_level, replay_to(name, format_record))
+
+        # 回放的批次与后台线程自身的日志不再入队
+        logger.add(
+            writer.sink,
+            level=self.log_level,
+            format="{message}",
+            filter=lambda record: _BATCH_KEY not in record["extra"]
+            and _WRITER_KEY not in record["extra"],
         )
+        logger.add(
+            writer.direct_sink,
+            level=0,
+            format="{message}",
+            filter=lambda record: _WRITER_KEY in record["extra"],
+        )
+        writer.start()
+        self.writer = _active_writer = writer
 
     @staticmethod
     def get_logger(name: Optional[str] = None):
@@ -105,26 +419,36 @@ class Logger:
 
 # 默认配置实例
 _default_logger: Optional[Logger] = None
+# 当前生效的异步写入器（重新配置时停止旧的）
+_active_writer: Optional[AsyncLogWriter] = None
 
 
 def setup_logger(
-    log_dir: str = "logs",
+    log_dir: Optional[str] = "logs",
     log_level: str = "INFO",
     rotation: str = "500 MB",
     retention: str = "7 days",
     compression: str = "zip",
     enable_console: bool = True,
+    enqueue: bool = False,
+    queue_size: int = 10000,
+    overflow: str = "drop",
+    json_sink: bool = False,
 ) -> Logger:
     """
     设置并返回全局 Logger 配置
 
     Args:
-        log_dir: 日志文件存储目录
+        log_dir: 日志文件存储目录，为空时不写文件
         log_level: 日志级别
         rotation: 日志轮转大小
         retention: 日志保留时间
         compression: 压缩格式
         enable_console: 是否启用控制台输出
+        enqueue: 是否异步批量写入
+        queue_size: 异步模式的队列容量
+        overflow: 异步模式队列满时的策略 (drop / block)
+        json_sink: 是否额外写入结构化 JSON 行日志
 
     Returns:
         Logger 实例
@@ -138,6 +462,10 @@ def setup_logger(
         retention=retention,
         compression=compression,
         enable_console=enable_console,
+        enqueue=enqueue,
+        queue_size=queue_size,
+        overflow=overflow,
+        json_sink=json_sink,
     )
     _default_logger.configure()
 
@@ -148,7 +476,7 @@ def get_logger(name: Optional[str] = None):
     """
     获取配置好的 logger 实例
 
-    如果尚未配置，将使用默认配置自动初始化。
+    如果尚未配置，将使用默认配置自动初始化（日志目录取 LOG_DIR）。
 
     Args:
         name: logger 名称，用于标识调用模块
@@ -159,9 +487,23 @@ def get_logger(name: Optional[str] = None):
     global _default_logger
 
     if _default_logger is None:
-        setup_logger()
+        from .settings import Settings
+
+        setup_logger(log_dir=Settings.LOG_DIR)
 
     return Logger.get_logger(name)
 
 
-__all__ = ["Logger", "get_logger"]
+def shutdown_logger(timeout: float = 5.0) -> None:
+    """写出异步队列中剩余的日志并停止后台线程（进程退出时自动调用）"""
+    global _active_writer
+
+    if _active_writer is not None:
+        _active_writer.stop(timeout)
+        _active_writer = None
+
+
+atexit.register(shutdown_logger)
+
+
+__all__ = ["Logger", "get_logger", "setup_logger", "correlation_scope", "shutdown_logger"]
@@ -1,16 +1,246 @@
 import asyncio
 import json
 import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from pathlib import Path
-from typing import List, Optional
-
-from langchain_core.tools import BaseTool
-from langchain_mcp_adapters.client import MultiServerMCPClient
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 from core import get_logger
+from core.resilience import (
+    CallPolicy,
+    CircuitBreaker,
+    ToolError,
+    ToolTimeoutError,
+    call_with_policy,
+)
+from core.telemetry import (
+    SERVER_STARTUP_SECONDS,
+    SERVER_TIME_META,
+    SPAN_KIND_CLIENT,
+    record_tool_call,
+    start_span,
+)
+
+if TYPE_CHECKING:
+    # mcp 与 langchain_mcp_adapters 导入较慢，延迟到首次连接服务器时
+    from langchain_core.tools import BaseTool
+    from langchain_mcp_adapters.client import MultiServerMCPClient
+    from langchain_mcp_adapters.interceptors import MCPToolCallRequest
+    from mcp import ClientSession
+    from mcp.types import CallToolResult
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+# 当前工具调用的计时: {"rtt": 请求往返秒数, "server": 服务端处理秒数}，见 MCPClientManager._observed()
+_call_timing: ContextVar[Optional[Dict[str, float]]] = ContextVar("mcp_call_timing", default=None)
+
+
+class _BatchCoalescer:
+    """
+    将短时间窗口内对同一工具的并发单次调用合并为一次批量调用。
+
+    批量工具的输入为 {"items": [参数, ...]}，输出为
+    {"results": [{"ok": ..., "result"/"error": ...}, ...]}，与输入一一对应。
+    """
+
+    def __init__(
+        self,
+        manager: "MCPClientManager",
+        server_name: str,
+        tool_name: str,
+        batch_tool: str,
+        window_ms: float = 5,
+        max_batch: int = 32,
+    ):
+        self.manager = manager
+        self.server_name = server_name
+        self.tool_name = tool_name
+        self.batch_tool = batch_tool
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: list[tuple[dict, asyncio.Future, Optional[Dict[str, float]]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # 进行中的分发任务（事件循环只弱引用任务，不保存引用可能在完成前被回收）
+        self._tasks: set[asyncio.Task] = set()
+
+    async def call(self, arguments: dict) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((arguments, future, _call_timing.get()))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.ensure_future(self._dispatch(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self) -> None:
+        """取消等待中的调用与进行中的分发，调用方收到 ToolError"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(ToolError(f"Tool {self.server_name}.{self.tool_name} was cancelled"))
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _dispatch(
+        self, pending: list[tuple[dict, asyncio.Future, Optional[Dict[str, float]]]]
+    ) -> None:
+        # 本任务的上下文复制自触发 flush 的调用方，单独计时后再分发给每个调用方
+        timing: Dict[str, float] = {}
+        _call_timing.set(timing)
+        try:
+            # 窗口内只有一次调用时直接走单次工具，避免批量封装开销
+            if len(pending) == 1:
+                arguments, future, caller_timing = pending[0]
+                result = await self.manager._call_direct(
+                    self.server_name, self.tool_name, arguments
+                )
+                if caller_timing is not None:
+                    caller_timing.update(timing)
+                if not future.done():
+                    future.set_result(result)
+                return
+
+            payload = await self.manager._call_direct(
+                self.server_name,
+                self.batch_tool,
+                {"items": [arguments for arguments, _, _ in pending]},
+            )
+            for _, _, caller_timing in pending:
+                if caller_timing is not None:
+                    caller_timing.update(timing)
+            results = payload["results"]
+            if len(results) != len(pending):
+                raise RuntimeError(
+                    f"Batch tool {self.server_name}.{self.batch_tool} returned "
+                    f"{len(results)} results for {len(pending)} items"
+                )
+            for (_, future, _), item in zip(pending, results):
+                if future.done():
+                    continue
+                if item.get("ok"):
+                    future.set_result(item.get("result"))
+                else:
+                    future.set_exception(
+                        ToolError(
+                            f"Tool {self.server_name}.{self.tool_name} failed: {item.get('error')}"
+                        )
+                    )
+        except asyncio.CancelledError:
+            # 分发被取消（如 close()）时调用方不能一直等待
+            error = ToolError(f"Tool {self.server_name}.{self.tool_name} was cancelled")
+            for _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(error)
+            raise
+        except Exception as e:
+            for _, future, _ in pending:
+                if not future.done():
+                    future.set_exception(e)
+
+
+class _SessionHandle:
+    """
+    单个服务器的常驻会话。
+
+    会话在独立的后台任务中打开与关闭：stdio/HTTP 客户端基于 anyio 任务组，
+    必须在同一个任务内进入和退出上下文。
+    refs 为正在使用该会话的调用/运行数，配置热更新时被替换的会话
+    会等到 refs 归零后才关闭。
+    """
+
+    def __init__(self, server_name: str, connection: dict):
+        self.server_name = server_name
+        self.connection = connection
+        self.session: Optional["ClientSession"] = None
+        self.refs = 0
+        self.retired = False
+        # 因传输层故障被回收（进程崩溃/卡死），固定了该会话的运行也应换用新会话
+        self.broken = False
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def start(self) -> "ClientSession":
+        self._task = asyncio.create_task(self._run(), name=f"mcp-session:{self.server_name}")
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self.session
+
+    async def _run(self) -> None:
+        from langchain_mcp_adapters.sessions import create_session
+
+        try:
+            async with create_session(self.connection) as session:
+                await session.initialize()
+                self.session = session
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            await self._task
+
+    async def abort(self) -> None:
+        """启动超时时取消后台任务（会话上下文在其自身任务内退出）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# 当前运行固定使用的会话: server_name -> _SessionHandle，见 MCPClientManager.run_scope()
+_run_pins: ContextVar[Optional[Dict[str, _SessionHandle]]] = ContextVar("mcp_run_pins", default=None)
+
+# 当前上下文发起的工具调用: [(server_name, tool_name, arguments), ...]，见 MCPClientManager.record_calls()
+_run_calls: ContextVar[Optional[List[Tuple[str, str, dict]]]] = ContextVar("mcp_run_calls", default=None)
+
+# 缓存未命中
+_MISS = object()
+
 
 class MCPClientManager:
     """
@@ -28,9 +258,33 @@ class MCPClientManager:
     """
 
     def __init__(self):
-        self._client: Optional[MultiServerMCPClient] = None
+        self._client: Optional["MultiServerMCPClient"] = None
         self._servers: dict[str, dict] = {}
         self._initialized = False
+        # 常驻会话：同一个 manager 下的所有智能体共享，close() 时统一关闭
+        self._handles: dict[str, _SessionHandle] = {}
+        # 配置热更新后被替换、仍有调用在使用的旧会话
+        self._retired: set[_SessionHandle] = set()
+        self._session_locks: dict[str, asyncio.Lock] = {}
+        # 工具注册表: server_name -> tools，热更新时整体替换
+        self._tools: dict[str, List["BaseTool"]] = {}
+        # 配置文件热更新
+        self._config_path: Optional[str] = None
+        self._config_mtime: Optional[float] = None
+        self._watch_task: Optional[asyncio.Task] = None
+        self._reload_lock = asyncio.Lock()
+        self._reload_listeners: List[Callable[[Set[str]], Any]] = []
+        # 工具结果缓存: key -> (过期时间, 结果)
+        self._result_cache: dict[str, tuple[float, Any]] = {}
+        # 进行中的可缓存调用（含投机预取）: key -> Future，相同调用等待它而不重复发起
+        self._pending: dict[str, asyncio.Future] = {}
+        # 批量合并: (server, tool) -> _BatchCoalescer
+        self._coalescers: dict[tuple[str, str], _BatchCoalescer] = {}
+        # 由配置文件 batch_tools 开启的合并器，热更新时只调整这些
+        self._config_batch_keys: set[tuple[str, str]] = set()
+        # 容错策略: server_name -> 配置中的 policy 字段；熔断器按服务器维护
+        self._policies: dict[str, dict] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
 
     def add_server(
         self,
@@ -54,26 +308,103 @@ class MCPClientManager:
             headers: HTTP 请求头 (仅 streamable_http 需要)
             env: 环境变量字典 (可选)
         """
-        config: dict[str, str | List[str] | dict] = {
-            "command": command,
-            "args": args,
-            "transport": transport,
-        }
+        self._servers[server_name] = self._build_connection(
+            command, args, transport, url=url, headers=headers, env=env
+        )
+        logger.info(f"Added server config: {server_name}")
+
+    @staticmethod
+    def _build_connection(
+        command: str,
+        args: List[str],
+        transport: str = "stdio",
+        url: Optional[str] = None,
+        headers: Optional[dict] = None,
+        env: Optional[dict] = None,
+    ) -> dict:
+        """构造 langchain_mcp_adapters 的连接配置"""
+        config: dict[str, str | List[str] | dict] = {"transport": transport}
 
         if transport == "streamable_http":
             if not url:
                 raise ValueError("url is required for streamable_http transport")
+            # langchain_mcp_adapters 会把连接配置原样作为参数传给 HTTP 会话，
+            # 不能带 stdio 专用的 command/args/env
             config["url"] = url
             if headers:
                 config["headers"] = headers
+        else:
+            config["command"] = command
+            config["args"] = args
+            if env:
+                config["env"] = env
 
-        if env:
-            config["env"] = env
+        return config
 
-        self._servers[server_name] = config
-        logger.info(f"Added server config: {server_name}")
+    @property
+    def server_names(self) -> List[str]:
+        return list(self._servers)
+
+    def _ensure_client(self) -> "MultiServerMCPClient":
+        """初始化 client（只初始化一次）"""
+        if not self._initialized:
+            self._client = self._new_client(self._servers)
+            self._initialized = True
+            logger.info(
+                f"MultiServerMCPClient initialized with {len(self._servers)} server(s)"
+            )
+        return self._client
+
+    def _new_client(self, servers: dict) -> "MultiServerMCPClient":
+        from langchain_mcp_adapters.client import MultiServerMCPClient
+
+        # 工具调用经拦截器转到常驻会话并套用容错策略（见 _tool_interceptor）
+        return MultiServerMCPClient(dict(servers), tool_interceptors=[self._tool_interceptor])
+
+    async def _tool_interceptor(
+        self, request: "MCPToolCallRequest", handler
+    ) -> "CallToolResult":
+        """
+        LangChain 工具（如 ToolNode 中）的调用拦截器。
 
-    async def get_tools(self) -> List[BaseTool]:
+        适配器默认每次工具调用都新建会话（stdio 即重新拉起子进程），且没有超时；
+        这里改为复用常驻会话并按策略执行。超时、熔断等失败以 isError 结果返回，
+        由适配器作为错误 ToolMessage 交给 LLM，而不是卡住或中断整个 ReAct 循环。
+        """
+        server_name = request.server_name
+        calls = _run_calls.get()
+        if calls is not None:
+            calls.append((server_name, request.name, request.args))
+
+        if request.headers is not None:
+            # 修改了请求头的 HTTP 调用无法复用常驻会话
+            return await handler(request)
+
+        # 只读工具的缓存结果（如投机预取的结果）直接返回
+        payload = await self._cached(
+            self.cache_key(server_name, request.name, request.args), server_name, request.name
+        )
+        if payload is not _MISS:
+            return self._cached_result(payload)
+
+        async def attempt() -> "CallToolResult":
+            async with self._lease(server_name) as session:
+                return await self._send(session, request.name, request.args)
+
+        async def call() -> "CallToolResult":
+            try:
+                return await self._call_with_policy(server_name, request.name, attempt)
+            except Exception as e:
+                from mcp.types import CallToolResult, TextContent
+
+                return CallToolResult(
+                    content=[TextContent(type="text", text=f"{type(e).__name__}: {e}")],
+                    isError=True,
+                )
+
+        return await self._observed(server_name, request.name, call)
+
+    async def get_tools(self) -> List["BaseTool"]:
         """
         获取所有已配置服务器的工具列表。
 
@@ -84,23 +415,29 @@ class MCPClientManager:
             logger.warning("No servers configured")
             return []
 
-        # 初始化 client（只初始化一次）
-        if not self._initialized:
-            self._client = MultiServerMCPClient(self._servers)
-            self._initialized = True
-            logger.info(
-                f"MultiServerMCPClient initialized with {len(self._servers)} server(s)"
+        # 只加载注册表中还没有的服务器，热更新时按服务器增量替换
+        missing = [name for name in self._servers if name not in self._tools]
+        if missing:
+            client = self._ensure_client()
+            loaded = await asyncio.gather(
+                *(client.get_tools(server_name=name) for name in missing)
             )
+            self._tools = {**self._tools, **dict(zip(missing, loaded))}
 
-        # 获取所有工具
-        tools = await self._client.get_tools()
+        tools = self.tools
         logger.info(f"Found {len(tools)} tools: {[t.name for t in tools]}")
 
         return tools
 
+    @property
+    def tools(self) -> List["BaseTool"]:
+        """当前工具注册表的快照（按配置顺序）"""
+        registry = self._tools
+        return [tool for name in self._servers for tool in registry.get(name, [])]
+
     async def load_tools_from_stdio_server(
         self, server_name: str, command: str, args: List[str] = None
-    ) -> List[BaseTool]:
+    ) -> List["BaseTool"]:
         """
         兼容旧接口：通过 Stdio 连接到 MCP Server，加载并转换工具。
 
@@ -125,10 +462,28 @@ class MCPClientManager:
 
     async def load_tools_from_config(
         self, config_path: str = "config/mcp_config.json"
-    ) -> List[BaseTool]:
+    ) -> List["BaseTool"]:
         """
         从 JSON 配置文件中读取 MCP 服务器配置并加载所有工具。
 
+        配置文件格式见 load_config()。
+
+        参数:
+            config_path: 配置文件路径，默认为 "config/mcp_config.json"
+
+        返回:
+            List[langchain_core.tools.BaseTool]: 所有服务器的工具列表
+        """
+        if not self.load_config(config_path):
+            return []
+
+        # 获取所有工具
+        return await self.get_tools()
+
+    def load_config(self, config_path: str = "config/mcp_config.json") -> List[str]:
+        """
+        从 JSON 配置文件中注册 MCP 服务器（不建立连接）。
+
         配置文件格式：
         {
             "mcp_servers": [
@@ -138,7 +493,10 @@ class MCPClientManager:
                     "command": "python",  // 仅 stdio 需要
                     "args": ["-m", "my_mcp_server"],  // 仅 stdio 需要
                     "url": "http://localhost:8000/mcp",  // 仅 streamable_http 需要
-                    "headers": {"Authorization": "Bearer xxx"}  // 可选
+                    "headers": {"Authorization": "Bearer xxx"},  // 可选
+                    "batch_tools": {"get_weather": "get_weather_batch"},  // 可选，见 enable_batching()
+                    "policy": {"timeout": 5, "idempotent": true, "hedge_after": 0.5,
+                               "tools": {"reindex": {"idempotent": false}}}  // 可选，见 set_policy()
                 }
             ]
         }
@@ -147,7 +505,28 @@ class MCPClientManager:
             config_path: 配置文件路径，默认为 "config/mcp_config.json"
 
         返回:
-            List[langchain_core.tools.BaseTool]: 所有服务器的工具列表
+            List[str]: 成功注册的服务器名称
+        """
+        servers, batch_tools, policies = self._read_config(config_path)
+        self._config_path = config_path
+        self._config_mtime = os.stat(config_path).st_mtime
+
+        for server_name, connection in servers.items():
+            self._servers[server_name] = connection
+            logger.info(f"Added server config: {server_name}")
+        self._apply_batch_tools(batch_tools)
+        self._policies.update(policies)
+
+        return list(servers)
+
+    def _read_config(
+        self, config_path: str
+    ) -> Tuple[Dict[str, dict], Dict[str, Dict[str, str]], Dict[str, dict]]:
+        """
+        解析配置文件
+
+        返回:
+            (server_name -> 连接配置, server_name -> batch_tools 映射, server_name -> policy)
         """
         config_file = Path(config_path)
         if not config_file.exists():
@@ -159,9 +538,10 @@ class MCPClientManager:
         servers_config = config.get("mcp_servers", [])
         if not servers_config:
             logger.warning(f"No MCP servers configured in {config_path}")
-            return []
 
-        # 添加所有服务器配置
+        servers: Dict[str, dict] = {}
+        batch_tools: Dict[str, Dict[str, str]] = {}
+        policies: Dict[str, dict] = {}
         for server in servers_config:
             server_name = server.get("name")
             server_type = server.get("type", "stdio")
@@ -177,7 +557,9 @@ class MCPClientManager:
                 # 处理环境变量中的 ${VAR} 格式
                 if env:
                     env = {k: os.path.expandvars(str(v)) for k, v in env.items()}
-                self.add_server(server_name, command, args, transport="stdio", env=env)
+                servers[server_name] = self._build_connection(
+                    command, args, transport="stdio", env=env
+                )
 
             elif server_type == "streamable_http":
                 url = server.get("url")
@@ -186,25 +568,616 @@ class MCPClientManager:
                         f"HTTP server '{server_name}' missing 'url', skipping"
                     )
                     continue
-                headers = server.get("headers")
-                self.add_server(
-                    server_name,
-                    "",
-                    [],
-                    transport="streamable_http",
-                    url=url,
-                    headers=headers,
+                servers[server_name] = self._build_connection(
+                    "", [], transport="streamable_http", url=url, headers=server.get("headers")
                 )
             else:
                 logger.warning(
                     f"Unknown server type '{server_type}' for '{server_name}', skipping"
                 )
+                continue
 
-        # 获取所有工具
-        return await self.get_tools()
+            if server.get("batch_tools"):
+                batch_tools[server_name] = server["batch_tools"]
+            if server.get("policy"):
+                policies[server_name] = server["policy"]
+
+        return servers, batch_tools, policies
+
+    def _apply_batch_tools(self, batch_tools: Dict[str, Dict[str, str]]) -> None:
+        """按配置调整批量合并器（保留参数未变的合并器，不影响手动 enable_batching() 的）"""
+        wanted = {
+            (server_name, tool_name): batch_tool
+            for server_name, mapping in batch_tools.items()
+            for tool_name, batch_tool in mapping.items()
+        }
+        for key in self._config_batch_keys - set(wanted):
+            self._coalescers.pop(key, None)
+        for (server_name, tool_name), batch_tool in wanted.items():
+            coalescer = self._coalescers.get((server_name, tool_name))
+            if coalescer is None or coalescer.batch_tool != batch_tool:
+                self.enable_batching(server_name, tool_name, batch_tool)
+        self._config_batch_keys = set(wanted)
+
+    async def reload_config(self, config_path: Optional[str] = None) -> Dict[str, List[str]]:
+        """
+        重新读取配置文件并与当前配置做增量对比。
+
+        - 新增的服务器：注册并建立会话
+        - 删除的服务器：注销，会话在进行中的调用结束后关闭
+        - command/args/env/url/headers 变化的服务器：替换为新会话，旧会话同样延迟关闭
+        - 未变化的服务器：会话、工具与结果缓存保持不变
+
+        工具注册表整体替换，随后通知 add_reload_listener() 注册的回调（参数为受影响的服务器集合）。
+
+        返回:
+            {"added": [...], "removed": [...], "changed": [...]}
+        """
+        config_path = config_path or self._config_path
+        if config_path is None:
+            raise ValueError("No config file loaded")
+
+        async with self._reload_lock:
+            servers, batch_tools, policies = self._read_config(config_path)
+            self._config_path = config_path
+            self._config_mtime = os.stat(config_path).st_mtime
+
+            old = self._servers
+            added = [name for name in servers if name not in old]
+            removed = [name for name in old if name not in servers]
+            changed = [name for name in servers if name in old and servers[name] != old[name]]
+            affected = set(added) | set(removed) | set(changed)
+
+            self._servers = servers
+            if self._initialized:
+                self._client = self._new_client(servers)
+            for key in [key for key in self._coalescers if key[0] in removed]:
+                del self._coalescers[key]
+            self._apply_batch_tools(batch_tools)
+            self._policies = policies
+            for name in removed + changed:
+                self._breakers.pop(name, None)
+
+            if affected:
+                restart = [name for name in changed if name in self._handles]
+                for name in removed + changed:
+                    await self._retire(name)
+                self._invalidate_cache(affected)
+                await self._reload_tools(affected)
+
+                started = await asyncio.gather(
+                    *(self.get_session(name) for name in added + restart),
+                    return_exceptions=True,
+                )
+                for name, result in zip(added + restart, started):
+                    if isinstance(result, BaseException):
+                        logger.warning(f"Failed to start MCP server '{name}': {result}")
+
+                logger.info(
+                    f"MCP config reloaded: added={added} removed={removed} changed={changed}"
+                )
+                await self._notify_reload(affected)
+
+            return {"added": added, "removed": removed, "changed": changed}
+
+    async def _reload_tools(self, affected: Set[str]) -> None:
+        """只重新加载受影响服务器的工具，然后整体替换注册表"""
+        if not self._tools:
+            # 尚未加载过工具，下次 get_tools() 时再加载
+            return
+
+        registry = {
+            name: tools
+            for name, tools in self._tools.items()
+            if name in self._servers and name not in affected
+        }
+        client = self._ensure_client()
+        reload_names = [name for name in self._servers if name in affected]
+        loaded = await asyncio.gather(
+            *(client.get_tools(server_name=name) for name in reload_names),
+            return_exceptions=True,
+        )
+        for name, tools in zip(reload_names, loaded):
+            if isinstance(tools, BaseException):
+                logger.warning(f"Failed to load tools from '{name}': {tools}")
+                continue
+            registry[name] = tools
+        self._tools = registry
+
+    def add_reload_listener(self, callback: Callable[[Set[str]], Any]) -> None:
+        """注册配置热更新回调，参数为受影响的服务器名称集合（可为 async 函数）"""
+        self._reload_listeners.append(callback)
+
+    async def _notify_reload(self, affected: Set[str]) -> None:
+        for callback in self._reload_listeners:
+            try:
+                result = callback(affected)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.warning(f"Reload listener failed: {e}")
+
+    def watch_config(self, config_path: Optional[str] = None, interval: float = 1.0) -> None:
+        """
+        在后台轮询配置文件的修改时间，变化时调用 reload_config()。
+
+        需在事件循环中调用；close() 时自动停止。
+        """
+        config_path = config_path or self._config_path
+        if config_path is None:
+            raise ValueError("No config file loaded")
+        if self._config_path is None:
+            self._config_path = config_path
+            self._config_mtime = os.stat(config_path).st_mtime
+        self.stop_watching()
+        self._watch_task = asyncio.create_task(self._watch_loop(config_path, interval))
+        logger.info(f"Watching MCP config: {config_path}")
+
+    def stop_watching(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+
+    async def _watch_loop(self, config_path: str, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(config_path).st_mtime
+            except OSError:
+                continue
+            if mtime == self._config_mtime:
+                continue
+            try:
+                await self.reload_config(config_path)
+            except Exception as e:
+                # 编辑中的半成品文件等情况：记录后等待下一次变化
+                self._config_mtime = mtime
+                logger.warning(f"Failed to reload MCP config: {e}")
+
+    def enable_batching(
+        self,
+        server_name: str,
+        tool_name: str,
+        batch_tool: Optional[str] = None,
+        window_ms: float = 5,
+        max_batch: int = 32,
+    ) -> None:
+        """
+        为工具开启并发调用合并。
+
+        开启后，window_ms 毫秒内对该工具的并发 call_tool() 会合并为一次
+        batch_tool 调用（默认为 "<tool_name>_batch"），结果按顺序分发回各调用方。
+
+        参数:
+            server_name: 服务器名称
+            tool_name: 单次调用的工具名称
+            batch_tool: 批量工具名称
+            window_ms: 合并窗口（毫秒）
+            max_batch: 单批最大调用数，达到后立即发送
+        """
+        self._coalescers[(server_name, tool_name)] = _BatchCoalescer(
+            self,
+            server_name,
+            tool_name,
+            batch_tool or f"{tool_name}_batch",
+            window_ms=window_ms,
+            max_batch=max_batch,
+        )
+        logger.info(f"Enabled batching: {server_name}.{tool_name}")
+
+    def set_policy(self, server_name: str, tool_name: Optional[str] = None, **overrides) -> None:
+        """
+        设置容错策略（字段见 core.resilience.CallPolicy）。
+
+        服务器级别还可设置熔断参数 failure_threshold / recovery_timeout，
+        以及会话建立超时 connect_timeout（默认 60 秒，不计入工具截止时间）。
+
+        参数:
+            server_name: 服务器名称
+            tool_name: 工具名称，为 None 时设置服务器默认策略
+        """
+        policy = self._policies.setdefault(server_name, {})
+        if tool_name is None:
+            policy.update(overrides)
+            self._breakers.pop(server_name, None)
+        else:
+            policy.setdefault("tools", {}).setdefault(tool_name, {}).update(overrides)
+
+    def get_policy(self, server_name: str, tool_name: str) -> CallPolicy:
+        """服务器默认策略叠加工具级覆盖后的最终策略"""
+        config = self._policies.get(server_name) or {}
+        return (
+            CallPolicy()
+            .merge(config)
+            .merge((config.get("tools") or {}).get(tool_name))
+        )
+
+    def _breaker_for(self, server_name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(server_name)
+        if breaker is None:
+            config = self._policies.get(server_name) or {}
+            breaker = CircuitBreaker(
+                server_name,
+                failure_threshold=config.get("failure_threshold", 5),
+                recovery_timeout=config.get("recovery_timeout", 30.0),
+            )
+            self._breakers[server_name] = breaker
+        return breaker
+
+    def circuit_states(self) -> Dict[str, str]:
+        """各服务器熔断器状态: closed / open / half_open"""
+        return {name: breaker.state for name, breaker in self._breakers.items()}
+
+    async def get_session(self, server_name: str) -> "ClientSession":
+        """
+        获取指定服务器的常驻会话，首次调用时建立连接。
+
+        多个智能体（包括并发运行的子智能体）共享同一会话，
+        避免每次工具调用都重新拉起 stdio 子进程。
+        """
+        return (await self._get_handle(server_name)).session
+
+    async def _get_handle(self, server_name: str) -> _SessionHandle:
+        handle = self._handles.get(server_name)
+        if handle is not None and handle.session is not None:
+            return handle
+
+        if server_name not in self._servers:
+            raise ValueError(f"Unknown MCP server: {server_name}")
+
+        lock = self._session_locks.setdefault(server_name, asyncio.Lock())
+        async with lock:
+            handle = self._handles.get(server_name)
+            if handle is not None and handle.session is not None:
+                return handle
+            handle = _SessionHandle(server_name, self._servers[server_name])
+            connect_timeout = (self._policies.get(server_name) or {}).get("connect_timeout", 60.0)
+            start = time.perf_counter()
+            with start_span(f"mcp.server.start {server_name}", **{"mcp.server": server_name}):
+                try:
+                    await asyncio.wait_for(handle.start(), timeout=connect_timeout)
+                except asyncio.TimeoutError:
+                    await handle.abort()
+                    raise ToolTimeoutError(
+                        f"MCP server '{server_name}' did not start within {connect_timeout}s"
+                    )
+            elapsed = time.perf_counter() - start
+            SERVER_STARTUP_SECONDS.observe(elapsed, server=server_name)
+            self._handles[server_name] = handle
+            logger.info(f"Opened persistent session: {server_name} ({elapsed:.2f}s)")
+            return handle
+
+    @asynccontextmanager
+    async def _lease(self, server_name: str) -> AsyncIterator["ClientSession"]:
+        """借用会话；在 run_scope() 内时固定使用本次运行首次借到的会话"""
+        pins = _run_pins.get()
+        if pins is not None and server_name in pins:
+            pinned = pins[server_name]
+            if not pinned.broken:
+                yield pinned.session
+                return
+            # 固定的会话已因故障被回收，换用新会话
+            del pins[server_name]
+            await self._release(pinned)
+
+        handle = await self._get_handle(server_name)
+        handle.refs += 1
+        if pins is not None:
+            # 引用由 run_scope() 退出时释放
+            pins[server_name] = handle
+            yield handle.session
+            return
+        try:
+            yield handle.session
+        finally:
+            await self._release(handle)
+
+    async def _release(self, handle: _SessionHandle) -> None:
+        handle.refs -= 1
+        if handle.retired and handle.refs <= 0:
+            self._retired.discard(handle)
+            await handle.stop()
+            logger.info(f"Closed retired session: {handle.server_name}")
+
+    async def _retire(self, server_name: str, broken: bool = False) -> None:
+        """注销当前会话：没有调用在使用时立即关闭，否则等最后一个调用结束"""
+        handle = self._handles.pop(server_name, None)
+        if handle is None:
+            return
+        handle.retired = True
+        handle.broken = broken
+        if handle.refs <= 0:
+            await handle.stop()
+            logger.info(f"Closed session: {server_name}")
+        else:
+            self._retired.add(handle)
+
+    @asynccontextmanager
+    async def run_scope(self) -> AsyncIterator[None]:
+        """
+        在一次智能体运行期间固定所用的会话。
+
+        配置热更新替换了某个服务器时，进行中的运行继续使用旧会话直到结束，
+        新的运行使用新会话。
+        """
+        pins: Dict[str, _SessionHandle] = {}
+        token = _run_pins.set(pins)
+        try:
+            yield
+        finally:
+            _run_pins.reset(token)
+            for handle in pins.values():
+                await self._release(handle)
+
+    async def call_tool(
+        self,
+        server_name: str,
+        tool_name: str,
+        arguments: Optional[dict] = None,
+        cache_ttl: float = 0,
+    ) -> Any:
+        """
+        通过常驻会话调用工具，返回解析后的结果。
+
+        参数:
+            server_name: 服务器名称
+            tool_name: 工具名称
+            arguments: 工具参数
+            cache_ttl: 结果缓存秒数，0 表示不缓存（仅用于只读工具）；
+                相同调用正在进行（如投机预取）时等待其结果，不重复发起
+
+        返回:
+            工具声明了 outputSchema 时直接返回 structuredContent（类型见 core.tool_results），
+            否则 JSON 可解析时返回 dict/list，再否则返回文本
+        """
+        arguments = arguments or {}
+        calls = _run_calls.get()
+        if calls is not None:
+            calls.append((server_name, tool_name, arguments))
+        if cache_ttl <= 0:
+            return await self._fetch(server_name, tool_name, arguments)
+
+        cache_key = self.cache_key(server_name, tool_name, arguments)
+        payload = await self._cached(cache_key, server_name, tool_name)
+        if payload is not _MISS:
+            return payload
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[cache_key] = future
+        try:
+            payload = await self._fetch(server_name, tool_name, arguments)
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                # 取消等不传给等待者，它们会自行重新调用
+                e = ToolError(f"Tool {server_name}.{tool_name} was cancelled")
+            future.set_exception(e)
+            future.exception()  # 没有等待者时不报 "exception was never retrieved"
+            raise
+        else:
+            self._result_cache[cache_key] = (time.monotonic() + cache_ttl, payload)
+            future.set_result(payload)
+            return payload
+        finally:
+            if self._pending.get(cache_key) is future:
+                del self._pending[cache_key]
+
+    async def _fetch(self, server_name: str, tool_name: str, arguments: dict) -> Any:
+        """不经过结果缓存的调用（开启了批量合并时经合并器）"""
+        coalescer = self._coalescers.get((server_name, tool_name))
+        if coalescer is not None:
+            return await self._observed(server_name, tool_name, lambda: coalescer.call(arguments))
+        return await self._observed(
+            server_name, tool_name, lambda: self._call_direct(server_name, tool_name, arguments)
+        )
+
+    @staticmethod
+    def cache_key(server_name: str, tool_name: str, arguments: Optional[dict]) -> str:
+        """工具结果缓存的键"""
+        return f"{server_name}:{tool_name}:{json.dumps(arguments or {}, sort_keys=True, ensure_ascii=False)}"
+
+    async def _cached(self, cache_key: str, server_name: str, tool_name: str) -> Any:
+        """未过期的缓存结果，或等待进行中的相同调用；都没有（或进行中的调用失败）时返回 _MISS"""
+        cached = self._result_cache.get(cache_key)
+        if cached and cached[0] > time.monotonic():
+            record_tool_call(server_name, tool_name, 0.0, "cache_hit")
+            return cached[1]
+        pending = self._pending.get(cache_key)
+        if pending is None:
+            return _MISS
+        start = time.perf_counter()
+        try:
+            # shield: 等待者超时或被取消不影响进行中的调用
+            payload = await asyncio.shield(pending)
+        except Exception:
+            return _MISS
+        record_tool_call(server_name, tool_name, time.perf_counter() - start, "cache_hit")
+        return payload
+
+    @staticmethod
+    def _cached_result(payload: Any) -> "CallToolResult":
+        """把缓存的解析结果还原为 CallToolResult（与 mcp_servers.structured 的格式一致）"""
+        from mcp.types import CallToolResult, TextContent
+
+        if isinstance(payload, str):
+            text = payload
+        else:
+            text = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        return CallToolResult(
+            content=[TextContent(type="text", text=text)],
+            structuredContent=payload if isinstance(payload, dict) else None,
+        )
+
+    def prefetch(
+        self, server_name: str, tool_name: str, arguments: dict, cache_ttl: float
+    ) -> "asyncio.Task[bool]":
+        """
+        在后台投机调用只读工具，结果写入缓存（cache_ttl 秒）。
+
+        之后相同参数的调用（指定了 cache_ttl 的 call_tool，或 LangChain 工具）直接读取缓存，
+        预取仍在进行时等待它完成。预取不计入 record_calls() 的记录；
+        失败只记录日志，任务结果为是否成功。
+        """
+        return asyncio.create_task(self._prefetch(server_name, tool_name, arguments, cache_ttl))
+
+    async def _prefetch(self, server_name: str, tool_name: str, arguments: dict, cache_ttl: float) -> bool:
+        # 任务运行在调用方上下文的副本中，这里的修改不影响调用方的记录
+        _run_calls.set(None)
+        try:
+            await self.call_tool(server_name, tool_name, arguments, cache_ttl=cache_ttl)
+        except Exception as e:
+            logger.debug(f"Prefetch {server_name}.{tool_name} failed: {e}")
+            return False
+        return True
+
+    @contextmanager
+    def record_calls(self) -> Iterator[List[Tuple[str, str, dict]]]:
+        """
+        记录此上下文内（包括其中的图节点与子任务）发起的工具调用，
+        产出 [(server_name, tool_name, arguments), ...]，退出前持续追加。
+        """
+        calls: List[Tuple[str, str, dict]] = []
+        token = _run_calls.set(calls)
+        try:
+            yield calls
+        finally:
+            _run_calls.reset(token)
+
+    def server_for_tool(self, tool_name: str) -> Optional[str]:
+        """工具注册表中提供该工具的服务器（尚未加载工具时返回 None）"""
+        for server_name, tools in self._tools.items():
+            if any(tool.name == tool_name for tool in tools):
+                return server_name
+        return None
+
+    async def _observed(
+        self, server_name: str, tool_name: str, call: Callable[[], Awaitable[T]]
+    ) -> T:
+        """
+        记录一次工具调用的指标与 span
+
+        总耗时拆分为：排队（批量合并窗口、建立会话、重试退避）、
+        传输（往返耗时减去服务端耗时）和服务端处理耗时（由服务端在 _meta 中报告）。
+        """
+        timing: Dict[str, float] = {}
+        token = _call_timing.set(timing)
+        start = time.perf_counter()
+        status = "error"
+        try:
+            with start_span(
+                f"mcp.tool {server_name}.{tool_name}",
+                SPAN_KIND_CLIENT,
+                **{"mcp.server": server_name, "mcp.tool": tool_name},
+            ) as span:
+                try:
+                    result = await call()
+                    if not getattr(result, "isError", False):
+                        status = "ok"
+                    return result
+                finally:
+                    record_tool_call(
+                        server_name,
+                        tool_name,
+                        time.perf_counter() - start,
+                        status,
+                        rtt=timing.get("rtt"),
+                        server_time=timing.get("server"),
+                        span=span,
+                    )
+        finally:
+            _call_timing.reset(token)
+
+    @staticmethod
+    async def _send(
+        session: "ClientSession", tool_name: str, arguments: dict
+    ) -> "CallToolResult":
+        """发送一次 tools/call 请求并记录往返耗时与服务端耗时"""
+        start = time.perf_counter()
+        result = await session.call_tool(tool_name, arguments)
+        timing = _call_timing.get()
+        if timing is not None:
+            timing["rtt"] = time.perf_counter() - start
+            server_ms = (result.meta or {}).get(SERVER_TIME_META)
+            if isinstance(server_ms, (int, float)):
+                timing["server"] = server_ms / 1000
+            else:
+                timing.pop("server", None)
+        return result
+
+    async def _call_direct(self, server_name: str, tool_name: str, arguments: dict) -> Any:
+        """不经过缓存与批量合并，按容错策略在常驻会话上调用工具"""
+        return await self._call_with_policy(
+            server_name, tool_name, lambda: self._call_once(server_name, tool_name, arguments)
+        )
+
+    async def _call_with_policy(self, server_name: str, tool_name: str, attempt) -> Any:
+        """按该工具的策略与服务器熔断器执行 attempt（每次重试/对冲重新调用）"""
+
+        async def on_failure(error: BaseException, opened: bool) -> None:
+            # 卡死（熔断）或崩溃（非超时的传输错误）的会话直接回收，
+            # 未熔断时立即重连，使重试不把进程启动时间算进工具截止时间
+            if opened or not isinstance(error, ToolTimeoutError):
+                logger.warning(f"MCP server '{server_name}' unhealthy, recycling session: {error}")
+                await self._retire(server_name, broken=True)
+                if not opened:
+                    try:
+                        await self._get_handle(server_name)
+                    except Exception as e:
+                        logger.warning(f"MCP server '{server_name}' restart failed: {e}")
+
+        # 先建立会话：连接耗时由 connect_timeout 约束，不占用工具截止时间；熔断中则直接拒绝
+        self._breaker_for(server_name).check()
+        await self._get_handle(server_name)
+        return await call_with_policy(
+            attempt,
+            self.get_policy(server_name, tool_name),
+            self._breaker_for(server_name),
+            label=f"{server_name}.{tool_name}",
+            on_failure=on_failure,
+        )
+
+    async def _call_once(self, server_name: str, tool_name: str, arguments: dict) -> Any:
+        async with self._lease(server_name) as session:
+            result = await self._send(session, tool_name, arguments)
+        payload = self._parse_tool_result(result)
+        if result.isError:
+            raise ToolError(f"Tool {server_name}.{tool_name} failed: {payload}")
+        return payload
+
+    @staticmethod
+    def _parse_tool_result(result) -> Any:
+        """优先使用 structuredContent，否则提取文本内容并尝试解析为 JSON"""
+        structured = getattr(result, "structuredContent", None)
+        if structured is not None:
+            return structured
+
+        texts = [c.text for c in result.content if getattr(c, "type", None) == "text"]
+        text = "\n".join(texts)
+        try:
+            return json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            return text
+
+    def clear_cache(self) -> None:
+        """清空工具结果缓存。"""
+        self._result_cache.clear()
+
+    def _invalidate_cache(self, server_names: Set[str]) -> None:
+        """只清除指定服务器的工具结果缓存"""
+        prefixes = tuple(f"{name}:" for name in server_names)
+        for key in [key for key in self._result_cache if key.startswith(prefixes)]:
+            del self._result_cache[key]
 
     async def close(self) -> None:
         """关闭所有 MCP 连接。"""
+        self.stop_watching()
+        for coalescer in list(self._coalescers.values()):
+            await coalescer.close()
+        handles = list(self._handles.values()) + list(self._retired)
+        self._handles.clear()
+        self._retired.clear()
+        for handle in handles:
+            await handle.stop()
+        self._tools = {}
         if self._client is not None:
             # 注意：MultiServerMCPClient 没有显式的 close 方法
             # 连接会在 client 对象被垃圾回收时自动关闭
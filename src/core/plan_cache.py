@@ -0,0 +1,343 @@
+"""
+工具调用轨迹缓存
+
+很多请求的工具调用轨迹完全相同，例如"归档 <url>"总是 firecrawl_scrape -> write_file，
+文件名由 URL 确定。PlanCache 记录 ReAct 智能体成功运行的轨迹，按规范化的请求模板索引，
+之后遇到同一模板的请求时直接按轨迹执行工具调用，不再请求 LLM：
+
+- 模板：请求中的 URL、日期、数字替换为槽位（url0、date0、number0 ...），其余文本原样保留
+- 参数化：工具参数中出现的槽位值（以及派生形式，如 URL 的 slug）替换为占位符 {url0}、{url0|slug}；
+  与此前某个工具结果相同（或包含它）的参数替换为 {result0} 等结果引用
+- 确认：同一模板下参数化后完全相同的轨迹出现 min_support 次才会被回放，
+  只出现过一次、或夹带了无法解释的字面量（如模型改写过的内容）的轨迹不会被回放
+- 回放：逐步代入参数并执行，每步的结果都要通过校验（不是错误、内容非空、
+  JSON 结果包含记录时的顶层字段）。校验失败时停止回放，已执行的消息保留在对话中，
+  由 LLM 从此处接手，同时该轨迹需要重新确认。各次记录中最终回复一致时连回复一起回放，
+  否则工具调用之后仍由 LLM 生成回复
+
+用法:
+    plans = PlanCache(min_support=2)
+    matched = plans.match(user_input)
+    if matched:
+        messages, complete = await plans.replay(*matched, execute=dispatcher.execute)
+    ...
+    plans.record(all_messages)  # 成功运行后
+"""
+
+import json
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage, BaseMessage, ToolMessage
+
+from .logger import get_logger
+from .prompt import canonical_json, message_text
+
+logger = get_logger(__name__)
+
+# 槽位：按顺序提取，先提取的部分不再参与后面的匹配
+_SLOTS = (
+    ("url", re.compile(r"https?://[^\s，。、；！？）)\]\"'<>]+")),
+    ("date", re.compile(r"\d{4}-\d{1,2}-\d{1,2}")),
+    ("number", re.compile(r"(?<![\w.])\d+(?:\.\d+)?(?![\w.])")),
+)
+
+# 槽位值的派生形式
+TRANSFORMS: Dict[str, Callable[[str], str]] = {
+    # https://example.com/news -> example_com_news
+    "slug": lambda value: re.sub(r"[^0-9A-Za-z]+", "_", re.sub(r"^\w+://", "", value)).strip("_"),
+}
+
+_PLACEHOLDER = re.compile(r"\{(\w+)(?:\|(\w+))?\}")
+
+# 短于该长度的工具结果不作为参数引用（避免误把 "ok" 之类的短结果当作数据来源）
+MIN_RESULT_REF = 16
+
+# 回放生成的工具调用 ID 前缀；含回放调用的运行不再记录，避免轨迹自我确认
+REPLAY_ID_PREFIX = "replay_"
+
+
+def normalize(text: str) -> Tuple[str, Dict[str, str]]:
+    """请求 -> (模板, 槽位值)"""
+    slots: Dict[str, str] = {}
+    text = " ".join(text.split())
+    for kind, pattern in _SLOTS:
+        count = 0
+
+        def replace(match: "re.Match[str]") -> str:
+            nonlocal count
+            name = f"{kind}{count}"
+            count += 1
+            slots[name] = match.group(0)
+            return "{" + name + "}"
+
+        # 只在尚未替换的文本片段中匹配
+        parts = re.split(r"(\{\w+\})", text)
+        text = "".join(part if i % 2 else pattern.sub(replace, part) for i, part in enumerate(parts))
+    return text, slots
+
+
+def _bounded(form: str) -> "re.Pattern[str]":
+    return re.compile(r"(?<![0-9A-Za-z])" + re.escape(form) + r"(?![0-9A-Za-z])")
+
+
+def _parametrize_text(text: str, slots: Dict[str, str], results: Sequence[str]) -> str:
+    for index in range(len(results) - 1, -1, -1):
+        result = results[index]
+        if len(result) >= MIN_RESULT_REF and result in text:
+            text = text.replace(result, "{result%d}" % index)
+    for name, value in sorted(slots.items(), key=lambda item: -len(item[1])):
+        forms = [("", value)] + [(f"|{t}", fn(value)) for t, fn in TRANSFORMS.items()]
+        for suffix, form in forms:
+            if form:
+                text = _bounded(form).sub("{" + name + suffix + "}", text)
+    return text
+
+
+def _parametrize(value: Any, slots: Dict[str, str], results: Sequence[str]) -> Any:
+    if isinstance(value, str):
+        return _parametrize_text(value, slots, results)
+    if isinstance(value, dict):
+        return {key: _parametrize(item, slots, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_parametrize(item, slots, results) for item in value]
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        for name, raw in slots.items():
+            if name.startswith("number") and float(raw) == value:
+                return {"$slot": name}
+    return value
+
+
+def _number(raw: str) -> Any:
+    return int(raw) if raw.isdigit() else float(raw)
+
+
+def _render(value: Any, slots: Dict[str, str], results: Sequence[str]) -> Any:
+    if isinstance(value, str):
+
+        def replace(match: "re.Match[str]") -> str:
+            name, transform = match.group(1), match.group(2)
+            if name in slots:
+                raw = slots[name]
+            elif name.startswith("result") and name[6:].isdigit() and int(name[6:]) < len(results):
+                raw = results[int(name[6:])]
+            else:
+                return match.group(0)
+            return TRANSFORMS[transform](raw) if transform in TRANSFORMS else raw
+
+        return _PLACEHOLDER.sub(replace, value)
+    if isinstance(value, dict):
+        if set(value) == {"$slot"} and value["$slot"] in slots:
+            return _number(slots[value["$slot"]])
+        return {key: _render(item, slots, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_render(item, slots, results) for item in value]
+    return value
+
+
+def _shape(text: str) -> Optional[FrozenSet[str]]:
+    """JSON 对象结果的顶层字段"""
+    try:
+        value = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    return frozenset(value) if isinstance(value, dict) else None
+
+
+def _valid(message: ToolMessage, shape: Optional[FrozenSet[str]]) -> bool:
+    if getattr(message, "status", "success") == "error":
+        return False
+    text = message_text(message)
+    if not text.strip():
+        return False
+    if shape:
+        actual = _shape(text)
+        return actual is not None and shape <= actual
+    return True
+
+
+@dataclass
+class _Step:
+    # [(工具名, 参数模板), ...]，同一轮中并行的调用
+    calls: List[Tuple[str, Any]]
+    # 各调用结果的顶层字段（多次记录取交集），非 JSON 对象时为 None
+    shapes: List[Optional[FrozenSet[str]]]
+
+
+@dataclass
+class TrajectoryPlan:
+    """一个请求模板下的工具调用轨迹"""
+
+    template: str
+    steps: List[_Step]
+    # 最终回复模板；各次记录不一致时为 None（回放后由 LLM 生成回复）
+    answer: Optional[str]
+    support: int = 1
+    replays: int = 0
+    failures: int = 0
+    tools: FrozenSet[str] = field(default_factory=frozenset)
+
+
+class PlanCache:
+    """
+    轨迹缓存（进程内，随智能体常驻）
+
+    Args:
+        min_support: 轨迹被回放前需要出现的次数
+        max_templates: 保留的请求模板数（LRU）
+        max_steps: 记录的轨迹最多包含的工具调用轮数
+    """
+
+    def __init__(self, min_support: int = 2, max_templates: int = 256, max_steps: int = 8):
+        self.min_support = min_support
+        self.max_templates = max_templates
+        self.max_steps = max_steps
+        # 模板 -> 轨迹签名 -> 轨迹
+        self._plans: "OrderedDict[str, Dict[str, TrajectoryPlan]]" = OrderedDict()
+        self.stats = {"recorded": 0, "matched": 0, "replayed": 0, "partial": 0, "fallbacks": 0}
+
+    def match(
+        self, text: str, tools: Optional[Sequence[str]] = None
+    ) -> Optional[Tuple[TrajectoryPlan, Dict[str, str]]]:
+        """已确认的轨迹及本次请求的槽位值；tools 为当前可用的工具名"""
+        template, slots = normalize(text)
+        plans = self._plans.get(template)
+        if not plans:
+            return None
+        available = set(tools) if tools is not None else None
+        candidates = [
+            plan
+            for plan in plans.values()
+            if plan.support >= self.min_support and (available is None or plan.tools <= available)
+        ]
+        if not candidates:
+            return None
+        self._plans.move_to_end(template)
+        self.stats["matched"] += 1
+        return max(candidates, key=lambda plan: plan.support), slots
+
+    async def replay(
+        self,
+        plan: TrajectoryPlan,
+        slots: Dict[str, str],
+        execute: Callable[[List[Dict[str, Any]]], Awaitable[List[ToolMessage]]],
+    ) -> Tuple[List[BaseMessage], bool]:
+        """
+        按轨迹执行工具调用，execute 并发执行一轮调用并按顺序返回 ToolMessage
+
+        Returns:
+            (新消息, 是否完整回放到最终回复)
+        """
+        messages: List[BaseMessage] = []
+        results: List[str] = []
+        for step in plan.steps:
+            calls = [
+                {
+                    "name": name,
+                    "args": _render(arguments, slots, results),
+                    "id": f"{REPLAY_ID_PREFIX}{uuid4().hex[:16]}",
+                    "type": "tool_call",
+                }
+                for name, arguments in step.calls
+            ]
+            tool_messages = await execute(calls)
+            messages.append(AIMessage(content="", tool_calls=calls))
+            messages.extend(tool_messages)
+            if not all(_valid(m, shape) for m, shape in zip(tool_messages, step.shapes)):
+                # 已执行的调用保留在对话中交给 LLM 继续；轨迹需要重新确认
+                plan.failures += 1
+                plan.support = 0
+                self.stats["fallbacks"] += 1
+                logger.info(f"[plan] 回放结果校验失败，交给 LLM 继续: {plan.template}")
+                return messages, False
+            results.extend(message_text(m) for m in tool_messages)
+
+        plan.replays += 1
+        if plan.answer is None:
+            self.stats["partial"] += 1
+            return messages, False
+        messages.append(AIMessage(content=_render(plan.answer, slots, results)))
+        self.stats["replayed"] += 1
+        return messages, True
+
+    def record(self, messages: Sequence[BaseMessage]) -> bool:
+        """
+        记录一次成功运行的轨迹：[用户请求, (工具调用, 结果...)..., 最终回复]
+
+        （部分）回放得到的运行不记录：它只是重复已有轨迹，不能作为新的确认
+        """
+        if len(messages) < 4 or messages[0].type != "human" or not isinstance(messages[0].content, str):
+            return False
+        final = messages[-1]
+        if final.type != "ai" or final.tool_calls or not isinstance(final.content, str) or not final.content:
+            return False
+
+        # 按轮切分：每条带工具调用的 AIMessage 及其后的 ToolMessage
+        rounds: List[Tuple[List[Dict[str, Any]], Dict[str, ToolMessage]]] = []
+        for message in messages[1:-1]:
+            if message.type == "ai" and message.tool_calls:
+                if any(call["id"].startswith(REPLAY_ID_PREFIX) for call in message.tool_calls):
+                    return False
+                rounds.append((message.tool_calls, {}))
+            elif message.type == "tool" and rounds:
+                rounds[-1][1][message.tool_call_id] = message
+            else:
+                return False
+        if not rounds or len(rounds) > self.max_steps:
+            return False
+
+        template, slots = normalize(messages[0].content)
+        results: List[str] = []
+        steps: List[_Step] = []
+        for calls, replies in rounds:
+            ordered = [replies.get(call["id"]) for call in calls]
+            if any(m is None or getattr(m, "status", "success") == "error" for m in ordered):
+                return False
+            steps.append(
+                _Step(
+                    calls=[(call["name"], _parametrize(call["args"], slots, results)) for call in calls],
+                    shapes=[_shape(message_text(m)) for m in ordered],
+                )
+            )
+            results.extend(message_text(m) for m in ordered)
+        answer = _parametrize_text(final.content, slots, results)
+
+        signature = canonical_json([step.calls for step in steps])
+        plans = self._plans.setdefault(template, {})
+        plan = plans.get(signature)
+        if plan is None:
+            plans[signature] = TrajectoryPlan(
+                template=template,
+                steps=steps,
+                answer=answer,
+                tools=frozenset(name for step in steps for name, _ in step.calls),
+            )
+        else:
+            plan.support += 1
+            if plan.answer != answer:
+                plan.answer = None
+            for old, new in zip(plan.steps, steps):
+                old.shapes = [
+                    a & b if a is not None and b is not None else None for a, b in zip(old.shapes, new.shapes)
+                ]
+        self._plans.move_to_end(template)
+        if len(self._plans) > self.max_templates:
+            self._plans.popitem(last=False)
+        self.stats["recorded"] += 1
+        return True
+
+
+__all__ = ["PlanCache", "TrajectoryPlan", "normalize"]
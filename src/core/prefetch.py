@@ -0,0 +1,226 @@
+"""
+投机预取
+
+部分工具调用在运行开始时就能确定：数据查询几乎总要读取表结构，出行规划要按解析出的
+出发地/目的地查车票和天气，归档要抓取请求中的 URL。Prefetcher 在运行开始时按智能体的
+预取规则（以及学习到的调用统计）并发发起这些调用，与第一轮 LLM 调用（或图的前几个节点）
+同时进行，结果写入 MCPClientManager 的工具结果缓存；智能体之后发起相同调用时直接读取缓存，
+预取仍在进行时等待它完成。
+
+- 规则：PrefetchRule 从用户请求生成工具参数，返回 None 表示本次不适用；
+  参数必须与智能体实际调用时完全相同才能命中缓存
+- 学习：记录每次运行实际发起的调用，按"每次运行"以及"本次触发的各条规则"统计共现；
+  某个触发条件下出现 min_samples 次以上、且出现比例不低于 learn_threshold 的调用也会被预取。
+  只学习容错策略标记为幂等（idempotent）的工具，避免投机执行有副作用的调用
+- 调优：每个预取按 used（运行中发起了相同调用）/ unused / error 计数（stats、rule_stats，
+  以及 Prometheus 指标 mcp_prefetch_total）；累计命中率低于 min_hit_rate 的规则暂停，
+  每 explore_every 次运行再试一次。运行结束时仍未完成且未被使用的预取会被取消
+
+用法:
+    prefetcher = Prefetcher("data_agent", [PrefetchRule("schema", "get_schema", lambda text: {}, server="nl2sql")])
+    async with prefetcher.session(mcp_manager, user_input):
+        result = await graph.ainvoke(initial_state)
+"""
+
+import asyncio
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .logger import get_logger
+from .settings import Settings
+from .telemetry import PREFETCH_CALLS
+
+if TYPE_CHECKING:
+    from .mcp_client_manager import MCPClientManager
+
+logger = get_logger(__name__)
+
+# 统计中"每次运行"这一触发条件，以及学习到的预取在 rule_stats 中的名称
+ALL_RUNS = "*"
+LEARNED = "learned"
+
+
+@dataclass(frozen=True)
+class PrefetchRule:
+    """
+    预取规则
+
+    Args:
+        name: 规则名（用于统计）
+        tool: 工具名
+        arguments: 用户请求 -> 工具参数，不适用时返回 None
+        server: 服务器名，为 None 时在已加载的工具注册表中查找
+        ttl: 结果缓存秒数，0 表示使用 PREFETCH_TTL
+    """
+
+    name: str
+    tool: str
+    arguments: Callable[[str], Optional[Dict[str, Any]]]
+    server: Optional[str] = None
+    ttl: float = 0
+
+
+@dataclass(frozen=True)
+class _Planned:
+    source: str
+    server: str
+    tool: str
+    arguments: Dict[str, Any]
+    ttl: float
+    key: str
+
+
+class Prefetcher:
+    """
+    单个智能体的预取器（实例随智能体常驻，统计在多次运行间累积）
+
+    Args:
+        agent: 智能体名称（指标标签）
+        rules: 预取规则
+        min_samples: 规则调优与学习所需的最少样本数
+        min_hit_rate: 规则命中率低于该值时暂停
+        explore_every: 暂停的规则每隔多少次运行再试一次
+        learn_threshold: 学习到的调用在触发条件下的最低出现比例
+        max_learned: 每次运行最多预取的学习调用数
+        max_tracked: 每个触发条件保留的调用统计数
+    """
+
+    def __init__(
+        self,
+        agent: str,
+        rules: Sequence[PrefetchRule] = (),
+        min_samples: int = 5,
+        min_hit_rate: float = 0.2,
+        explore_every: int = 10,
+        learn_threshold: float = 0.6,
+        max_learned: int = 4,
+        max_tracked: int = 64,
+    ):
+        self.agent = agent
+        self.rules = list(rules)
+        self.min_samples = min_samples
+        self.min_hit_rate = min_hit_rate
+        self.explore_every = explore_every
+        self.learn_threshold = learn_threshold
+        self.max_learned = max_learned
+        self.max_tracked = max_tracked
+        self.stats = {"runs": 0, "fired": 0, "used": 0, "unused": 0, "errors": 0}
+        self.rule_stats: Dict[str, Dict[str, int]] = {
+            name: {"fired": 0, "used": 0} for name in [rule.name for rule in self.rules] + [LEARNED]
+        }
+        # 触发条件 -> 运行次数；触发条件 -> 调用键 -> 出现该调用的运行次数
+        self._runs: Counter = Counter()
+        self._seen: Dict[str, Counter] = defaultdict(Counter)
+        # 调用键 -> (server, tool, arguments)
+        self._calls: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}
+
+    def _active(self, rule: PrefetchRule) -> bool:
+        stats = self.rule_stats[rule.name]
+        if stats["fired"] < self.min_samples or stats["used"] >= self.min_hit_rate * stats["fired"]:
+            return True
+        # 命中率过低的规则暂停，定期再试一次以便情况变化后恢复
+        return self.stats["runs"] % self.explore_every == 0
+
+    def plan(self, manager: "MCPClientManager", text: str) -> Tuple[List[_Planned], List[str]]:
+        """本次运行的预取调用，以及用于学习的触发条件"""
+        servers = set(manager.server_names)
+        planned: Dict[str, _Planned] = {}
+        triggers = [ALL_RUNS]
+        for rule in self.rules:
+            server = rule.server or manager.server_for_tool(rule.tool)
+            if server not in servers or not self._active(rule):
+                continue
+            try:
+                arguments = rule.arguments(text)
+            except Exception as e:
+                logger.debug(f"[prefetch] 规则 {rule.name} 出错: {e}")
+                continue
+            if arguments is None:
+                continue
+            key = manager.cache_key(server, rule.tool, arguments)
+            ttl = rule.ttl or Settings.PREFETCH_TTL
+            planned.setdefault(key, _Planned(rule.name, server, rule.tool, arguments, ttl, key))
+            triggers.append(rule.name)
+
+        candidates: Dict[str, float] = {}
+        for trigger in triggers:
+            runs = self._runs[trigger]
+            if runs < self.min_samples:
+                continue
+            for key, count in self._seen[trigger].items():
+                if key not in planned and count >= self.learn_threshold * runs:
+                    candidates[key] = max(candidates.get(key, 0.0), count / runs)
+        for key in sorted(candidates, key=candidates.get, reverse=True)[: self.max_learned]:
+            server, tool, arguments = self._calls[key]
+            if server in servers:
+                planned[key] = _Planned(LEARNED, server, tool, arguments, Settings.PREFETCH_TTL, key)
+        return list(planned.values()), triggers
+
+    @asynccontextmanager
+    async def session(self, manager: Optional["MCPClientManager"], text: str) -> AsyncIterator[None]:
+        """在一次运行期间预取，退出时按本次运行实际发起的调用更新统计"""
+        if manager is None or not Settings.PREFETCH:
+            yield
+            return
+        planned, triggers = self.plan(manager, text)
+        tasks = [manager.prefetch(p.server, p.tool, p.arguments, p.ttl) for p in planned]
+        if planned:
+            logger.debug(
+                f"[prefetch] {self.agent}: {', '.join(f'{p.server}.{p.tool}' for p in planned)}"
+            )
+        with manager.record_calls() as calls:
+            try:
+                yield
+            finally:
+                self._finish(manager, planned, tasks, calls, triggers)
+
+    def _finish(
+        self,
+        manager: "MCPClientManager",
+        planned: List[_Planned],
+        tasks: List["asyncio.Task[bool]"],
+        calls: List[Tuple[str, str, dict]],
+        triggers: List[str],
+    ) -> None:
+        observed: Dict[str, Tuple[str, str, Dict[str, Any]]] = {}
+        for server, tool, arguments in calls:
+            observed.setdefault(manager.cache_key(server, tool, arguments), (server, tool, arguments))
+
+        self.stats["runs"] += 1
+        for item, task in zip(planned, tasks):
+            if task.done() and not task.cancelled() and not task.result():
+                outcome = "error"
+            elif item.key in observed:
+                outcome = "used"
+            else:
+                outcome = "unused"
+                task.cancel()
+            self.stats["fired"] += 1
+            self.stats["errors" if outcome == "error" else outcome] += 1
+            rule = self.rule_stats.setdefault(item.source, {"fired": 0, "used": 0})
+            rule["fired"] += 1
+            rule["used"] += outcome == "used"
+            PREFETCH_CALLS.inc(agent=self.agent, server=item.server, tool=item.tool, outcome=outcome)
+
+        learnable = [
+            key for key, (server, tool, _) in observed.items() if manager.get_policy(server, tool).idempotent
+        ]
+        pruned = False
+        for trigger in triggers:
+            self._runs[trigger] += 1
+            seen = self._seen[trigger]
+            seen.update(learnable)
+            if len(seen) > self.max_tracked:
+                for key, _ in seen.most_common()[self.max_tracked:]:
+                    del seen[key]
+                pruned = True
+        for key in learnable:
+            self._calls[key] = observed[key]
+        if pruned:
+            tracked = set().union(*self._seen.values())
+            self._calls = {key: call for key, call in self._calls.items() if key in tracked}
+
+
+__all__ = ["PrefetchRule", "Prefetcher"]
@@ -0,0 +1,273 @@
+"""
+提示词组装
+
+LLM 服务端的前缀缓存（KV cache）只在请求开头的字节完全相同时命中。PromptAssembler 保证：
+
+- 前缀稳定：系统提示在构造时规范化一次并复用同一个 SystemMessage，
+  工具 schema 按名称排序、键按字典序输出，与服务器返回工具的顺序无关
+- 历史只追加：每轮在固定前缀之后原样拼接状态中的消息；超出 token 预算时保留首条任务消息，
+  从最早的历史开始裁剪，且不把工具调用与其结果拆开
+- token 计数按消息 id 缓存，每轮只计算新增消息
+
+每次组装生成 PromptLayout（前缀哈希、前缀/历史 token 数、与上一轮相同的可复用 token 数等），
+记录在遥测 span "prompt.assemble" 的属性中。
+
+token 数默认按字符估算（CJK 字符约 1 token，其他约 4 字符 1 token），不需要下载词表；
+设置 PROMPT_TOKENIZER（如 cl100k_base）且安装了 tiktoken 时改用 tiktoken 精确计数。
+
+用法:
+    assembler = PromptAssembler(SYSTEM_PROMPT, tools, max_tokens=6000)
+    llm = Settings.get_llm().bind_tools(assembler.tool_schemas)
+    response = await llm.ainvoke(assembler.assemble(state["messages"]))
+"""
+
+import hashlib
+import json
+import math
+import re
+import textwrap
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from langchain_core.messages import BaseMessage, SystemMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .logger import get_logger
+
+LOG = get_logger(__name__)
+
+# 每条消息的格式开销（角色、分隔符），与 OpenAI 的计数约定一致
+MESSAGE_OVERHEAD = 4
+
+_CJK = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """无词表的估算：CJK 字符各算 1 token，其余字符每 4 个算 1 token"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def load_encoder(name: str) -> Optional[Callable[[str], int]]:
+    """按名称加载 tiktoken 编码；未安装或词表不可用时返回 None"""
+    if not name:
+        return None
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding(name)
+    except Exception as e:  # 未安装、名称错误或无法下载词表
+        LOG.warning(f"[prompt] 无法加载 tokenizer {name}，改用估算: {e}")
+        return None
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def message_text(message: BaseMessage) -> str:
+    """参与计数的文本：内容（多段内容取文本块）加工具调用参数"""
+    content = message.content
+    if isinstance(content, str):
+        text = content
+    else:
+        parts = []
+        for block in content:
+            if isinstance(block, dict):
+                parts.append(str(block.get("text", "")) if block.get("type") == "text" else canonical_json(block))
+            else:
+                parts.append(str(block))
+        text = "\n".join(parts)
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        text += canonical_json([{"name": c["name"], "args": c["args"]} for c in tool_calls])
+    return text
+
+
+class TokenCounter:
+    """
+    消息 token 计数，按消息 id 缓存
+
+    状态中的消息都有 id 且写入后不再修改（见 core.state），同一条消息只计算一次；
+    没有 id 的消息每次重新计算。
+    """
+
+    def __init__(self, encoder: Optional[Callable[[str], int]] = None, cache_size: int = 8192):
+        self.encode = encoder or estimate_tokens
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def count_text(self, text: str) -> int:
+        return self.encode(text)
+
+    def count(self, message: BaseMessage) -> int:
+        key = message.id
+        if key is not None and key in self._cache:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        self.misses += 1
+        tokens = self.encode(message_text(message)) + MESSAGE_OVERHEAD
+        if key is not None:
+            self._cache[key] = tokens
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tokens
+
+
+@dataclass
+class PromptLayout:
+    """一次组装的布局统计"""
+
+    prefix_hash: str
+    prefix_tokens: int
+    history_tokens: int
+    total_tokens: int
+    # 与同一会话上一轮请求开头完全相同的 token 数（可命中服务端前缀缓存的上限）
+    reused_tokens: int
+    messages: int
+    trimmed: int
+    counted: int
+
+    @property
+    def reuse_ratio(self) -> float:
+        return self.reused_tokens / self.total_tokens if self.total_tokens else 0.0
+
+    def as_attributes(self) -> Dict[str, Any]:
+        attributes = {f"prompt.{k}": v for k, v in asdict(self).items()}
+        attributes["prompt.reuse_ratio"] = round(self.reuse_ratio, 3)
+        return attributes
+
+
+class PromptAssembler:
+    """
+    组装 [系统提示, 历史消息...]，保持请求前缀字节稳定
+
+    Args:
+        system_prompt: 系统提示（去除公共缩进与首尾空白后使用）
+        tools: 绑定给 LLM 的工具；tool_schemas 为按名称排序的规范化 schema
+        max_tokens: 前缀加历史的 token 上限（<= 0 表示不限制）
+        counter: token 计数器，默认按 PROMPT_TOKENIZER 创建
+        sessions: 记录上一轮布局的会话数量（按首条消息 id 区分会话）
+    """
+
+    def __init__(
+        self,
+        system_prompt: str,
+        tools: Sequence[Any] = (),
+        max_tokens: int = 0,
+        counter: Optional[TokenCounter] = None,
+        sessions: int = 256,
+    ):
+        if counter is None:
+            from .settings import Settings
+
+            counter = TokenCounter(load_encoder(Settings.PROMPT_TOKENIZER))
+        self.counter = counter
+        self.max_tokens = max_tokens
+        self.sessions = sessions
+        self.system_message = SystemMessage(content=textwrap.dedent(system_prompt).strip())
+        self.tool_schemas = [
+            json.loads(canonical_json(schema))
+            for schema in sorted(
+                (convert_to_openai_tool(tool) for tool in tools),
+                key=lambda s: s["function"]["name"],
+            )
+        ]
+        tools_json = canonical_json(self.tool_schemas)
+        self.prefix_hash = hashlib.sha1(
+            (self.system_message.content + "\0" + tools_json).encode()
+        ).hexdigest()[:12]
+        self.prefix_tokens = (
+            self.counter.count_text(self.system_message.content) + MESSAGE_OVERHEAD
+            + self.counter.count_text(tools_json)
+        )
+        self._previous: "OrderedDict[str, List[Optional[str]]]" = OrderedDict()
+        self.last_layout: Optional[PromptLayout] = None
+
+    def _trim(self, history: List[BaseMessage], counts: List[int]) -> int:
+        """
+        返回从第几条开始保留：首条任务消息始终保留，其余历史按轮（工具调用及其全部结果）
+        从最早的开始整体裁剪，最后一轮始终保留，保证不会出现缺少工具调用的工具结果
+        """
+        total = self.prefix_tokens + sum(counts)
+        start = 1
+        for i in range(2, len(history)):
+            if total <= self.max_tokens:
+                break
+            # 工具结果属于前一条工具调用，不能作为保留部分的开头
+            if history[i].type == "tool":
+                continue
+            total -= sum(counts[start:i])
+            start = i
+        return start
+
+    def assemble(self, history: Sequence[BaseMessage]) -> List[BaseMessage]:
+        """返回发给 LLM 的消息列表，并更新 last_layout"""
+        from .telemetry import start_span
+
+        with start_span("prompt.assemble") as span:
+            messages = self._assemble(history)
+            if span is not None:
+                for key, value in self.last_layout.as_attributes().items():
+                    span.set_attribute(key, value)
+        return messages
+
+    def _assemble(self, history: Sequence[BaseMessage]) -> List[BaseMessage]:
+        misses = self.counter.misses
+        history = list(history)
+        counts = [self.counter.count(m) for m in history]
+        trimmed = 0
+        if self.max_tokens > 0 and history and self.prefix_tokens + sum(counts) > self.max_tokens:
+            start = self._trim(history, counts)
+            trimmed = start - 1
+            history = history[:1] + history[start:]
+            counts = counts[:1] + counts[start:]
+
+        # 与同一会话上一轮相同的开头部分
+        ids = [m.id for m in history]
+        session = ids[0] if ids and ids[0] is not None else None
+        reused = 0
+        if session is not None:
+            previous = self._previous.get(session)
+            if previous is not None:
+                reused = self.prefix_tokens
+                for i, (a, b) in enumerate(zip(previous, ids)):
+                    if a is None or a != b:
+                        break
+                    reused += counts[i]
+            self._previous[session] = ids
+            self._previous.move_to_end(session)
+            if len(self._previous) > self.sessions:
+                self._previous.popitem(last=False)
+
+        history_tokens = sum(counts)
+        layout = PromptLayout(
+            prefix_hash=self.prefix_hash,
+            prefix_tokens=self.prefix_tokens,
+            history_tokens=history_tokens,
+            total_tokens=self.prefix_tokens + history_tokens,
+            reused_tokens=reused,
+            messages=len(history) + 1,
+            trimmed=trimmed,
+            counted=self.counter.misses - misses,
+        )
+        self.last_layout = layout
+        if trimmed:
+            LOG.info(f"[prompt] 超出 {self.max_tokens} token 预算，裁剪了 {trimmed} 条历史消息")
+        return [self.system_message] + history
+
+
+__all__ = [
+    "PromptAssembler",
+    "PromptLayout",
+    "TokenCounter",
+    "estimate_tokens",
+    "load_encoder",
+]
@@ -0,0 +1,225 @@
+"""
+MCP 工具调用的容错策略
+
+- 单次调用截止时间 (timeout)
+- 幂等工具的有界指数退避重试（full jitter）
+- 幂等工具的对冲请求：首个请求超过 hedge_after 秒未返回时再发一份，先成功者胜出
+- 按服务器的熔断器：连续失败达到阈值后快速失败，冷却后放行一个探测请求
+
+工具自身返回的错误 (ToolError) 说明服务器是健康的，不计入熔断，也不重试。
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, fields, replace
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+T = TypeVar("T")
+
+
+class ToolError(RuntimeError):
+    """工具返回 isError（业务错误，服务器本身正常）"""
+
+
+class ToolTimeoutError(TimeoutError):
+    """工具调用超过截止时间"""
+
+
+class CircuitOpenError(RuntimeError):
+    """服务器熔断中，调用被直接拒绝"""
+
+
+@dataclass(frozen=True)
+class CallPolicy:
+    """
+    单个工具的调用策略
+
+    Attributes:
+        timeout: 单次尝试的截止时间（秒）
+        retries: 失败后的最大重试次数（仅幂等工具）
+        idempotent: 是否幂等；只有幂等工具会重试和对冲
+        hedge_after: 对冲延迟（秒），None 表示不对冲
+        backoff_base: 退避基数（秒），第 n 次重试前等待 uniform(0, base * 2**n)
+        backoff_max: 单次退避上限（秒）
+    """
+
+    timeout: float = 30.0
+    retries: int = 2
+    idempotent: bool = False
+    hedge_after: Optional[float] = None
+    backoff_base: float = 0.2
+    backoff_max: float = 5.0
+
+    def merge(self, overrides: Optional[Dict[str, Any]]) -> "CallPolicy":
+        """用配置中的字段覆盖（忽略未知字段）"""
+        if not overrides:
+            return self
+        names = {f.name for f in fields(self)}
+        return replace(self, **{k: v for k, v in overrides.items() if k in names})
+
+
+class CircuitBreaker:
+    """
+    熔断器
+
+    closed: 正常放行；连续失败 failure_threshold 次后转为 open
+    open: 直接拒绝，recovery_timeout 秒后转为 half_open
+    half_open: 只放行一个探测请求，成功则 closed，失败则重新 open
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.recovery_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self) -> None:
+        """open 状态时抛出 CircuitOpenError（不占用 half_open 的探测名额）"""
+        if self.state == "open":
+            remaining = self.recovery_timeout - (time.monotonic() - self._opened_at)
+            raise CircuitOpenError(f"MCP server '{self.name}' circuit open, retry in {remaining:.1f}s")
+
+    def before_call(self) -> None:
+        self.check()
+        if self.state == "half_open":
+            if self._probing:
+                raise CircuitOpenError(f"MCP server '{self.name}' circuit half-open, probe in flight")
+            self._probing = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> bool:
+        """记录一次失败，返回是否因此进入 open 状态"""
+        self.failures += 1
+        if self._probing or (self._opened_at is None and self.failures >= self.failure_threshold):
+            self._opened_at = time.monotonic()
+            self._probing = False
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        """探测请求被取消（既未成功也未失败）时释放名额"""
+        self._probing = False
+
+    def reset(self) -> None:
+        self.record_success()
+
+
+async def _with_deadline(call: Awaitable[T], timeout: float) -> T:
+    """
+    带截止时间执行
+
+    与 asyncio.wait_for 不同：超时后被取消的调用在清理时抛出的异常
+    （如 anyio 任务组的 ExceptionGroup）会被丢弃，统一表现为超时。
+    """
+    task = asyncio.ensure_future(call)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=timeout)
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+    if not done:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        raise asyncio.TimeoutError
+    return task.result()
+
+
+async def _hedged(attempt: Callable[[], Awaitable[T]], hedge_after: float) -> T:
+    """首个请求 hedge_after 秒内未完成时再发一份，返回先成功的结果"""
+    tasks = [asyncio.ensure_future(attempt())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            tasks.append(asyncio.ensure_future(attempt()))
+
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def call_with_policy(
+    attempt: Callable[[], Awaitable[T]],
+    policy: CallPolicy,
+    breaker: CircuitBreaker,
+    label: str = "",
+    tool_errors: Tuple[Type[BaseException], ...] = (ToolError,),
+    on_failure: Optional[Callable[[BaseException, bool], Awaitable[None]]] = None,
+) -> T:
+    """
+    按策略执行一次工具调用
+
+    Args:
+        attempt: 执行单次尝试的协程工厂（每次重试/对冲都会重新调用）
+        policy: 调用策略
+        breaker: 该服务器的熔断器
+        label: 日志/异常中使用的工具标识
+        tool_errors: 视为业务错误的异常类型（直接抛出，不重试、不计入熔断）
+        on_failure: 传输层失败回调 (异常, 是否刚进入熔断)，用于回收会话等
+    """
+    attempts = 1 + (max(0, policy.retries) if policy.idempotent else 0)
+    for attempt_no in range(attempts):
+        breaker.before_call()
+        try:
+            if policy.idempotent and policy.hedge_after is not None:
+                call = _hedged(attempt, policy.hedge_after)
+            else:
+                call = attempt()
+            result = await _with_deadline(call, policy.timeout)
+        except tool_errors:
+            breaker.record_success()
+            raise
+        except asyncio.CancelledError:
+            breaker.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            error: BaseException = ToolTimeoutError(f"{label} timed out after {policy.timeout}s")
+        except Exception as e:
+            error = e
+        else:
+            breaker.record_success()
+            return result
+
+        opened = breaker.record_failure()
+        if on_failure is not None:
+            await on_failure(error, opened)
+        if attempt_no == attempts - 1 or breaker.state != "closed":
+            raise error
+        delay = random.uniform(0, min(policy.backoff_max, policy.backoff_base * 2**attempt_no))
+        await asyncio.sleep(delay)
+
+    raise AssertionError("unreachable")
+
+
+__all__ = [
+    "CallPolicy",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "ToolError",
+    "ToolTimeoutError",
+    "call_with_policy",
+]
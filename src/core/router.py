@@ -0,0 +1,253 @@
+"""
+意图路由模块
+
+基于 config/agents_config.yaml 中的智能体描述与标注样例构建本地稀疏向量索引，
+使用最近邻打分进行路由，并提供 LRU 决策缓存与低置信度时的 LLM 兜底。
+"""
+
+import asyncio
+import math
+import re
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import yaml
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+_CJK_RE = re.compile(r"[一-鿿]+")
+_WORD_RE = re.compile(r"[a-z0-9_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    提取特征：中文按字 unigram + bigram，英文按单词
+
+    中文没有空格分词，字级 n-gram 足以覆盖 "火车票"、"路线" 这类短意图词。
+    """
+    text = text.lower()
+    features: List[str] = []
+
+    for word in _WORD_RE.findall(text):
+        features.append(word)
+
+    for run in _CJK_RE.findall(text):
+        features.extend(run)
+        features.extend(run[i : i + 2] for i in range(len(run) - 1))
+
+    return features
+
+
+@dataclass
+class RouteDecision:
+    """路由决策"""
+
+    agent: str
+    confidence: float
+    margin: float
+    source: str  # "index" / "cache" / "llm" / "default"
+
+
+class IntentRouter:
+    """
+    意图路由器
+
+    每个样例（含智能体描述）编码为 TF-IDF 稀疏向量并做 L2 归一化，
+    查询时通过倒排表累加点积，取每个智能体的最大相似度作为该智能体得分。
+    """
+
+    def __init__(
+        self,
+        examples: Dict[str, List[str]],
+        descriptions: Optional[Dict[str, str]] = None,
+        default_agent: str = "data",
+        min_score: float = 0.2,
+        min_margin: float = 0.05,
+        cache_size: int = 1024,
+        use_llm_fallback: bool = True,
+        llm_timeout: float = 5.0,
+    ):
+        """
+        初始化路由器
+
+        Args:
+            examples: 智能体名称 -> 标注样例列表
+            descriptions: 智能体名称 -> 描述，既参与索引也用于 LLM 兜底提示
+            default_agent: 无法判断时的默认智能体
+            min_score: 最高得分低于该值视为低置信度
+            min_margin: 第一、第二名得分差低于该值视为低置信度
+            cache_size: LRU 决策缓存容量
+            use_llm_fallback: 低置信度时是否调用 LLM
+            llm_timeout: LLM 兜底的超时（秒），超时按 LLM 未给出答案处理
+        """
+        self.descriptions = descriptions or {}
+        self.default_agent = default_agent
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.cache_size = cache_size
+        self.use_llm_fallback = use_llm_fallback
+        self.llm_timeout = llm_timeout
+
+        self._labels: List[str] = []
+        self._postings: Dict[str, List[Tuple[int, float]]] = {}
+        self._idf: Dict[str, float] = {}
+        self._cache: "OrderedDict[str, RouteDecision]" = OrderedDict()
+
+        samples = []
+        for agent, texts in examples.items():
+            samples.extend((agent, text) for text in texts)
+        for agent, description in self.descriptions.items():
+            if description:
+                samples.append((agent, description))
+        self._build_index(samples)
+
+    @classmethod
+    def from_config(cls, config_path: str = "config/agents_config.yaml") -> "IntentRouter":
+        """
+        从 agents_config.yaml 构建路由器
+
+        智能体键名去掉 "_agent" 后缀即为路由名（browser_agent -> browser），
+        可选的顶层 router 段用于覆盖阈值等参数。
+        """
+        with open(Path(config_path), "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+
+        examples: Dict[str, List[str]] = {}
+        descriptions: Dict[str, str] = {}
+        for key, agent_config in (config.get("agents") or {}).items():
+            name = key[: -len("_agent")] if key.endswith("_agent") else key
+            examples[name] = list(agent_config.get("examples") or [])
+            descriptions[name] = agent_config.get("description", "")
+
+        return cls(examples, descriptions, **(config.get("router") or {}))
+
+    def _build_index(self, samples: List[Tuple[str, str]]) -> None:
+        """构建 TF-IDF 倒排索引"""
+        doc_freq: Dict[str, int] = defaultdict(int)
+        tokenized = []
+        for agent, text in samples:
+            tokens = tokenize(text)
+            tokenized.append((agent, tokens))
+            for token in set(tokens):
+                doc_freq[token] += 1
+
+        n = len(samples)
+        self._idf = {t: math.log((1 + n) / (1 + df)) + 1.0 for t, df in doc_freq.items()}
+
+        postings: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+        for agent, tokens in tokenized:
+            vector = self._vectorize(tokens)
+            if not vector:
+                continue
+            self._labels.append(agent)
+            idx = len(self._labels) - 1
+            for token, weight in vector.items():
+                postings[token].append((idx, weight))
+        self._postings = dict(postings)
+
+    def _vectorize(self, tokens: List[str]) -> Dict[str, float]:
+        counts: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            if token in self._idf:
+                counts[token] += 1
+        vector = {t: (1 + math.log(c)) * self._idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        return {t: w / norm for t, w in vector.items()} if norm else {}
+
+    def score(self, text: str) -> Dict[str, float]:
+        """计算每个智能体的最近邻余弦相似度"""
+        sims: Dict[int, float] = defaultdict(float)
+        for token, weight in self._vectorize(tokenize(text)).items():
+            for idx, w in self._postings.get(token, ()):
+                sims[idx] += weight * w
+
+        scores: Dict[str, float] = {}
+        for idx, sim in sims.items():
+            label = self._labels[idx]
+            if sim > scores.get(label, 0.0):
+                scores[label] = sim
+        return scores
+
+    def classify(self, text: str) -> RouteDecision:
+        """仅使用本地索引分类（不查缓存、不调用 LLM）"""
+        ranked = sorted(self.score(text).items(), key=lambda x: x[1], reverse=True)
+        if not ranked:
+            return RouteDecision(self.default_agent, 0.0, 0.0, "default")
+
+        best, best_score = ranked[0]
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        return RouteDecision(best, best_score, best_score - second_score, "index")
+
+    def is_confident(self, decision: RouteDecision) -> bool:
+        return decision.confidence >= self.min_score and decision.margin >= self.min_margin
+
+    async def route(self, text: str) -> RouteDecision:
+        """
+        路由请求
+
+        顺序：LRU 缓存 -> 本地索引 -> （低置信度时）LLM 兜底 -> 默认智能体。
+        """
+        key = " ".join(text.lower().split())
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return RouteDecision(cached.agent, cached.confidence, cached.margin, "cache")
+
+        decision = self.classify(text)
+        if not self.is_confident(decision):
+            llm_agent = await self._llm_route(text) if self.use_llm_fallback else None
+            if llm_agent:
+                decision = RouteDecision(llm_agent, decision.confidence, decision.margin, "llm")
+            elif decision.confidence < self.min_score:
+                decision = RouteDecision(
+                    self.default_agent, decision.confidence, decision.margin, "default"
+                )
+
+        self._remember(key, decision)
+        logger.debug(
+            f"[Router] {decision.agent} (source={decision.source}, "
+            f"confidence={decision.confidence:.3f}, margin={decision.margin:.3f})"
+        )
+        return decision
+
+    def _remember(self, key: str, decision: RouteDecision) -> None:
+        self._cache[key] = decision
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _llm_route(self, text: str) -> Optional[str]:
+        """让 LLM 在候选智能体中选择一个，失败或超时返回 None"""
+        from .settings import Settings
+
+        agents = sorted(set(self._labels) | set(self.descriptions))
+        options = "\n".join(f"- {a}: {self.descriptions.get(a, '')}" for a in agents)
+        prompt = (
+            "根据用户请求选择最合适的智能体，只回复智能体名称。\n"
+            f"可选智能体:\n{options}\n\n用户请求: {text}"
+        )
+
+        try:
+            response = await asyncio.wait_for(Settings.get_llm().ainvoke(prompt), self.llm_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[Router] LLM fallback timed out after {self.llm_timeout}s")
+            return None
+        except Exception as e:
+            logger.warning(f"[Router] LLM fallback failed: {e}")
+            return None
+
+        answer = str(response.content).strip().lower()
+        for agent in agents:
+            if agent in answer:
+                return agent
+        return None
+
+    def clear_cache(self) -> None:
+        self._cache.clear()
+
+
+__all__ = ["IntentRouter", "RouteDecision", "tokenize"]
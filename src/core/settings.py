@@ -2,17 +2,47 @@
 配置管理模块
 
 从环境变量加载配置，提供 LLM 实例和其他配置项。
+
+.env 与环境变量在首次读取配置项（或调用 Settings.load()）时才加载，
+LLM 客户端库在首次调用 get_llm() 时才导入，导入本模块本身没有副作用。
 """
 
 import os
-from typing import Optional
-from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+_UNSET = object()
+
+
+def _flag(value: str) -> bool:
+    return value.lower() == "true"
+
+
+class _Env:
+    """
+    从环境变量读取的配置项
+
+    首次访问时加载 .env 并按 parse 解析，结果缓存（Settings.load(reload=True) 时清除）。
+    直接给类属性赋值（Settings.LOG_LEVEL = "DEBUG"）会覆盖该配置项。
+    """
+
+    def __init__(self, default: Any, parse: Callable[[str], Any] = str):
+        self.default = default
+        self.parse = parse
+        self.name = ""
+        self.value: Any = _UNSET
 
-from langchain_openai import ChatOpenAI
-from langchain_core.language_models import BaseChatModel
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
 
-# 加载环境变量
-load_dotenv()
+    def __get__(self, instance, owner) -> Any:
+        if self.value is _UNSET:
+            owner.load()
+            raw = os.getenv(self.name)
+            self.value = self.default if raw is None else self.parse(raw)
+        return self.value
 
 
 class Settings:
@@ -23,27 +53,88 @@ class Settings:
     """
 
     # KIMI API 配置
-    KIMI_API_KEY: str = os.getenv("KIMI_API_KEY", "")
-    KIMI_BASE_URL: str = os.getenv("KIMI_BASE_URL", "https://api.moonshot.cn/v1")
-    KIMI_MODEL: str = os.getenv("KIMI_MODEL", "moonshot-v1-8k")
+    KIMI_API_KEY = _Env("")
+    KIMI_BASE_URL = _Env("https://api.moonshot.cn/v1")
+    KIMI_MODEL = _Env("moonshot-v1-8k")
 
     # Tavily API 配置
-    TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
+    TAVILY_API_KEY = _Env("")
 
     # 日志配置
-    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVEL = _Env("INFO")
+    # 日志文件目录，为空时只输出到控制台
+    LOG_DIR = _Env("logs")
+    # 异步批量写日志（后台线程），队列满时 drop 丢弃 / block 阻塞
+    LOG_ASYNC = _Env(True, _flag)
+    LOG_OVERFLOW = _Env("drop")
+    # 额外写入结构化 JSON 行日志 logs/events_*.jsonl（带 run_id）
+    LOG_JSON = _Env(False, _flag)
+
+    # 遥测配置：METRICS_PORT > 0 时提供 Prometheus /metrics 端点；
+    # TRACE_EXPORT_DIR 非空时每次运行的追踪以 OTLP JSON 写入该目录
+    METRICS_PORT = _Env(0, int)
+    TRACE_EXPORT_DIR = _Env("")
+
+    # CLI 后台进程：单次查询默认转发给常驻后台进程（Unix socket），空闲超时后自动退出；
+    # DAEMON_SOCKET 为空时按工作目录生成路径
+    DAEMON = _Env(True, _flag)
+    DAEMON_IDLE_TIMEOUT = _Env(600.0, float)
+    DAEMON_SOCKET = _Env("")
+
+    # 提示词组装：PROMPT_TOKENIZER 为 tiktoken 编码名（如 cl100k_base，为空时按字符估算 token），
+    # PROMPT_MAX_TOKENS > 0 时超出预算的早期历史会被裁剪
+    PROMPT_TOKENIZER = _Env("")
+    PROMPT_MAX_TOKENS = _Env(0, int)
+    # 按用户消息选出的工具数（另加固定工具与已调用过的工具），<= 0 时绑定全部工具
+    TOOL_TOP_K = _Env(8, int)
+    # ReAct 智能体流式调用 LLM，工具调用参数完整后立即执行（不等整条回复生成完）
+    TOOL_EARLY_DISPATCH = _Env(True, _flag)
+    # 运行开始时按预取规则与学习到的调用统计投机调用只读工具，结果缓存 PREFETCH_TTL 秒
+    PREFETCH = _Env(True, _flag)
+    PREFETCH_TTL = _Env(60.0, float)
+    # ReAct 智能体按请求模板回放已确认（出现 PLAN_CACHE_MIN_SUPPORT 次）的工具调用轨迹，跳过 LLM
+    PLAN_CACHE = _Env(True, _flag)
+    PLAN_CACHE_MIN_SUPPORT = _Env(2, int)
+
+    # 检查点：CHECKPOINT_DB 非空时各智能体的图把每步状态以增量形式保存到该 SQLite 文件，
+    # 每 CHECKPOINT_SNAPSHOT_INTERVAL 个增量写一次完整快照
+    CHECKPOINT_DB = _Env("")
+    CHECKPOINT_SNAPSHOT_INTERVAL = _Env(16, int)
 
     # 数据库配置
-    DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///data/database.db")
+    DATABASE_URL = _Env("sqlite:///data/database.db")
 
     # LangGraph 配置
-    LANGCHAIN_TRACING_V2: bool = (
-        os.getenv("LANGCHAIN_TRACING_V2", "false").lower() == "true"
-    )
-    LANGCHAIN_API_KEY: Optional[str] = os.getenv("LANGCHAIN_API_KEY")
-    LANGCHAIN_PROJECT: str = os.getenv("LANGCHAIN_PROJECT", "langgraph-mcp-bootcamp")
+    LANGCHAIN_TRACING_V2 = _Env(False, _flag)
+    LANGCHAIN_API_KEY = _Env(None)
+    LANGCHAIN_PROJECT = _Env("langgraph-mcp-bootcamp")
 
-    _llm_instance: Optional[BaseChatModel] = None
+    _llm_instance: Optional["BaseChatModel"] = None
+    _loaded: bool = False
+
+    @classmethod
+    def load(cls, reload: bool = False) -> None:
+        """
+        加载 .env 到环境变量（首次读取配置项时自动调用）
+
+        Args:
+            reload: 重新加载 .env 并丢弃已缓存的配置项
+        """
+        if cls._loaded and not reload:
+            return
+        from dotenv import load_dotenv
+
+        cls._loaded = True
+        load_dotenv(override=reload)
+        if reload:
+            for attr in vars(cls).values():
+                if isinstance(attr, _Env):
+                    attr.value = _UNSET
+
+    @classmethod
+    def env_names(cls) -> list:
+        """所有配置项对应的环境变量名"""
+        return [name for name, attr in vars(cls).items() if isinstance(attr, _Env)]
 
     @classmethod
     def get_llm(
@@ -52,7 +143,7 @@ class Settings:
         model: Optional[str] = None,
         api_key: Optional[str] = None,
         base_url: Optional[str] = None,
-    ) -> BaseChatModel:
+    ) -> "BaseChatModel":
         """
         获取 LLM 实例
 
@@ -73,6 +164,8 @@ class Settings:
             if not api_key:
                 raise ValueError("KIMI_API_KEY 未设置，请在 .env 文件中配置")
 
+            from langchain_openai import ChatOpenAI
+
             cls._llm_instance = ChatOpenAI(
                 model=model,
                 api_key=api_key,
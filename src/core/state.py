@@ -1,20 +1,70 @@
 """
 通用 State 定义
+
+节点只返回本步变化的键（增量更新），列表与字典字段通过 reducer 合并：
+messages 追加新消息、context 按键合并、其他列表字段追加，
+每一步的开销与增量大小成正比，而不是与整个状态的大小成正比。
+
+启用检查点后，同一 thread_id 的下一次运行会在上一轮状态上继续合并。
+智能体 run() 的入口状态用 langgraph.types.Overwrite 写入本轮的初始值（绕过 reducer），
+否则上一轮的 context、路线、分支错误等会累积到新一轮中；messages 保留为对话历史。
 """
 
 from typing import Any, Dict, List, Optional, TypedDict, Annotated
-from langchain_core.messages import BaseMessage
+from uuid import uuid4
+
+from langchain_core.messages import BaseMessage, RemoveMessage, convert_to_messages
 from langgraph.graph.message import add_messages
 
+from .tool_results import RoutePlan, TicketQueryResult, WeatherInfo
+
+
+def merge_dicts(left: Optional[Dict[str, Any]], right: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """字典合并 reducer，用于并行分支各自写入不同的键"""
+    return {**(left or {}), **(right or {})}
+
+
+def extend_list(left: Optional[List[Any]], right: Optional[List[Any]]) -> List[Any]:
+    """列表追加 reducer：节点只返回新增的元素"""
+    if not right:
+        return left or []
+    return (left or []) + list(right)
+
+
+def _is_new_message(message: Any) -> bool:
+    if isinstance(message, RemoveMessage):
+        return False
+    if isinstance(message, dict):
+        return message.get("id") is None
+    return getattr(message, "id", None) is None
+
+
+def append_messages(left: List[BaseMessage], right: Any) -> List[BaseMessage]:
+    """
+    messages 的 reducer，语义与 add_messages 相同
+
+    节点新建的消息（没有 id）直接转换并追加，不再重新遍历、转换已有消息；
+    带 id 的消息（可能替换或删除已有消息）以及首次写入仍交给 add_messages。
+    """
+    if not isinstance(right, list):
+        right = [right]
+    if not left or not all(_is_new_message(m) for m in right):
+        return add_messages(left, right)
+    new = convert_to_messages(right)
+    for message in new:
+        if message.id is None:
+            message.id = str(uuid4())
+    return left + new
+
 
 class AgentState(TypedDict):
     """通用智能体状态"""
 
-    messages: Annotated[List[BaseMessage], add_messages]
+    messages: Annotated[List[BaseMessage], append_messages]
     next: Optional[str]
     result: Optional[Any]
     error: Optional[str]
-    context: Dict[str, Any]
+    context: Annotated[Dict[str, Any], merge_dicts]
 
 
 class BrowserAgentState(AgentState):
@@ -22,8 +72,8 @@ class BrowserAgentState(AgentState):
 
     url: Optional[str]
     page_content: Optional[str]
-    screenshots: List[str]
-    actions: List[Dict[str, Any]]
+    screenshots: Annotated[List[str], extend_list]
+    actions: Annotated[List[Dict[str, Any]], extend_list]
 
 
 class TravelAgentState(AgentState):
@@ -32,8 +82,10 @@ class TravelAgentState(AgentState):
     origin: Optional[str]
     destination: Optional[str]
     date: Optional[str]
-    ticket_info: Optional[Dict[str, Any]]
-    route_options: List[Dict[str, Any]]
+    ticket_info: Optional[TicketQueryResult]
+    route_options: Annotated[List[RoutePlan], extend_list]
+    weather: Optional[WeatherInfo]
+    branch_errors: Annotated[Dict[str, str], merge_dicts]
 
 
 class DataAgentState(AgentState):
@@ -43,3 +95,10 @@ class DataAgentState(AgentState):
     sql: Optional[str]
     data: Optional[List[Dict[str, Any]]]
     visualization: Optional[Dict[str, Any]]
+
+
+class SupervisorState(AgentState):
+    """多智能体编排状态"""
+
+    subtasks: Annotated[List[Dict[str, Any]], extend_list]
+    sub_results: Annotated[List[Dict[str, Any]], extend_list]
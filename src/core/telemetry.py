@@ -0,0 +1,665 @@
+"""
+运行时遥测
+
+- 指标：图节点、LLM 调用（含 prompt/completion token）、MCP 工具调用
+  （拆分为排队/传输/服务端耗时）、MCP 服务器启动耗时，以直方图/计数器记录，
+  通过 Prometheus 文本格式导出（start_metrics_server 提供 /metrics 端点）
+- 追踪：与 OpenTelemetry 数据模型一致的 span（trace_id/span_id/父子关系/属性/状态），
+  不依赖 SDK 和 collector，离线可用；每次运行结束生成耗时汇总，也可导出为 OTLP JSON
+
+用法:
+    with trace_run("orchestrator.run") as trace:
+        await graph.ainvoke(state)      # 图节点与 LLM 调用经回调自动记录
+    print(trace.format_summary())
+"""
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables.config import var_child_runnable_config
+from langchain_core.tracers.context import register_configure_hook
+
+# 服务端在 CallToolResult._meta 中返回的处理耗时（毫秒），见 mcp_servers.launcher
+SERVER_TIME_META = "server_time_ms"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# ==================== 指标 ====================
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        return "\n".join(header + self._samples())
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] += amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value:g}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图（Prometheus 语义：le 桶为累计计数）"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [各桶计数..., 总和, 总数]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    row[i] += 1
+            row[-2] += value
+            row[-1] += 1
+
+    def snapshot(self, **labels) -> Tuple[float, int]:
+        """返回 (总和, 次数)"""
+        row = self._values.get(self._key(labels))
+        return (row[-2], int(row[-1])) if row else (0.0, 0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(row)) for key, row in self._values.items()]
+        lines = []
+        for key, row in items:
+            for bound, count in zip(self.buckets, row):
+                labels = _format_labels(self.label_names, key, f'le="{bound:g}"')
+                lines.append(f"{self.name}_bucket{labels} {count:g}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {row[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {row[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {row[-1]:g}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def _register(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式 (version 0.0.4)"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+RUN_SECONDS = REGISTRY.histogram(
+    "agent_run_duration_seconds", "Duration of a traced agent run", ("name",)
+)
+NODE_SECONDS = REGISTRY.histogram(
+    "graph_node_duration_seconds", "Duration of a LangGraph node", ("graph", "node")
+)
+LLM_SECONDS = REGISTRY.histogram("llm_call_duration_seconds", "Duration of an LLM call", ("model",))
+LLM_TOKENS = REGISTRY.counter("llm_tokens_total", "LLM tokens by kind (prompt/completion)", ("model", "kind"))
+TOOL_SECONDS = REGISTRY.histogram(
+    "mcp_tool_call_duration_seconds",
+    "MCP tool call duration by phase (total/queue/transport/server)",
+    ("server", "tool", "phase"),
+)
+TOOL_CALLS = REGISTRY.counter(
+    "mcp_tool_calls_total", "MCP tool calls by status (ok/error/cache_hit)", ("server", "tool", "status")
+)
+PREFETCH_CALLS = REGISTRY.counter(
+    "mcp_prefetch_total",
+    "Speculative tool prefetches by outcome (used/unused/error)",
+    ("agent", "server", "tool", "outcome"),
+)
+SERVER_STARTUP_SECONDS = REGISTRY.histogram(
+    "mcp_server_startup_seconds", "Time to spawn/connect and initialize an MCP server session", ("server",)
+)
+
+
+# ==================== 追踪 ====================
+
+# OTLP 枚举值
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """与 OpenTelemetry 数据模型一致的 span"""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.start_ns = time.time_ns()
+        self._start_perf = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+
+    @property
+    def duration(self) -> float:
+        """耗时（秒）；未结束时为到目前为止的耗时"""
+        if self.end_ns is None:
+            return (time.perf_counter_ns() - self._start_perf) / 1e9
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self, error: Optional[BaseException] = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._start_perf)
+        if error is not None:
+            self.status = STATUS_ERROR
+            self.status_message = f"{type(error).__name__}: {error}"
+        elif self.status == STATUS_UNSET:
+            self.status = STATUS_OK
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": self.status, "message": self.status_message},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """一次运行的全部 span"""
+
+    def __init__(self, name: str, attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span(name, self.trace_id, attributes=attributes)
+        self.spans: List[Span] = [self.root]
+        self.handler = TelemetryCallbackHandler(self)
+
+    @property
+    def name(self) -> str:
+        return self.root.name
+
+    def start_span(
+        self,
+        name: str,
+        parent: Optional[Span] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+    ) -> Span:
+        span = Span(name, self.trace_id, (parent or self.root).span_id, kind, attributes)
+        self.spans.append(span)
+        return span
+
+    def summary(self) -> Dict[str, Any]:
+        """按 span 名称聚合的耗时汇总"""
+        groups: Dict[str, Dict[str, float]] = {}
+        tokens = {"prompt": 0, "completion": 0}
+        errors = 0
+        for span in self.spans[1:]:
+            group = groups.setdefault(span.name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            ms = span.duration * 1000
+            group["count"] += 1
+            group["total_ms"] += ms
+            group["max_ms"] = max(group["max_ms"], ms)
+            tokens["prompt"] += span.attributes.get("llm.usage.prompt_tokens", 0)
+            tokens["completion"] += span.attributes.get("llm.usage.completion_tokens", 0)
+            errors += span.status == STATUS_ERROR
+        for group in groups.values():
+            group["total_ms"] = round(group["total_ms"], 3)
+            group["max_ms"] = round(group["max_ms"], 3)
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": round(self.root.duration * 1000, 3),
+            "span_count": len(self.spans),
+            "errors": errors,
+            "tokens": tokens,
+            "spans": dict(sorted(groups.items(), key=lambda kv: -kv[1]["total_ms"])),
+        }
+
+    def format_summary(self, limit: int = 10) -> str:
+        summary = self.summary()
+        lines = [
+            f"[Trace] {summary['name']} {summary['duration_ms']:.1f}ms "
+            f"(spans={summary['span_count']}, errors={summary['errors']}, "
+            f"tokens={summary['tokens']['prompt']}+{summary['tokens']['completion']})"
+        ]
+        for name, group in list(summary["spans"].items())[:limit]:
+            lines.append(
+                f"  {name}: {group['count']}x total={group['total_ms']:.1f}ms max={group['max_ms']:.1f}ms"
+            )
+        return "\n".join(lines)
+
+    def to_otlp(self, service_name: str = "langgraph-mcp-bootcamp") -> Dict[str, Any]:
+        """OTLP/JSON 格式（ExportTraceServiceRequest），可直接发送给 collector 的 /v1/traces"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [{"key": "service.name", "value": _otlp_value(service_name)}]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": __name__},
+                            "spans": [span.to_otlp() for span in self.spans],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def export(self, directory: str) -> Path:
+        """将 OTLP JSON 写入 {directory}/{trace_id}.json"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        path = path / f"{self.trace_id}.json"
+        path.write_text(json.dumps(self.to_otlp(), ensure_ascii=False), encoding="utf-8")
+        return path
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("telemetry_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("telemetry_span", default=None)
+# 运行期间自动注入到所有 LangChain Runnable 的回调（图节点、LLM 调用）
+_callback_var: ContextVar[Optional["TelemetryCallbackHandler"]] = ContextVar(
+    "telemetry_callback", default=None
+)
+register_configure_hook(_callback_var, inheritable=True)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def trace_run(name: str, **attributes) -> Iterator[Trace]:
+    """
+    追踪一次运行
+
+    作用域内的图节点与 LLM 调用通过 LangChain 回调自动记录，
+    MCP 工具调用由 MCPClientManager 记录。
+    """
+    trace = Trace(name, attributes)
+    tokens = (_current_trace.set(trace), _current_span.set(trace.root), _callback_var.set(trace.handler))
+    error: Optional[BaseException] = None
+    try:
+        yield trace
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _callback_var.reset(tokens[2])
+        _current_span.reset(tokens[1])
+        _current_trace.reset(tokens[0])
+        trace.root.end(error)
+        RUN_SECONDS.observe(trace.root.duration, name=name)
+
+
+@contextmanager
+def start_span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Iterator[Optional[Span]]:
+    """在当前 span 下创建子 span；不在 trace_run 内时不记录（返回 None）"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    parent = _current_span.get()
+    if parent is trace.root:
+        # 在图节点内调用时挂到该节点（或其中的 LLM 调用）的 span 下
+        parent = trace.handler.enclosing_span() or parent
+    span = trace.start_span(name, parent, kind, attributes)
+    token = _current_span.set(span)
+    error: Optional[BaseException] = None
+    try:
+        yield span
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end(error)
+
+
+def record_tool_call(
+    server: str,
+    tool: str,
+    total: float,
+    status: str,
+    rtt: Optional[float] = None,
+    server_time: Optional[float] = None,
+    span: Optional[Span] = None,
+) -> None:
+    """
+    记录一次 MCP 工具调用
+
+    Args:
+        total: 调用方视角的总耗时
+        rtt: 最后一次（成功的）请求往返耗时；其余为排队（批量合并窗口、建立会话、重试退避）
+        server_time: 服务端报告的处理耗时；往返耗时减去它即为传输耗时
+    """
+    TOOL_CALLS.inc(server=server, tool=tool, status=status)
+    TOOL_SECONDS.observe(total, server=server, tool=tool, phase="total")
+    phases = {}
+    if rtt is not None:
+        phases["queue"] = max(0.0, total - rtt)
+        if server_time is not None:
+            phases["server"] = server_time
+            phases["transport"] = max(0.0, rtt - server_time)
+        else:
+            phases["transport"] = rtt
+    for phase, seconds in phases.items():
+        TOOL_SECONDS.observe(seconds, server=server, tool=tool, phase=phase)
+        if span is not None:
+            span.set_attribute(f"mcp.{phase}_ms", round(seconds * 1000, 3))
+    if span is not None:
+        span.set_attribute("mcp.status", status)
+
+
+class TelemetryCallbackHandler(BaseCallbackHandler):
+    """记录图节点与 LLM 调用的 LangChain 回调"""
+
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        # run_id -> (父 run_id, 名称, 是否为图节点)
+        self._runs: Dict[UUID, Tuple[Optional[UUID], str, bool]] = {}
+        self._spans: Dict[UUID, Span] = {}
+
+    def _parent_span(self, parent_run_id: Optional[UUID]) -> Optional[Span]:
+        while parent_run_id is not None:
+            span = self._spans.get(parent_run_id)
+            if span is not None:
+                return span
+            parent_run_id = self._runs.get(parent_run_id, (None,))[0]
+        return None
+
+    def enclosing_span(self) -> Optional[Span]:
+        """当前正在执行的 Runnable（如图节点）对应的 span"""
+        config = var_child_runnable_config.get() or {}
+        parent_run_id = getattr(config.get("callbacks"), "parent_run_id", None)
+        return self._parent_span(parent_run_id)
+
+    def _graph_name(self, parent_run_id: Optional[UUID]) -> str:
+        """图节点的父 run 即图本身；子图嵌套在节点内时向上找到最近的非节点 run"""
+        while parent_run_id is not None:
+            parent, name, is_node = self._runs.get(parent_run_id, (None, "graph", False))
+            if not is_node:
+                return name
+            parent_run_id = parent
+        return "graph"
+
+    def on_chain_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        inputs: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = kwargs.get("name") or (serialized or {}).get("name") or "chain"
+        node = (metadata or {}).get("langgraph_node")
+        is_node = node is not None and name == node
+        self._runs[run_id] = (parent_run_id, name, is_node)
+        if is_node:
+            graph = self._graph_name(parent_run_id)
+            span = self.trace.start_span(
+                f"node {graph}.{node}",
+                self._parent_span(parent_run_id),
+                attributes={"graph.name": graph, "graph.node": node},
+            )
+            self._spans[run_id] = span
+
+    def _end_chain(self, run_id: UUID, error: Optional[BaseException] = None) -> None:
+        self._runs.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.end(error)
+            NODE_SECONDS.observe(
+                span.duration, graph=span.attributes["graph.name"], node=span.attributes["graph.node"]
+            )
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_chain(run_id, error)
+
+    def _start_llm(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        run_id: UUID,
+        parent_run_id: Optional[UUID],
+        metadata: Optional[Dict[str, Any]],
+        kwargs: Dict[str, Any],
+    ) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = (
+            (metadata or {}).get("ls_model_name")
+            or params.get("model")
+            or params.get("model_name")
+            or kwargs.get("name")
+            or "llm"
+        )
+        self._runs[run_id] = (parent_run_id, model, False)
+        self._spans[run_id] = self.trace.start_span(
+            f"llm {model}",
+            self._parent_span(parent_run_id),
+            SPAN_KIND_CLIENT,
+            {"llm.model": model},
+        )
+
+    def on_chat_model_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        messages: Any,
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    def on_llm_start(
+        self,
+        serialized: Optional[Dict[str, Any]],
+        prompts: List[str],
+        *,
+        run_id: UUID,
+        parent_run_id: Optional[UUID] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        self._start_llm(serialized, run_id, parent_run_id, metadata, kwargs)
+
+    @staticmethod
+    def _token_usage(response: LLMResult) -> Tuple[int, int]:
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            return usage.get("prompt_tokens", 0) or 0, usage.get("completion_tokens", 0) or 0
+        prompt = completion = 0
+        for generations in response.generations:
+            for generation in generations:
+                meta = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                prompt += meta.get("input_tokens", 0)
+                completion += meta.get("output_tokens", 0)
+        return prompt, completion
+
+    def _end_llm(self, run_id: UUID, response: Optional[LLMResult], error: Optional[BaseException]) -> None:
+        _, model, _ = self._runs.pop(run_id, (None, "llm", False))
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        if response is not None:
+            prompt, completion = self._token_usage(response)
+            span.set_attribute("llm.usage.prompt_tokens", prompt)
+            span.set_attribute("llm.usage.completion_tokens", completion)
+            LLM_TOKENS.inc(prompt, model=model, kind="prompt")
+            LLM_TOKENS.inc(completion, model=model, kind="completion")
+        span.end(error)
+        LLM_SECONDS.observe(span.duration, model=model)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_llm(run_id, response, None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end_llm(run_id, None, error)
+
+
+# ==================== Prometheus 端点 ====================
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry: MetricsRegistry = REGISTRY
+
+    def do_GET(self) -> None:
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = self.registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+def start_metrics_server(
+    port: int, host: str = "127.0.0.1", registry: MetricsRegistry = REGISTRY
+) -> ThreadingHTTPServer:
+    """在后台线程提供 http://{host}:{port}/metrics，返回的 server 可用 shutdown() 停止"""
+    handler = type("MetricsRequestHandler", (_MetricsRequestHandler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
+
+
+__all__ = [
+    "REGISTRY",
+    "SERVER_TIME_META",
+    "Counter",
+    "Histogram",
+    "MetricsRegistry",
+    "Span",
+    "Trace",
+    "TelemetryCallbackHandler",
+    "current_trace",
+    "record_tool_call",
+    "start_metrics_server",
+    "start_span",
+    "trace_run",
+]
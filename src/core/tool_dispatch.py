@@ -0,0 +1,130 @@
+"""
+流式工具调用的提前执行
+
+ReAct 循环通常等 LLM 输出完整的 AIMessage 后才交给 ToolNode 执行工具。
+EarlyToolDispatcher 改为消费 LLM 的流式输出：某个工具调用的参数 JSON 一旦完整，
+立即在后台开始执行，模型继续生成后续调用或文本的同时工具 I/O 已在进行。
+流结束后等待所有调用完成，按 AIMessage.tool_calls 的顺序返回 ToolMessage。
+
+- 参数在流结束前无法判定完整（或模型不支持流式、一次性返回整条消息）的调用在流结束后执行
+- 工具不存在或执行出错时返回 status="error" 的 ToolMessage，与 ToolNode 的默认行为一致
+- LLM 流出错或节点被取消时，已开始的工具调用一并取消
+
+用法:
+    dispatcher = EarlyToolDispatcher(tools)
+    message, results = await dispatcher.run(llm, messages)
+    return {"messages": [message, *results]}
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, ToolMessage
+from langchain_core.messages.utils import message_chunk_to_message
+
+from .logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def complete_args(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    """参数 JSON 已完整时返回解析结果，否则返回 None"""
+    if not raw or not raw.rstrip().endswith("}"):
+        # 未以 } 结尾一定不完整，避免对长参数逐块重复解析
+        return None
+    try:
+        args = json.loads(raw)
+    except ValueError:
+        return None
+    return args if isinstance(args, dict) else None
+
+
+class EarlyToolDispatcher:
+    """
+    在 LLM 流式输出过程中提前执行工具调用
+
+    Args:
+        tools: 可执行的工具（通常与 ToolNode 相同）
+    """
+
+    def __init__(self, tools: Sequence[Any]):
+        self.tools = {tool.name: tool for tool in tools}
+        self.stats = {"turns": 0, "calls": 0, "early": 0}
+
+    async def _call(self, name: str, args: Dict[str, Any], call_id: str) -> ToolMessage:
+        tool = self.tools.get(name)
+        if tool is None:
+            return ToolMessage(
+                content=f"Error: {name} is not a valid tool, try one of [{', '.join(sorted(self.tools))}].",
+                name=name,
+                tool_call_id=call_id,
+                status="error",
+            )
+        try:
+            result = await tool.ainvoke({"name": name, "args": args, "id": call_id, "type": "tool_call"})
+        except Exception as e:
+            return ToolMessage(
+                content=f"Error: {e!r}\n Please fix your mistakes.",
+                name=name,
+                tool_call_id=call_id,
+                status="error",
+            )
+        if isinstance(result, ToolMessage):
+            return result
+        return ToolMessage(content=str(result), name=name, tool_call_id=call_id)
+
+    async def execute(self, tool_calls: Sequence[Dict[str, Any]]) -> List[ToolMessage]:
+        """并发执行一组完整的工具调用，按顺序返回结果"""
+        return list(
+            await asyncio.gather(*(self._call(c["name"], c["args"], c["id"]) for c in tool_calls))
+        )
+
+    async def run(
+        self, llm: Any, messages: Sequence[BaseMessage]
+    ) -> Tuple[AIMessage, List[ToolMessage]]:
+        """流式调用 llm，返回完整的 AIMessage 及其全部工具调用的结果"""
+        started: Dict[str, asyncio.Task] = {}
+        merged: Optional[BaseMessage] = None
+        try:
+            async for chunk in llm.astream(messages):
+                merged = chunk if merged is None else merged + chunk
+                if not isinstance(merged, AIMessageChunk):
+                    continue
+                for call in merged.tool_call_chunks:
+                    call_id, name = call.get("id"), call.get("name")
+                    if not call_id or not name or call_id in started:
+                        continue
+                    args = complete_args(call.get("args"))
+                    if args is not None:
+                        started[call_id] = asyncio.create_task(self._call(name, args, call_id))
+            if merged is None:
+                raise ValueError("LLM 没有返回任何输出")
+            message = (
+                message_chunk_to_message(merged) if isinstance(merged, AIMessageChunk) else merged
+            )
+        except BaseException:
+            for task in started.values():
+                task.cancel()
+            raise
+
+        early = len(started)
+        tasks = [
+            started.pop(call["id"], None)
+            or asyncio.ensure_future(self._call(call["name"], call["args"], call["id"]))
+            for call in message.tool_calls
+        ]
+        # 最终消息中不存在的调用（理论上不会出现）不再需要
+        for task in started.values():
+            task.cancel()
+        results = list(await asyncio.gather(*tasks))
+
+        self.stats["turns"] += 1
+        self.stats["calls"] += len(tasks)
+        self.stats["early"] += min(early, len(tasks))
+        if tasks:
+            logger.debug(f"[tools] {len(tasks)} 个工具调用，其中 {early} 个在流式输出期间开始执行")
+        return message, results
+
+
+__all__ = ["EarlyToolDispatcher", "complete_args"]
@@ -0,0 +1,93 @@
+"""
+MCP 工具结构化结果类型
+
+与 src/mcp_servers 中各工具声明的 outputSchema 对应。
+MCPClientManager.call_tool() 直接返回服务器的 structuredContent，
+智能体可以按这些类型读取并写入状态，无需再解析文本。
+"""
+
+from typing import Any, Dict, List, Optional, TypedDict
+
+
+class TicketQueryResult(TypedDict, total=False):
+    """12306.query_train_tickets"""
+
+    origin: str
+    destination: str
+    date: str
+    tickets: List[Dict[str, Any]]
+    count: int
+    transfers: List[Dict[str, Any]]
+
+
+class TrainDetail(TypedDict, total=False):
+    """12306.get_train_detail"""
+
+    train_no: str
+    type: str
+    running_days: List[int]
+    seat_classes: List[str]
+    stations: List[Dict[str, Any]]
+    error: str
+
+
+class RoutePlan(TypedDict, total=False):
+    """amap.plan_route，不可达或未知地点时只有 error"""
+
+    origin: str
+    destination: str
+    mode: str
+    distance: str
+    duration: str
+    distance_m: float
+    duration_s: int
+    routes: List[Dict[str, Any]]
+    polyline: List[List[float]]
+    error: str
+
+
+class PoiSearchResult(TypedDict, total=False):
+    """amap.search_poi"""
+
+    keywords: str
+    city: str
+    pois: List[Dict[str, Any]]
+    count: int
+
+
+class WeatherInfo(TypedDict, total=False):
+    """amap.get_weather"""
+
+    city: str
+    weather: str
+    temperature: str
+    humidity: str
+
+
+class SqlRows(TypedDict, total=False):
+    """nl2sql.execute_sql / nl2sql.nl2sql"""
+
+    sql: str
+    rows: List[Dict[str, Any]]
+    count: int
+
+
+class SqlSchema(TypedDict, total=False):
+    """nl2sql.get_schema，tables 为 [{"name": 表名, "columns": [列名, ...]}, ...]"""
+
+    tables: List[Dict[str, Any]]
+
+
+class BatchItem(TypedDict, total=False):
+    """批量工具 (*_batch) 的单项结果"""
+
+    ok: bool
+    result: Optional[Any]
+    error: str
+
+
+class BatchResult(TypedDict):
+    """批量工具 (*_batch) 的返回"""
+
+    results: List[BatchItem]
+    count: int
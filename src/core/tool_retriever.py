@@ -0,0 +1,133 @@
+"""
+按请求选择工具子集
+
+把所有服务器的工具一次性绑定给 LLM 时，工具 schema 每轮都要占用大量 prompt token。
+ToolRetriever 为每个工具的名称、描述、参数（以及调用方提供的中文提示词）建立本地
+TF-IDF 索引（复用 IntentRouter 的索引与打分），根据用户消息选出最相关的 top_k 个工具，
+再加上固定工具与对话中已调用过的工具。
+
+检索只看用户消息，不看工具结果与模型回复：一次运行内各轮选出的子集相同，
+工具 schema 所在的提示词前缀不会在轮次之间变化（否则前缀缓存每轮失效）。
+模型只能调用已绑定的工具，回放的调用在第一轮之前写入，因此“已调用的工具”也不会让子集在运行中途变化。
+
+同一工具子集对应的绑定结果（如 llm.bind_tools 后的模型）按子集缓存，子集不变时直接复用。
+
+用法:
+    retriever = ToolRetriever(tools, top_k=6, pinned=["write_file"], hints={"write_file": "保存 文件"})
+    subset = retriever.select(state["messages"])
+    llm = retriever.bound(subset, lambda tools: Settings.get_llm().bind_tools(tools))
+"""
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from langchain_core.messages import BaseMessage
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .logger import get_logger
+from .router import IntentRouter
+
+logger = get_logger(__name__)
+
+
+def _tool_samples(tool: Any, hint: str = "") -> List[str]:
+    """工具的索引文本：名称（下划线拆词）、描述、各参数的名称与描述、提示词"""
+    function = convert_to_openai_tool(tool)["function"]
+    name = function["name"]
+    samples = [f"{name} {name.replace('_', ' ')}"]
+    if function.get("description"):
+        samples.append(function["description"])
+    properties = (function.get("parameters") or {}).get("properties") or {}
+    params = [
+        f"{key.replace('_', ' ')} {spec.get('description', '')}" for key, spec in properties.items()
+    ]
+    if params:
+        samples.append(" ".join(params))
+    if hint:
+        samples.append(hint)
+    return samples
+
+
+class ToolRetriever:
+    """
+    工具检索器
+
+    Args:
+        tools: 全部可用工具
+        top_k: 每轮按相关度选出的工具数（<= 0 或工具总数不超过 top_k 时不做筛选）
+        pinned: 始终包含的工具名
+        hints: 工具名 -> 额外的索引文本（如中文关键词，弥补英文描述与中文请求之间的词汇差异）
+        min_score: 低于该相似度的工具不参与 top_k
+        cache_size: 缓存的工具子集绑定结果数量
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[Any],
+        top_k: int = 8,
+        pinned: Sequence[str] = (),
+        hints: Optional[Dict[str, str]] = None,
+        min_score: float = 0.05,
+        cache_size: int = 32,
+    ):
+        self.tools = {tool.name: tool for tool in tools}
+        self.top_k = top_k
+        self.pinned = [name for name in pinned if name in self.tools]
+        self.min_score = min_score
+        self.cache_size = cache_size
+        hints = hints or {}
+        self._index = IntentRouter(
+            {name: _tool_samples(tool, hints.get(name, "")) for name, tool in self.tools.items()},
+            use_llm_fallback=False,
+        )
+        self._bound: "OrderedDict[Tuple[str, ...], Any]" = OrderedDict()
+        self.stats = {"selections": 0, "tools_selected": 0, "bind_hits": 0, "bind_misses": 0}
+
+    @staticmethod
+    def _query(messages: Union[str, Sequence[BaseMessage]]) -> Tuple[str, List[str]]:
+        """检索文本（全部用户消息）及对话中已调用的工具名"""
+        if isinstance(messages, str):
+            return messages, []
+        texts, called = [], []
+        for message in messages:
+            if message.type == "human" and isinstance(message.content, str):
+                texts.append(message.content)
+            for call in getattr(message, "tool_calls", None) or ():
+                called.append(call["name"])
+        return " ".join(texts), called
+
+    def select(self, messages: Union[str, Sequence[BaseMessage]]) -> List[Any]:
+        """返回绑定的工具（按名称排序），同一请求的各轮结果相同"""
+        if self.top_k <= 0 or len(self.tools) <= self.top_k:
+            return [self.tools[name] for name in sorted(self.tools)]
+
+        text, called = self._query(messages)
+        ranked = sorted(self._index.score(text).items(), key=lambda x: (-x[1], x[0]))
+        chosen = set(self.pinned) | {name for name in called if name in self.tools}
+        chosen.update(name for name, score in ranked[: self.top_k] if score >= self.min_score)
+        if not chosen:
+            # 没有任何线索时不限制，避免模型无工具可用
+            chosen = set(self.tools)
+
+        self.stats["selections"] += 1
+        self.stats["tools_selected"] += len(chosen)
+        return [self.tools[name] for name in sorted(chosen)]
+
+    def bound(self, subset: Sequence[Any], factory: Callable[[List[Any]], Any]) -> Any:
+        """返回该工具子集的绑定结果，首次使用时由 factory(subset) 创建并缓存"""
+        key = tuple(sorted(tool.name for tool in subset))
+        cached = self._bound.get(key)
+        if cached is not None:
+            self.stats["bind_hits"] += 1
+            self._bound.move_to_end(key)
+            return cached
+        self.stats["bind_misses"] += 1
+        value = factory([self.tools[name] for name in key])
+        self._bound[key] = value
+        if len(self._bound) > self.cache_size:
+            self._bound.popitem(last=False)
+        logger.debug(f"[tools] 绑定工具子集: {', '.join(key)}")
+        return value
+
+
+__all__ = ["ToolRetriever"]
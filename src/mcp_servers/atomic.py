@@ -0,0 +1,43 @@
+"""
+原子写文件
+
+路网、ALT 地标、POI 库等数据文件由服务器首次启动时生成，其他进程可能同时打开（或 mmap）同一路径。
+先写入同目录下的临时文件，完成后 os.replace 到目标路径：读者看到的要么是旧文件，要么是完整的新文件。
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional
+
+
+@contextmanager
+def atomic_write(path: str, mode: str = "wb", encoding: Optional[str] = None) -> Iterator[IO]:
+    """
+    以原子方式写入 path
+
+    用法:
+        with atomic_write("data/road_network.bin") as f:
+            f.write(data)
+    """
+    target = Path(path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".tmp", dir=target.parent)
+    try:
+        # mkstemp 创建的文件只有属主可读，与直接 open 创建的文件保持一致
+        os.chmod(tmp, 0o644)
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+__all__ = ["atomic_write"]
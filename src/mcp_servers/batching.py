@@ -0,0 +1,71 @@
+"""
+批量工具辅助函数
+
+批量工具统一使用 {"items": [单次调用参数, ...]} 作为输入，
+返回与输入一一对应的 [{"ok": true, "result": ...} | {"ok": false, "error": ...}]。
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, List, Optional
+
+
+def batch_schema(item_schema: Dict[str, Any], max_items: int = 100) -> Dict[str, Any]:
+    """由单次调用的 inputSchema 生成批量工具的 inputSchema"""
+    return {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "items": item_schema,
+                "maxItems": max_items,
+                "description": "每一项为一次单独调用的参数",
+            }
+        },
+        "required": ["items"],
+    }
+
+
+def batch_output_schema(result_schema: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """批量工具的 outputSchema，result_schema 为单次调用结果的 schema"""
+    item = {
+        "type": "object",
+        "properties": {
+            "ok": {"type": "boolean"},
+            "result": result_schema or {},
+            "error": {"type": "string"},
+        },
+        "required": ["ok"],
+    }
+    return {
+        "type": "object",
+        "properties": {
+            "results": {"type": "array", "items": item},
+            "count": {"type": "integer"},
+        },
+        "required": ["results", "count"],
+    }
+
+
+async def run_batch(
+    handler: Callable[[Dict[str, Any]], Any],
+    items: List[Dict[str, Any]],
+    max_concurrency: int = 8,
+) -> List[Dict[str, Any]]:
+    """
+    并发执行批量调用
+
+    handler 为同步函数，放入线程池执行，单项失败不影响其它项。
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(arguments: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"ok": True, "result": await asyncio.to_thread(handler, arguments)}
+            except Exception as e:
+                return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+
+    return await asyncio.gather(*(run_one(arguments) for arguments in items))
+
+
+__all__ = ["batch_schema", "batch_output_schema", "run_batch"]
@@ -0,0 +1,324 @@
+"""
+MCP Server 启动器
+
+内置服务器共用的启动逻辑，支持两种传输方式：
+
+- stdio（默认）：由客户端拉起子进程，与原有用法一致
+- streamable-http：作为常驻 HTTP 服务运行，可多 worker 进程，
+  多个编排器实例共享同一批已预热的服务器
+
+单个服务器:
+    python src/mcp_servers/server_amap.py --transport streamable-http --port 8102 --workers 4
+
+同时启动多个服务器（端口从 --base-port 依次递增）:
+    python src/mcp_servers/launcher.py 12306 amap nl2sql --base-port 8101 --workers 2
+
+客户端在 mcp_config.json 中改为:
+    {"name": "amap", "type": "streamable_http", "url": "http://127.0.0.1:8102/mcp"}
+"""
+
+import argparse
+import importlib
+import os
+import signal
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Callable, List, Optional
+
+SERVERS_DIR = Path(__file__).resolve().parent
+
+# 多 worker 时由 uvicorn 在子进程中通过该环境变量找到服务器模块
+SERVER_MODULE_ENV = "MCP_SERVER_MODULE"
+STATELESS_ENV = "MCP_HTTP_STATELESS"
+
+# 在 CallToolResult._meta 中返回的服务端处理耗时（毫秒），客户端据此拆分传输与服务端耗时
+# （与 core.telemetry.SERVER_TIME_META 一致）
+SERVER_TIME_META = "server_time_ms"
+
+# 可由启动器统一拉起的服务器（名称与 mcp_config.json 中一致）
+BUNDLED_SERVERS = {
+    "12306": "server_12306",
+    "amap": "server_amap",
+    "nl2sql": "server_nl2sql",
+    "python": "server_python",
+    "archive": "server_archive",
+}
+
+
+def _parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="启动 MCP Server")
+    parser.add_argument(
+        "--transport",
+        choices=["stdio", "streamable-http"],
+        default=os.getenv("MCP_TRANSPORT", "stdio"),
+    )
+    parser.add_argument("--host", default=os.getenv("MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("MCP_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("MCP_WORKERS", "1")))
+    parser.add_argument(
+        "--stateless",
+        action="store_true",
+        help="无状态模式（每个请求独立处理）；workers > 1 时自动开启",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=10.0,
+        help="收到 SIGTERM 后等待进行中请求完成的秒数",
+    )
+    return parser.parse_args(argv)
+
+
+def _hook(module: Any, name: str) -> Optional[Callable[[], None]]:
+    """服务器模块可选定义 prepare()（启动时预热）与 shutdown()（退出时释放资源）"""
+    hook = getattr(module, name, None)
+    return hook if callable(hook) else None
+
+
+def _report_server_time(server) -> None:
+    """包装 tools/call 处理器，在结果的 _meta 中附带服务端处理耗时"""
+    from mcp import types
+
+    handler = server.request_handlers.get(types.CallToolRequest)
+    if handler is None or getattr(handler, "reports_server_time", False):
+        return
+
+    async def timed_handler(request):
+        start = time.perf_counter()
+        response = await handler(request)
+        result = response.root
+        if isinstance(result, types.CallToolResult):
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+            result.meta = {**(result.meta or {}), SERVER_TIME_META: elapsed_ms}
+        return response
+
+    timed_handler.reports_server_time = True
+    server.request_handlers[types.CallToolRequest] = timed_handler
+
+
+class _StreamableHTTPEndpoint:
+    """把 MCP 请求转交给 session manager 的 ASGI 端点"""
+
+    def __init__(self, session_manager):
+        self.session_manager = session_manager
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.session_manager.handle_request(scope, receive, send)
+
+
+def create_http_app(server, stateless: bool = False, module: Any = None):
+    """
+    为 mcp Server 构建 Starlette 应用
+
+    路由:
+        /mcp      MCP streamable-HTTP 端点
+        /healthz  健康检查
+    """
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from starlette.applications import Starlette
+    from starlette.responses import PlainTextResponse
+    from starlette.routing import Route
+
+    _report_server_time(server)
+    session_manager = StreamableHTTPSessionManager(app=server, stateless=stateless)
+    prepare = _hook(module, "prepare")
+    shutdown = _hook(module, "shutdown")
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        if prepare:
+            prepare()
+        async with session_manager.run():
+            try:
+                yield
+            finally:
+                if shutdown:
+                    shutdown()
+
+    async def healthz(_request):
+        return PlainTextResponse("ok")
+
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=_StreamableHTTPEndpoint(session_manager)),
+            Route("/healthz", endpoint=healthz),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def _prepare_once(module: Any) -> None:
+    """在派生 worker 之前执行 prepare()，随后释放父进程持有的资源（父进程不处理请求）"""
+    prepare = _hook(module, "prepare")
+    shutdown = _hook(module, "shutdown")
+    if prepare:
+        prepare()
+    if shutdown:
+        shutdown()
+
+
+def create_http_app_from_env():
+    """uvicorn 多 worker 使用的工厂函数：每个 worker 进程独立导入服务器模块"""
+    module = importlib.import_module(os.environ[SERVER_MODULE_ENV])
+    stateless = os.getenv(STATELESS_ENV, "1") == "1"
+    return create_http_app(module.app, stateless=stateless, module=module)
+
+
+async def _run_stdio(server, module: Any) -> None:
+    from mcp.server.stdio import stdio_server
+
+    _report_server_time(server)
+    prepare = _hook(module, "prepare")
+    shutdown = _hook(module, "shutdown")
+    if prepare:
+        prepare()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, server.create_initialization_options())
+    finally:
+        if shutdown:
+            shutdown()
+
+
+def serve(server, module_name: str, argv: Optional[List[str]] = None) -> None:
+    """
+    按命令行参数启动服务器
+
+    Args:
+        server: mcp.server.Server 实例
+        module_name: 服务器模块的导入路径（如 "mcp_servers.server_amap"），
+            用于读取 prepare/shutdown 钩子以及多 worker 时在子进程中重新导入
+    """
+    args = _parse_args(argv)
+    # 作为脚本运行时服务器模块即 __main__
+    module = sys.modules.get(module_name) or sys.modules["__main__"]
+
+    if args.transport == "stdio":
+        import asyncio
+
+        asyncio.run(_run_stdio(server, module))
+        return
+
+    import uvicorn
+
+    # 多 worker 时请求可能落到任意进程，会话无法跨进程保持，必须无状态
+    stateless = args.stateless or args.workers > 1
+    config = dict(
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        log_level="info",
+    )
+    if args.workers > 1:
+        # 数据文件（路网、地标、POI 库等）在父进程中生成一次，各 worker 启动时只读取已有文件，
+        # 避免多个 worker 同时生成、写入同一路径
+        _prepare_once(module)
+        os.environ[SERVER_MODULE_ENV] = module_name
+        os.environ[STATELESS_ENV] = "1" if stateless else "0"
+        uvicorn.run(
+            "mcp_servers.launcher:create_http_app_from_env",
+            factory=True,
+            workers=args.workers,
+            **config,
+        )
+    else:
+        uvicorn.run(create_http_app(server, stateless=stateless, module=module), **config)
+
+
+def launch(
+    names: List[str],
+    base_port: int,
+    host: str = "127.0.0.1",
+    workers: int = 1,
+    graceful_timeout: float = 10.0,
+) -> int:
+    """
+    以 streamable-http 方式同时启动多个内置服务器
+
+    每个服务器一个子进程；收到 SIGINT/SIGTERM 时转发 SIGTERM，
+    等待子进程优雅退出，超时后强制结束。
+    """
+    procs = []
+    for offset, name in enumerate(names):
+        port = base_port + offset
+        script = SERVERS_DIR / f"{BUNDLED_SERVERS[name]}.py"
+        cmd = [
+            sys.executable,
+            str(script),
+            "--transport",
+            "streamable-http",
+            "--host",
+            host,
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--graceful-timeout",
+            str(graceful_timeout),
+        ]
+        procs.append((name, subprocess.Popen(cmd)))
+        print(f"[launcher] {name}: http://{host}:{port}/mcp (workers={workers})")
+
+    stopping = False
+
+    def stop(_signum, _frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        for _, proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # 任一服务器退出即整体停止，避免部分服务不可用而不自知
+    while not stopping and all(proc.poll() is None for _, proc in procs):
+        time.sleep(0.5)
+    stop(None, None)
+
+    deadline = time.monotonic() + graceful_timeout + 5
+    for name, proc in procs:
+        try:
+            proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            print(f"[launcher] {name} 未在超时内退出，强制结束")
+            proc.kill()
+            proc.wait()
+
+    return max((proc.returncode or 0) for _, proc in procs) if procs else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="以 streamable-http 方式启动多个内置 MCP Server")
+    parser.add_argument(
+        "servers",
+        nargs="*",
+        help=f"要启动的服务器，默认全部 ({', '.join(BUNDLED_SERVERS)})",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--base-port", type=int, default=8101)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--graceful-timeout", type=float, default=10.0)
+    args = parser.parse_args()
+    unknown = [name for name in args.servers if name not in BUNDLED_SERVERS]
+    if unknown:
+        parser.error(f"未知的服务器: {', '.join(unknown)}")
+
+    sys.exit(
+        launch(
+            args.servers or list(BUNDLED_SERVERS),
+            args.base_port,
+            host=args.host,
+            workers=args.workers,
+            graceful_timeout=args.graceful_timeout,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+POI 存储与检索
+
+POI 数据集编译为单个二进制文件，通过 mmap 只读映射后直接在文件页上检索，
+启动时无需反序列化，多个服务器进程共享同一份页缓存。
+
+- POI 按 (城市, geohash) 排序：同城 POI 的 ID 连续，城市过滤即 ID 区间；
+  区间内 geohash 有序，附近查询为若干次二分
+- 关键词倒排索引：中文按字 unigram + bigram、英文按单词切分，
+  倒排表按 POI ID 有序，可直接二分裁剪到城市区间
+"""
+
+import heapq
+import math
+import mmap
+import random
+import re
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from mcp_servers.atomic import atomic_write
+
+MAGIC = b"POISTOR1"
+# magic, poi 数, 城市数, 类别数, token 数, 段数
+_HEADER = struct.Struct("<8sIIIII")
+_SECTION = struct.Struct("<QQ")
+
+GEOHASH_BITS = 16  # 每个维度的位数，合计 32 位 geohash（约 300m 精度）
+
+_CJK_RE = re.compile(r"[一-鿿]+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """中文 unigram + bigram，英文/数字按单词"""
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        tokens.extend(run)
+        tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def query_tokens(text: str) -> List[str]:
+    """查询侧切分：中文连续串长度 >= 2 时只用 bigram（更有区分度）"""
+    text = text.lower()
+    tokens = _WORD_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return list(dict.fromkeys(tokens))
+
+
+def _spread(x: int) -> int:
+    """将 16 位整数的各位间隔展开（Morton 编码）"""
+    x &= 0xFFFF
+    x = (x | (x << 8)) & 0x00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F
+    x = (x | (x << 2)) & 0x33333333
+    x = (x | (x << 1)) & 0x55555555
+    return x
+
+
+def _cell_index(lat: float, lon: float, bits: int = GEOHASH_BITS) -> Tuple[int, int]:
+    scale = 1 << bits
+    y = min(scale - 1, max(0, int((lat + 90.0) / 180.0 * scale)))
+    x = min(scale - 1, max(0, int((lon + 180.0) / 360.0 * scale)))
+    return y, x
+
+
+def geohash32(lat: float, lon: float) -> int:
+    """32 位整数 geohash（经度位在高位，与标准 geohash 的位序一致）"""
+    y, x = _cell_index(lat, lon)
+    return (_spread(x) << 1) | _spread(y)
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371000.0 * 2 * math.asin(math.sqrt(h))
+
+
+def covering_ranges(lat: float, lon: float, radius_m: float) -> List[Tuple[int, int]]:
+    """
+    覆盖以 (lat, lon) 为圆心、radius_m 为半径的圆的 geohash 区间
+
+    选择格子边长不小于半径的层级，取所在格及 8 邻格（3x3 必然覆盖该圆）。
+    """
+    bits = GEOHASH_BITS
+    lat_cell_m = 111_320.0 * 180.0
+    lon_cell_m = 111_320.0 * 360.0 * max(0.01, math.cos(math.radians(lat)))
+    while bits > 1 and min(lat_cell_m, lon_cell_m) / (1 << bits) < radius_m:
+        bits -= 1
+
+    y, x = _cell_index(lat, lon, bits)
+    shift = 2 * (GEOHASH_BITS - bits)
+    ranges = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            cy, cx = y + dy, (x + dx) % (1 << bits)
+            if not 0 <= cy < (1 << bits):
+                continue
+            prefix = (_spread(cx) << 1) | _spread(cy)
+            ranges.append((prefix << shift, (prefix + 1) << shift))
+    ranges.sort()
+
+    merged: List[Tuple[int, int]] = []
+    for lo, hi in ranges:
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+# ---------------------------------------------------------------------- 构建
+
+
+def build_poi_store(pois: Iterable[Dict[str, Any]], path: str) -> int:
+    """
+    编译 POI 数据集为二进制文件
+
+    Args:
+        pois: [{"name", "address", "category", "city", "lat", "lon"}, ...]
+        path: 输出文件路径
+
+    Returns:
+        POI 数量
+    """
+    records = [
+        (p.get("city", ""), geohash32(p["lat"], p["lon"]), p) for p in pois
+    ]
+    records.sort(key=lambda r: (r[0], r[1]))
+    n = len(records)
+
+    cities = sorted({r[0] for r in records})
+    city_ids = {c: i for i, c in enumerate(cities)}
+    categories = sorted({r[2].get("category", "") for r in records})
+    category_ids = {c: i for i, c in enumerate(categories)}
+
+    lat, lon = array("f"), array("f")
+    geohash, category = array("I"), array("H")
+    city_start = array("I", [0] * (len(cities) + 1))
+    names, addresses = [], []
+    postings: Dict[str, List[int]] = {}
+
+    for pid, (city, gh, poi) in enumerate(records):
+        lat.append(poi["lat"])
+        lon.append(poi["lon"])
+        geohash.append(gh)
+        category.append(category_ids[poi.get("category", "")])
+        city_start[city_ids[city] + 1] = pid + 1
+        names.append(poi["name"])
+        addresses.append(poi.get("address", ""))
+        for token in set(tokenize(poi["name"] + " " + poi.get("category", ""))):
+            postings.setdefault(token, []).append(pid)
+    for i in range(len(cities)):
+        city_start[i + 1] = max(city_start[i + 1], city_start[i])
+
+    tokens = sorted(postings, key=lambda t: t.encode("utf-8"))
+    posting_offsets = array("I", [0])
+    posting_blob = array("I")
+    for token in tokens:
+        posting_blob.extend(postings[token])
+        posting_offsets.append(len(posting_blob))
+
+    def string_table(values: List[str]) -> Tuple[bytes, bytes]:
+        offsets, blob = array("I", [0]), bytearray()
+        for value in values:
+            blob += value.encode("utf-8")
+            offsets.append(len(blob))
+        return offsets.tobytes(), bytes(blob)
+
+    name_off, name_blob = string_table(names)
+    addr_off, addr_blob = string_table(addresses)
+    city_off, city_blob = string_table(cities)
+    cat_off, cat_blob = string_table(categories)
+    tok_off, tok_blob = string_table(tokens)
+
+    sections = [
+        lat.tobytes(), lon.tobytes(), geohash.tobytes(), category.tobytes(), city_start.tobytes(),
+        name_off, name_blob, addr_off, addr_blob, city_off, city_blob, cat_off, cat_blob,
+        tok_off, tok_blob, posting_offsets.tobytes(), posting_blob.tobytes(),
+    ]
+
+    # 写入临时文件后替换：其他进程可能正在 mmap 旧文件，或同时打开该路径
+    with atomic_write(path) as f:
+        table_size = _HEADER.size + _SECTION.size * len(sections)
+        offset = (table_size + 7) & ~7
+        entries = []
+        for data in sections:
+            entries.append((offset, len(data)))
+            offset = (offset + len(data) + 7) & ~7
+        f.write(_HEADER.pack(MAGIC, n, len(cities), len(categories), len(tokens), len(sections)))
+        for entry in entries:
+            f.write(_SECTION.pack(*entry))
+        for (start, _), data in zip(entries, sections):
+            f.seek(start)
+            f.write(data)
+
+    return n
+
+
+# ---------------------------------------------------------------------- 检索
+
+
+class PoiStore:
+    """基于 mmap 的只读 POI 检索"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mm)
+
+        magic, self.count, n_cities, n_categories, self.n_tokens, n_sections = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a POI store file: {path}")
+        sections = [
+            _SECTION.unpack_from(self._mm, _HEADER.size + i * _SECTION.size) for i in range(n_sections)
+        ]
+
+        def section(i: int, fmt: Optional[str] = None):
+            start, length = sections[i]
+            part = view[start : start + length]
+            return part.cast(fmt) if fmt else part
+
+        self.lat = section(0, "f")
+        self.lon = section(1, "f")
+        self.geohash = section(2, "I")
+        self.category = section(3, "H")
+        self.city_start = section(4, "I")
+        self._names = (section(5, "I"), section(6))
+        self._addresses = (section(7, "I"), section(8))
+        self._tokens = (section(13, "I"), section(14))
+        self._posting_offsets = section(15, "I")
+        self._postings = section(16, "I")
+
+        self.cities = self._read_all(section(9, "I"), section(10), n_cities)
+        self.categories = self._read_all(section(11, "I"), section(12), n_categories)
+        self.city_ids = {c: i for i, c in enumerate(self.cities)}
+
+    @staticmethod
+    def _string(table: Tuple[memoryview, memoryview], i: int) -> str:
+        offsets, blob = table
+        return bytes(blob[offsets[i] : offsets[i + 1]]).decode("utf-8")
+
+    @classmethod
+    def _read_all(cls, offsets: memoryview, blob: memoryview, count: int) -> List[str]:
+        return [cls._string((offsets, blob), i) for i in range(count)]
+
+    def close(self) -> None:
+        for attr in ("lat", "lon", "geohash", "category", "city_start", "_posting_offsets", "_postings"):
+            getattr(self, attr).release()
+        for table in (self._names, self._addresses, self._tokens):
+            for part in table:
+                part.release()
+        self._mm.close()
+        self._file.close()
+
+    def _posting(self, token: str) -> Optional[memoryview]:
+        """二分查找 token，返回按 POI ID 有序的倒排表"""
+        key = token.encode("utf-8")
+        offsets, blob = self._tokens
+        lo, hi = 0, self.n_tokens
+        while lo < hi:
+            mid = (lo + hi) // 2
+            value = bytes(blob[offsets[mid] : offsets[mid + 1]])
+            if value < key:
+                lo = mid + 1
+            elif value > key:
+                hi = mid
+            else:
+                return self._postings[self._posting_offsets[mid] : self._posting_offsets[mid + 1]]
+        return None
+
+    def _id_range(self, city: Optional[str]) -> Optional[Tuple[int, int]]:
+        if not city:
+            return 0, self.count
+        cid = self.city_ids.get(city, self.city_ids.get(city.rstrip("市")))
+        if cid is None:
+            return None
+        return self.city_start[cid], self.city_start[cid + 1]
+
+    def _spatial_ids(self, lo: int, hi: int, lat: float, lon: float, radius_m: float) -> Iterable[int]:
+        """在 ID 区间 [lo, hi) 内按 geohash 覆盖区间取候选"""
+        segments = (
+            [(lo, hi)]
+            if lo or hi != self.count
+            else [(self.city_start[c], self.city_start[c + 1]) for c in range(len(self.cities))]
+        )
+        for seg_lo, seg_hi in segments:
+            for gh_lo, gh_hi in covering_ranges(lat, lon, radius_m):
+                start = bisect_left(self.geohash, gh_lo, seg_lo, seg_hi)
+                end = bisect_left(self.geohash, gh_hi, start, seg_hi)
+                yield from range(start, end)
+
+    def get(self, pid: int) -> Dict[str, Any]:
+        city = bisect_right(self.city_start, pid) - 1
+        return {
+            "id": pid,
+            "name": self._string(self._names, pid),
+            "address": self._string(self._addresses, pid),
+            "category": self.categories[self.category[pid]],
+            "city": self.cities[min(city, len(self.cities) - 1)],
+            "lat": round(self.lat[pid], 6),
+            "lon": round(self.lon[pid], 6),
+        }
+
+    def search(
+        self,
+        keywords: str = "",
+        city: Optional[str] = None,
+        location: Optional[Tuple[float, float]] = None,
+        radius_m: Optional[float] = None,
+        top_k: int = 10,
+        sort: str = "relevance",
+    ) -> List[Dict[str, Any]]:
+        """
+        检索 POI
+
+        Args:
+            keywords: 关键词，可为空（仅按位置检索）
+            city: 城市过滤
+            location: (纬度, 经度)，提供时计算距离
+            radius_m: 距离上限（米），需同时提供 location
+            top_k: 返回数量
+            sort: relevance（相关度，带距离衰减）或 distance
+        """
+        id_range = self._id_range(city)
+        if id_range is None:
+            return []
+        lo, hi = id_range
+
+        tokens = query_tokens(keywords) if keywords else []
+        matches: Dict[int, int] = {}
+        if tokens:
+            for token in tokens:
+                posting = self._posting(token)
+                if posting is None:
+                    continue
+                start = bisect_left(posting, lo)
+                end = bisect_left(posting, hi, start)
+                for pid in posting[start:end]:
+                    matches[pid] = matches.get(pid, 0) + 1
+            candidates: Iterable[int] = matches
+            if location and radius_m:
+                spatial = set(self._spatial_ids(lo, hi, location[0], location[1], radius_m))
+                candidates = [pid for pid in matches if pid in spatial]
+        elif location and radius_m:
+            candidates = self._spatial_ids(lo, hi, location[0], location[1], radius_m)
+        else:
+            return []
+
+        keyword = keywords.strip().lower()
+        scored = []
+        for pid in candidates:
+            relevance = matches.get(pid, 0) / len(tokens) if tokens else 1.0
+            # 完整包含关键词的名称排在仅部分 n-gram 命中的前面；加分在取 top_k 之前计入，
+            # 否则完整匹配可能在截断时被丢弃。名称包含关键词时各查询 token 必然全部命中，
+            # 只需读取全部命中的候选的名称
+            if keyword and relevance >= 1.0 and keyword in self._string(self._names, pid).lower():
+                relevance += 1.0
+            distance = None
+            if location:
+                distance = haversine_m(location[0], location[1], self.lat[pid], self.lon[pid])
+                if radius_m and distance > radius_m:
+                    continue
+            if sort == "distance" and distance is not None:
+                score = -distance
+            else:
+                score = relevance / (1.0 + distance / 5000.0) if distance is not None else relevance
+            scored.append((score, pid, relevance, distance))
+
+        results = []
+        for score, pid, relevance, distance in heapq.nlargest(top_k, scored):
+            poi = self.get(pid)
+            poi.update(score=round(score, 4), relevance=round(relevance, 3))
+            if distance is not None:
+                poi["distance_m"] = round(distance)
+            results.append(poi)
+        return results
+
+
+# ---------------------------------------------------------------------- 数据集生成
+
+POI_CATEGORIES = [
+    "餐厅", "咖啡馆", "酒店", "加油站", "医院", "超市", "银行", "学校", "公园",
+    "地铁站", "停车场", "药店", "电影院", "书店", "火锅店", "便利店", "健身房", "景点",
+]
+_BRAND_CHARS = "金银华美新东方明星光海天长城福禄寿喜乐和平安泰康盛鑫源恒达佳德"
+_ROAD_CHARS = "人民中山解放建设和平胜利文化友谊新华长江黄河朝阳"
+
+
+def generate_pois(count: int = 200_000, seed: int = 2024) -> List[Dict[str, Any]]:
+    """在主要城市周边生成模拟 POI（城市中心附近密度更高）"""
+    from mcp_servers.timetable import MAJOR_CITIES
+
+    rng = random.Random(seed)
+    cities = list(MAJOR_CITIES.items())
+    pois = []
+    for _ in range(count):
+        city, (clat, clon) = rng.choice(cities)
+        category = rng.choice(POI_CATEGORIES)
+        brand = "".join(rng.sample(_BRAND_CHARS, 2))
+        road = "".join(rng.sample(_ROAD_CHARS, 2))
+        spread = rng.expovariate(1 / 0.08)
+        angle = rng.uniform(0, 2 * math.pi)
+        pois.append(
+            {
+                "name": f"{brand}{category}({road}路店)" if rng.random() < 0.5 else f"{brand}{category}",
+                "address": f"{city}市{road}路{rng.randint(1, 999)}号",
+                "category": category,
+                "city": city,
+                "lat": clat + spread * math.sin(angle),
+                "lon": clon + spread * math.cos(angle),
+            }
+        )
+    return pois
+
+
+__all__ = ["PoiStore", "build_poi_store", "generate_pois", "tokenize", "geohash32"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成模拟 POI 数据集并编译为二进制文件")
+    parser.add_argument("output", nargs="?", default="data/poi_store.bin")
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=2024)
+    args = parser.parse_args()
+
+    total = build_poi_store(generate_pois(args.count, args.seed), args.output)
+    print(f"[OK] {total} POIs -> {args.output}")
@@ -0,0 +1,603 @@
+"""
+路网路径规划引擎
+
+路网以二进制文件存储（节点坐标 + 无向边表 + 地名表），加载后按出行方式
+构建基于 array 的 CSR 邻接表：
+- driving: 全部机动车道路
+- walking: 步行可达的道路与步行道
+- transit: 步行边 + 公交/地铁边
+各方式均使用 A* + ALT（地标三角不等式）启发：网格路网上直线距离启发与实际路程相差
+可达 √2 倍，步行/公交仅用直线启发时扩展节点数是 ALT 的数倍。地标距离按方式预计算，
+缓存到 <路网文件>.alt（驾车）与 <路网文件>.<方式>.alt（缓存头含地标数、种子与路网校验和）；
+未准备地标的方式退回直线距离启发。
+同时提供双向 Dijkstra 作为无启发的基线算法。
+
+生成的路网为省级网格，另含连接全国主要城市（与时刻表相同的城市集合）的高速干线，
+跨省驾车路线经干线规划；干线没有步行道与公交，跨省的步行/公交查询返回不可达。
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import random
+import struct
+from array import array
+from typing import Any, Dict, List, Optional, Tuple
+
+from mcp_servers.atomic import atomic_write
+from mcp_servers.timetable import MAJOR_CITIES
+
+MAGIC = b"RGRAPH1\0"
+_HEADER = struct.Struct("<8sIII")
+# ALT 地标缓存：magic, 地标数, 随机种子, 路网文件校验和
+ALT_MAGIC = b"RGALT2\0\0"
+_ALT_HEADER = struct.Struct("<8sIq16s")
+
+# 道路等级
+HIGHWAY, ARTERIAL, LOCAL, FOOTPATH, TRANSIT = range(5)
+ROAD_CLASS_NAMES = {HIGHWAY: "高速公路", ARTERIAL: "主干道", LOCAL: "城市道路", FOOTPATH: "步行道", TRANSIT: "公交/地铁"}
+
+# 各出行方式允许的道路等级及速度（km/h）
+MODE_SPEEDS: Dict[str, Dict[int, float]] = {
+    "driving": {HIGHWAY: 100.0, ARTERIAL: 60.0, LOCAL: 30.0},
+    "walking": {ARTERIAL: 5.0, LOCAL: 5.0, FOOTPATH: 5.0},
+    "transit": {ARTERIAL: 5.0, LOCAL: 5.0, FOOTPATH: 5.0, TRANSIT: 35.0},
+}
+
+INF = float("inf")
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    h = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 6371000.0 * 2 * math.asin(math.sqrt(h))
+
+
+class ModeGraph:
+    """单一出行方式的 CSR 邻接表，边权为通行秒数"""
+
+    def __init__(self, n: int, edges: List[Tuple[int, int, int, int]], speeds: Dict[int, float]):
+        degree = array("i", bytes(4 * (n + 1)))
+        kept = []
+        for u, v, length, cls in edges:
+            speed = speeds.get(cls)
+            if speed is None:
+                continue
+            seconds = max(1, round(length / (speed / 3.6)))
+            kept.append((u, v, seconds, cls))
+            degree[u + 1] += 1
+            degree[v + 1] += 1
+
+        for i in range(n):
+            degree[i + 1] += degree[i]
+        self.offsets = degree
+        cursor = array("i", degree[:-1])
+        self.targets = array("i", bytes(4 * degree[n]))
+        self.weights = array("i", bytes(4 * degree[n]))
+        self.classes = array("B", bytes(degree[n]))
+        for u, v, seconds, cls in kept:
+            for a, b in ((u, v), (v, u)):
+                i = cursor[a]
+                self.targets[i], self.weights[i], self.classes[i] = b, seconds, cls
+                cursor[a] += 1
+
+        self.max_speed = max(speeds.values()) / 3.6  # m/s
+
+    def neighbours(self, u: int):
+        for i in range(self.offsets[u], self.offsets[u + 1]):
+            yield self.targets[i], self.weights[i], i
+
+
+class RoadNetwork:
+    """路网与路径规划"""
+
+    def __init__(
+        self,
+        lat: array,
+        lon: array,
+        edges: List[Tuple[int, int, int, int]],
+        places: Dict[str, int],
+        path: Optional[str] = None,
+    ):
+        self.lat = lat
+        self.lon = lon
+        self.edges = edges
+        self.places = places
+        self.path = path
+        self._checksum: Optional[bytes] = None
+        self._graphs: Dict[str, ModeGraph] = {}
+        # 出行方式 -> 各地标到所有节点的耗时（不可达为 -1）
+        self._landmarks: Dict[str, List[array]] = {}
+        self._edge_len: Dict[Tuple[int, int], int] = {}
+        for u, v, length, _ in edges:
+            self._edge_len[(u, v)] = self._edge_len[(v, u)] = length
+
+        # 最近节点查询用的网格索引（0.05 度一格）
+        self._cell = 0.05
+        self._grid: Dict[Tuple[int, int], List[int]] = {}
+        for i in range(len(lat)):
+            self._grid.setdefault(self._cell_of(lat[i], lon[i]), []).append(i)
+
+    # ------------------------------------------------------------------ 读写
+
+    @classmethod
+    def load(cls, path: str) -> "RoadNetwork":
+        """从二进制路网文件加载"""
+        with open(path, "rb") as f:
+            magic, n, m, places_len = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"Not a road graph file: {path}")
+            lat, lon = array("f"), array("f")
+            lat.fromfile(f, n)
+            lon.fromfile(f, n)
+            us, vs, lengths, classes = array("i"), array("i"), array("i"), array("B")
+            us.fromfile(f, m)
+            vs.fromfile(f, m)
+            lengths.fromfile(f, m)
+            classes.fromfile(f, m)
+            places = json.loads(f.read(places_len).decode("utf-8"))
+
+        edges = list(zip(us, vs, lengths, classes))
+        return cls(lat, lon, edges, places, path=path)
+
+    def save(self, path: str) -> None:
+        places = json.dumps(self.places, ensure_ascii=False).encode("utf-8")
+        with atomic_write(path) as f:
+            f.write(_HEADER.pack(MAGIC, len(self.lat), len(self.edges), len(places)))
+            self.lat.tofile(f)
+            self.lon.tofile(f)
+            for column, typecode in ((0, "i"), (1, "i"), (2, "i"), (3, "B")):
+                array(typecode, (e[column] for e in self.edges)).tofile(f)
+            f.write(places)
+        self.path = path
+        self._checksum = None
+
+    # ------------------------------------------------------------------ 基础
+
+    def graph(self, mode: str) -> ModeGraph:
+        """按需构建指定出行方式的 CSR"""
+        if mode not in MODE_SPEEDS:
+            raise ValueError(f"Unsupported mode: {mode}")
+        if mode not in self._graphs:
+            self._graphs[mode] = ModeGraph(len(self.lat), self.edges, MODE_SPEEDS[mode])
+        return self._graphs[mode]
+
+    def _cell_of(self, lat: float, lon: float) -> Tuple[int, int]:
+        return int(lat / self._cell), int(lon / self._cell)
+
+    def nearest_node(self, lat: float, lon: float, mode: Optional[str] = None) -> Optional[int]:
+        """最近的节点（指定 mode 时要求节点在该方式下有连边）"""
+        graph = self.graph(mode) if mode else None
+        cy, cx = self._cell_of(lat, lon)
+        for radius in range(0, 20):
+            best, best_d = None, INF
+            for dy in range(-radius, radius + 1):
+                for dx in range(-radius, radius + 1):
+                    if max(abs(dy), abs(dx)) != radius:
+                        continue
+                    for i in self._grid.get((cy + dy, cx + dx), ()):
+                        if graph and graph.offsets[i] == graph.offsets[i + 1]:
+                            continue
+                        d = (self.lat[i] - lat) ** 2 + (self.lon[i] - lon) ** 2
+                        if d < best_d:
+                            best, best_d = i, d
+            if best is not None:
+                return best
+        return None
+
+    def resolve(self, place: str, mode: Optional[str] = None) -> Optional[int]:
+        """地名或 "纬度,经度" -> 节点"""
+        if place in self.places:
+            node = self.places[place]
+            if mode is None or self.graph(mode).offsets[node] != self.graph(mode).offsets[node + 1]:
+                return node
+            return self.nearest_node(self.lat[node], self.lon[node], mode)
+        try:
+            lat, lon = (float(x) for x in place.split(","))
+        except ValueError:
+            return None
+        return self.nearest_node(lat, lon, mode)
+
+    # ------------------------------------------------------------------ ALT 地标
+
+    def _dijkstra_all(self, graph: ModeGraph, source: int) -> array:
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        push, pop = heapq.heappush, heapq.heappop
+        dist = array("i", [-1]) * len(self.lat)
+        heap = [(0, source)]
+        while heap:
+            d, u = pop(heap)
+            if dist[u] != -1:
+                continue
+            dist[u] = d
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                if dist[v] == -1:
+                    push(heap, (d + weights[i], v))
+        return dist
+
+    def _landmark_cache(self, mode: str) -> Optional[str]:
+        if not self.path:
+            return None
+        return f"{self.path}.alt" if mode == "driving" else f"{self.path}.{mode}.alt"
+
+    def prepare_landmarks(self, count: int = 8, seed: int = 0, modes: Tuple[str, ...] = tuple(MODE_SPEEDS)) -> None:
+        """
+        预计算各出行方式的 ALT 地标距离
+
+        采用最远点选取：每次选择与已选地标距离之和最大的节点。
+        有路网文件时结果按方式缓存，缓存头记录地标数、随机种子与路网文件校验和，
+        三者都一致时才直接读取，否则重新计算并覆盖缓存。
+        """
+        for mode in modes:
+            self._prepare_mode_landmarks(mode, count, seed)
+
+    def _prepare_mode_landmarks(self, mode: str, count: int, seed: int) -> None:
+        graph = self.graph(mode)
+        n = len(self.lat)
+        cache = self._landmark_cache(mode)
+
+        header = _ALT_HEADER.pack(ALT_MAGIC, count, seed, self.checksum()) if cache else b""
+        landmarks = self._load_landmarks(cache, header) if cache else None
+        if landmarks is not None:
+            self._landmarks[mode] = landmarks
+            return
+
+        rng = random.Random(seed)
+        # 地标只从稠密区域选取（周围 3x3 网格单元内还有其他节点）：落在远处孤立干线城市上的
+        # 地标对网格内的查询几乎不提供下界
+        dense = {
+            (cy, cx)
+            for cy, cx in self._grid
+            if sum(len(self._grid.get((cy + dy, cx + dx), ())) for dy in (-1, 0, 1) for dx in (-1, 0, 1)) > 1
+        }
+        connected = [i for i in range(n) if graph.offsets[i] != graph.offsets[i + 1]]
+        candidates = [i for i in connected if self._cell_of(self.lat[i], self.lon[i]) in dense] or connected
+        current = rng.choice(candidates)
+        landmarks: List[array] = []
+        total = [0] * n
+        for _ in range(count):
+            dist = self._dijkstra_all(graph, current)
+            landmarks.append(dist)
+            for i in range(n):
+                total[i] = total[i] + dist[i] if dist[i] >= 0 and total[i] >= 0 else -1
+            current = max(candidates, key=lambda i: total[i])
+        self._landmarks[mode] = landmarks
+
+        if cache:
+            with atomic_write(cache) as f:
+                f.write(header)
+                for dist in landmarks:
+                    dist.tofile(f)
+
+    def _load_landmarks(self, cache: str, header: bytes) -> Optional[List[array]]:
+        """读取地标缓存；地标数、种子或路网内容与缓存头不一致时返回 None（需要重新计算）"""
+        if not os.path.exists(cache):
+            return None
+        n = len(self.lat)
+        with open(cache, "rb") as f:
+            if f.read(_ALT_HEADER.size) != header:
+                return None
+            _, count, _, _ = _ALT_HEADER.unpack(header)
+            landmarks = []
+            for _ in range(count):
+                dist = array("i")
+                try:
+                    dist.fromfile(f, n)
+                except EOFError:
+                    return None
+                landmarks.append(dist)
+        return landmarks
+
+    def checksum(self) -> bytes:
+        """路网文件内容的校验和（地标缓存据此判断是否对应当前路网）"""
+        if self._checksum is None:
+            digest = hashlib.blake2b(digest_size=16)
+            with open(self.path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            self._checksum = digest.digest()
+        return self._checksum
+
+    def _alt_heuristic(self, mode: str, target: int):
+        landmarks = [(dist, dist[target]) for dist in self._landmarks[mode] if dist[target] >= 0]
+
+        def h(v: int) -> float:
+            best = 0
+            for dist, to_target in landmarks:
+                dv = dist[v]
+                if dv >= 0:
+                    diff = abs(to_target - dv)
+                    if diff > best:
+                        best = diff
+            return best
+
+        return h
+
+    def _geo_heuristic(self, graph: ModeGraph, target: int):
+        tlat, tlon = self.lat[target], self.lon[target]
+        speed = graph.max_speed
+
+        def h(v: int) -> float:
+            return haversine_m(self.lat[v], self.lon[v], tlat, tlon) / speed
+
+        return h
+
+    # ------------------------------------------------------------------ 搜索
+
+    def astar(self, mode: str, source: int, target: int) -> Tuple[float, List[int], int]:
+        """
+        A* 搜索
+
+        Returns:
+            (耗时秒数, 节点路径, 扩展节点数)
+        """
+        graph = self.graph(mode)
+        if self._landmarks.get(mode):
+            h = self._alt_heuristic(mode, target)
+        else:
+            h = self._geo_heuristic(graph, target)
+
+        # 热循环直接访问 CSR 数组，避免 neighbours() 生成器的开销
+        offsets, targets, weights = graph.offsets, graph.targets, graph.weights
+        push, pop = heapq.heappush, heapq.heappop
+        dist = {source: 0}
+        parent = {source: -1}
+        heap = [(h(source), 0, source)]
+        closed = set()
+        while heap:
+            _, d, u = pop(heap)
+            if u in closed:
+                continue
+            if u == target:
+                return d, self._unwind(parent, target), len(closed)
+            closed.add(u)
+            for i in range(offsets[u], offsets[u + 1]):
+                v = targets[i]
+                nd = d + weights[i]
+                if nd < dist.get(v, INF):
+                    dist[v] = nd
+                    parent[v] = u
+                    push(heap, (nd + h(v), nd, v))
+        return INF, [], len(closed)
+
+    def bidirectional_dijkstra(self, mode: str, source: int, target: int) -> Tuple[float, List[int], int]:
+        """双向 Dijkstra（路网无向，反向图即正向图）"""
+        graph = self.graph(mode)
+        dist = ({source: 0}, {target: 0})
+        parent = ({source: -1}, {target: -1})
+        heaps = ([(0, source)], [(0, target)])
+        closed = (set(), set())
+        best, meet = INF, -1
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            d, u = heapq.heappop(heaps[side])
+            if u in closed[side]:
+                continue
+            closed[side].add(u)
+            for v, w, _ in graph.neighbours(u):
+                nd = d + w
+                if nd < dist[side].get(v, INF):
+                    dist[side][v] = nd
+                    parent[side][v] = u
+                    heapq.heappush(heaps[side], (nd, v))
+                other = dist[1 - side].get(v)
+                if other is not None and nd + other < best:
+                    best, meet = nd + other, v
+
+        if meet == -1:
+            return INF, [], len(closed[0]) + len(closed[1])
+        forward = self._unwind(parent[0], meet)
+        backward = self._unwind(parent[1], meet)[::-1][1:]
+        return best, forward + backward, len(closed[0]) + len(closed[1])
+
+    @staticmethod
+    def _unwind(parent: Dict[int, int], node: int) -> List[int]:
+        path = []
+        while node != -1:
+            path.append(node)
+            node = parent[node]
+        return path[::-1]
+
+    # ------------------------------------------------------------------ 对外接口
+
+    def plan(self, origin: str, destination: str, mode: str = "driving", algorithm: str = "astar") -> Dict[str, Any]:
+        """规划路线，返回距离、耗时与按道路等级合并的路段"""
+        source = self.resolve(origin, mode)
+        target = self.resolve(destination, mode)
+        if source is None or target is None:
+            missing = origin if source is None else destination
+            # 已知地点在该出行方式下没有可用道路（如跨省步行）时为不可达
+            error = f"{mode} 不可达: {missing}" if missing in self.places else f"未知地点: {missing}"
+            return {"origin": origin, "destination": destination, "mode": mode, "error": error}
+
+        search = self.bidirectional_dijkstra if algorithm == "bidijkstra" else self.astar
+        seconds, path, expanded = search(mode, source, target)
+        if not path:
+            return {"origin": origin, "destination": destination, "mode": mode, "error": "不可达"}
+
+        graph = self.graph(mode)
+        segments: List[Dict[str, Any]] = []
+        total_m = 0
+        for u, v in zip(path, path[1:]):
+            cls, seconds_uv = self._edge_info(graph, u, v)
+            length = self._edge_len[(u, v)]
+            total_m += length
+            name = ROAD_CLASS_NAMES[cls]
+            if segments and segments[-1]["name"] == name:
+                segments[-1]["_m"] += length
+                segments[-1]["_s"] += seconds_uv
+            else:
+                segments.append({"name": name, "_m": length, "_s": seconds_uv})
+
+        step = max(1, len(path) // 50)
+        polyline = [[round(self.lat[i], 5), round(self.lon[i], 5)] for i in path[::step]]
+        return {
+            "origin": origin,
+            "destination": destination,
+            "mode": mode,
+            "distance": f"{total_m / 1000:.1f}km",
+            "duration": _fmt_duration(seconds),
+            "distance_m": total_m,
+            "duration_s": int(seconds),
+            "routes": [
+                {"name": s["name"], "distance": f"{s['_m'] / 1000:.1f}km", "duration": _fmt_duration(s["_s"])}
+                for s in segments
+            ],
+            "polyline": polyline,
+            "expanded_nodes": expanded,
+        }
+
+    def _edge_info(self, graph: ModeGraph, u: int, v: int) -> Tuple[int, int]:
+        best = None
+        for target, weight, i in graph.neighbours(u):
+            if target == v and (best is None or weight < best[1]):
+                best = (graph.classes[i], weight)
+        return best
+
+
+def _fmt_duration(seconds: float) -> str:
+    minutes = int(round(seconds / 60))
+    if minutes >= 60:
+        return f"{minutes // 60}小时{minutes % 60}分钟"
+    return f"{minutes}分钟"
+
+
+# ---------------------------------------------------------------------- 路网生成
+
+# 浙江省主要城市 (纬度, 经度)
+PROVINCE_PLACES: Dict[str, Tuple[float, float]] = {
+    "杭州": (30.27, 120.16), "宁波": (29.87, 121.54), "温州": (28.00, 120.70),
+    "绍兴": (30.00, 120.58), "嘉兴": (30.75, 120.76), "湖州": (30.89, 120.09),
+    "金华": (29.08, 119.65), "衢州": (28.97, 118.87), "舟山": (30.00, 122.10),
+    "台州": (28.66, 121.42), "丽水": (28.45, 119.92), "义乌": (29.31, 120.08),
+}
+
+
+def generate_network(
+    rows: int = 300,
+    cols: int = 300,
+    bbox: Tuple[float, float, float, float] = (27.0, 118.0, 31.2, 122.9),
+    places: Optional[Dict[str, Tuple[float, float]]] = None,
+    seed: int = 42,
+    trunk_places: Optional[Dict[str, Tuple[float, float]]] = None,
+    trunk_neighbours: int = 3,
+) -> RoadNetwork:
+    """
+    生成省级规模的模拟路网
+
+    抖动网格上的四邻接道路：每 25 行/列为高速、每 5 行/列为主干道，其余为城市道路
+    （少量随机缺失）；部分主干道叠加公交/地铁线；高速旁附带步行道以保证步行连通。
+
+    trunk_places（缺省为时刻表的 MAJOR_CITIES）之间铺设高速干线：bbox 内的城市接入
+    最近的网格节点，其余城市各新增一个节点；干线为城市间最小生成树加上每个城市到
+    最近 trunk_neighbours 个城市的连线，保证任意两城市驾车可达。
+    """
+    rng = random.Random(seed)
+    places = places or PROVINCE_PLACES
+    trunk_places = MAJOR_CITIES if trunk_places is None else trunk_places
+    lat0, lon0, lat1, lon1 = bbox
+    dlat, dlon = (lat1 - lat0) / (rows - 1), (lon1 - lon0) / (cols - 1)
+
+    lat, lon = array("f"), array("f")
+    for r in range(rows):
+        for c in range(cols):
+            lat.append(lat0 + r * dlat + rng.uniform(-0.3, 0.3) * dlat)
+            lon.append(lon0 + c * dlon + rng.uniform(-0.3, 0.3) * dlon)
+
+    def node(r: int, c: int) -> int:
+        return r * cols + c
+
+    def length(u: int, v: int) -> int:
+        return max(1, round(haversine_m(lat[u], lon[u], lat[v], lon[v]) * 1.1))
+
+    edges: List[Tuple[int, int, int, int]] = []
+    for r in range(rows):
+        for c in range(cols):
+            u = node(r, c)
+            for nr, nc, line in ((r, c + 1, r), (r + 1, c, c)):
+                if nr >= rows or nc >= cols:
+                    continue
+                v = node(nr, nc)
+                if line % 25 == 0:
+                    cls = HIGHWAY
+                elif line % 5 == 0:
+                    cls = ARTERIAL
+                elif rng.random() < 0.08:
+                    continue
+                else:
+                    cls = LOCAL
+                edges.append((u, v, length(u, v), cls))
+                if cls == HIGHWAY:
+                    edges.append((u, v, length(u, v), FOOTPATH))
+                elif cls == ARTERIAL and line % 10 == 0:
+                    edges.append((u, v, length(u, v), TRANSIT))
+
+    network = RoadNetwork(lat, lon, edges, {})
+    place_nodes = {name: network.nearest_node(*coord) for name, coord in places.items()}
+    if not trunk_places:
+        network.places = place_nodes
+        return network
+
+    def inside(coord: Tuple[float, float]) -> bool:
+        return lat0 <= coord[0] <= lat1 and lon0 <= coord[1] <= lon1
+
+    cities = list(trunk_places)
+    trunk: Dict[str, int] = {}
+    for city in cities:
+        coord = trunk_places[city]
+        if city in place_nodes:
+            trunk[city] = place_nodes[city]
+        elif inside(coord):
+            trunk[city] = network.nearest_node(*coord)
+        else:
+            lat.append(coord[0])
+            lon.append(coord[1])
+            trunk[city] = len(lat) - 1
+
+    def km(a: str, b: str) -> float:
+        return haversine_m(*trunk_places[a], *trunk_places[b])
+
+    links = set()
+    # Prim 最小生成树保证连通
+    tree, rest = {cities[0]}, set(cities[1:])
+    while rest:
+        a, b = min(((a, b) for a in tree for b in rest), key=lambda ab: km(*ab))
+        links.add(frozenset((a, b)))
+        tree.add(b)
+        rest.remove(b)
+    for a in cities:
+        for b in sorted((b for b in cities if b != a), key=lambda b: km(a, b))[:trunk_neighbours]:
+            links.add(frozenset((a, b)))
+    for link in sorted(links, key=sorted):
+        a, b = sorted(link)
+        edges.append((trunk[a], trunk[b], max(1, round(km(a, b) * 1.2)), HIGHWAY))
+
+    network = RoadNetwork(lat, lon, edges, {})
+    network.places = {**trunk, **place_nodes}
+    return network
+
+
+__all__ = ["RoadNetwork", "ModeGraph", "generate_network", "haversine_m"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成模拟省级路网文件")
+    parser.add_argument("output", nargs="?", default="data/road_network.bin")
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--cols", type=int, default=300)
+    parser.add_argument("--landmarks", type=int, default=8)
+    args = parser.parse_args()
+
+    net = generate_network(args.rows, args.cols)
+    net.save(args.output)
+    net.prepare_landmarks(args.landmarks)
+    print(f"[OK] {len(net.lat)} nodes, {len(net.edges)} edges -> {args.output}")
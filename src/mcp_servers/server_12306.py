@@ -2,23 +2,123 @@
 12306 MCP Server - 火车票查询服务
 """
 
-from typing import Any
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import Any, Optional
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 
+from mcp_servers.timetable import TimetableEngine, generate_timetable
+from mcp_servers.batching import batch_output_schema, batch_schema, run_batch
+from mcp_servers.launcher import serve
+from mcp_servers.structured import ToolResult, object_schema, structured_result
+
 app = Server("server_12306")
 
-# 模拟火车票数据
-MOCK_TICKETS = {
-    "北京-上海": [
-        {"train_no": "G101", "departure": "08:00", "arrival": "13:30", "price": 553},
-        {"train_no": "G103", "departure": "10:00", "arrival": "15:30", "price": 553},
-    ],
-    "上海-北京": [
-        {"train_no": "G102", "departure": "14:00", "arrival": "19:30", "price": 553},
-    ],
+# 时刻表数据集路径，不存在时使用固定种子生成的全国模拟时刻表
+TIMETABLE_PATH = os.getenv("TIMETABLE_PATH", "data/timetable.json")
+
+_engine: Optional[TimetableEngine] = None
+
+
+def get_engine() -> TimetableEngine:
+    """懒加载时刻表引擎"""
+    global _engine
+
+    if _engine is None:
+        if os.path.exists(TIMETABLE_PATH):
+            _engine = TimetableEngine.load(TIMETABLE_PATH)
+        else:
+            data = generate_timetable()
+            _engine = TimetableEngine(data["stations"], data["trains"], data["fares"])
+
+    return _engine
+
+
+TRAIN_DETAIL_SCHEMA = {
+    "type": "object",
+    "properties": {"train_no": {"type": "string", "description": "车次号"}},
+    "required": ["train_no"],
 }
 
+TICKETS_OUTPUT_SCHEMA = object_schema(
+    {
+        "origin": {"type": "string"},
+        "destination": {"type": "string"},
+        "date": {"type": "string"},
+        "tickets": {"type": "array"},
+        "count": {"type": "integer"},
+        "transfers": {"type": "array"},
+        "error": {"type": "string"},
+    },
+    required=["origin", "destination", "date", "tickets", "count", "transfers"],
+)
+
+TRAIN_DETAIL_OUTPUT_SCHEMA = object_schema(
+    {
+        "train_no": {"type": "string"},
+        "type": {"type": "string"},
+        "running_days": {"type": "array"},
+        "seat_classes": {"type": "array"},
+        "stations": {"type": "array"},
+        "error": {"type": "string"},
+    },
+    required=["train_no"],
+)
+
+
+def query_tickets(arguments: dict[str, Any]) -> dict[str, Any]:
+    """直达不足时补充一次换乘方案；参数错误或车站不存在时返回空结果与 error"""
+    origin = arguments["origin"]
+    destination = arguments["destination"]
+    date = arguments["date"]
+    limit = int(arguments.get("limit", 20))
+    window = {
+        "depart_after": arguments.get("depart_after"),
+        "depart_before": arguments.get("depart_before"),
+        "seat_class": arguments.get("seat_class"),
+    }
+    result: dict[str, Any] = {
+        "origin": origin,
+        "destination": destination,
+        "date": date,
+        "tickets": [],
+        "count": 0,
+        "transfers": [],
+    }
+
+    engine = get_engine()
+    unknown = [name for name in (origin, destination) if not engine.resolve(name)]
+    if unknown:
+        result["error"] = f"未知车站: {', '.join(unknown)}"
+        return result
+
+    try:
+        tickets = engine.query_direct(origin, destination, date, limit=limit, **window)
+        transfers = []
+        if arguments.get("allow_transfer", True) and len(tickets) < limit:
+            transfers = engine.query_transfer(
+                origin, destination, date, limit=limit - len(tickets), **window
+            )
+    except ValueError as e:
+        result["error"] = str(e)
+        return result
+
+    result.update(tickets=tickets, count=len(tickets), transfers=transfers)
+    return result
+
+
+def get_train_detail(arguments: dict[str, Any]) -> dict[str, Any]:
+    """查询单个车次详情"""
+    train_no = arguments["train_no"]
+    return get_engine().train_detail(train_no) or {
+        "train_no": train_no,
+        "error": "车次不存在",
+    }
+
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
@@ -33,63 +133,62 @@ async def list_tools() -> list[Tool]:
                     "origin": {"type": "string", "description": "出发地"},
                     "destination": {"type": "string", "description": "目的地"},
                     "date": {"type": "string", "description": "出发日期 (YYYY-MM-DD)"},
+                    "depart_after": {"type": "string", "description": "最早发车时间 (HH:MM)"},
+                    "depart_before": {"type": "string", "description": "最晚发车时间 (HH:MM)，早于 depart_after 时跨零点"},
+                    "seat_class": {
+                        "type": "string",
+                        "description": "席别，如 二等座、一等座、商务座、硬卧",
+                    },
+                    "allow_transfer": {
+                        "type": "boolean",
+                        "description": "直达不足时是否返回一次换乘方案，默认 true",
+                    },
+                    "limit": {"type": "integer", "description": "最多返回数量，默认 20"},
                 },
                 "required": ["origin", "destination", "date"],
             },
+            outputSchema=TICKETS_OUTPUT_SCHEMA,
         ),
         Tool(
             name="get_train_detail",
             description="获取车次详情",
-            inputSchema={
-                "type": "object",
-                "properties": {"train_no": {"type": "string", "description": "车次号"}},
-                "required": ["train_no"],
-            },
+            inputSchema=TRAIN_DETAIL_SCHEMA,
+            outputSchema=TRAIN_DETAIL_OUTPUT_SCHEMA,
+        ),
+        Tool(
+            name="get_train_detail_batch",
+            description="批量获取多个车次的详情",
+            inputSchema=batch_schema(TRAIN_DETAIL_SCHEMA),
+            outputSchema=batch_output_schema(TRAIN_DETAIL_OUTPUT_SCHEMA),
         ),
     ]
 
 
 @app.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+async def call_tool(name: str, arguments: dict[str, Any]) -> ToolResult:
     """调用工具"""
     if name == "query_train_tickets":
-        origin = arguments["origin"]
-        destination = arguments["destination"]
-        date = arguments["date"]
-
-        key = f"{origin}-{destination}"
-        tickets = MOCK_TICKETS.get(key, [])
-
-        result = {
-            "origin": origin,
-            "destination": destination,
-            "date": date,
-            "tickets": tickets,
-            "count": len(tickets),
-        }
-        return [TextContent(type="text", text=str(result))]
+        return structured_result(query_tickets(arguments))
 
     elif name == "get_train_detail":
-        train_no = arguments["train_no"]
-        result = {
-            "train_no": train_no,
-            "status": "正常",
-            "stations": ["起点站", "终点站"],
-        }
-        return [TextContent(type="text", text=str(result))]
+        return structured_result(get_train_detail(arguments))
+
+    elif name == "get_train_detail_batch":
+        results = await run_batch(get_train_detail, arguments["items"])
+        return structured_result({"results": results, "count": len(results)})
 
     return [TextContent(type="text", text="Unknown tool")]
 
 
-async def main():
-    """启动服务器"""
-    from mcp.server.stdio import stdio_server
+def prepare() -> None:
+    """启动时预加载时刻表"""
+    get_engine()
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
 
+def main():
+    """启动服务器（默认 stdio，--transport streamable-http 以 HTTP 服务运行，见 launcher.py）"""
+    serve(app, "mcp_servers.server_12306")
 
-if __name__ == "__main__":
-    import asyncio
 
-    asyncio.run(main())
+if __name__ == "__main__":
+    main()
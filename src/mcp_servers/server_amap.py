@@ -2,12 +2,150 @@
 高德地图 MCP Server - 路线规划服务
 """
 
-from typing import Any
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import Any, Optional
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 
+from mcp_servers.routing import RoadNetwork, generate_network
+from mcp_servers.poi_store import PoiStore, build_poi_store, generate_pois
+from mcp_servers.batching import batch_output_schema, batch_schema, run_batch
+from mcp_servers.launcher import serve
+from mcp_servers.structured import ToolResult, object_schema, structured_result
+
 app = Server("server_amap")
 
+# 路网文件路径，不存在时生成模拟路网（省级网格 + 全国主要城市干线）并写入该路径
+# （各出行方式的 ALT 地标缓存在同目录 .alt 文件）
+ROAD_NETWORK_PATH = os.getenv("ROAD_NETWORK_PATH", "data/road_network.bin")
+
+# POI 二进制库路径（mmap 只读映射），不存在时生成模拟数据集并编译到该路径
+POI_STORE_PATH = os.getenv("POI_STORE_PATH", "data/poi_store.bin")
+
+_network: Optional[RoadNetwork] = None
+_poi_store: Optional[PoiStore] = None
+
+
+def get_network() -> RoadNetwork:
+    """懒加载路网并准备各出行方式的 ALT 地标"""
+    global _network
+
+    if _network is None:
+        if os.path.exists(ROAD_NETWORK_PATH):
+            _network = RoadNetwork.load(ROAD_NETWORK_PATH)
+        else:
+            _network = generate_network()
+            _network.save(ROAD_NETWORK_PATH)
+        _network.prepare_landmarks()
+
+    return _network
+
+
+def get_poi_store() -> PoiStore:
+    """懒加载 POI 库"""
+    global _poi_store
+
+    if _poi_store is None:
+        if not os.path.exists(POI_STORE_PATH):
+            build_poi_store(generate_pois(), POI_STORE_PATH)
+        _poi_store = PoiStore(POI_STORE_PATH)
+
+    return _poi_store
+
+
+def _parse_location(text: str) -> tuple[float, float]:
+    """"纬度,经度" -> (纬度, 经度)，格式或范围错误时抛出 ValueError"""
+    parts = text.split(",")
+    if len(parts) != 2:
+        raise ValueError(f"location 格式应为 纬度,经度: {text}")
+    lat, lon = (float(x) for x in parts)
+    if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+        raise ValueError(f"location 超出范围: {text}")
+    return lat, lon
+
+
+def search_poi(arguments: dict[str, Any]) -> dict[str, Any]:
+    """检索 POI；参数格式错误时返回空结果与 error"""
+    keywords = arguments["keywords"]
+    city = arguments.get("city", "")
+    result: dict[str, Any] = {"keywords": keywords, "city": city, "pois": [], "count": 0}
+    try:
+        location = _parse_location(arguments["location"]) if arguments.get("location") else None
+        radius = float(arguments["radius"]) if arguments.get("radius") else None
+        top_k = int(arguments.get("top_k", 10))
+    except (TypeError, ValueError) as e:
+        result["error"] = str(e)
+        return result
+
+    pois = get_poi_store().search(
+        keywords,
+        city=city or None,
+        location=location,
+        radius_m=radius,
+        top_k=top_k,
+        sort=arguments.get("sort", "relevance"),
+    )
+    result.update(pois=pois, count=len(pois))
+    return result
+
+
+WEATHER_SCHEMA = {
+    "type": "object",
+    "properties": {"city": {"type": "string", "description": "城市名称"}},
+    "required": ["city"],
+}
+
+ROUTE_OUTPUT_SCHEMA = object_schema(
+    {
+        "origin": {"type": "string"},
+        "destination": {"type": "string"},
+        "mode": {"type": "string"},
+        "distance": {"type": "string"},
+        "duration": {"type": "string"},
+        "distance_m": {"type": "number"},
+        "duration_s": {"type": "integer"},
+        "routes": {"type": "array"},
+        "polyline": {"type": "array"},
+        "error": {"type": "string"},
+    },
+    required=["origin", "destination", "mode"],
+)
+
+POI_OUTPUT_SCHEMA = object_schema(
+    {
+        "keywords": {"type": "string"},
+        "city": {"type": "string"},
+        "pois": {"type": "array"},
+        "count": {"type": "integer"},
+        "error": {"type": "string"},
+    },
+    required=["keywords", "pois", "count"],
+)
+
+WEATHER_OUTPUT_SCHEMA = object_schema(
+    {
+        "city": {"type": "string"},
+        "weather": {"type": "string"},
+        "temperature": {"type": "string"},
+        "humidity": {"type": "string"},
+    },
+    required=["city"],
+)
+
+
+def get_weather(arguments: dict[str, Any]) -> dict[str, Any]:
+    """查询单个城市天气"""
+    return {
+        "city": arguments["city"],
+        "weather": "晴",
+        "temperature": "25°C",
+        "humidity": "60%",
+    }
+
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
@@ -19,8 +157,8 @@ async def list_tools() -> list[Tool]:
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "origin": {"type": "string", "description": "起点"},
-                    "destination": {"type": "string", "description": "终点"},
+                    "origin": {"type": "string", "description": "起点（地名或 \"纬度,经度\"）"},
+                    "destination": {"type": "string", "description": "终点（地名或 \"纬度,经度\"）"},
                     "mode": {
                         "type": "string",
                         "enum": ["driving", "walking", "transit"],
@@ -29,6 +167,7 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["origin", "destination"],
             },
+            outputSchema=ROUTE_OUTPUT_SCHEMA,
         ),
         Tool(
             name="search_poi",
@@ -38,77 +177,70 @@ async def list_tools() -> list[Tool]:
                 "properties": {
                     "keywords": {"type": "string", "description": "关键词"},
                     "city": {"type": "string", "description": "城市"},
+                    "location": {
+                        "type": "string",
+                        "description": "中心点坐标 \"纬度,经度\"，提供时按距离衰减排序",
+                    },
+                    "radius": {"type": "integer", "description": "搜索半径（米），需配合 location"},
+                    "sort": {
+                        "type": "string",
+                        "enum": ["relevance", "distance"],
+                        "description": "排序方式，默认 relevance",
+                    },
+                    "top_k": {"type": "integer", "description": "返回数量，默认 10"},
                 },
                 "required": ["keywords"],
             },
+            outputSchema=POI_OUTPUT_SCHEMA,
         ),
         Tool(
             name="get_weather",
             description="获取天气信息",
-            inputSchema={
-                "type": "object",
-                "properties": {"city": {"type": "string", "description": "城市名称"}},
-                "required": ["city"],
-            },
+            inputSchema=WEATHER_SCHEMA,
+            outputSchema=WEATHER_OUTPUT_SCHEMA,
+        ),
+        Tool(
+            name="get_weather_batch",
+            description="批量获取多个城市的天气信息",
+            inputSchema=batch_schema(WEATHER_SCHEMA),
+            outputSchema=batch_output_schema(WEATHER_OUTPUT_SCHEMA),
         ),
     ]
 
 
 @app.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+async def call_tool(name: str, arguments: dict[str, Any]) -> ToolResult:
     """调用工具"""
     if name == "plan_route":
         origin = arguments["origin"]
         destination = arguments["destination"]
         mode = arguments.get("mode", "driving")
 
-        result = {
-            "origin": origin,
-            "destination": destination,
-            "mode": mode,
-            "distance": "1250km",
-            "duration": "12小时",
-            "routes": [{"name": "G1高速", "distance": "1250km", "duration": "12小时"}],
-        }
-        return [TextContent(type="text", text=str(result))]
+        return structured_result(get_network().plan(origin, destination, mode))
 
     elif name == "search_poi":
-        keywords = arguments["keywords"]
-        city = arguments.get("city", "")
-
-        result = {
-            "keywords": keywords,
-            "city": city,
-            "pois": [
-                {"name": f"{keywords}1", "address": f"{city}市XX路1号"},
-                {"name": f"{keywords}2", "address": f"{city}市XX路2号"},
-            ],
-        }
-        return [TextContent(type="text", text=str(result))]
+        return structured_result(search_poi(arguments))
 
     elif name == "get_weather":
-        city = arguments["city"]
+        return structured_result(get_weather(arguments))
 
-        result = {
-            "city": city,
-            "weather": "晴",
-            "temperature": "25°C",
-            "humidity": "60%",
-        }
-        return [TextContent(type="text", text=str(result))]
+    elif name == "get_weather_batch":
+        results = await run_batch(get_weather, arguments["items"])
+        return structured_result({"results": results, "count": len(results)})
 
     return [TextContent(type="text", text="Unknown tool")]
 
 
-async def main():
-    """启动服务器"""
-    from mcp.server.stdio import stdio_server
+def prepare() -> None:
+    """启动时预加载路网与 POI 库"""
+    get_network()
+    get_poi_store()
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
 
+def main():
+    """启动服务器（默认 stdio，--transport streamable-http 以 HTTP 服务运行，见 launcher.py）"""
+    serve(app, "mcp_servers.server_amap")
 
-if __name__ == "__main__":
-    import asyncio
 
-    asyncio.run(main())
+if __name__ == "__main__":
+    main()
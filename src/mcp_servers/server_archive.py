@@ -0,0 +1,509 @@
+"""
+Archive MCP Server - 本地归档检索服务
+
+为 data/crawled/ 下的 Markdown 归档维护增量的 SQLite FTS5 全文索引，
+并可选地维护本地向量索引，按片段（chunk）返回相关内容。
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from typing import Any, Optional
+from pathlib import Path
+from mcp.server import Server
+from mcp.types import Tool, TextContent
+import hashlib
+import re
+import sqlite3
+import struct
+
+from mcp_servers.launcher import serve
+from mcp_servers.structured import ToolResult, object_schema, structured_result
+
+app = Server("server_archive")
+
+SEARCH_OUTPUT_SCHEMA = object_schema(
+    {"query": {"type": "string"}, "results": {"type": "array"}, "count": {"type": "integer"}},
+    required=["query", "results", "count"],
+)
+
+CHUNK_OUTPUT_SCHEMA = object_schema(
+    {
+        "chunk_id": {"type": "integer"},
+        "path": {"type": "string"},
+        "heading": {"type": ["string", "null"]},
+        "text": {"type": "string"},
+        "error": {"type": "string"},
+    }
+)
+
+REINDEX_OUTPUT_SCHEMA = object_schema(
+    {"changes": {"type": "object"}, "stats": {"type": "object"}},
+    required=["changes", "stats"],
+)
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "data/crawled")
+INDEX_PATH = os.getenv("ARCHIVE_INDEX_PATH", "data/archive_index.db")
+# 可选：本地 embedding 模型名称（需安装 sentence-transformers），为空则只用全文索引
+EMBED_MODEL = os.getenv("ARCHIVE_EMBED_MODEL", "")
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*)$")
+
+
+def chunk_markdown(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list[dict]:
+    """
+    按标题切分 Markdown，过长的段落再按字符窗口切分
+
+    Returns:
+        [{"heading": str, "text": str, "line": int}, ...]
+    """
+    sections: list[tuple[str, int, list[str]]] = []
+    heading, start, buf = "", 1, []
+
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        match = _HEADING_RE.match(line)
+        if match:
+            if any(s.strip() for s in buf):
+                sections.append((heading, start, buf))
+            heading, start, buf = match.group(2).strip(), lineno, [line]
+        else:
+            buf.append(line)
+    if any(s.strip() for s in buf):
+        sections.append((heading, start, buf))
+
+    chunks = []
+    for heading, line, lines in sections:
+        body = "\n".join(lines).strip()
+        if len(body) <= chunk_size:
+            chunks.append({"heading": heading, "text": body, "line": line})
+            continue
+
+        step = max(chunk_size - overlap, 1)
+        for offset in range(0, len(body), step):
+            piece = body[offset : offset + chunk_size].strip()
+            if piece:
+                chunks.append({"heading": heading, "text": piece, "line": line})
+            if offset + chunk_size >= len(body):
+                break
+
+    return chunks
+
+
+class LocalEmbedder:
+    """本地 embedding 封装，依赖缺失时不可用"""
+
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+
+        self.model_name = model_name
+        self.model = SentenceTransformer(model_name)
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors = self.model.encode(texts, normalize_embeddings=True)
+        return [list(map(float, v)) for v in vectors]
+
+
+def _pack_vector(vector: list[float]) -> bytes:
+    return struct.pack(f"{len(vector)}f", *vector)
+
+
+def _unpack_vector(blob: bytes) -> list[float]:
+    return list(struct.unpack(f"{len(blob) // 4}f", blob))
+
+
+class ArchiveIndex:
+    """
+    归档索引
+
+    documents 记录文件的 mtime/size/sha1 用于增量更新，
+    chunks_fts 为 trigram 分词的 FTS5 外部内容表，支持中文子串检索。
+    """
+
+    def __init__(
+        self,
+        archive_dir: str = ARCHIVE_DIR,
+        index_path: str = INDEX_PATH,
+        embedder: Optional[LocalEmbedder] = None,
+    ):
+        self.archive_dir = Path(archive_dir)
+        self.index_path = index_path
+        self.embedder = embedder
+
+        if index_path != ":memory:":
+            Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(index_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._init_schema()
+
+    def _init_schema(self) -> None:
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS documents (
+                path TEXT PRIMARY KEY,
+                mtime REAL,
+                size INTEGER,
+                sha1 TEXT
+            );
+
+            CREATE TABLE IF NOT EXISTS chunks (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL,
+                ord INTEGER NOT NULL,
+                heading TEXT,
+                line INTEGER,
+                text TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chunks_path ON chunks(path, ord);
+
+            CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+                heading, text, content='chunks', content_rowid='id', tokenize='trigram'
+            );
+
+            CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+                INSERT INTO chunks_fts(rowid, heading, text) VALUES (new.id, new.heading, new.text);
+            END;
+            CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+                INSERT INTO chunks_fts(chunks_fts, rowid, heading, text)
+                VALUES ('delete', old.id, old.heading, old.text);
+            END;
+
+            CREATE TABLE IF NOT EXISTS chunk_vectors (
+                chunk_id INTEGER PRIMARY KEY,
+                model TEXT NOT NULL,
+                vector BLOB NOT NULL
+            );
+        """)
+        self.conn.commit()
+
+    def refresh(self) -> dict[str, int]:
+        """
+        增量同步归档目录
+
+        只重新切分 mtime/size 变化且内容哈希不同的文件，删除已消失文件的索引。
+        """
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        known = {
+            row["path"]: row
+            for row in self.conn.execute("SELECT path, mtime, size, sha1 FROM documents")
+        }
+        seen = set()
+
+        files = sorted(self.archive_dir.rglob("*.md")) if self.archive_dir.exists() else []
+        for file in files:
+            rel = file.relative_to(self.archive_dir).as_posix()
+            seen.add(rel)
+            stat = file.stat()
+            row = known.get(rel)
+            if row and row["mtime"] == stat.st_mtime and row["size"] == stat.st_size:
+                stats["unchanged"] += 1
+                continue
+
+            content = file.read_text(encoding="utf-8", errors="replace")
+            sha1 = hashlib.sha1(content.encode("utf-8")).hexdigest()
+            if row and row["sha1"] == sha1:
+                self.conn.execute(
+                    "UPDATE documents SET mtime = ?, size = ? WHERE path = ?",
+                    (stat.st_mtime, stat.st_size, rel),
+                )
+                stats["unchanged"] += 1
+                continue
+
+            self._delete_document(rel)
+            self._index_document(rel, content)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents(path, mtime, size, sha1) VALUES (?, ?, ?, ?)",
+                (rel, stat.st_mtime, stat.st_size, sha1),
+            )
+            stats["updated" if row else "added"] += 1
+
+        for rel in set(known) - seen:
+            self._delete_document(rel)
+            self.conn.execute("DELETE FROM documents WHERE path = ?", (rel,))
+            stats["removed"] += 1
+
+        self.conn.commit()
+        return stats
+
+    def _delete_document(self, rel: str) -> None:
+        self.conn.execute(
+            "DELETE FROM chunk_vectors WHERE chunk_id IN (SELECT id FROM chunks WHERE path = ?)",
+            (rel,),
+        )
+        self.conn.execute("DELETE FROM chunks WHERE path = ?", (rel,))
+
+    def _index_document(self, rel: str, content: str) -> None:
+        chunks = chunk_markdown(content)
+        ids = []
+        for ord_, chunk in enumerate(chunks):
+            cursor = self.conn.execute(
+                "INSERT INTO chunks(path, ord, heading, line, text) VALUES (?, ?, ?, ?, ?)",
+                (rel, ord_, chunk["heading"], chunk["line"], chunk["text"]),
+            )
+            ids.append(cursor.lastrowid)
+
+        if self.embedder and chunks:
+            vectors = self.embedder.embed([c["text"] for c in chunks])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO chunk_vectors(chunk_id, model, vector) VALUES (?, ?, ?)",
+                [
+                    (cid, self.embedder.model_name, _pack_vector(vec))
+                    for cid, vec in zip(ids, vectors)
+                ],
+            )
+
+    @staticmethod
+    def _fts_query(query: str) -> Optional[str]:
+        """将用户输入转为 FTS5 查询：每个词作为短语，OR 连接；trigram 要求至少 3 个字符"""
+        terms = [t for t in re.split(r"\s+", query.strip()) if len(t) >= 3]
+        if not terms:
+            return None
+        return " OR ".join('"' + t.replace('"', '""') + '"' for t in terms)
+
+    def search_fulltext(self, query: str, top_k: int = 5) -> list[dict]:
+        """BM25 全文检索，短于 3 个字符的查询退化为 LIKE 匹配"""
+        fts_query = self._fts_query(query)
+        if fts_query:
+            rows = self.conn.execute(
+                """
+                SELECT c.id, c.path, c.ord, c.heading, c.line,
+                       snippet(chunks_fts, 1, '**', '**', '…', 24) AS snippet,
+                       bm25(chunks_fts) AS score
+                FROM chunks_fts JOIN chunks c ON c.id = chunks_fts.rowid
+                WHERE chunks_fts MATCH ?
+                ORDER BY score LIMIT ?
+                """,
+                (fts_query, top_k),
+            ).fetchall()
+            return [
+                {
+                    "chunk_id": r["id"],
+                    "path": r["path"],
+                    "ord": r["ord"],
+                    "heading": r["heading"],
+                    "line": r["line"],
+                    "snippet": r["snippet"],
+                    "score": -r["score"],
+                }
+                for r in rows
+            ]
+
+        rows = self.conn.execute(
+            "SELECT id, path, ord, heading, line, text FROM chunks WHERE text LIKE ? LIMIT ?",
+            (f"%{query.strip()}%", top_k),
+        ).fetchall()
+        return [
+            {
+                "chunk_id": r["id"],
+                "path": r["path"],
+                "ord": r["ord"],
+                "heading": r["heading"],
+                "line": r["line"],
+                "snippet": r["text"][:200],
+                "score": 0.0,
+            }
+            for r in rows
+        ]
+
+    def search_vector(self, query: str, top_k: int = 5) -> list[dict]:
+        """余弦相似度检索（向量已归一化，直接点积）"""
+        if not self.embedder:
+            return []
+
+        qvec = self.embedder.embed([query])[0]
+        scored = []
+        for row in self.conn.execute(
+            "SELECT chunk_id, vector FROM chunk_vectors WHERE model = ?",
+            (self.embedder.model_name,),
+        ):
+            vec = _unpack_vector(row["vector"])
+            scored.append((sum(a * b for a, b in zip(qvec, vec)), row["chunk_id"]))
+        scored.sort(reverse=True)
+
+        results = []
+        for score, chunk_id in scored[:top_k]:
+            chunk = self.get_chunk(chunk_id)
+            if chunk:
+                chunk["snippet"] = chunk.pop("text")[:200]
+                chunk["score"] = score
+                results.append(chunk)
+        return results
+
+    def search(self, query: str, top_k: int = 5, mode: str = "hybrid") -> list[dict]:
+        """
+        检索归档
+
+        Args:
+            mode: fulltext / vector / hybrid（倒数排名融合）
+        """
+        if mode == "fulltext" or not self.embedder:
+            return self.search_fulltext(query, top_k)
+        if mode == "vector":
+            return self.search_vector(query, top_k)
+
+        # Reciprocal Rank Fusion
+        fused: dict[int, dict] = {}
+        for results in (
+            self.search_fulltext(query, top_k * 2),
+            self.search_vector(query, top_k * 2),
+        ):
+            for rank, item in enumerate(results):
+                entry = fused.setdefault(item["chunk_id"], dict(item, score=0.0))
+                entry["score"] += 1.0 / (60 + rank)
+        ranked = sorted(fused.values(), key=lambda x: x["score"], reverse=True)
+        return ranked[:top_k]
+
+    def get_chunk(self, chunk_id: int, context: int = 0) -> Optional[dict]:
+        """获取片段全文，context > 0 时附带前后相邻片段"""
+        row = self.conn.execute(
+            "SELECT id, path, ord, heading, line, text FROM chunks WHERE id = ?",
+            (chunk_id,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        text = row["text"]
+        if context > 0:
+            neighbours = self.conn.execute(
+                "SELECT text FROM chunks WHERE path = ? AND ord BETWEEN ? AND ? ORDER BY ord",
+                (row["path"], row["ord"] - context, row["ord"] + context),
+            ).fetchall()
+            text = "\n\n".join(n["text"] for n in neighbours)
+
+        return {
+            "chunk_id": row["id"],
+            "path": row["path"],
+            "ord": row["ord"],
+            "heading": row["heading"],
+            "line": row["line"],
+            "text": text,
+        }
+
+    def stats(self) -> dict[str, Any]:
+        docs = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        chunks = self.conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        vectors = self.conn.execute("SELECT COUNT(*) FROM chunk_vectors").fetchone()[0]
+        return {
+            "documents": docs,
+            "chunks": chunks,
+            "vectors": vectors,
+            "embed_model": self.embedder.model_name if self.embedder else None,
+        }
+
+
+_index: Optional[ArchiveIndex] = None
+
+
+def get_index() -> ArchiveIndex:
+    """懒加载索引，首次使用时同步一次归档目录"""
+    global _index
+
+    if _index is None:
+        embedder = None
+        if EMBED_MODEL:
+            try:
+                embedder = LocalEmbedder(EMBED_MODEL)
+            except ImportError:
+                embedder = None
+        _index = ArchiveIndex(embedder=embedder)
+        _index.refresh()
+
+    return _index
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """列出可用工具"""
+    return [
+        Tool(
+            name="search_archive",
+            description="在本地网页归档 (data/crawled) 中检索相关片段，返回片段 ID 与摘要",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string", "description": "检索关键词或问题"},
+                    "top_k": {"type": "integer", "description": "返回数量，默认 5"},
+                    "mode": {
+                        "type": "string",
+                        "enum": ["hybrid", "fulltext", "vector"],
+                        "description": "检索方式，默认 hybrid",
+                    },
+                },
+                "required": ["query"],
+            },
+            outputSchema=SEARCH_OUTPUT_SCHEMA,
+        ),
+        Tool(
+            name="get_chunk",
+            description="根据片段 ID 获取归档片段全文",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "chunk_id": {"type": "integer", "description": "片段 ID"},
+                    "context": {
+                        "type": "integer",
+                        "description": "附带前后相邻片段的数量，默认 0",
+                    },
+                },
+                "required": ["chunk_id"],
+            },
+            outputSchema=CHUNK_OUTPUT_SCHEMA,
+        ),
+        Tool(
+            name="reindex_archive",
+            description="增量同步归档目录到索引",
+            inputSchema={"type": "object", "properties": {}, "required": []},
+            outputSchema=REINDEX_OUTPUT_SCHEMA,
+        ),
+    ]
+
+
+@app.call_tool()
+async def call_tool(name: str, arguments: dict[str, Any]) -> ToolResult:
+    """调用工具"""
+    index = get_index()
+
+    if name == "search_archive":
+        # 每次检索前做一次廉价的增量同步（仅 stat 文件）
+        index.refresh()
+        query = arguments["query"]
+        top_k = int(arguments.get("top_k", 5))
+        mode = arguments.get("mode", "hybrid")
+
+        results = index.search(query, top_k=top_k, mode=mode)
+        return structured_result({"query": query, "results": results, "count": len(results)})
+
+    elif name == "get_chunk":
+        chunk = index.get_chunk(int(arguments["chunk_id"]), int(arguments.get("context", 0)))
+        if chunk is None:
+            chunk = {"error": f"chunk not found: {arguments['chunk_id']}"}
+        return structured_result(chunk)
+
+    elif name == "reindex_archive":
+        return structured_result({"changes": index.refresh(), "stats": index.stats()})
+
+    return [TextContent(type="text", text="Unknown tool")]
+
+
+def prepare() -> None:
+    """启动时打开索引并做一次增量同步"""
+    get_index()
+
+
+def shutdown() -> None:
+    """退出时关闭索引连接"""
+    if _index is not None:
+        _index.conn.close()
+
+
+def main():
+    """启动服务器（默认 stdio，--transport streamable-http 以 HTTP 服务运行，见 launcher.py）"""
+    serve(app, "mcp_servers.server_archive")
+
+
+if __name__ == "__main__":
+    main()
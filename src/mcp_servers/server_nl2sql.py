@@ -2,11 +2,19 @@
 NL2SQL MCP Server - 自然语言转SQL服务
 """
 
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
 from typing import Any
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 import sqlite3
-import json
+
+from mcp_servers.batching import batch_output_schema, batch_schema, run_batch
+from mcp_servers.launcher import serve
+from mcp_servers.structured import ToolResult, object_schema, structured_result
 
 app = Server("server_nl2sql")
 
@@ -53,7 +61,12 @@ def init_database():
 
 
 def execute_query(sql: str) -> list[dict]:
-    """执行SQL查询"""
+    """
+    执行SQL查询
+
+    SQL 错误（sqlite3.Error）直接抛出：工具处理函数中的异常由 mcp Server 转为 isError 结果，
+    客户端据此区分失败与正常结果（例如恰好只有一列名为 error 的表）。
+    """
     conn = sqlite3.connect(DB_PATH)
     conn.row_factory = sqlite3.Row
     cursor = conn.cursor()
@@ -64,12 +77,31 @@ def execute_query(sql: str) -> list[dict]:
         result = [dict(row) for row in rows]
         conn.commit()
         return result
-    except Exception as e:
-        return [{"error": str(e)}]
     finally:
         conn.close()
 
 
+EXECUTE_SQL_SCHEMA = {
+    "type": "object",
+    "properties": {"sql": {"type": "string", "description": "SQL语句"}},
+    "required": ["sql"],
+}
+
+# structuredContent 必须是 object，查询结果行放在 rows 字段中
+ROWS_OUTPUT_SCHEMA = object_schema(
+    {"sql": {"type": "string"}, "rows": {"type": "array"}, "count": {"type": "integer"}},
+    required=["sql", "rows", "count"],
+)
+
+SCHEMA_OUTPUT_SCHEMA = object_schema({"tables": {"type": "array"}}, required=["tables"])
+
+
+def run_sql(arguments: dict[str, Any]) -> dict[str, Any]:
+    """执行单条 SQL，返回 {"sql", "rows", "count"}；SQL 错误时抛出（批量工具中记为该项失败）"""
+    rows = execute_query(arguments["sql"])
+    return {"sql": arguments["sql"], "rows": rows, "count": len(rows)}
+
+
 @app.list_tools()
 async def list_tools() -> list[Tool]:
     """列出可用工具"""
@@ -84,26 +116,31 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["query"],
             },
+            outputSchema=ROWS_OUTPUT_SCHEMA,
         ),
         Tool(
             name="execute_sql",
             description="直接执行SQL查询",
-            inputSchema={
-                "type": "object",
-                "properties": {"sql": {"type": "string", "description": "SQL语句"}},
-                "required": ["sql"],
-            },
+            inputSchema=EXECUTE_SQL_SCHEMA,
+            outputSchema=ROWS_OUTPUT_SCHEMA,
+        ),
+        Tool(
+            name="execute_sql_batch",
+            description="批量执行多条SQL查询（各自独立连接，并发执行）",
+            inputSchema=batch_schema(EXECUTE_SQL_SCHEMA),
+            outputSchema=batch_output_schema(ROWS_OUTPUT_SCHEMA),
         ),
         Tool(
             name="get_schema",
             description="获取数据库表结构",
             inputSchema={"type": "object", "properties": {}, "required": []},
+            outputSchema=SCHEMA_OUTPUT_SCHEMA,
         ),
     ]
 
 
 @app.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+async def call_tool(name: str, arguments: dict[str, Any]) -> ToolResult:
     """调用工具"""
     if name == "nl2sql":
         query = arguments["query"].lower()
@@ -121,18 +158,14 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
         else:
             sql = f"-- 无法解析: {query}"
 
-        result = execute_query(sql)
-        return [
-            TextContent(
-                type="text",
-                text=json.dumps({"sql": sql, "result": result}, ensure_ascii=False),
-            )
-        ]
+        return structured_result(run_sql({"sql": sql}))
 
     elif name == "execute_sql":
-        sql = arguments["sql"]
-        result = execute_query(sql)
-        return [TextContent(type="text", text=json.dumps(result, ensure_ascii=False))]
+        return structured_result(run_sql(arguments))
+
+    elif name == "execute_sql_batch":
+        results = await run_batch(run_sql, arguments["items"])
+        return structured_result({"results": results, "count": len(results)})
 
     elif name == "get_schema":
         schema = {
@@ -151,21 +184,20 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
                 },
             ]
         }
-        return [TextContent(type="text", text=json.dumps(schema, ensure_ascii=False))]
+        return structured_result(schema)
 
     return [TextContent(type="text", text="Unknown tool")]
 
 
-async def main():
-    """启动服务器"""
+def prepare() -> None:
+    """启动时初始化数据库"""
     init_database()
-    from mcp.server.stdio import stdio_server
 
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
 
+def main():
+    """启动服务器（默认 stdio，--transport streamable-http 以 HTTP 服务运行，见 launcher.py）"""
+    serve(app, "mcp_servers.server_nl2sql")
 
-if __name__ == "__main__":
-    import asyncio
 
-    asyncio.run(main())
+if __name__ == "__main__":
+    main()
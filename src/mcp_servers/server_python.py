@@ -2,15 +2,41 @@
 Python执行 MCP Server - 代码执行服务
 """
 
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
 from typing import Any
 from mcp.server import Server
 from mcp.types import Tool, TextContent
-import sys
 import io
 import traceback
 
+from mcp_servers.launcher import serve
+from mcp_servers.structured import ToolResult, object_schema, structured_result
+
 app = Server("server_python")
 
+EXECUTE_OUTPUT_SCHEMA = object_schema(
+    {
+        "output": {"type": "string"},
+        "error": {"type": ["string", "null"]},
+        "success": {"type": "boolean"},
+    },
+    required=["success"],
+)
+
+ANALYZE_OUTPUT_SCHEMA = object_schema(
+    {
+        "operation": {"type": "string"},
+        "result": {},
+        "success": {"type": "boolean"},
+        "error": {"type": "string"},
+    },
+    required=["operation", "success"],
+)
+
 
 @app.list_tools()
 async def list_tools() -> list[Tool]:
@@ -26,6 +52,7 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["code"],
             },
+            outputSchema=EXECUTE_OUTPUT_SCHEMA,
         ),
         Tool(
             name="analyze_data",
@@ -41,12 +68,13 @@ async def list_tools() -> list[Tool]:
                 },
                 "required": ["data", "operation"],
             },
+            outputSchema=ANALYZE_OUTPUT_SCHEMA,
         ),
     ]
 
 
 @app.call_tool()
-async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
+async def call_tool(name: str, arguments: dict[str, Any]) -> ToolResult:
     """调用工具"""
     if name == "execute_python":
         code = arguments["code"]
@@ -86,15 +114,11 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
                 "success": not error,
             }
 
-            return [TextContent(type="text", text=str(result))]
+            return structured_result(result)
 
         except Exception as e:
             error_msg = f"Error: {type(e).__name__}: {str(e)}\n{traceback.format_exc()}"
-            return [
-                TextContent(
-                    type="text", text=str({"success": False, "error": error_msg})
-                )
-            ]
+            return structured_result({"success": False, "error": error_msg})
 
         finally:
             sys.stdout = old_stdout
@@ -120,25 +144,22 @@ async def call_tool(name: str, arguments: dict[str, Any]) -> list[TextContent]:
             else:
                 result = df.to_dict()
 
-            return [
-                TextContent(type="text", text=json.dumps(result, ensure_ascii=False))
-            ]
+            # describe() 的键可能是非字符串，经 JSON 往返统一为可序列化的结构
+            result = json.loads(json.dumps(result, ensure_ascii=False, default=str))
+            return structured_result({"operation": operation, "result": result, "success": True})
 
         except ImportError:
-            return [TextContent(type="text", text="pandas not installed")]
+            return structured_result(
+                {"operation": operation, "success": False, "error": "pandas not installed"}
+            )
 
     return [TextContent(type="text", text="Unknown tool")]
 
 
-async def main():
-    """启动服务器"""
-    from mcp.server.stdio import stdio_server
-
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+def main():
+    """启动服务器（默认 stdio，--transport streamable-http 以 HTTP 服务运行，见 launcher.py）"""
+    serve(app, "mcp_servers.server_python")
 
 
 if __name__ == "__main__":
-    import asyncio
-
-    asyncio.run(main())
+    main()
@@ -0,0 +1,31 @@
+"""
+结构化工具结果
+
+工具同时返回 structuredContent 与紧凑 JSON 文本：
+客户端直接读取 structuredContent 得到 dict，无需再解析文本；
+文本内容保留给只读取 content 的客户端（以及进入 LLM 上下文的场景）。
+
+声明了 outputSchema 的工具，其 structuredContent 会由 mcp Server 按 schema 校验。
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Tuple, Union
+
+from mcp.types import TextContent
+
+# @app.call_tool() 处理函数的返回类型：纯文本，或 (文本, 结构化内容)
+ToolResult = Union[List[TextContent], Tuple[List[TextContent], Dict[str, Any]]]
+
+
+def structured_result(data: Dict[str, Any]) -> Tuple[List[TextContent], Dict[str, Any]]:
+    """包装为 (content, structuredContent)，供 @app.call_tool() 处理函数直接返回"""
+    text = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return [TextContent(type="text", text=text)], data
+
+
+def object_schema(properties: Dict[str, Any], required: Iterable[str] = ()) -> Dict[str, Any]:
+    """构造 object 类型的 JSON Schema（只校验顶层字段，避免大结果的深度校验开销）"""
+    return {"type": "object", "properties": properties, "required": list(required)}
+
+
+__all__ = ["ToolResult", "structured_result", "object_schema"]
@@ -0,0 +1,523 @@
+"""
+列车时刻表检索引擎
+
+将时刻表数据集加载为紧凑的数组结构：
+- 所有停站按车次连续存放（CSR），train_offsets[t]..train_offsets[t+1] 为车次 t 的停站
+- 每个车站一个按发车时刻（当日分钟数）排序的倒排表，时间窗口查询通过二分完成
+
+支持直达与一次换乘查询、发车时间窗口、席别过滤与开行日过滤。
+"""
+
+import bisect
+import datetime as dt
+import json
+import math
+import random
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+MINUTES_PER_DAY = 1440
+
+# 每公里票价（元），按车次类型与席别
+DEFAULT_FARES: Dict[str, Dict[str, float]] = {
+    "G": {"商务座": 1.46, "一等座": 0.74, "二等座": 0.42},
+    "D": {"一等座": 0.37, "二等座": 0.31},
+    "K": {"硬座": 0.08, "硬卧": 0.15, "软卧": 0.23},
+}
+
+
+def _fmt_time(minutes: int) -> str:
+    day, minute = divmod(minutes, MINUTES_PER_DAY)
+    text = f"{minute // 60:02d}:{minute % 60:02d}"
+    return f"{text}+{day}" if day else text
+
+
+def _parse_time(text: Optional[str], default: int) -> int:
+    """HH:MM -> 当日分钟数，格式错误时抛出 ValueError"""
+    if not text:
+        return default
+    hour, sep, minute = text.partition(":")
+    if not (sep and hour.isdigit() and minute.isdigit() and int(hour) < 24 and int(minute) < 60):
+        raise ValueError(f"时间格式应为 HH:MM: {text}")
+    return int(hour) * 60 + int(minute)
+
+
+def _time_window(depart_after: Optional[str], depart_before: Optional[str]) -> Tuple[int, int]:
+    """
+    发车时间窗口（分钟）
+
+    depart_after 晚于 depart_before 时（如 22:00-02:00）视为跨零点：查询当天 [depart_after, 24:00)
+    与 [00:00, depart_before]，_window 按 end >= 一天的分钟数拆成两段。
+    """
+    start = _parse_time(depart_after, 0)
+    end = _parse_time(depart_before, MINUTES_PER_DAY - 1)
+    if end < start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def _parse_date(text: str) -> dt.date:
+    """YYYY-MM-DD -> date，格式错误时抛出 ValueError"""
+    try:
+        return dt.date.fromisoformat(text)
+    except (TypeError, ValueError):
+        raise ValueError(f"日期格式应为 YYYY-MM-DD: {text}") from None
+
+
+class TimetableEngine:
+    """时刻表检索引擎"""
+
+    def __init__(
+        self,
+        stations: List[Dict[str, Any]],
+        trains: List[Dict[str, Any]],
+        fares: Optional[Dict[str, Dict[str, float]]] = None,
+    ):
+        """
+        Args:
+            stations: [{"name", "city", ...}]，下标即车站 ID
+            trains: [{"train_no", "type", "days", "stops": [[station, arr, dep, km], ...]}]
+                arr/dep 为相对始发日 0 点的分钟数（可超过 1440 表示次日），
+                days 为星期位图（bit0 = 周一）
+            fares: 每公里票价表，缺省使用 DEFAULT_FARES
+        """
+        self.fares = fares or DEFAULT_FARES
+
+        self.station_names = [s["name"] for s in stations]
+        self.station_index = {name: i for i, name in enumerate(self.station_names)}
+        self.city_stations: Dict[str, List[int]] = {}
+        for i, station in enumerate(stations):
+            self.city_stations.setdefault(station.get("city", station["name"]), []).append(i)
+
+        self.train_nos: List[str] = []
+        self.train_types: List[str] = []
+        self.train_days = array("B")
+        self.train_offsets = array("i", [0])
+        self.stop_train = array("i")
+        self.stop_station = array("i")
+        self.stop_arr = array("i")
+        self.stop_dep = array("i")
+        self.stop_km = array("i")
+
+        for train in trains:
+            t = len(self.train_nos)
+            self.train_nos.append(train["train_no"])
+            self.train_types.append(train.get("type") or train["train_no"][0])
+            self.train_days.append(train.get("days", 0x7F))
+            for station, arr, dep, km in train["stops"]:
+                self.stop_train.append(t)
+                self.stop_station.append(station)
+                self.stop_arr.append(arr)
+                self.stop_dep.append(dep)
+                self.stop_km.append(km)
+            self.train_offsets.append(len(self.stop_train))
+        self.train_index = {no: i for i, no in enumerate(self.train_nos)}
+
+        self._build_postings()
+
+    def _build_postings(self) -> None:
+        """为每个车站构建按当日发车分钟排序的 (发车分钟, 停站下标) 倒排表"""
+        buckets: List[List[Tuple[int, int]]] = [[] for _ in self.station_names]
+        for t in range(len(self.train_nos)):
+            # 终到站不发车，不进入倒排表
+            for g in range(self.train_offsets[t], self.train_offsets[t + 1] - 1):
+                buckets[self.stop_station[g]].append((self.stop_dep[g] % MINUTES_PER_DAY, g))
+
+        self.post_dep: List[array] = []
+        self.post_stop: List[array] = []
+        # 车站 -> 经停该站的 (车次, 停站下标)，用于构建到站映射
+        self.arrivals: List[array] = [array("i") for _ in self.station_names]
+        for bucket in buckets:
+            bucket.sort()
+            self.post_dep.append(array("i", (d for d, _ in bucket)))
+            self.post_stop.append(array("i", (g for _, g in bucket)))
+        for g in range(len(self.stop_train)):
+            if g != self.train_offsets[self.stop_train[g]]:
+                self.arrivals[self.stop_station[g]].append(g)
+
+    @classmethod
+    def load(cls, path: str) -> "TimetableEngine":
+        """从 JSON 数据集加载"""
+        with open(Path(path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["stations"], data["trains"], data.get("fares"))
+
+    # ------------------------------------------------------------------ 查询
+
+    def resolve(self, name: str) -> List[int]:
+        """车站名或城市名 -> 车站 ID 列表"""
+        if name in self.city_stations:
+            return self.city_stations[name]
+        if name in self.station_index:
+            return [self.station_index[name]]
+        return []
+
+    def _runs_on(self, train: int, date: dt.date) -> bool:
+        return bool(self.train_days[train] >> date.weekday() & 1)
+
+    def _arrival_map(self, station_ids: Iterable[int]) -> Dict[int, int]:
+        """车次 -> 到达目标站的停站下标"""
+        result: Dict[int, int] = {}
+        for sid in station_ids:
+            for g in self.arrivals[sid]:
+                result[self.stop_train[g]] = g
+        return result
+
+    def _window(self, sid: int, start: int, end: int) -> Iterable[int]:
+        """车站 sid 在 [start, end] 分钟内发车的停站下标，支持跨零点"""
+        deps, stops = self.post_dep[sid], self.post_stop[sid]
+        if start >= MINUTES_PER_DAY:
+            start, end = start - MINUTES_PER_DAY, end - MINUTES_PER_DAY
+        ranges = [(start, end)]
+        if end >= MINUTES_PER_DAY:
+            ranges = [(start, MINUTES_PER_DAY - 1), (0, end - MINUTES_PER_DAY)]
+        for lo_t, hi_t in ranges:
+            lo = bisect.bisect_left(deps, lo_t)
+            hi = bisect.bisect_right(deps, hi_t)
+            for i in range(lo, hi):
+                yield stops[i]
+
+    def _seat_prices(self, train: int, km: int, seat_class: Optional[str]) -> Optional[Dict[str, int]]:
+        rates = self.fares.get(self.train_types[train], {})
+        if seat_class:
+            if seat_class not in rates:
+                return None
+            rates = {seat_class: rates[seat_class]}
+        return {seat: max(1, round(rate * km)) for seat, rate in rates.items()}
+
+    def _leg(self, g_from: int, g_to: int, start_day: int, seat_class: Optional[str]) -> Optional[Dict[str, Any]]:
+        train = self.stop_train[g_from]
+        km = self.stop_km[g_to] - self.stop_km[g_from]
+        prices = self._seat_prices(train, km, seat_class)
+        if prices is None:
+            return None
+        base = start_day * MINUTES_PER_DAY
+        return {
+            "train_no": self.train_nos[train],
+            "from": self.station_names[self.stop_station[g_from]],
+            "to": self.station_names[self.stop_station[g_to]],
+            "departure": _fmt_time(base + self.stop_dep[g_from]),
+            "arrival": _fmt_time(base + self.stop_arr[g_to]),
+            "duration": self.stop_arr[g_to] - self.stop_dep[g_from],
+            "distance_km": km,
+            "prices": prices,
+            "price": min(prices.values()),
+            "_dep_abs": base + self.stop_dep[g_from],
+            "_arr_abs": base + self.stop_arr[g_to],
+        }
+
+    def query_direct(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        depart_after: Optional[str] = None,
+        depart_before: Optional[str] = None,
+        seat_class: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        直达查询，按发车时间排序
+
+        Raises:
+            ValueError: 日期或发车时间格式错误
+        """
+        day = _parse_date(date)
+        start, end = _time_window(depart_after, depart_before)
+        dest_map = self._arrival_map(self.resolve(destination))
+
+        results = []
+        for sid in self.resolve(origin):
+            for g in self._window(sid, start, end):
+                train = self.stop_train[g]
+                g_to = dest_map.get(train)
+                if g_to is None or g_to <= g:
+                    continue
+                start_day = -(self.stop_dep[g] // MINUTES_PER_DAY)
+                if not self._runs_on(train, day + dt.timedelta(days=start_day)):
+                    continue
+                leg = self._leg(g, g_to, start_day, seat_class)
+                if leg:
+                    results.append(leg)
+
+        results.sort(key=lambda x: x["_dep_abs"])
+        return [_public(r) for r in results[:limit]]
+
+    def query_transfer(
+        self,
+        origin: str,
+        destination: str,
+        date: str,
+        depart_after: Optional[str] = None,
+        depart_before: Optional[str] = None,
+        seat_class: Optional[str] = None,
+        min_transfer: int = 20,
+        max_transfer: int = 240,
+        limit: int = 10,
+    ) -> List[Dict[str, Any]]:
+        """
+        一次换乘查询，按到达时间排序
+
+        对窗口内每趟出发车次的后续停站作为换乘站，在换乘站的倒排表中
+        二分出 [到达 + min_transfer, 到达 + max_transfer] 内发车且能到达目的地的车次。
+
+        Raises:
+            ValueError: 日期或发车时间格式错误
+        """
+        day = _parse_date(date)
+        start, end = _time_window(depart_after, depart_before)
+        origin_ids = set(self.resolve(origin))
+        dest_ids = set(self.resolve(destination))
+        dest_map = self._arrival_map(dest_ids)
+
+        best: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for sid in origin_ids:
+            for g in self._window(sid, start, end):
+                train = self.stop_train[g]
+                if train in dest_map and dest_map[train] > g:
+                    continue  # 直达车次不参与换乘
+                start_day = -(self.stop_dep[g] // MINUTES_PER_DAY)
+                if not self._runs_on(train, day + dt.timedelta(days=start_day)):
+                    continue
+
+                for k in range(g + 1, self.train_offsets[train + 1]):
+                    hub = self.stop_station[k]
+                    if hub in dest_ids or hub in origin_ids:
+                        break
+                    arr_abs = start_day * MINUTES_PER_DAY + self.stop_arr[k]
+                    arr_day, arr_min = divmod(arr_abs, MINUTES_PER_DAY)
+                    for h in self._window(hub, arr_min + min_transfer, arr_min + max_transfer):
+                        train2 = self.stop_train[h]
+                        g_to = dest_map.get(train2)
+                        if train2 == train or g_to is None or g_to <= h:
+                            continue
+                        dep_min = self.stop_dep[h] % MINUTES_PER_DAY
+                        dep_day = arr_day + (1 if dep_min < arr_min else 0)
+                        start_day2 = dep_day - self.stop_dep[h] // MINUTES_PER_DAY
+                        if not self._runs_on(train2, day + dt.timedelta(days=start_day2)):
+                            continue
+
+                        leg2 = self._leg(h, g_to, start_day2, seat_class)
+                        if leg2 is None:
+                            continue
+                        key = (self.train_nos[train], leg2["train_no"])
+                        if key in best and best[key]["_arr_abs"] <= leg2["_arr_abs"]:
+                            continue
+                        leg1 = self._leg(g, k, start_day, seat_class)
+                        if leg1 is None:
+                            continue
+                        best[key] = {
+                            "legs": [_public(leg1), _public(leg2)],
+                            "transfer_station": self.station_names[hub],
+                            "transfer_wait": leg2["_dep_abs"] - leg1["_arr_abs"],
+                            "departure": leg1["departure"],
+                            "arrival": leg2["arrival"],
+                            "duration": leg2["_arr_abs"] - leg1["_dep_abs"],
+                            "price": leg1["price"] + leg2["price"],
+                            "_arr_abs": leg2["_arr_abs"],
+                        }
+
+        ranked = sorted(best.values(), key=lambda x: (x["_arr_abs"], x["price"]))
+        return [_public(r) for r in ranked[:limit]]
+
+    def train_detail(self, train_no: str) -> Optional[Dict[str, Any]]:
+        """车次详情：经停站与时刻"""
+        train = self.train_index.get(train_no)
+        if train is None:
+            return None
+
+        stops = []
+        lo, hi = self.train_offsets[train], self.train_offsets[train + 1]
+        for g in range(lo, hi):
+            stops.append(
+                {
+                    "station": self.station_names[self.stop_station[g]],
+                    "arrival": None if g == lo else _fmt_time(self.stop_arr[g]),
+                    "departure": None if g == hi - 1 else _fmt_time(self.stop_dep[g]),
+                    "distance_km": self.stop_km[g],
+                }
+            )
+        days = self.train_days[train]
+        return {
+            "train_no": train_no,
+            "type": self.train_types[train],
+            "running_days": [d + 1 for d in range(7) if days >> d & 1],
+            "seat_classes": list(self.fares.get(self.train_types[train], {})),
+            "stations": stops,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "stations": len(self.station_names),
+            "trains": len(self.train_nos),
+            "stops": len(self.stop_train),
+        }
+
+
+def _public(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in item.items() if not k.startswith("_")}
+
+
+# ---------------------------------------------------------------------- 数据集生成
+
+# 主要城市及坐标 (纬度, 经度)
+MAJOR_CITIES: Dict[str, Tuple[float, float]] = {
+    "北京": (39.90, 116.41), "上海": (31.23, 121.47), "广州": (23.13, 113.26),
+    "深圳": (22.54, 114.06), "天津": (39.08, 117.20), "重庆": (29.56, 106.55),
+    "成都": (30.57, 104.07), "武汉": (30.59, 114.31), "西安": (34.34, 108.94),
+    "杭州": (30.27, 120.16), "南京": (32.06, 118.80), "郑州": (34.75, 113.62),
+    "长沙": (28.23, 112.94), "沈阳": (41.81, 123.43), "哈尔滨": (45.80, 126.53),
+    "长春": (43.82, 125.32), "济南": (36.65, 117.12), "青岛": (36.07, 120.38),
+    "石家庄": (38.04, 114.51), "太原": (37.87, 112.55), "合肥": (31.82, 117.23),
+    "南昌": (28.68, 115.86), "福州": (26.07, 119.30), "厦门": (24.48, 118.09),
+    "昆明": (25.04, 102.71), "贵阳": (26.65, 106.63), "南宁": (22.82, 108.37),
+    "兰州": (36.06, 103.83), "西宁": (36.62, 101.78), "银川": (38.49, 106.23),
+    "呼和浩特": (40.84, 111.75), "乌鲁木齐": (43.83, 87.62), "拉萨": (29.65, 91.14),
+    "海口": (20.04, 110.20), "大连": (38.91, 121.61), "宁波": (29.87, 121.54),
+    "苏州": (31.30, 120.59), "无锡": (31.49, 120.31), "徐州": (34.21, 117.28),
+    "洛阳": (34.62, 112.45),
+}
+
+_NAME_CHARS = "安宁平江山河东西南北阳城新华清泉丰德兴隆永昌宝庆临川云峰林桥溪湖岭州水台源长"
+
+
+def _haversine(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (*a, *b))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(h))
+
+
+def generate_timetable(
+    num_lines: int = 150,
+    stations_per_line: int = 20,
+    num_trains: int = 10000,
+    seed: int = 12306,
+    trunk_trains: int = 1,
+) -> Dict[str, Any]:
+    """
+    生成全国规模的模拟时刻表
+
+    在主要城市之间铺设线路，线路上插入中间站；车次沿线路的连续区段运行，
+    高铁/动车停靠部分中间站，普速车停靠大部分车站。换乘发生在线路交汇的城市站。
+    此外任意两个主要城市之间每个方向另有 trunk_trains 趟每日开行的直达车
+    （1500 公里以内为高铁，更远为普速），随机线路未覆盖的城市对也能查到直达。
+
+    Returns:
+        与 TimetableEngine.load 相同格式的字典
+    """
+    rng = random.Random(seed)
+    stations: List[Dict[str, Any]] = []
+    coords: List[Tuple[float, float]] = []
+    used_names = set()
+
+    def add_station(name: str, city: str, coord: Tuple[float, float]) -> int:
+        used_names.add(name)
+        stations.append({"name": name, "city": city, "lat": round(coord[0], 4), "lon": round(coord[1], 4)})
+        coords.append(coord)
+        return len(stations) - 1
+
+    city_ids: Dict[str, List[int]] = {}
+    for city, coord in MAJOR_CITIES.items():
+        city_ids[city] = [add_station(city, city, coord)]
+        if rng.random() < 0.5:
+            city_ids[city].append(add_station(f"{city}南", city, coord))
+
+    cities = list(MAJOR_CITIES)
+    # 保证主干线存在
+    pairs = [("北京", "上海"), ("北京", "广州"), ("上海", "成都"), ("北京", "哈尔滨"), ("广州", "昆明")]
+    while len(pairs) < num_lines:
+        a, b = rng.sample(cities, 2)
+        pairs.append((a, b))
+
+    lines: List[List[Tuple[int, float]]] = []
+    for a, b in pairs[:num_lines]:
+        ca, cb = MAJOR_CITIES[a], MAJOR_CITIES[b]
+        path = [rng.choice(city_ids[a])]
+        for i in range(1, stations_per_line + 1):
+            f = i / (stations_per_line + 1)
+            coord = (
+                ca[0] + (cb[0] - ca[0]) * f + rng.uniform(-0.2, 0.2),
+                ca[1] + (cb[1] - ca[1]) * f + rng.uniform(-0.2, 0.2),
+            )
+            name = ""
+            while not name or name in used_names:
+                name = "".join(rng.sample(_NAME_CHARS, 2)) + rng.choice(["", "东", "西", "南", "北"])
+            path.append(add_station(name, name, coord))
+        path.append(rng.choice(city_ids[b]))
+
+        km, line = 0.0, [(path[0], 0.0)]
+        for prev, cur in zip(path, path[1:]):
+            km += _haversine(coords[prev], coords[cur]) * 1.15
+            line.append((cur, km))
+        lines.append(line)
+
+    speeds = {"G": 250.0, "D": 180.0, "K": 75.0}
+    counters = {"G": 1, "D": 1, "K": 1}
+    trains = []
+    for _ in range(num_trains):
+        kind = rng.choices(["G", "D", "K"], weights=[5, 3, 2])[0]
+        line = rng.choice(lines)
+        if rng.random() < 0.5:
+            line = [(s, line[-1][1] - km) for s, km in reversed(line)]
+        lo = 0 if rng.random() < 0.6 else rng.randrange(0, len(line) // 2)
+        hi = len(line) - 1 if rng.random() < 0.6 else rng.randrange(len(line) // 2 + 1, len(line))
+        stop_prob = {"G": 0.3, "D": 0.5, "K": 0.85}[kind]
+        segment = [line[lo]] + [p for p in line[lo + 1 : hi] if rng.random() < stop_prob] + [line[hi]]
+
+        t = rng.randrange(6 * 60, 22 * 60) if kind != "K" else rng.randrange(0, MINUTES_PER_DAY)
+        base_km = segment[0][1]
+        stops, prev_km = [], base_km
+        for i, (sid, km) in enumerate(segment):
+            if i > 0:
+                t += max(5, round((km - prev_km) / speeds[kind] * 60))
+            arr = t
+            if 0 < i < len(segment) - 1:
+                t += rng.randint(2, 5) if kind != "K" else rng.randint(5, 15)
+            stops.append([sid, arr, t, round(km - base_km)])
+            prev_km = km
+
+        days = 0x7F if rng.random() < 0.85 else rng.randrange(1, 0x80)
+        trains.append({"train_no": f"{kind}{counters[kind]}", "type": kind, "days": days, "stops": stops})
+        counters[kind] += 1
+
+    # 主要城市间的直达干线车次（在随机车次之后生成，不改变随机车次的编号与时刻）
+    for a in cities:
+        for b in cities:
+            if a == b:
+                continue
+            km = _haversine(MAJOR_CITIES[a], MAJOR_CITIES[b]) * 1.15
+            kind = "G" if km <= 1500 else "K"
+            for _ in range(trunk_trains):
+                dep = rng.randrange(7 * 60, 20 * 60) if kind == "G" else rng.randrange(0, MINUTES_PER_DAY)
+                arr = dep + max(5, round(km / speeds[kind] * 60))
+                stops = [[rng.choice(city_ids[a]), dep, dep, 0], [rng.choice(city_ids[b]), arr, arr, round(km)]]
+                trains.append({"train_no": f"{kind}{counters[kind]}", "type": kind, "days": 0x7F, "stops": stops})
+                counters[kind] += 1
+
+    return {"stations": stations, "trains": trains, "fares": DEFAULT_FARES}
+
+
+def save_timetable(data: Dict[str, Any], path: str) -> None:
+    with atomic_write(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+
+__all__ = ["TimetableEngine", "generate_timetable", "save_timetable", "DEFAULT_FARES"]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成模拟全国时刻表数据集")
+    parser.add_argument("output", nargs="?", default="data/timetable.json")
+    parser.add_argument("--lines", type=int, default=150)
+    parser.add_argument("--stations-per-line", type=int, default=20)
+    parser.add_argument("--trains", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=12306)
+    parser.add_argument("--trunk-trains", type=int, default=1, help="主要城市间每个方向的直达车次数")
+    args = parser.parse_args()
+
+    dataset = generate_timetable(args.lines, args.stations_per_line, args.trains, args.seed, args.trunk_trains)
+    save_timetable(dataset, args.output)
+    print(f"[OK] {len(dataset['stations'])} stations, {len(dataset['trains'])} trains -> {args.output}")
@@ -0,0 +1,96 @@
+"""
+测试公共配置：与 main.py 相同，把 src 加入 sys.path，以顶层包名导入 core / agents / mcp_servers；
+fake_manager fixture 提供可配置的 MCP 管理器替身
+"""
+
+import asyncio
+import json
+import os
+import sys
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+# 测试中日志只输出到控制台，不在运行目录下生成 logs/
+os.environ.setdefault("LOG_DIR", "")
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+
+class FakeManager:
+    """
+    可配置的 MCPClientManager 替身
+
+    Args:
+        servers: 已注册的服务器名；工具默认属于第一个服务器，tools 可按工具名指定
+        results: 工具名 -> 返回值，或以 arguments 为参数返回结果的函数（可抛出异常）
+        errors: 工具名 -> 调用时抛出的异常
+        startup: 每个服务器首次建立会话的耗时（秒）
+        latency: 每次调用的耗时（秒）
+    """
+
+    def __init__(self, servers=("nl2sql",), tools=None, results=None, errors=None, startup=0.0, latency=0.0):
+        self.server_names = list(servers)
+        self.tools = tools or {}
+        self.results = results or {}
+        self.errors = errors or {}
+        self.startup = startup
+        self.latency = latency
+        self.sessions = set()
+        # [(server, tool, arguments), ...]
+        self.calls = []
+        # 预取的 [(tool, arguments), ...]
+        self.prefetched = []
+        self._recorded = None
+
+    def server_for_tool(self, tool):
+        return self.tools.get(tool, self.server_names[0])
+
+    async def get_session(self, server):
+        if server not in self.sessions:
+            await asyncio.sleep(self.startup)
+            self.sessions.add(server)
+        return object()
+
+    async def _call_direct(self, server, tool, arguments):
+        await asyncio.sleep(self.latency)
+        self.calls.append((server, tool, arguments))
+        if self._recorded is not None:
+            self._recorded.append((server, tool, arguments))
+        if tool in self.errors:
+            raise self.errors[tool]
+        result = self.results.get(tool, {})
+        return result(arguments) if callable(result) else result
+
+    async def call_tool(self, server, tool, arguments=None, cache_ttl=0):
+        await self.get_session(server)
+        return await self._call_direct(server, tool, arguments)
+
+    def cache_key(self, server, tool, arguments):
+        return f"{server}.{tool}:{json.dumps(arguments, sort_keys=True)}"
+
+    def prefetch(self, server, tool, arguments, ttl):
+        self.prefetched.append((tool, arguments))
+
+        async def done():
+            return True
+
+        return asyncio.ensure_future(done())
+
+    def get_policy(self, server, tool):
+        return SimpleNamespace(idempotent=True)
+
+    @contextmanager
+    def record_calls(self):
+        self._recorded = []
+        try:
+            yield self._recorded
+        finally:
+            self._recorded = None
+
+
+@pytest.fixture
+def fake_manager():
+    """FakeManager 的构造函数，参数见 FakeManager"""
+    return FakeManager
@@ -0,0 +1,79 @@
+"""归档检索：Markdown 切分、增量索引与全文检索"""
+
+import os
+
+from mcp_servers.server_archive import ArchiveIndex, chunk_markdown
+
+
+def test_chunk_markdown_splits_by_heading():
+    text = "# 标题一\n第一段内容\n\n## 标题二\n第二段内容\n"
+    chunks = chunk_markdown(text)
+    assert [c["heading"] for c in chunks] == ["标题一", "标题二"]
+    assert chunks[1]["line"] == 4
+    assert "第二段内容" in chunks[1]["text"]
+
+
+def test_chunk_markdown_windows_long_sections_with_overlap():
+    body = "".join(f"{i:04d}" for i in range(500))  # 2000 字符
+    chunks = chunk_markdown("# 长段落\n" + body, chunk_size=800, overlap=100)
+    assert len(chunks) == 3
+    assert all(len(c["text"]) <= 800 for c in chunks)
+    # 相邻窗口重叠 100 个字符
+    assert chunks[0]["text"][-100:] == chunks[1]["text"][:100]
+
+
+def test_chunk_markdown_skips_empty_sections():
+    assert chunk_markdown("") == []
+    # 首个标题前只有空行时不产生片段
+    assert [c["heading"] for c in chunk_markdown("\n\n# 有内容\n文本")] == ["有内容"]
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def test_refresh_is_incremental(tmp_path):
+    archive = tmp_path / "crawled"
+    _write(archive / "a.md", "# 北京\n北京天气晴朗，适合出行")
+    _write(archive / "b.md", "# 上海\n上海的高铁站很多")
+    index = ArchiveIndex(str(archive), ":memory:")
+
+    assert index.refresh() == {"added": 2, "updated": 0, "removed": 0, "unchanged": 0}
+    assert index.refresh()["unchanged"] == 2
+
+    _write(archive / "a.md", "# 北京\n北京今天有雨")
+    # 确保 mtime 变化
+    os.utime(archive / "a.md", (1, 1))
+    (archive / "b.md").unlink()
+    stats = index.refresh()
+    assert (stats["updated"], stats["removed"]) == (1, 1)
+    assert index.stats()["documents"] == 1
+
+
+def test_search_fulltext_and_short_query_fallback(tmp_path):
+    archive = tmp_path / "crawled"
+    _write(archive / "trip.md", "# 行程\n从北京到上海的高铁需要四个半小时\n\n# 天气\n上海今天多云")
+    index = ArchiveIndex(str(archive), ":memory:")
+    index.refresh()
+
+    results = index.search("高铁需要")
+    assert results and results[0]["path"] == "trip.md"
+    assert results[0]["heading"] == "行程"
+
+    # 少于 3 个字符无法用 trigram，退化为 LIKE
+    short = index.search("多云")
+    assert [r["heading"] for r in short] == ["天气"]
+    assert index.search("不存在的内容") == []
+
+
+def test_get_chunk_with_context(tmp_path):
+    archive = tmp_path / "crawled"
+    _write(archive / "doc.md", "# 一\n甲\n# 二\n乙\n# 三\n丙")
+    index = ArchiveIndex(str(archive), ":memory:")
+    index.refresh()
+
+    middle = index.search("乙")[0]
+    chunk = index.get_chunk(middle["chunk_id"], context=1)
+    assert "甲" in chunk["text"] and "丙" in chunk["text"]
+    assert index.get_chunk(10**6) is None
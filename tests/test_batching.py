@@ -0,0 +1,90 @@
+"""工具调用批量合并：合并、逐项错误与关闭时取消"""
+
+import asyncio
+
+import pytest
+
+from core.mcp_client_manager import _BatchCoalescer
+from core.resilience import ToolError
+
+
+def _double_batch(arguments):
+    return {
+        "results": [
+            {"ok": False, "error": "bad"} if item["x"] < 0 else {"ok": True, "result": item["x"] * 2}
+            for item in arguments["items"]
+        ]
+    }
+
+
+def _manager(fake_manager, latency=0.0):
+    return fake_manager(
+        servers=["srv"],
+        results={"double": lambda arguments: arguments["x"] * 2, "double_batch": _double_batch},
+        latency=latency,
+    )
+
+
+def coalescer(manager, **kwargs):
+    return _BatchCoalescer(manager, "srv", "double", "double_batch", **kwargs)
+
+
+def test_concurrent_calls_share_one_batch(fake_manager):
+    async def main():
+        manager = _manager(fake_manager)
+        batcher = coalescer(manager)
+        results = await asyncio.gather(*(batcher.call({"x": i}) for i in range(4)))
+        return manager.calls, results, batcher._tasks
+
+    calls, results, tasks = asyncio.run(main())
+    assert results == [0, 2, 4, 6]
+    assert [tool for _, tool, _ in calls] == ["double_batch"]
+    assert not tasks
+
+
+def test_single_call_skips_batch_tool_and_max_batch_flushes(fake_manager):
+    async def main():
+        manager = _manager(fake_manager)
+        batcher = coalescer(manager, max_batch=2)
+        single = await batcher.call({"x": 5})
+        pair = await asyncio.gather(batcher.call({"x": 1}), batcher.call({"x": 2}), batcher.call({"x": 3}))
+        return manager.calls, single, pair
+
+    calls, single, pair = asyncio.run(main())
+    assert single == 10 and pair == [2, 4, 6]
+    assert [tool for _, tool, _ in calls] == ["double", "double_batch", "double"]
+
+
+def test_item_error_only_fails_its_caller(fake_manager):
+    async def main():
+        batcher = coalescer(_manager(fake_manager))
+        return await asyncio.gather(batcher.call({"x": 1}), batcher.call({"x": -1}), return_exceptions=True)
+
+    ok, failed = asyncio.run(main())
+    assert ok == 2 and isinstance(failed, ToolError)
+
+
+def test_close_cancels_in_flight_dispatch(fake_manager):
+    async def main():
+        batcher = coalescer(_manager(fake_manager, latency=10), window_ms=1)
+        calls = [asyncio.ensure_future(batcher.call({"x": i})) for i in range(2)]
+        await asyncio.sleep(0.05)
+        assert len(batcher._tasks) == 1
+        await batcher.close()
+        return await asyncio.gather(*calls, return_exceptions=True), batcher._tasks
+
+    results, tasks = asyncio.run(asyncio.wait_for(main(), 2))
+    assert all(isinstance(r, ToolError) for r in results)
+    assert not tasks
+
+
+def test_close_fails_calls_still_in_window(fake_manager):
+    async def main():
+        batcher = coalescer(_manager(fake_manager), window_ms=1000)
+        call = asyncio.ensure_future(batcher.call({"x": 1}))
+        await asyncio.sleep(0)
+        await batcher.close()
+        with pytest.raises(ToolError):
+            await call
+
+    asyncio.run(main())
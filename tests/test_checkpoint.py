@@ -0,0 +1,109 @@
+"""增量检查点：按内容判断增量，节点原地修改的状态同样能完整恢复，读出的值不跨线程共享"""
+
+import operator
+from typing import Annotated, Any, Dict, List, TypedDict
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, StateGraph
+
+from core.checkpoint import DeltaCheckpointSaver, run_config
+
+
+def _merge(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    return {**(left or {}), **(right or {})}
+
+
+class _State(TypedDict):
+    items: Annotated[List[Dict[str, Any]], operator.add]
+    context: Annotated[Dict[str, Any], _merge]
+
+
+def _step(state: _State) -> Dict[str, Any]:
+    # 原地修改已写入检查点的元素与字典值
+    if state["items"]:
+        state["items"][0]["n"] += 1
+    if "tags" in state["context"]:
+        state["context"]["tags"].append(len(state["items"]))
+    return {"items": [{"n": 0, "text": "x" * 300}], "context": {"tags": state["context"].get("tags", [])}}
+
+
+def _graph(saver):
+    graph = StateGraph(_State)
+    graph.add_node("step", _step)
+    graph.set_entry_point("step")
+    graph.add_edge("step", END)
+    return graph.compile(checkpointer=saver)
+
+
+def _run(saver, turns: int) -> Dict[str, Any]:
+    graph = _graph(saver)
+    config = run_config("t1")
+    for _ in range(turns):
+        graph.invoke({"items": [], "context": {}}, config, durability="sync")
+    return graph.get_state(config).values
+
+
+def test_in_place_mutation_is_persisted(tmp_path):
+    path = str(tmp_path / "cp.db")
+    expected = _run(InMemorySaver(), 5)
+    saver = DeltaCheckpointSaver(path, snapshot_interval=4)
+    assert _run(saver, 5) == expected
+    saver.close()
+
+    # 新进程（空缓存）从数据库恢复
+    restored = DeltaCheckpointSaver(path)
+    values = _graph(restored).get_state(run_config("t1")).values
+    assert values == expected
+    assert values["items"][0]["n"] == 4
+    assert values["context"]["tags"] == [1, 2, 3, 4]
+
+
+def test_appends_are_written_as_deltas():
+    saver = DeltaCheckpointSaver(snapshot_interval=100)
+    graph = StateGraph(_State)
+    graph.add_node("step", lambda state: {"items": [{"n": len(state["items"])}]})
+    graph.set_entry_point("step")
+    graph.add_edge("step", END)
+    app = graph.compile(checkpointer=saver)
+    for _ in range(5):
+        app.invoke({"items": [], "context": {}}, run_config("t2"))
+    assert saver.stats["deltas"] > 0
+    assert [item["n"] for item in app.get_state(run_config("t2")).values["items"]] == list(range(5))
+
+
+def test_history_is_not_affected_by_cached_objects(tmp_path):
+    reference = InMemorySaver()
+    _run(reference, 3)
+    saver = DeltaCheckpointSaver(str(tmp_path / "cp.db"))
+    _run(saver, 2)
+    # 第 3 次运行在读出的（缓存中的）元素上原地修改，旧检查点仍须按原内容恢复
+    _run(saver, 1)
+    config = run_config("t1")
+    expected = [t.checkpoint["channel_values"].get("items") for t in reference.list(config)]
+    assert [t.checkpoint["channel_values"].get("items") for t in saver.list(config)] == expected
+
+
+def test_delete_thread_removes_values():
+    saver = DeltaCheckpointSaver()
+    _run(saver, 2)
+    saver.delete_thread("t1")
+    assert saver.get_tuple(run_config("t1")) is None
+    assert saver.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
+
+
+def test_values_are_not_shared_across_threads():
+    saver = DeltaCheckpointSaver()
+    graph = StateGraph(_State)
+    graph.add_node("step", lambda state: {"items": [{"n": 0, "text": "shared" * 100}]})
+    graph.set_entry_point("step")
+    graph.add_edge("step", END)
+    app = graph.compile(checkpointer=saver)
+    app.invoke({"items": [], "context": {}}, run_config("a"))
+    app.invoke({"items": [], "context": {}}, run_config("b"))
+    # 两个线程的元素内容相同，只存一份
+    assert saver.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 1
+
+    items = saver.get_tuple(run_config("a")).checkpoint["channel_values"]["items"]
+    items[0]["n"] = 99
+    assert saver.get_tuple(run_config("b")).checkpoint["channel_values"]["items"][0]["n"] == 0
+    assert saver.get_tuple(run_config("a")).checkpoint["channel_values"]["items"][0]["n"] == 0
@@ -0,0 +1,52 @@
+"""后台进程指纹：源码、配置文件与环境变量的变化都会让后台进程重启"""
+
+import os
+
+from core import daemon
+
+
+def test_source_fingerprint_tracks_plain_files(tmp_path):
+    config = tmp_path / "mcp_config.json"
+    missing = tmp_path / ".env"
+    config.write_text("{}")
+    before = daemon.source_fingerprint([str(config), str(missing)])
+
+    os.utime(config, (1, os.stat(config).st_mtime + 10))
+    touched = daemon.source_fingerprint([str(config), str(missing)])
+    missing.write_text("KIMI_MODEL=x")
+    created = daemon.source_fingerprint([str(config), str(missing)])
+    assert len({before, touched, created}) == 3
+
+
+def test_env_fingerprint_tracks_values(monkeypatch):
+    monkeypatch.delenv("TIMETABLE_PATH", raising=False)
+    unset = daemon.env_fingerprint(["TIMETABLE_PATH", "KIMI_MODEL"])
+    monkeypatch.setenv("TIMETABLE_PATH", "")
+    empty = daemon.env_fingerprint(["KIMI_MODEL", "TIMETABLE_PATH"])
+    monkeypatch.setenv("TIMETABLE_PATH", "data/other.json")
+    changed = daemon.env_fingerprint(["TIMETABLE_PATH", "KIMI_MODEL"])
+    assert len({unset, empty, changed}) == 3
+    assert "data/other.json" not in changed
+
+
+def test_daemon_rejects_request_with_new_fingerprint(tmp_path):
+    import asyncio
+
+    async def handler(request):
+        return 0
+
+    async def main():
+        server = daemon.DaemonServer(handler, str(tmp_path / "d.sock"), fingerprint="a:1")
+        server.acquire_lock()
+        serving = asyncio.ensure_future(server.serve())
+        await asyncio.sleep(0.1)
+        reader, writer = await asyncio.open_unix_connection(str(tmp_path / "d.sock"))
+        writer.write(b'{"protocol": 1, "fingerprint": "a:2", "query": "q"}\n')
+        await writer.drain()
+        reply = await reader.readline()
+        writer.close()
+        await asyncio.wait_for(serving, 2)
+        server.release()
+        return reply
+
+    assert b'"restart"' in asyncio.run(main())
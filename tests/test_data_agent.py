@@ -0,0 +1,81 @@
+"""数据分析智能体：查询失败时返回 error 而不中断图"""
+
+import asyncio
+
+import pytest
+
+from mcp import types
+
+from agents.data_agent import DataAgent
+from core.resilience import ToolError
+from core.settings import Settings
+from mcp_servers import server_nl2sql
+
+
+@pytest.fixture(autouse=True)
+def no_prefetch(monkeypatch):
+    monkeypatch.setattr(Settings, "PREFETCH", False)
+
+
+@pytest.fixture
+def run(fake_manager):
+    def run(execute):
+        manager = fake_manager(
+            results={
+                "get_schema": {"tables": [{"name": "users", "columns": ["id", "name"]}]},
+                "execute_sql": lambda arguments: execute(arguments["sql"]),
+            }
+        )
+        return asyncio.run(DataAgent(manager).run("查询所有用户"))["result"]
+
+    return run
+
+
+def raise_connection_error(sql):
+    raise ConnectionError("server gone")
+
+
+def raise_tool_error(sql):
+    raise ToolError("Tool nl2sql.execute_sql failed: no such table: users")
+
+
+@pytest.mark.parametrize(
+    "execute, error",
+    [
+        (raise_connection_error, "ConnectionError: server gone"),
+        (raise_tool_error, "ToolError: Tool nl2sql.execute_sql failed: no such table: users"),
+        (lambda sql: {"count": 0}, "KeyError: 'rows'"),
+    ],
+)
+def test_query_failure_is_reported(run, execute, error):
+    result = run(execute)
+    assert result["error"] == error
+    assert result["data"] == [] and result["analysis"]["row_count"] == 0
+
+
+def test_successful_query_has_no_error(run):
+    result = run(lambda sql: {"rows": [{"id": 1, "name": "张三"}], "count": 1})
+    assert result["error"] is None and result["sql"] == "SELECT * FROM users LIMIT 10"
+    assert result["analysis"] == {"row_count": 1, "columns": ["id", "name"]}
+
+
+def test_table_with_single_error_column_is_data(run):
+    result = run(lambda sql: {"rows": [{"error": "E42"}], "count": 1})
+    assert result["error"] is None and result["data"] == [{"error": "E42"}]
+
+
+def test_execute_sql_failure_is_reported_as_is_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(server_nl2sql, "DB_PATH", str(tmp_path / "db.sqlite"))
+    handler = server_nl2sql.app.request_handlers[types.CallToolRequest]
+
+    def call(sql):
+        request = types.CallToolRequest(params=types.CallToolRequestParams(name="execute_sql", arguments={"sql": sql}))
+        return asyncio.run(handler(request)).root
+
+    failed = call("SELECT * FROM missing")
+    assert failed.isError and "no such table: missing" in failed.content[0].text
+
+    call("CREATE TABLE error (error TEXT)")
+    call("INSERT INTO error VALUES ('E42')")
+    ok = call("SELECT * FROM error")
+    assert not ok.isError and ok.structuredContent["rows"] == [{"error": "E42"}]
@@ -0,0 +1,43 @@
+"""多 worker 启动：数据在父进程中准备一次；数据文件以原子方式写入"""
+
+import os
+import sys
+import types
+
+import pytest
+
+from mcp_servers import launcher
+from mcp_servers.atomic import atomic_write
+
+
+def test_atomic_write_replaces_or_keeps_target(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write(b"partial")
+            raise RuntimeError("interrupted")
+    assert path.read_bytes() == b"old"
+
+    with atomic_write(str(path)) as f:
+        f.write(b"new")
+        # 写入过程中目标仍是完整的旧文件
+        assert path.read_bytes() == b"old"
+    assert path.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["data.bin"]
+
+
+def test_multi_worker_prepares_in_parent(monkeypatch):
+    events = []
+    module = types.SimpleNamespace(
+        prepare=lambda: events.append("prepare"), shutdown=lambda: events.append("shutdown")
+    )
+    fake_uvicorn = types.SimpleNamespace(run=lambda *args, **kwargs: events.append(("run", kwargs["workers"])))
+    monkeypatch.setitem(sys.modules, "uvicorn", fake_uvicorn)
+    monkeypatch.setitem(sys.modules, "fake_server", module)
+    # serve() 会设置这两个环境变量，测试结束后恢复
+    monkeypatch.setenv(launcher.SERVER_MODULE_ENV, "")
+    monkeypatch.setenv(launcher.STATELESS_ENV, "")
+
+    launcher.serve(None, "fake_server", ["--transport", "streamable-http", "--workers", "3"])
+    assert events == ["prepare", "shutdown", ("run", 3)]
@@ -0,0 +1,99 @@
+"""异步日志：队列满时 drop / block、flush 语义，JSON 日志带 correlation_scope 的 run_id"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from core.logger import AsyncLogWriter, correlation_scope, get_logger, setup_logger
+
+
+def _message(text, level=20):
+    return SimpleNamespace(record={"message": text, "level": SimpleNamespace(no=level)})
+
+
+def _collect(writer, level=0):
+    written = []
+    writer.add_target(level, lambda records: written.extend(r["message"] for r in records))
+    return written
+
+
+@pytest.fixture
+def writer():
+    writers = []
+
+    def make(**kwargs):
+        writers.append(AsyncLogWriter(**kwargs))
+        return writers[-1]
+
+    yield make
+    for w in writers:
+        w.stop(timeout=1)
+
+
+def test_drop_overflow_counts_and_keeps_earlier_records(writer):
+    w = writer(queue_size=2, overflow="drop")
+    written = _collect(w)
+    for i in range(5):
+        w.sink(_message(f"m{i}"))
+    assert w.dropped == 3
+
+    w.start()
+    assert w.flush(timeout=1)
+    assert written == ["m0", "m1"]
+
+
+def test_block_overflow_waits_for_space(writer):
+    w = writer(queue_size=1, overflow="block")
+    written = _collect(w)
+    w.sink(_message("m0"))
+    caller = threading.Thread(target=w.sink, args=(_message("m1"),), daemon=True)
+    caller.start()
+    time.sleep(0.1)
+    # 队列已满，调用方被阻塞而不是丢弃
+    assert caller.is_alive()
+
+    w.start()
+    caller.join(timeout=1)
+    assert not caller.is_alive()
+    assert w.flush(timeout=1)
+    assert written == ["m0", "m1"] and w.dropped == 0
+
+
+def test_flush_waits_for_pending_records_and_filters_levels(writer):
+    w = writer()
+    errors = _collect(w, level=40)
+    everything = _collect(w)
+    w.start()
+    for i in range(100):
+        w.sink(_message(f"m{i}", level=40 if i % 10 == 0 else 20))
+    assert w.flush(timeout=1)
+    assert len(everything) == 100 and len(errors) == 10
+
+    w.stop(timeout=1)
+    assert not w.flush(timeout=0.1)
+
+
+def test_overflow_must_be_known():
+    with pytest.raises(ValueError):
+        AsyncLogWriter(overflow="wait")
+
+
+def test_json_sink_carries_run_id(tmp_path):
+    config = setup_logger(log_dir=str(tmp_path), enqueue=True, json_sink=True, enable_console=False)
+    try:
+        log = get_logger(__name__)
+        with correlation_scope("run-42"):
+            log.info("inside")
+        log.info("outside")
+        assert config.writer.flush(timeout=1)
+    finally:
+        setup_logger(log_dir="", enable_console=False)
+
+    (events,) = tmp_path.glob("events_*.jsonl")
+    entries = [json.loads(line) for line in events.read_text(encoding="utf-8").splitlines()]
+    assert [(e["message"], e.get("run_id")) for e in entries] == [("inside", "run-42"), ("outside", None)]
+    (app,) = tmp_path.glob("app_*.log")
+    assert "[run-42] inside" in app.read_text(encoding="utf-8")
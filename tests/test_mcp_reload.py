@@ -0,0 +1,110 @@
+"""MCP 配置热更新：增量对比、只回收变更服务器的会话与缓存、通知监听者并只重建受影响的智能体"""
+
+import asyncio
+import importlib.util
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+from core.mcp_client_manager import MCPClientManager
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _server(name, *args):
+    return {"name": name, "type": "stdio", "command": "python", "args": [f"{name}.py", *args]}
+
+
+def _write(path, servers):
+    path.write_text(json.dumps({"mcp_servers": servers}), encoding="utf-8")
+    # 保证 mtime 变化（部分文件系统精度为秒）
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+
+
+class FakeHandle:
+    def __init__(self, name, refs=0):
+        self.server_name = name
+        self.session = object()
+        self.refs = refs
+        self.retired = False
+        self.broken = False
+        self.stopped = False
+
+    async def stop(self):
+        self.stopped = True
+
+
+def _manager(tmp_path, monkeypatch):
+    config = tmp_path / "mcp_config.json"
+    _write(config, [_server("a"), _server("b"), _server("c")])
+    manager = MCPClientManager()
+    manager.load_config(str(config))
+
+    started = []
+
+    async def get_session(name):
+        started.append(name)
+
+    monkeypatch.setattr(manager, "get_session", get_session)
+    manager._handles = {"a": FakeHandle("a"), "b": FakeHandle("b", refs=1), "c": FakeHandle("c")}
+    manager._result_cache = {f"{name}:tool:{{}}": (float("inf"), name) for name in "abc"}
+    return manager, config, started
+
+
+def test_reload_reconciles_servers(tmp_path, monkeypatch):
+    manager, config, started = _manager(tmp_path, monkeypatch)
+    handles = dict(manager._handles)
+    notified = []
+    manager.add_reload_listener(notified.append)
+
+    # a 不变，b 参数变化，c 删除，d 新增
+    _write(config, [_server("a"), _server("b", "--verbose"), _server("d")])
+    diff = asyncio.run(manager.reload_config())
+
+    assert diff == {"added": ["d"], "removed": ["c"], "changed": ["b"]}
+    assert manager.server_names == ["a", "b", "d"]
+    # 未变化的服务器会话保留；删除的立即关闭；变更的仍有调用在使用，延迟到调用结束
+    assert manager._handles == {"a": handles["a"]}
+    assert not handles["a"].stopped and handles["c"].stopped
+    assert handles["b"].retired and not handles["b"].stopped and handles["b"] in manager._retired
+    asyncio.run(manager._release(handles["b"]))
+    assert handles["b"].stopped and not manager._retired
+    # 只清除受影响服务器的缓存
+    assert [key.split(":")[0] for key in manager._result_cache] == ["a"]
+    # 新增与变更（此前有会话）的服务器重新建立会话
+    assert sorted(started) == ["b", "d"]
+    assert notified == [{"b", "c", "d"}]
+
+
+def test_unchanged_config_is_a_no_op(tmp_path, monkeypatch):
+    manager, config, started = _manager(tmp_path, monkeypatch)
+    notified = []
+    manager.add_reload_listener(notified.append)
+    _write(config, [_server("a"), _server("b"), _server("c")])
+
+    assert asyncio.run(manager.reload_config()) == {"added": [], "removed": [], "changed": []}
+    assert set(manager._handles) == {"a", "b", "c"} and len(manager._result_cache) == 3
+    assert started == [] and notified == []
+
+
+def test_orchestrator_rebuilds_only_affected_agents(tmp_path, monkeypatch):
+    spec = importlib.util.spec_from_file_location("bootcamp_main", ROOT / "main.py")
+    main = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(main)
+
+    manager, config, _ = _manager(tmp_path, monkeypatch)
+    orchestrator = main.AgentOrchestrator()
+    orchestrator.agents = {
+        "travel": SimpleNamespace(mcp_servers=("a",), graph="travel-graph"),
+        "data": SimpleNamespace(mcp_servers=("b",), graph="data-graph"),
+        "browser": SimpleNamespace(mcp_servers=("c", "e"), graph="browser-graph"),
+    }
+    manager.add_reload_listener(orchestrator._on_mcp_reload)
+
+    _write(config, [_server("a"), _server("b", "--verbose"), _server("c")])
+    asyncio.run(manager.reload_config())
+
+    graphs = {name: agent.graph for name, agent in orchestrator.agents.items()}
+    assert graphs == {"travel": "travel-graph", "data": None, "browser": "browser-graph"}
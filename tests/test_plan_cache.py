@@ -0,0 +1,128 @@
+"""轨迹缓存：模板化、确认次数、代入回放、校验失败时交回 LLM，回放的运行不再记录"""
+
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from agents.browser_agent.graph import BrowserAgent
+from core.plan_cache import PlanCache, normalize
+from core.settings import Settings
+from core.tool_dispatch import EarlyToolDispatcher
+
+
+def _archive_run(url: str, page: str):
+    slug = url.split("://", 1)[1].replace(".", "_").replace("/", "_")
+    return [
+        HumanMessage(content=f"归档 {url}"),
+        AIMessage(content="", tool_calls=[{"name": "firecrawl_scrape", "args": {"url": url}, "id": "a"}]),
+        ToolMessage(content=page, tool_call_id="a"),
+        AIMessage(
+            content="",
+            tool_calls=[{"name": "write_file", "args": {"path": f"{slug}.md", "content": page}, "id": "b"}],
+        ),
+        ToolMessage(content="saved", tool_call_id="b"),
+        AIMessage(content=f"已保存到 {slug}.md"),
+    ]
+
+
+def _executor(results, calls_seen):
+    async def execute(calls):
+        calls_seen.extend(calls)
+        return [
+            ToolMessage(content=results[call["name"]], tool_call_id=call["id"], name=call["name"])
+            for call in calls
+        ]
+
+    return execute
+
+
+def test_normalize_extracts_slots():
+    template, slots = normalize("归档  https://a.com/x 2026-02-05 的 3 篇")
+    assert template == "归档 {url0} {date0} 的 {number0} 篇"
+    assert slots == {"url0": "https://a.com/x", "date0": "2026-02-05", "number0": "3"}
+
+
+def test_plan_needs_support_before_replay():
+    plans = PlanCache(min_support=2)
+    assert plans.record(_archive_run("https://a.com/news", "# A news page with content"))
+    assert plans.match("归档 https://b.org/post") is None
+    assert plans.record(_archive_run("https://c.net/blog", "# C blog page with content"))
+    assert plans.match("归档 https://b.org/post") is not None
+    assert plans.match("归档 https://b.org/post", tools=["firecrawl_scrape"]) is None
+
+
+def test_replay_substitutes_slots_and_results():
+    plans = PlanCache(min_support=2)
+    plans.record(_archive_run("https://a.com/news", "# A news page with content"))
+    plans.record(_archive_run("https://c.net/blog", "# C blog page with content"))
+    plan, slots = plans.match("归档 https://b.org/post")
+
+    calls = []
+    page = "# B post page with content"
+    execute = _executor({"firecrawl_scrape": page, "write_file": "saved"}, calls)
+    messages, complete = asyncio.run(plans.replay(plan, slots, execute))
+
+    assert complete
+    assert [c["args"] for c in calls] == [
+        {"url": "https://b.org/post"},
+        {"path": "b_org_post.md", "content": page},
+    ]
+    assert messages[-1].content == "已保存到 b_org_post.md"
+    assert plans.stats["replayed"] == 1
+
+
+def test_failed_validation_hands_over_to_llm():
+    plans = PlanCache(min_support=2)
+    plans.record(_archive_run("https://a.com/news", "# A news page with content"))
+    plans.record(_archive_run("https://c.net/blog", "# C blog page with content"))
+    plan, slots = plans.match("归档 https://b.org/post")
+
+    calls = []
+    execute = _executor({"firecrawl_scrape": "   ", "write_file": "saved"}, calls)
+    messages, complete = asyncio.run(plans.replay(plan, slots, execute))
+
+    assert not complete
+    assert [c["name"] for c in calls] == ["firecrawl_scrape"]
+    assert messages[-1].type == "tool"
+    # 轨迹需要重新确认
+    assert plans.match("归档 https://b.org/post") is None
+
+
+def test_replayed_run_is_not_recorded():
+    plans = PlanCache(min_support=2)
+    plans.record(_archive_run("https://a.com/news", "# A news page with content"))
+    plans.record(_archive_run("https://c.net/blog", "# C blog page with content"))
+    plan, slots = plans.match("归档 https://b.org/post")
+
+    page = "# B post page with content"
+    execute = _executor({"firecrawl_scrape": page, "write_file": "saved"}, [])
+    messages, _ = asyncio.run(plans.replay(plan, slots, execute))
+
+    assert not plans.record([HumanMessage(content="归档 https://b.org/post"), *messages])
+    assert plan.support == 2 and plans.stats["recorded"] == 2
+
+
+def test_agent_skips_record_after_replay(monkeypatch):
+    @tool
+    def firecrawl_scrape(url: str) -> str:
+        """Scrape a url"""
+        return f"# Page {url} with content"
+
+    @tool
+    def write_file(path: str, content: str) -> str:
+        """Write a file"""
+        return "saved"
+
+    monkeypatch.setattr(Settings, "PLAN_CACHE", True)
+    agent = BrowserAgent()
+    agent.tools = [firecrawl_scrape, write_file]
+    agent.dispatcher = EarlyToolDispatcher(agent.tools)
+    agent.graph = agent._build_graph()
+    agent.plans.record(_archive_run("https://a.com/news", "# Page https://a.com/news with content"))
+    agent.plans.record(_archive_run("https://c.net/blog", "# Page https://c.net/blog with content"))
+
+    # 完整回放，不经过 LLM
+    assert asyncio.run(agent.run("归档 https://b.org/post")) == "已保存到 b_org_post.md"
+    plan, _ = agent.plans.match("归档 https://b.org/post")
+    assert plan.support == 2 and agent.plans.stats["recorded"] == 2
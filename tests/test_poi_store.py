@@ -0,0 +1,82 @@
+"""POI 库：构建与重新打开、关键词与城市过滤、geohash 半径检索、完整名称优先"""
+
+import random
+
+import pytest
+
+from mcp_servers import server_amap
+from mcp_servers.poi_store import PoiStore, build_poi_store, haversine_m
+
+
+def _pois():
+    rng = random.Random(3)
+    pois = []
+    for i in range(300):
+        city, (lat, lon) = rng.choice([("杭州", (30.27, 120.15)), ("上海", (31.23, 121.47))])
+        pois.append(
+            {
+                "name": f"店铺{i}",
+                "address": f"{city}路{i}号",
+                "category": rng.choice(["餐厅", "酒店", "书店"]),
+                "city": city,
+                "lat": lat + rng.uniform(-0.05, 0.05),
+                "lon": lon + rng.uniform(-0.05, 0.05),
+            }
+        )
+    # 完整名称匹配（位置最靠西南，ID 最小）与若干只命中全部 bigram 的名称
+    pois.append({"name": "金星咖啡馆", "category": "咖啡馆", "city": "杭州", "lat": 30.2, "lon": 120.0})
+    for i in range(12):
+        pois.append({"name": f"咖啡{i}啡馆", "category": "饮品", "city": "杭州", "lat": 30.3, "lon": 120.2 + i / 100})
+    return pois
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("poi") / "poi_store.bin")
+    assert build_poi_store(_pois(), path) == 313
+    store = PoiStore(path)
+    yield store
+    store.close()
+
+
+def test_reopen_reads_same_data(store):
+    reopened = PoiStore(store.path)
+    try:
+        assert reopened.count == store.count
+        assert sorted(reopened.cities) == ["上海", "杭州"]
+        assert reopened.get(5) == store.get(5)
+    finally:
+        reopened.close()
+
+
+def test_keyword_and_city_filter(store):
+    results = store.search("书店", city="上海", top_k=500)
+    expected = [p for p in _pois() if p["city"] == "上海" and p["category"] == "书店"]
+    assert len(results) == len(expected)
+    assert all(p["city"] == "上海" and p["category"] == "书店" for p in results)
+    assert store.search("书店", city="火星") == []
+
+
+def test_radius_matches_brute_force(store):
+    center, radius = (30.27, 120.15), 3000
+    results = store.search("", location=center, radius_m=radius, top_k=1000, sort="distance")
+    expected = {
+        p["name"] for p in _pois() if haversine_m(center[0], center[1], p["lat"], p["lon"]) <= radius
+    }
+    assert {p["name"] for p in results} == expected
+    distances = [p["distance_m"] for p in results]
+    assert distances == sorted(distances)
+
+
+def test_exact_name_ranked_first(store):
+    # 12 个名称同样命中全部 bigram，完整匹配不能在加分前被截断
+    results = store.search("咖啡馆", city="杭州", top_k=1)
+    assert results[0]["name"] == "金星咖啡馆"
+    assert results[0]["relevance"] == 2.0
+
+
+@pytest.mark.parametrize("location", ["abc", "1,2,3", "91,120", "30,"])
+def test_search_poi_rejects_malformed_location(location):
+    result = server_amap.search_poi({"keywords": "咖啡", "location": location})
+    assert result["pois"] == [] and result["count"] == 0
+    assert result["error"]
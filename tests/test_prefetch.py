@@ -0,0 +1,53 @@
+"""投机预取：规则触发、命中统计与按共现学习"""
+
+import asyncio
+
+from core.prefetch import LEARNED, PrefetchRule, Prefetcher
+from core.settings import Settings
+
+
+def _run(prefetcher, manager, text, calls):
+    async def main():
+        async with prefetcher.session(manager, text):
+            await asyncio.sleep(0)
+            for tool, arguments in calls:
+                await manager.call_tool("nl2sql", tool, arguments)
+
+    asyncio.run(main())
+
+
+def test_rule_hits_are_counted(fake_manager, monkeypatch):
+    monkeypatch.setattr(Settings, "PREFETCH", True)
+    manager = fake_manager()
+    prefetcher = Prefetcher("data_agent", [PrefetchRule("schema", "get_schema", lambda text: {})])
+    _run(prefetcher, manager, "查询销量", [("get_schema", {})])
+    _run(prefetcher, manager, "查询销量", [])
+    assert manager.prefetched == [("get_schema", {}), ("get_schema", {})]
+    assert prefetcher.stats["used"] == 1 and prefetcher.stats["unused"] == 1
+    assert prefetcher.rule_stats["schema"] == {"fired": 2, "used": 1}
+
+
+def test_frequent_calls_are_learned(fake_manager, monkeypatch):
+    monkeypatch.setattr(Settings, "PREFETCH", True)
+    manager = fake_manager()
+    prefetcher = Prefetcher("data_agent", min_samples=3)
+    for _ in range(3):
+        _run(prefetcher, manager, "查询", [("list_tables", {})])
+    assert manager.prefetched == []
+
+    _run(prefetcher, manager, "查询", [("list_tables", {})])
+    assert manager.prefetched == [("list_tables", {})]
+    assert prefetcher.rule_stats[LEARNED] == {"fired": 1, "used": 1}
+
+
+def test_disabled_prefetch_does_nothing(fake_manager, monkeypatch):
+    monkeypatch.setattr(Settings, "PREFETCH", False)
+    manager = fake_manager()
+    prefetcher = Prefetcher("data_agent", [PrefetchRule("schema", "get_schema", lambda text: {})])
+
+    async def main():
+        async with prefetcher.session(manager, "x"):
+            pass
+
+    asyncio.run(main())
+    assert manager.prefetched == [] and prefetcher.stats["runs"] == 0
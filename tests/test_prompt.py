@@ -0,0 +1,89 @@
+"""提示词组装：按轮裁剪不留孤立工具结果、前缀稳定与 schema 排序、token 计数缓存"""
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from core.prompt import PromptAssembler, TokenCounter
+
+
+@tool
+def fetch(url: str) -> str:
+    """Fetch a url"""
+    return url
+
+
+@tool
+def save(path: str, content: str) -> str:
+    """Save a file"""
+    return path
+
+
+def _round(n: int, size: int = 200):
+    """一轮：带两个并行工具调用的 AIMessage 及其结果"""
+    return [
+        AIMessage(
+            content="",
+            id=f"ai{n}",
+            tool_calls=[
+                {"name": "fetch", "args": {"url": f"u{n}"}, "id": f"c{n}a"},
+                {"name": "fetch", "args": {"url": f"v{n}"}, "id": f"c{n}b"},
+            ],
+        ),
+        ToolMessage(content="x" * size, tool_call_id=f"c{n}a", id=f"t{n}a"),
+        ToolMessage(content="y" * size, tool_call_id=f"c{n}b", id=f"t{n}b"),
+    ]
+
+
+def _assert_paired(messages):
+    called = set()
+    for message in messages:
+        if message.type == "ai":
+            called.update(call["id"] for call in message.tool_calls)
+        elif message.type == "tool":
+            assert message.tool_call_id in called
+
+
+def test_trim_drops_whole_rounds():
+    history = [HumanMessage(content="任务", id="h")] + _round(1) + _round(2) + _round(3)
+    prompt = PromptAssembler("系统", [fetch], max_tokens=300)
+    messages = prompt.assemble(history)
+
+    assert messages[1].id == "h"
+    assert [m.id for m in messages[2:]] == ["ai3", "t3a", "t3b"]
+    assert prompt.last_layout.trimmed == 6
+    _assert_paired(messages)
+
+
+def test_trim_keeps_last_round_even_over_budget():
+    # 最后一轮本身超出预算：不能只保留它的工具结果
+    history = [HumanMessage(content="任务", id="h")] + _round(1) + _round(2, size=2000)
+    messages = PromptAssembler("系统", [fetch], max_tokens=100).assemble(history)
+
+    assert [m.id for m in messages[1:]] == ["h", "ai2", "t2a", "t2b"]
+    _assert_paired(messages)
+
+
+def test_prefix_is_stable_across_tool_order():
+    a = PromptAssembler("\n    系统提示\n    第二行\n", [save, fetch])
+    b = PromptAssembler("系统提示\n第二行", [fetch, save])
+
+    assert a.prefix_hash == b.prefix_hash
+    assert a.tool_schemas == b.tool_schemas
+    assert [s["function"]["name"] for s in a.tool_schemas] == ["fetch", "save"]
+    assert a.system_message.content == "系统提示\n第二行"
+    assert PromptAssembler("其他提示", [fetch, save]).prefix_hash != a.prefix_hash
+
+
+def test_token_counts_are_cached_by_id():
+    counter = TokenCounter()
+    prompt = PromptAssembler("系统", [fetch], counter=counter)
+    history = [HumanMessage(content="任务", id="h")] + _round(1)
+    prompt.assemble(history)
+    assert prompt.last_layout.counted == 4 and prompt.last_layout.reused_tokens == 0
+
+    # 下一轮只计算新增消息，开头与上一轮相同的部分可复用
+    first = prompt.last_layout.total_tokens
+    prompt.assemble(history + _round(2))
+    assert prompt.last_layout.counted == 3
+    assert counter.hits == 4
+    assert prompt.last_layout.reused_tokens == first
@@ -0,0 +1,95 @@
+"""容错策略：重试、超时、对冲与熔断"""
+
+import asyncio
+
+import pytest
+
+from core.resilience import (
+    CallPolicy,
+    CircuitBreaker,
+    CircuitOpenError,
+    ToolError,
+    ToolTimeoutError,
+    call_with_policy,
+)
+
+
+def flaky(failures, error=ConnectionError, delay=0.0):
+    """前 failures 次抛出 error 的尝试工厂"""
+    attempts = []
+
+    async def attempt():
+        attempts.append(len(attempts))
+        await asyncio.sleep(delay)
+        if len(attempts) <= failures:
+            raise error("boom")
+        return "ok"
+
+    return attempt, attempts
+
+
+def run(attempt, policy, breaker=None):
+    return asyncio.run(call_with_policy(attempt, policy, breaker or CircuitBreaker("srv"), "srv.tool"))
+
+
+def test_idempotent_call_is_retried():
+    attempt, attempts = flaky(2)
+    assert run(attempt, CallPolicy(idempotent=True, retries=2, backoff_base=0)) == "ok"
+    assert len(attempts) == 3
+
+
+def test_non_idempotent_call_is_not_retried():
+    attempt, attempts = flaky(1)
+    with pytest.raises(ConnectionError):
+        run(attempt, CallPolicy(idempotent=False, retries=2, backoff_base=0))
+    assert len(attempts) == 1
+
+
+def test_tool_error_is_not_retried_or_counted():
+    attempt, attempts = flaky(1, error=ToolError)
+    breaker = CircuitBreaker("srv", failure_threshold=1)
+    with pytest.raises(ToolError):
+        run(attempt, CallPolicy(idempotent=True, backoff_base=0), breaker)
+    assert len(attempts) == 1 and breaker.state == "closed"
+
+
+def test_timeout_raises_tool_timeout_error():
+    attempt, _ = flaky(0, delay=1)
+    with pytest.raises(ToolTimeoutError):
+        run(attempt, CallPolicy(timeout=0.05))
+
+
+def test_hedged_request_wins_over_slow_first_attempt():
+    delays = [1.0, 0.0]
+
+    async def attempt():
+        await asyncio.sleep(delays.pop(0))
+        return "fast"
+
+    async def main():
+        start = asyncio.get_running_loop().time()
+        policy = CallPolicy(idempotent=True, hedge_after=0.05, timeout=2)
+        result = await call_with_policy(attempt, policy, CircuitBreaker("srv"))
+        return result, asyncio.get_running_loop().time() - start
+
+    result, elapsed = asyncio.run(main())
+    assert result == "fast" and elapsed < 0.5
+
+
+def test_circuit_opens_then_recovers_through_probe():
+    breaker = CircuitBreaker("srv", failure_threshold=2, recovery_timeout=0.05)
+    policy = CallPolicy(idempotent=False)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            run(flaky(1)[0], policy, breaker)
+    assert breaker.state == "open"
+
+    attempt, attempts = flaky(0)
+    with pytest.raises(CircuitOpenError):
+        run(attempt, policy, breaker)
+    assert attempts == []
+
+    asyncio.run(asyncio.sleep(0.06))
+    assert breaker.state == "half_open"
+    assert run(attempt, policy, breaker) == "ok"
+    assert breaker.state == "closed"
@@ -0,0 +1,59 @@
+"""意图路由：TF-IDF 最近邻打分、决策缓存与默认智能体"""
+
+import asyncio
+import os
+
+import pytest
+
+from core.router import IntentRouter, tokenize
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(
+        {
+            "travel": ["查询从北京到上海的火车票", "规划一条出行路线", "明天的高铁票"],
+            "data": ["查询所有用户数据", "统计订单数量", "用户的平均年龄"],
+            "browser": ["抓取网页内容", "访问 https://example.com"],
+        },
+        default_agent="data",
+        use_llm_fallback=False,
+    )
+
+
+def test_tokenize_cjk_ngrams_and_words():
+    assert tokenize("火车票 Train") == ["train", "火", "车", "票", "火车", "车票"]
+
+
+def test_classify_picks_nearest_agent(router):
+    assert router.classify("帮我查北京到杭州的火车票").agent == "travel"
+    assert router.classify("统计用户数量").agent == "data"
+    assert router.classify("抓取这个网页").agent == "browser"
+
+
+def test_unknown_text_falls_back_to_default(router):
+    decision = asyncio.run(router.route("xyz"))
+    assert (decision.agent, decision.source) == ("data", "default")
+
+
+def test_route_uses_cache_for_normalized_text(router):
+    first = asyncio.run(router.route("查询 火车票"))
+    second = asyncio.run(router.route("  查询   火车票 "))
+    assert first.agent == second.agent == "travel"
+    assert second.source == "cache"
+
+
+def test_cache_is_bounded():
+    router = IntentRouter({"a": ["苹果"], "b": ["香蕉"]}, cache_size=2, use_llm_fallback=False)
+    for text in ("苹果", "香蕉", "苹果汁"):
+        asyncio.run(router.route(text))
+    assert len(router._cache) == 2
+
+
+def test_from_config_routes_examples_to_their_agent():
+    router = IntentRouter.from_config(os.path.join(ROOT, "config", "agents_config.yaml"))
+    assert router.classify("查询从北京到上海的火车票").agent == "travel"
+    assert router.classify("请抓取 https://langchain.com 并归档").agent == "browser"
+    assert router.classify("查询所有用户的平均年龄").agent == "data"
@@ -0,0 +1,75 @@
+"""路网路径规划：A*/ALT 与双向 Dijkstra 一致、全国干线与地标缓存"""
+
+import os
+import random
+
+import pytest
+
+from mcp_servers.routing import RoadNetwork, generate_network
+from mcp_servers.timetable import MAJOR_CITIES
+
+
+@pytest.fixture(scope="module")
+def network(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("roads") / "road_network.bin")
+    generate_network(rows=60, cols=60).save(path)
+    net = RoadNetwork.load(path)
+    net.prepare_landmarks(count=4)
+    return net
+
+
+@pytest.mark.parametrize("mode", ["driving", "walking", "transit"])
+def test_alt_astar_matches_bidirectional_dijkstra(network, mode):
+    rng = random.Random(7)
+    n = len(network.lat)
+    for _ in range(20):
+        s = network.nearest_node(network.lat[rng.randrange(n)], network.lon[rng.randrange(n)], mode)
+        t = network.nearest_node(network.lat[rng.randrange(n)], network.lon[rng.randrange(n)], mode)
+        cost, path, _ = network.astar(mode, s, t)
+        baseline, _, _ = network.bidirectional_dijkstra(mode, s, t)
+        assert cost == baseline
+        assert not path or (path[0], path[-1]) == (s, t)
+
+
+def test_every_timetable_city_is_routable_by_car(network):
+    assert set(MAJOR_CITIES) <= set(network.places)
+    route = network.plan("北京", "上海")
+    assert "error" not in route and route["distance_m"] > 1_000_000
+    assert "error" not in network.plan("杭州", "南京")
+
+
+def test_plan_errors(network):
+    assert network.plan("北京", "火星")["error"] == "未知地点: 火星"
+    assert network.plan("北京", "杭州", mode="walking")["error"] == "walking 不可达: 北京"
+    assert "error" not in network.plan("杭州", "宁波", mode="transit")
+
+
+def test_landmarks_cached_per_mode(network):
+    reloaded = RoadNetwork.load(network.path)
+    reloaded.prepare_landmarks(count=4)
+    for mode in ("driving", "walking", "transit"):
+        assert reloaded._landmarks[mode] == network._landmarks[mode]
+
+
+def test_landmark_cache_rebuilt_when_parameters_change(tmp_path):
+    path = str(tmp_path / "road_network.bin")
+    generate_network(rows=20, cols=20).save(path)
+    first = RoadNetwork.load(path)
+    first.prepare_landmarks(count=3, seed=1, modes=("driving",))
+
+    # 地标数或种子不同：不能复用缓存
+    other = RoadNetwork.load(path)
+    other.prepare_landmarks(count=5, seed=1, modes=("driving",))
+    assert len(other._landmarks["driving"]) == 5
+    reseeded = RoadNetwork.load(path)
+    reseeded.prepare_landmarks(count=5, seed=2, modes=("driving",))
+    assert reseeded._landmarks["driving"] != other._landmarks["driving"]
+
+    # 路网内容变化（缓存文件仍然较新）：按校验和发现不一致并重新计算
+    generate_network(rows=24, cols=24).save(path)
+    changed = RoadNetwork.load(path)
+    changed.prepare_landmarks(count=5, seed=2, modes=("driving",))
+    os.remove(path + ".alt")
+    expected = RoadNetwork.load(path)
+    expected.prepare_landmarks(count=5, seed=2, modes=("driving",))
+    assert changed._landmarks["driving"] == expected._landmarks["driving"]
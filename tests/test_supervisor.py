@@ -0,0 +1,62 @@
+"""编排器的复合请求拆分与路由 LLM 兜底超时"""
+
+import asyncio
+
+import pytest
+
+from agents.supervisor import SupervisorAgent
+from core.router import IntentRouter
+from core.settings import Settings
+
+EXAMPLES = {
+    "travel": ["查询从北京到上海的火车票", "规划一条出行路线", "明天的高铁票"],
+    "data": ["查询所有用户数据", "统计订单数量", "用户的平均年龄"],
+    "browser": ["抓取网页内容", "访问 https://example.com"],
+}
+
+
+@pytest.fixture
+def supervisor():
+    router = IntentRouter(EXAMPLES, default_agent="data", use_llm_fallback=False)
+    return SupervisorAgent({}, router)
+
+
+def split(supervisor, text):
+    return asyncio.run(supervisor.split_request(text))
+
+
+def test_single_intent_with_bing_is_not_split(supervisor):
+    tasks = split(supervisor, "合并统计订单数量并行计算用户的平均年龄")
+    assert tasks == [{"agent": "data", "task": "合并统计订单数量并行计算用户的平均年龄"}]
+
+
+def test_sentences_are_not_split(supervisor):
+    text = "查询北京到上海的火车票。要明天的高铁票。"
+    assert split(supervisor, text) == [{"agent": "travel", "task": text}]
+
+
+def test_explicit_conjunction_splits_by_agent(supervisor):
+    tasks = split(supervisor, "查询北京到上海的火车票，然后统计订单数量")
+    assert [t["agent"] for t in tasks] == ["travel", "data"]
+    assert tasks[1]["task"] == "统计订单数量"
+
+
+def test_fragment_without_intent_is_dropped(supervisor):
+    tasks = split(supervisor, "抓取网页内容；统计订单数量；然后")
+    assert [t["agent"] for t in tasks] == ["browser", "data"]
+
+
+def test_adjacent_fragments_for_same_agent_are_merged(supervisor):
+    tasks = split(supervisor, "查询北京的火车票，同时规划一条出行路线")
+    assert len(tasks) == 1 and tasks[0]["agent"] == "travel"
+
+
+def test_llm_fallback_timeout_uses_default_agent(monkeypatch):
+    class SlowLLM:
+        async def ainvoke(self, prompt):
+            await asyncio.sleep(5)
+
+    monkeypatch.setattr(Settings, "get_llm", classmethod(lambda cls: SlowLLM()))
+    router = IntentRouter(EXAMPLES, default_agent="data", llm_timeout=0.05)
+    decision = asyncio.run(router.route("xyz"))
+    assert (decision.agent, decision.source) == ("data", "default")
@@ -0,0 +1,81 @@
+"""时刻表引擎：直达/换乘查询、参数校验与主要城市直达覆盖"""
+
+import pytest
+
+from mcp_servers import server_12306
+from mcp_servers.timetable import MAJOR_CITIES, TimetableEngine, generate_timetable
+
+# 北京 -> 换乘站 -> 上海 的小型时刻表
+STATIONS = [{"name": "北京", "city": "北京"}, {"name": "济南西", "city": "济南"}, {"name": "上海", "city": "上海"}]
+TRAINS = [
+    {"train_no": "G1", "type": "G", "days": 0x7F, "stops": [[0, 480, 480, 0], [2, 750, 750, 1300]]},
+    {"train_no": "G2", "type": "G", "days": 0x1F, "stops": [[0, 600, 600, 0], [1, 700, 705, 400]]},
+    {"train_no": "D3", "type": "D", "days": 0x7F, "stops": [[1, 740, 740, 0], [2, 900, 900, 900]]},
+]
+
+
+@pytest.fixture
+def engine():
+    return TimetableEngine(STATIONS, TRAINS)
+
+
+@pytest.fixture(scope="module")
+def national():
+    data = generate_timetable(num_lines=30, stations_per_line=5, num_trains=500)
+    return TimetableEngine(data["stations"], data["trains"], data["fares"])
+
+
+def test_direct_query_respects_window_and_seat(engine):
+    assert [t["train_no"] for t in engine.query_direct("北京", "上海", "2026-02-05")] == ["G1"]
+    assert engine.query_direct("北京", "上海", "2026-02-05", depart_after="09:00") == []
+    assert engine.query_direct("北京", "上海", "2026-02-05", seat_class="硬卧") == []
+    ticket = engine.query_direct("北京", "上海", "2026-02-05", seat_class="二等座")[0]
+    assert ticket["prices"] == {"二等座": 546} and ticket["duration"] == 270
+
+
+def test_transfer_query_and_running_days(engine):
+    # 2026-02-05 为周四，G2 开行；2026-02-07 为周六，G2 停运
+    plans = engine.query_transfer("北京", "上海", "2026-02-05")
+    assert [[leg["train_no"] for leg in p["legs"]] for p in plans] == [["G2", "D3"]]
+    assert plans[0]["transfer_station"] == "济南西" and plans[0]["transfer_wait"] == 40
+    assert engine.query_transfer("北京", "上海", "2026-02-07") == []
+
+
+def test_window_wrapping_midnight(engine):
+    # 09:30-08:30 跨零点：当天 [09:30, 24:00) 与 [00:00, 08:30]
+    wrapped = {"depart_after": "09:30", "depart_before": "08:30"}
+    assert [t["train_no"] for t in engine.query_direct("北京", "上海", "2026-02-05", **wrapped)] == ["G1"]
+    assert [p["legs"][0]["train_no"] for p in engine.query_transfer("北京", "上海", "2026-02-05", **wrapped)] == ["G2"]
+    late = {"depart_after": "22:00", "depart_before": "02:00"}
+    assert engine.query_direct("北京", "上海", "2026-02-05", **late) == []
+
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"date": "2026/02/05"}, {"date": "2026-02-30"}, {"depart_after": "8点"}, {"depart_before": "25:00"}],
+)
+def test_invalid_date_or_time_raises_value_error(engine, kwargs):
+    params = {"date": "2026-02-05", **kwargs}
+    with pytest.raises(ValueError):
+        engine.query_direct("北京", "上海", **params)
+    with pytest.raises(ValueError):
+        engine.query_transfer("北京", "上海", **params)
+
+
+def test_major_cities_have_direct_trains(national):
+    cities = list(MAJOR_CITIES)
+    missing = [
+        (a, b) for a in cities for b in cities
+        if a != b and not national.query_direct(a, b, "2026-02-07", limit=1)
+    ]
+    assert missing == []
+
+
+def test_server_returns_structured_error(monkeypatch, engine):
+    monkeypatch.setattr(server_12306, "_engine", engine)
+    result = server_12306.query_tickets({"origin": "北京", "destination": "上海", "date": "明天"})
+    assert result["tickets"] == [] and "YYYY-MM-DD" in result["error"]
+    result = server_12306.query_tickets({"origin": "北京", "destination": "火星", "date": "2026-02-05"})
+    assert result["error"] == "未知车站: 火星"
+    result = server_12306.query_tickets({"origin": "北京", "destination": "上海", "date": "2026-02-05"})
+    assert "error" not in result and result["count"] == 1 and len(result["transfers"]) == 1
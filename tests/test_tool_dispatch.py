@@ -0,0 +1,94 @@
+"""流式工具调用：参数完整即开始执行，结果按调用顺序返回，出错时取消已开始的调用"""
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langchain_core.tools import tool
+
+from core.tool_dispatch import EarlyToolDispatcher, complete_args
+
+
+def _chunk(index, call_id=None, name=None, args=""):
+    return AIMessageChunk(
+        content="",
+        tool_call_chunks=[{"index": index, "id": call_id, "name": name, "args": args, "type": "tool_call_chunk"}],
+    )
+
+
+class FakeLLM:
+    """按顺序输出 chunk；遇到 callable 时等待它（用于观察流式期间的状态）"""
+
+    def __init__(self, items):
+        self.items = items
+
+    async def astream(self, messages):
+        for item in self.items:
+            if callable(item):
+                await item()
+            else:
+                yield item
+
+
+def test_complete_args():
+    assert complete_args('{"url": "x"}') == {"url": "x"}
+    assert complete_args('{"url": "x"') is None
+    assert complete_args('{"a": "}') is None
+    assert complete_args("[1]") is None
+
+
+def test_tool_starts_while_stream_continues():
+    started = asyncio.Event()
+
+    @tool
+    async def fetch(url: str) -> str:
+        """Fetch a url"""
+        started.set()
+        return f"page {url}"
+
+    async def wait_started():
+        # 第一个调用的参数已完整，流尚未结束时工具就应开始执行
+        await asyncio.wait_for(started.wait(), timeout=1)
+
+    llm = FakeLLM(
+        [
+            _chunk(0, "c1", "fetch", '{"url": '),
+            _chunk(0, args='"a"}'),
+            wait_started,
+            _chunk(1, "c2", "missing", '{"x": 1}'),
+        ]
+    )
+    dispatcher = EarlyToolDispatcher([fetch])
+    message, results = asyncio.run(dispatcher.run(llm, [HumanMessage(content="go")]))
+
+    assert [c["id"] for c in message.tool_calls] == ["c1", "c2"]
+    assert [r.tool_call_id for r in results] == ["c1", "c2"]
+    assert results[0].content == "page a"
+    assert results[1].status == "error"
+    assert dispatcher.stats == {"turns": 1, "calls": 2, "early": 2}
+
+
+def test_stream_error_cancels_started_calls():
+    cancelled = asyncio.Event()
+
+    @tool
+    async def slow(x: int) -> str:
+        """Slow tool"""
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "done"
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("stream broken")
+
+    async def main():
+        llm = FakeLLM([_chunk(0, "c1", "slow", '{"x": 1}'), fail])
+        with pytest.raises(RuntimeError):
+            await EarlyToolDispatcher([slow]).run(llm, [HumanMessage(content="go")])
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+
+    asyncio.run(main())
@@ -0,0 +1,77 @@
+"""工具检索：同一次运行内各轮选出的工具子集不变"""
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+
+from core.tool_retriever import ToolRetriever
+
+
+@tool
+def firecrawl_scrape(url: str) -> str:
+    """Scrape a web page and return its markdown content"""
+    return ""
+
+
+@tool
+def write_file(path: str, content: str) -> str:
+    """Write content to a file on disk"""
+    return ""
+
+
+@tool
+def query_train_tickets(origin: str, destination: str, date: str) -> str:
+    """Query train tickets between two stations"""
+    return ""
+
+
+@tool
+def get_weather(city: str) -> str:
+    """Get weather forecast for a city"""
+    return ""
+
+
+@tool
+def execute_sql(sql: str) -> str:
+    """Execute a SQL query against the database"""
+    return ""
+
+
+TOOLS = [firecrawl_scrape, write_file, query_train_tickets, get_weather, execute_sql]
+
+
+def _names(tools):
+    return [t.name for t in tools]
+
+
+def test_subset_is_stable_across_turns():
+    retriever = ToolRetriever(TOOLS, top_k=1, pinned=["write_file"], hints={"firecrawl_scrape": "抓取 网页"})
+    messages = [HumanMessage(content="保存 https://example.com 网页")]
+    first = _names(retriever.select(messages))
+    assert first == ["firecrawl_scrape", "write_file"]
+
+    # 工具结果与模型回复中出现其他工具的关键词，不改变本次运行的子集
+    messages += [
+        AIMessage(content="", tool_calls=[{"name": "firecrawl_scrape", "args": {"url": "x"}, "id": "1"}]),
+        ToolMessage(content="weather forecast city train tickets sql database", tool_call_id="1"),
+        AIMessage(content="weather forecast weather city forecast weather"),
+    ]
+    assert _names(retriever.select(messages)) == first
+
+
+def test_called_and_pinned_tools_are_kept():
+    retriever = ToolRetriever(TOOLS, top_k=1, pinned=["write_file"])
+    messages = [
+        HumanMessage(content="weather forecast"),
+        AIMessage(content="", tool_calls=[{"name": "execute_sql", "args": {"sql": "x"}, "id": "1"}]),
+    ]
+    assert _names(retriever.select(messages)) == ["execute_sql", "get_weather", "write_file"]
+
+
+def test_bound_is_cached_per_subset():
+    retriever = ToolRetriever(TOOLS, top_k=1)
+    built = []
+    subset = retriever.select("weather forecast")
+    first = retriever.bound(subset, lambda tools: built.append(_names(tools)) or object())
+    assert retriever.bound(list(reversed(subset)), lambda tools: object()) is first
+    assert built == [["get_weather"]]
+    assert retriever.stats["bind_hits"] == 1
@@ -0,0 +1,62 @@
+"""出行规划智能体：并行分支的超时与错误汇总"""
+
+import asyncio
+
+from agents.travel_agent import TravelAgent
+from core.settings import Settings
+
+
+SERVERS = ["12306", "amap"]
+
+
+def test_branch_timeout_excludes_server_startup(fake_manager):
+    manager = fake_manager(servers=SERVERS, startup=0.2, latency=0.01, results={"get_weather": {"weather": "晴"}})
+    agent = TravelAgent(manager)
+    agent.BRANCH_TIMEOUTS = {"tickets": 0.1, "route": 0.1, "weather": 0.1}
+    result, error = asyncio.run(agent._call_branch("weather", "amap", "get_weather", {"city": "上海"}))
+    assert (result, error) == ({"weather": "晴"}, None)
+
+
+def test_slow_tool_call_still_times_out(fake_manager):
+    agent = TravelAgent(fake_manager(servers=SERVERS, latency=0.3))
+    agent.BRANCH_TIMEOUTS = {"tickets": 0.05, "route": 0.05, "weather": 0.05}
+    result, error = asyncio.run(agent._call_branch("weather", "amap", "get_weather", {"city": "上海"}))
+    assert result is None and error.startswith("超时")
+
+
+def test_unconfigured_server_is_reported():
+    agent = TravelAgent(None)
+    result, error = asyncio.run(agent._call_branch("tickets", "12306", "query_train_tickets", {}))
+    assert result is None and "未配置" in error
+
+
+def test_tool_error_field_becomes_branch_error(fake_manager):
+    manager = fake_manager(
+        servers=SERVERS, results={"plan_route": {"origin": "北京", "mode": "driving", "error": "未知地点: 北京"}}
+    )
+    agent = TravelAgent(manager)
+    update = asyncio.run(agent.plan_route({"origin": "北京", "destination": "上海"}))
+    assert update["route_options"] == []
+    assert update["branch_errors"] == {"route": "未知地点: 北京"}
+
+
+def test_reused_thread_id_starts_from_fresh_branch_state(fake_manager, monkeypatch, tmp_path):
+    monkeypatch.setattr(Settings, "CHECKPOINT_DB", str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(Settings, "PREFETCH", False)
+    manager = fake_manager(
+        servers=SERVERS,
+        results={"plan_route": {"distance": "1200km", "duration": "12小时"}},
+        errors={"get_weather": ConnectionError("down")},
+    )
+    agent = TravelAgent(manager)
+
+    first = asyncio.run(agent.run("从北京到上海", thread_id="trip"))
+    assert first["branch_errors"] == {"weather": "ConnectionError: down"}
+
+    manager.errors = {"plan_route": ConnectionError("down")}
+    second = asyncio.run(agent.run("从杭州到南京", thread_id="trip"))
+    assert second["route_options"] == []
+    assert second["branch_errors"] == {"route": "ConnectionError: down"}
+    assert second["context"] == {"trip_info": {"origin": "杭州", "destination": "南京", "date": "2026-02-05"}}
+    # 对话历史保留
+    assert len(second["messages"]) > len(first["messages"])